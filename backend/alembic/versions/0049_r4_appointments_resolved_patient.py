@@ -0,0 +1,74 @@
+"""add resolved patient and calendar indexes to r4 appointments
+
+Revision ID: 0049_r4_appointments_resolved_patient
+Revises: 0048_r4_charting_canonical_content_hash
+Create Date: 2026-02-02 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0049_r4_appointments_resolved_patient"
+down_revision = "0048_r4_charting_canonical_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "r4_appointments",
+        sa.Column("resolved_patient_id", sa.Integer(), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_r4_appointments_resolved_patient_id",
+        "r4_appointments",
+        "patients",
+        ["resolved_patient_id"],
+        ["id"],
+    )
+    op.execute(
+        """
+        UPDATE r4_appointments AS a
+        SET resolved_patient_id = COALESCE(
+            (
+                SELECT l.patient_id
+                FROM r4_appointment_patient_links AS l
+                WHERE l.legacy_source = a.legacy_source
+                  AND l.legacy_appointment_id = a.legacy_appointment_id
+            ),
+            (
+                SELECT min(p.id)
+                FROM patients AS p
+                WHERE p.legacy_source = a.legacy_source
+                  AND p.legacy_id = a.patient_code::text
+            )
+        )
+        """
+    )
+    op.create_index(
+        "ix_r4_appointments_resolved_patient_id",
+        "r4_appointments",
+        ["resolved_patient_id"],
+    )
+    op.create_index(
+        "ix_r4_appointments_starts_at_clinician_status",
+        "r4_appointments",
+        ["starts_at", "clinician_code", "status"],
+    )
+    op.create_index(
+        "ix_r4_appointments_clinician_starts_at",
+        "r4_appointments",
+        ["clinician_code", "starts_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_r4_appointments_clinician_starts_at", table_name="r4_appointments")
+    op.drop_index("ix_r4_appointments_starts_at_clinician_status", table_name="r4_appointments")
+    op.drop_index("ix_r4_appointments_resolved_patient_id", table_name="r4_appointments")
+    op.drop_constraint(
+        "fk_r4_appointments_resolved_patient_id", "r4_appointments", type_="foreignkey"
+    )
+    op.drop_column("r4_appointments", "resolved_patient_id")
@@ -0,0 +1,57 @@
+"""add diary snapshot version counters and cache
+
+Revision ID: 0050_diary_snapshot_cache
+Revises: 0049_r4_appointments_resolved_patient
+Create Date: 2026-02-03 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0050_diary_snapshot_cache"
+down_revision = "0049_r4_appointments_resolved_patient"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "diary_snapshot_versions",
+        sa.Column("scope", sa.String(length=32), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="1"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_table(
+        "diary_snapshot_cache",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("range_start", sa.Date(), nullable=False),
+        sa.Column("view", sa.String(length=10), nullable=False),
+        sa.Column("mask_names", sa.Boolean(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column(
+            "built_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.UniqueConstraint(
+            "range_start",
+            "view",
+            "mask_names",
+            name="uq_diary_snapshot_cache_key",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("diary_snapshot_cache")
+    op.drop_table("diary_snapshot_versions")
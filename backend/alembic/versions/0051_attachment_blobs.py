@@ -0,0 +1,48 @@
+"""content-addressed attachment blobs with reference counts
+
+Revision ID: 0051_attachment_blobs
+Revises: 0050_diary_snapshot_cache
+Create Date: 2026-02-10 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0051_attachment_blobs"
+down_revision = "0050_diary_snapshot_cache"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "attachment_blobs",
+        sa.Column("storage_key", sa.String(length=64), primary_key=True),
+        sa.Column("byte_size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    # Deduplicated uploads share a storage key, so it can no longer be unique.
+    op.drop_constraint("attachments_storage_key_key", "attachments", type_="unique")
+    op.create_index("ix_attachments_storage_key", "attachments", ["storage_key"])
+    op.execute(
+        """
+        INSERT INTO attachment_blobs (storage_key, byte_size, ref_count)
+        SELECT storage_key, max(byte_size), count(*)
+        FROM attachments
+        GROUP BY storage_key
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_attachments_storage_key", table_name="attachments")
+    op.create_unique_constraint("attachments_storage_key_key", "attachments", ["storage_key"])
+    op.drop_table("attachment_blobs")
@@ -0,0 +1,136 @@
+"""partition audit_logs by month and add diff-chain columns
+
+Revision ID: 0052_audit_log_partitions
+Revises: 0051_attachment_blobs
+Create Date: 2026-02-12 00:00:00.000000
+"""
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0052_audit_log_partitions"
+down_revision = "0051_attachment_blobs"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COPY_COLUMNS = (
+    "id, created_at, actor_user_id, actor_email, action, entity_type, entity_id, "
+    "request_id, ip_address, before_json, after_json"
+)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
+
+
+def _create_month_partition(month: date) -> None:
+    # Kept in step with app/services/audit_partitions.py.
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS audit_logs_y{month.year:04d}m{month.month:02d} "
+        f"PARTITION OF audit_logs FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+        f"TO ('{_next_month(month).isoformat()} 00:00:00+00')"
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned")
+    op.execute(
+        "ALTER TABLE audit_logs_unpartitioned "
+        "RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey"
+    )
+    op.execute(
+        "ALTER TABLE audit_logs_unpartitioned "
+        "RENAME CONSTRAINT audit_logs_actor_user_id_fkey TO audit_logs_unpartitioned_actor_fkey"
+    )
+    # Keep the id sequence: it is owned by the old column and would go with it.
+    op.execute("ALTER TABLE audit_logs_unpartitioned ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id integer NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            actor_user_id integer REFERENCES users (id),
+            actor_email varchar(320),
+            action varchar(64) NOT NULL,
+            entity_type varchar(50) NOT NULL,
+            entity_id varchar(64) NOT NULL,
+            request_id varchar(120),
+            ip_address varchar(64),
+            before_json json,
+            after_json json,
+            changes_json json,
+            state_hash varchar(64),
+            parent_id integer,
+            chain_depth smallint NOT NULL DEFAULT 0,
+            CONSTRAINT audit_logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+    first_logged = bind.execute(
+        sa.text("SELECT min(created_at) FROM audit_logs_unpartitioned")
+    ).scalar()
+    today = datetime.now(timezone.utc).date()
+    start = (first_logged.astimezone(timezone.utc).date() if first_logged else today).replace(day=1)
+    last = today.replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    month = start
+    while month <= last:
+        _create_month_partition(month)
+        month = _next_month(month)
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    op.create_index(
+        "ix_audit_logs_entity", "audit_logs", ["entity_type", "entity_id", "id"]
+    )
+    op.create_index("ix_audit_logs_created_at", "audit_logs", ["created_at"])
+
+    op.execute(
+        f"INSERT INTO audit_logs ({COPY_COLUMNS}) "
+        f"SELECT {COPY_COLUMNS} FROM audit_logs_unpartitioned"
+    )
+    op.execute("DROP TABLE audit_logs_unpartitioned")
+
+
+def downgrade() -> None:
+    # Diff-encoded rows keep only their changed columns; downgrading leaves
+    # their before/after snapshots empty.
+    op.execute("ALTER TABLE audit_logs ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.create_table(
+        "audit_logs",
+        sa.Column(
+            "id",
+            sa.Integer(),
+            primary_key=True,
+            server_default=sa.text("nextval('audit_logs_id_seq')"),
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("actor_user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("actor_email", sa.String(length=320), nullable=True),
+        sa.Column("action", sa.String(length=64), nullable=False),
+        sa.Column("entity_type", sa.String(length=50), nullable=False),
+        sa.Column("entity_id", sa.String(length=64), nullable=False),
+        sa.Column("request_id", sa.String(length=120), nullable=True),
+        sa.Column("ip_address", sa.String(length=64), nullable=True),
+        sa.Column("before_json", sa.JSON(), nullable=True),
+        sa.Column("after_json", sa.JSON(), nullable=True),
+    )
+    op.execute(
+        f"INSERT INTO audit_logs ({COPY_COLUMNS}) "
+        f"SELECT {COPY_COLUMNS} FROM audit_logs_partitioned"
+    )
+    op.execute("DROP TABLE audit_logs_partitioned")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
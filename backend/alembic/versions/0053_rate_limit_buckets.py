@@ -0,0 +1,46 @@
+"""shared token buckets for rate limiting
+
+Revision ID: 0053_rate_limit_buckets
+Revises: 0052_audit_log_partitions
+Create Date: 2026-02-14 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0053_rate_limit_buckets"
+down_revision = "0052_audit_log_partitions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # UNLOGGED: bucket state is disposable (a crash just refills every bucket),
+    # so skip WAL for what is a write on every rate-limited request.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE rate_limit_buckets (
+            bucket_key varchar(255) PRIMARY KEY,
+            tokens double precision NOT NULL,
+            updated_at double precision NOT NULL,
+            allowed boolean NOT NULL DEFAULT true,
+            expires_at timestamp with time zone NOT NULL
+        )
+        """
+    )
+    op.execute("CREATE INDEX ix_rate_limit_buckets_expires_at ON rate_limit_buckets (expires_at)")
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE rate_limit_throttle_counts (
+            limiter varchar(64) PRIMARY KEY,
+            throttled bigint NOT NULL DEFAULT 0,
+            last_throttled_at timestamp with time zone
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS rate_limit_throttle_counts")
+    op.execute("DROP TABLE IF EXISTS rate_limit_buckets")
@@ -0,0 +1,34 @@
+"""add reference data version counters
+
+Revision ID: 0054_reference_data_versions
+Revises: 0053_rate_limit_buckets
+Create Date: 2026-02-16 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0054_reference_data_versions"
+down_revision = "0053_rate_limit_buckets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reference_data_versions",
+        sa.Column("scope", sa.String(length=32), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="1"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("reference_data_versions")
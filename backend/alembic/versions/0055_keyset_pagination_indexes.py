@@ -0,0 +1,88 @@
+"""composite indexes matching the keyset orderings of the list endpoints
+
+Revision ID: 0055_keyset_pagination_indexes
+Revises: 0054_reference_data_versions
+Create Date: 2026-02-20 00:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0055_keyset_pagination_indexes"
+down_revision = "0054_reference_data_versions"
+branch_labels = None
+depends_on = None
+
+# Each index ends in the page's unique tiebreaker (usually id), so
+# `(keys) < (cursor)` is a single range scan in index order.
+INDEXES = (
+    ("ix_patients_name_keyset", "patients", ["last_name", "first_name", "id"]),
+    ("ix_audit_logs_entity_created", "audit_logs", ["entity_type", "entity_id", "created_at", "id"]),
+    ("ix_audit_logs_created_at_id", "audit_logs", ["created_at", "id"]),
+    ("ix_notes_created_at_id", "notes", ["created_at", "id"]),
+    ("ix_notes_patient_created_at_id", "notes", ["patient_id", "created_at", "id"]),
+    ("ix_invoices_created_at_id", "invoices", ["created_at", "id"]),
+    ("ix_invoices_patient_created_at_id", "invoices", ["patient_id", "created_at", "id"]),
+    (
+        "ix_patient_ledger_entries_patient_created_at_id",
+        "patient_ledger_entries",
+        ["patient_id", "created_at", "id"],
+    ),
+    ("ix_appointments_starts_at_id", "appointments", ["starts_at", "id"]),
+    (
+        "ix_r4_tooth_surfaces_tooth_surface_id",
+        "r4_tooth_surfaces",
+        ["legacy_tooth_id", "legacy_surface_no", "id"],
+    ),
+)
+
+# Unmapped legacy appointments are a small slice of the table.
+UNMAPPED_APPOINTMENT_INDEXES = (
+    ("ix_appointments_unmapped_starts_at_id", ["starts_at", "id"]),
+    ("ix_appointments_unmapped_created_at_id", ["created_at", "id"]),
+)
+
+# Expressions must match PERIO_*_KEYSET in app/routers/r4_charting.py.
+EXPRESSION_INDEXES = (
+    (
+        "ix_r4_perio_probes_patient_keyset",
+        "r4_perio_probes",
+        "legacy_patient_code, "
+        "coalesce(recorded_at, '9999-12-31 00:00:00+00'::timestamptz), "
+        "coalesce(tooth, 32767), coalesce(probing_point, 32767), "
+        "coalesce(legacy_trans_id, 2147483647), legacy_probe_key, id",
+    ),
+    (
+        "ix_r4_perio_plaque_patient_keyset",
+        "r4_perio_plaque",
+        "legacy_patient_code, "
+        "coalesce(recorded_at, '9999-12-31 00:00:00+00'::timestamptz), "
+        "coalesce(tooth, 32767), coalesce(legacy_trans_id, 2147483647), "
+        "legacy_plaque_key, id",
+    ),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for name, columns in UNMAPPED_APPOINTMENT_INDEXES:
+        op.execute(
+            f"CREATE INDEX {name} ON appointments ({', '.join(columns)}) "
+            "WHERE patient_id IS NULL AND legacy_source IS NOT NULL"
+        )
+    for name, table, expression in EXPRESSION_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON {table} ({expression})")
+    # (created_at, id) serves everything the single-column index did.
+    op.drop_index("ix_audit_logs_created_at", table_name="audit_logs")
+
+
+def downgrade() -> None:
+    op.create_index("ix_audit_logs_created_at", "audit_logs", ["created_at"])
+    for name, table, _expression in reversed(EXPRESSION_INDEXES):
+        op.drop_index(name, table_name=table)
+    for name, _columns in reversed(UNMAPPED_APPOINTMENT_INDEXES):
+        op.drop_index(name, table_name="appointments")
+    for name, table, _columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
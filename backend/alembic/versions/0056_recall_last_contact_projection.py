@@ -0,0 +1,70 @@
+"""denormalise each recall's latest contact onto patient_recalls
+
+Revision ID: 0056_recall_last_contact_projection
+Revises: 0055_keyset_pagination_indexes
+Create Date: 2026-02-24 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0056_recall_last_contact_projection"
+down_revision = "0055_keyset_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    channel = postgresql.ENUM(name="patient_recall_comm_channel", create_type=False)
+    op.add_column("patient_recalls", sa.Column("last_contact_id", sa.Integer(), nullable=True))
+    op.add_column(
+        "patient_recalls",
+        sa.Column("last_contacted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column("patient_recalls", sa.Column("last_contact_channel", channel, nullable=True))
+    op.add_column("patient_recalls", sa.Column("last_contact_outcome", sa.Text(), nullable=True))
+
+    # Same ordering as app.services.recall_communications.rebuild_recall_last_contact.
+    op.execute(
+        """
+        UPDATE patient_recalls AS r
+        SET last_contact_id = latest.id,
+            last_contacted_at = latest.contacted_at,
+            last_contact_channel = latest.channel,
+            last_contact_outcome = latest.outcome
+        FROM (
+            SELECT DISTINCT ON (recall_id)
+                recall_id,
+                id,
+                coalesce(contacted_at, created_at) AS contacted_at,
+                channel,
+                outcome
+            FROM patient_recall_communications
+            ORDER BY recall_id, coalesce(contacted_at, created_at) DESC, id DESC
+        ) AS latest
+        WHERE r.id = latest.recall_id
+        """
+    )
+
+    op.create_index(
+        "ix_patient_recalls_status_due_date",
+        "patient_recalls",
+        ["status", "due_date", "id"],
+    )
+    op.create_index(
+        "ix_patient_recalls_last_contacted_at",
+        "patient_recalls",
+        ["last_contacted_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_patient_recalls_last_contacted_at", table_name="patient_recalls")
+    op.drop_index("ix_patient_recalls_status_due_date", table_name="patient_recalls")
+    op.drop_column("patient_recalls", "last_contact_outcome")
+    op.drop_column("patient_recalls", "last_contact_channel")
+    op.drop_column("patient_recalls", "last_contacted_at")
+    op.drop_column("patient_recalls", "last_contact_id")
@@ -0,0 +1,79 @@
+"""add pre-aggregated recall KPI counters
+
+Revision ID: 0057_recall_kpi_counters
+Revises: 0056_recall_last_contact_projection
+Create Date: 2026-02-26 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0057_recall_kpi_counters"
+down_revision = "0056_recall_last_contact_projection"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    recall_status = postgresql.ENUM(name="recall_status", create_type=False)
+    channel = postgresql.ENUM(name="patient_recall_comm_channel", create_type=False)
+    op.create_table(
+        "recall_kpi_buckets",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("recall_status", recall_status, nullable=False),
+        sa.Column("contacted_on", sa.Date(), nullable=True),
+        sa.Column("patients", sa.Integer(), nullable=False, server_default="0"),
+        sa.UniqueConstraint(
+            "due_date",
+            "recall_status",
+            "contacted_on",
+            name="uq_recall_kpi_buckets_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+    op.create_table(
+        "recall_contact_daily",
+        sa.Column("contacted_on", sa.Date(), primary_key=True),
+        sa.Column("channel", channel, primary_key=True),
+        sa.Column("contacts", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Same grouping as app.services.recall_kpis.rebuild_recall_kpis.
+    op.execute(
+        """
+        INSERT INTO recall_kpi_buckets (due_date, recall_status, contacted_on, patients)
+        SELECT
+            recall_due_date,
+            recall_status,
+            CASE
+                WHEN recall_status = 'contacted'
+                THEN (recall_last_contacted_at AT TIME ZONE 'UTC')::date
+            END,
+            count(*)
+        FROM patients
+        WHERE deleted_at IS NULL
+          AND recall_due_date IS NOT NULL
+          AND recall_status IS NOT NULL
+        GROUP BY 1, 2, 3
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO recall_contact_daily (contacted_on, channel, contacts)
+        SELECT
+            (coalesce(contacted_at, created_at) AT TIME ZONE 'UTC')::date,
+            channel,
+            count(*)
+        FROM patient_recall_communications
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("recall_contact_daily")
+    op.drop_table("recall_kpi_buckets")
@@ -0,0 +1,59 @@
+"""store closed-month finance packs and closed-day ledger fragments
+
+Revision ID: 0058_finance_month_pack_cache
+Revises: 0057_recall_kpi_counters
+Create Date: 2026-02-28 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0058_finance_month_pack_cache"
+down_revision = "0057_recall_kpi_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "finance_month_packs",
+        sa.Column("period_start", sa.Date(), primary_key=True),
+        sa.Column("format", sa.String(length=8), primary_key=True),
+        sa.Column("ledger_watermark", sa.Integer(), nullable=False),
+        sa.Column("render_digest", sa.String(length=64), nullable=False),
+        sa.Column("content", sa.LargeBinary(), nullable=False),
+        sa.Column(
+            "built_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_table(
+        "finance_day_fragments",
+        sa.Column("kind", sa.String(length=16), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("ledger_watermark", sa.Integer(), nullable=False),
+        sa.Column(
+            "built_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    # The current month's live tail and per-day rebuilds read the ledger by date.
+    op.create_index(
+        "ix_patient_ledger_entries_created_at",
+        "patient_ledger_entries",
+        ["created_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_patient_ledger_entries_created_at", table_name="patient_ledger_entries")
+    op.drop_table("finance_day_fragments")
+    op.drop_table("finance_month_packs")
@@ -1,13 +1,138 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.settings import settings
 
 DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Shared by the sync and async engines; each worker holds up to
+# 2 * (pool_size + max_overflow) connections, size Postgres max_connections accordingly.
+POOL_OPTIONS = {
+    "pool_size": settings.db_pool_size,
+    "max_overflow": settings.db_max_overflow,
+    "pool_timeout": settings.db_pool_timeout_seconds,
+    "pool_recycle": settings.db_pool_recycle_seconds,
+    "pool_pre_ping": settings.db_pool_pre_ping,
+}
+
+
+_pool_wait_listeners: list[Callable[[float], None]] = []
+
+
+def on_pool_wait(listener: Callable[[float], None]) -> None:
+    """Call `listener(milliseconds)` each time a session waits for a pooled connection."""
+    if listener not in _pool_wait_listeners:
+        _pool_wait_listeners.append(listener)
+
+
+class PoolWaitStats:
+    """Checkouts from one pool: how many, and how long callers waited for a connection.
+
+    The wait covers queueing for a free connection and opening a new one
+    when the pool is below its limit; checkouts that hit pool_timeout count
+    as timeouts.
+    """
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited_ms: float, *, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_ms_total += waited_ms
+            self.wait_ms_max = max(self.wait_ms_max, waited_ms)
+
+    def snapshot(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_ms_total, 1),
+                "wait_ms_max": round(self.wait_ms_max, 1),
+            }
+
+
+class _TimedCheckout:
+    """Times `_do_get`, the point where a checkout blocks once the pool is exhausted."""
+
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited_ms = (time.perf_counter() - started) * 1000
+            self.wait_stats.record(waited_ms, timed_out=timed_out)
+            for listener in _pool_wait_listeners:
+                listener(waited_ms)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        self.wait_stats = PoolWaitStats()
+        super().__init__(*args, **kwargs)
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        self.wait_stats = PoolWaitStats()
+        super().__init__(*args, **kwargs)
+
+
+def async_database_url(url: str) -> str:
+    """Same database through psycopg 3's asyncio driver."""
+    parsed = make_url(url)
+    if parsed.drivername in {"postgresql", "postgresql+psycopg", "postgresql+psycopg2"}:
+        parsed = parsed.set(drivername="postgresql+psycopg_async")
+    return parsed.render_as_string(hide_password=False)
+
+
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    async_database_url(DATABASE_URL), poolclass=TimedAsyncQueuePool, **POOL_OPTIONS
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+def pool_status() -> dict[str, dict[str, float | int]]:
+    """Occupancy and checkout waits of this worker's sync and async pools."""
+    status = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        status[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": settings.db_max_overflow,
+            **pool.wait_stats.snapshot(),
+        }
+    return status
+
 
 def get_db():
     db: Session = SessionLocal()
@@ -15,3 +140,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,10 +1,11 @@
 from fastapi import Depends, Header, HTTPException, status
 from jose import JWTError, jwt
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.settings import settings
-from app.db.session import get_db
+from app.db.session import get_async_db, get_db
 from app.models.capability import Capability, UserCapability
 from app.models.user import User
 
@@ -12,9 +13,7 @@ JWT_SECRET = settings.secret_key
 JWT_ALG = settings.jwt_alg
 
 
-def get_current_user(
-    db: Session = Depends(get_db), authorization: str | None = Header(default=None)
-) -> User:
+def _token_user_id(authorization: str | None) -> int:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
     token = authorization.split(" ", 1)[1].strip()
@@ -23,16 +22,41 @@ def get_current_user(
         sub = payload.get("sub")
         if not sub:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        user_id = int(sub)
+        return int(sub)
     except (JWTError, ValueError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+
+def _capability_stmt(user_id: int, code: str):
+    return (
+        select(UserCapability.user_id)
+        .join(Capability, Capability.id == UserCapability.capability_id)
+        .where(UserCapability.user_id == user_id, Capability.code == code)
+        .limit(1)
+    )
+
+
+def get_current_user(
+    db: Session = Depends(get_db), authorization: str | None = Header(default=None)
+) -> User:
+    user_id = _token_user_id(authorization)
     user = db.scalar(select(User).where(User.id == user_id))
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
     return user
 
 
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), authorization: str | None = Header(default=None)
+) -> User:
+    """get_current_user for async routes; runs on the event loop, not the threadpool."""
+    user_id = _token_user_id(authorization)
+    user = await db.scalar(select(User).where(User.id == user_id))
+    if not user or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+    return user
+
+
 def require_roles(*roles: str):
     def _inner(user: User = Depends(get_current_user)) -> User:
         if user.role.value not in roles:
@@ -60,12 +84,21 @@ def require_capability(code: str):
         db: Session = Depends(get_db),
         user: User = Depends(get_current_user),
     ) -> User:
-        allowed = db.scalar(
-            select(UserCapability)
-            .join(Capability, Capability.id == UserCapability.capability_id)
-            .where(UserCapability.user_id == user.id, Capability.code == code)
-        )
-        if not allowed:
+        allowed = db.scalar(_capability_stmt(user.id, code))
+        if allowed is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+        return user
+
+    return _inner
+
+
+def require_capability_async(code: str):
+    async def _inner(
+        db: AsyncSession = Depends(get_async_db),
+        user: User = Depends(get_current_user_async),
+    ) -> User:
+        allowed = await db.scalar(_capability_stmt(user.id, code))
+        if allowed is None:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
         return user
 
@@ -4,7 +4,7 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from app.core.settings import settings, validate_settings
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, async_engine
 from app.routers.auth import router as auth_router
 from app.routers.appointments import router as appointments_router
 from app.routers.invoices import router as invoices_router
@@ -34,9 +34,15 @@ from app.routers.patient_documents import (
 )
 from app.routers.capabilities import router as capabilities_router
 from app.routers.config import router as config_router
+from app.routers.rate_limits import router as rate_limits_router
+from app.routers.query_profile import router as query_profile_router
 from app.services.users import seed_initial_admin
 from app.services.capabilities import ensure_capabilities
+from app.services.audit_buffer import audit_buffer
+from app.services.query_profile import QueryProfileMiddleware
+from app.services.diary_events import diary_event_hub
 from app.services.document_templates import ensure_default_templates
+from app.services.reference_cache import warm_reference_cache
 from app.models.user import User
 from sqlalchemy import select
 from app.routers.r4_calendar import router as r4_calendar_router
@@ -44,6 +50,7 @@ from app.routers.r4_charting import router as r4_charting_router
 from app.routers.test_seed import router as test_seed_router
 
 app = FastAPI(title="Dental PMS API", version="0.1.0")
+app.add_middleware(QueryProfileMiddleware)
 logger = logging.getLogger("dental_pms.startup")
 
 
@@ -78,10 +85,19 @@ def startup():
             created_templates = ensure_default_templates(db, actor=actor)
             if created_templates:
                 logger.info("Default document templates ensured (%s added).", created_templates)
+        loaded = warm_reference_cache(db)
+        logger.info("Reference cache loaded (%s).", ", ".join(loaded))
     finally:
         db.close()
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await diary_event_hub.aclose()
+    audit_buffer.close()
+    await async_engine.dispose()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -112,6 +128,8 @@ app.include_router(patient_documents_router)
 app.include_router(documents_router)
 app.include_router(capabilities_router)
 app.include_router(audit_router)
+app.include_router(rate_limits_router)
+app.include_router(query_profile_router)
 app.include_router(timeline_router)
 app.include_router(reports_router)
 app.include_router(legacy_admin_router)
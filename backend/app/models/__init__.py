@@ -15,12 +15,16 @@ from app.models.patient_recall_communication import (
     PatientRecallCommunicationStatus,
 )
 from app.models.appointment import Appointment, AppointmentLocationType, AppointmentStatus
+from app.models.diary_snapshot import DiarySnapshotCacheEntry, DiarySnapshotVersion
 from app.models.note import Note, NoteType
 from app.models.invoice import Invoice, InvoiceLine, InvoiceStatus, Payment, PaymentMethod
 from app.models.ledger import LedgerEntryType, PatientLedgerEntry
 from app.models.treatment import Treatment, TreatmentFee, FeeType
 from app.models.estimate import Estimate, EstimateItem, EstimateStatus, EstimateFeeType
 from app.models.practice_schedule import PracticeHour, PracticeClosure, PracticeOverride
+from app.models.reference_data import ReferenceDataVersion
+from app.models.recall_kpi import RecallContactDaily, RecallKpiBucket
+from app.models.finance_report_cache import FinanceDayFragment, FinanceMonthPack
 from app.models.clinical import (
     Procedure,
     ProcedureStatus,
@@ -29,7 +33,7 @@ from app.models.clinical import (
     TreatmentPlanStatus,
 )
 from app.models.document_template import DocumentTemplate, DocumentTemplateKind
-from app.models.attachment import Attachment
+from app.models.attachment import Attachment, AttachmentBlob
 from app.models.patient_document import PatientDocument
 from app.models.practice_profile import PracticeProfile
 from app.models.capability import Capability, UserCapability
@@ -85,6 +89,8 @@ __all__ = [
     "Appointment",
     "AppointmentStatus",
     "AppointmentLocationType",
+    "DiarySnapshotVersion",
+    "DiarySnapshotCacheEntry",
     "Note",
     "NoteType",
     "Invoice",
@@ -104,6 +110,11 @@ __all__ = [
     "PracticeHour",
     "PracticeClosure",
     "PracticeOverride",
+    "ReferenceDataVersion",
+    "RecallKpiBucket",
+    "RecallContactDaily",
+    "FinanceMonthPack",
+    "FinanceDayFragment",
     "Procedure",
     "ProcedureStatus",
     "ToothNote",
@@ -112,6 +123,7 @@ __all__ = [
     "DocumentTemplate",
     "DocumentTemplateKind",
     "Attachment",
+    "AttachmentBlob",
     "PatientDocument",
     "PracticeProfile",
     "Capability",
@@ -2,18 +2,27 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, JSON, String, func
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import DateTime, ForeignKey, Integer, JSON, SmallInteger, String, func, select
+from sqlalchemy.orm import Mapped, Session, mapped_column, object_session, relationship
 
 from app.models.base import Base
 
 
 class AuditLog(Base):
+    """One audit event; the table is range-partitioned by month on created_at.
+
+    Update events whose before-state matches the after-state of an earlier
+    event for the same entity store only `changes_json` ({column: [before,
+    after]}) and point at that event through `parent_id`. Chains start at a
+    keyframe holding full snapshots, so `before_json`/`after_json` always
+    return complete states.
+    """
+
     __tablename__ = "audit_logs"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False
     )
     actor_user_id: Mapped[int | None] = mapped_column(
         ForeignKey("users.id"), nullable=True
@@ -24,7 +33,122 @@ class AuditLog(Base):
     entity_id: Mapped[str] = mapped_column(String(64), nullable=False)
     request_id: Mapped[str | None] = mapped_column(String(120), nullable=True)
     ip_address: Mapped[str | None] = mapped_column(String(64), nullable=True)
-    before_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
-    after_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    stored_before_json: Mapped[dict | None] = mapped_column("before_json", JSON, nullable=True)
+    stored_after_json: Mapped[dict | None] = mapped_column("after_json", JSON, nullable=True)
+    changes_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    state_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    parent_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    chain_depth: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0)
 
     actor = relationship("User", lazy="joined")
+
+    @property
+    def before_json(self) -> dict | None:
+        return self._states()[0]
+
+    @property
+    def after_json(self) -> dict | None:
+        return self._states()[1]
+
+    def _states(self) -> tuple[dict | None, dict | None]:
+        cached = self.__dict__.get("_resolved_states")
+        if cached is None:
+            cached = _resolve_states(self)
+            self.__dict__["_resolved_states"] = cached
+        return cached
+
+
+def _apply_changes(state: dict, changes: dict) -> dict:
+    updated = dict(state)
+    for key, (_before, after) in changes.items():
+        updated[key] = after
+    return updated
+
+
+def _resolve_states(entry: AuditLog) -> tuple[dict | None, dict | None]:
+    if entry.parent_id is None or entry.changes_json is None:
+        return entry.stored_before_json, entry.stored_after_json
+    session = object_session(entry)
+    if session is None:
+        return None, None
+    chain = [entry]
+    current = entry
+    while current.parent_id is not None:
+        resolved = current.__dict__.get("_resolved_states") if current is not entry else None
+        if resolved is not None:
+            break
+        parent = session.scalars(
+            select(AuditLog).where(
+                AuditLog.id == current.parent_id,
+                AuditLog.id < current.id,
+                AuditLog.entity_type == entry.entity_type,
+                AuditLog.entity_id == entry.entity_id,
+                AuditLog.created_at <= current.created_at,
+            )
+        ).first()
+        if parent is None:
+            # The chain was cut (e.g. a dropped partition); only the diff survives.
+            return None, None
+        chain.append(parent)
+        current = parent
+    state = current._states()[1] if current.parent_id is not None else current.stored_after_json
+    for link in reversed(chain[:-1]):
+        before = state
+        state = _apply_changes(before or {}, link.changes_json or {})
+        link.__dict__["_resolved_states"] = (before, state)
+    return entry.__dict__["_resolved_states"]
+
+
+def _is_chain_parent(parent: AuditLog, entry: AuditLog) -> bool:
+    return (
+        parent.id < entry.id
+        and parent.entity_type == entry.entity_type
+        and parent.entity_id == entry.entity_id
+        and parent.created_at <= entry.created_at
+    )
+
+
+def _resolve_from(entry: AuditLog, by_id: dict[int, AuditLog]) -> tuple[dict | None, dict | None]:
+    cached = entry.__dict__.get("_resolved_states")
+    if cached is not None:
+        return cached
+    if entry.parent_id is None or entry.changes_json is None:
+        states = (entry.stored_before_json, entry.stored_after_json)
+    else:
+        parent = by_id.get(entry.parent_id)
+        parent_states = (None, None)
+        if parent is not None and _is_chain_parent(parent, entry):
+            parent_states = _resolve_from(parent, by_id)
+        if parent is None or (parent.changes_json is not None and parent_states == (None, None)):
+            states = (None, None)
+        else:
+            before = parent_states[1]
+            states = (before, _apply_changes(before or {}, entry.changes_json))
+    entry.__dict__["_resolved_states"] = states
+    return states
+
+
+def resolve_audit_states(session: Session, entries: list[AuditLog]) -> list[AuditLog]:
+    """Resolve before/after states for a page of entries, loading chain parents in batches.
+
+    Resolving entries one by one costs a query per chain link; here each
+    chain level is one `id IN (...)` query shared by the whole page.
+    """
+    by_id = {entry.id: entry for entry in entries}
+    pending = {
+        entry.parent_id
+        for entry in entries
+        if entry.parent_id is not None and entry.changes_json is not None
+    } - by_id.keys()
+    while pending:
+        parents = session.scalars(select(AuditLog).where(AuditLog.id.in_(pending))).all()
+        for parent in parents:
+            by_id[parent.id] = parent
+        pending = {
+            parent.parent_id
+            for parent in parents
+            if parent.parent_id is not None and parent.changes_json is not None
+        } - by_id.keys()
+    for entry in entries:
+        _resolve_from(entry, by_id)
+    return entries
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, String, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class DiarySnapshotVersion(Base):
+    """Monotonic version counter per diary scope ("day:YYYY-MM-DD" or "all")."""
+
+    __tablename__ = "diary_snapshot_versions"
+
+    scope: Mapped[str] = mapped_column(String(32), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+
+class DiarySnapshotCacheEntry(Base):
+    __tablename__ = "diary_snapshot_cache"
+    __table_args__ = (
+        UniqueConstraint(
+            "range_start",
+            "view",
+            "mask_names",
+            name="uq_diary_snapshot_cache_key",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    range_start: Mapped[date] = mapped_column(Date, nullable=False)
+    view: Mapped[str] = mapped_column(String(10), nullable=False)
+    mask_names: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    built_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Integer, LargeBinary, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class FinanceMonthPack(Base):
+    """Rendered month pack for a closed month.
+
+    `ledger_watermark` is the highest ledger entry id when the pack was built;
+    a later entry dated inside the period means the pack is out of date.
+    """
+
+    __tablename__ = "finance_month_packs"
+
+    period_start: Mapped[date] = mapped_column(Date, primary_key=True)
+    format: Mapped[str] = mapped_column(String(8), primary_key=True)
+    ledger_watermark: Mapped[int] = mapped_column(Integer, nullable=False)
+    render_digest: Mapped[str] = mapped_column(String(64), nullable=False)
+    content: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    built_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+class FinanceDayFragment(Base):
+    """Ledger aggregate for a closed UTC day ("cashup" totals or "balances" at day end)."""
+
+    __tablename__ = "finance_day_fragments"
+
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    ledger_watermark: Mapped[int] = mapped_column(Integer, nullable=False)
+    built_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -3,10 +3,11 @@ from __future__ import annotations
 import enum
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, Enum, ForeignKey, String, Text
+from sqlalchemy import Date, DateTime, Enum, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import AuditMixin, Base
+from app.models.patient_recall_communication import PatientRecallCommunicationChannel
 
 
 class PatientRecallKind(str, enum.Enum):
@@ -59,6 +60,17 @@ class PatientRecall(Base, AuditMixin):
     linked_appointment_id: Mapped[int | None] = mapped_column(
         ForeignKey("appointments.id"), nullable=True
     )
+    # Newest communication (by contacted_at, then id), copied here by
+    # log_recall_communication so the dashboard never scans the history.
+    last_contact_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_contacted_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    last_contact_channel: Mapped[PatientRecallCommunicationChannel | None] = mapped_column(
+        Enum(PatientRecallCommunicationChannel, name="patient_recall_comm_channel"),
+        nullable=True,
+    )
+    last_contact_outcome: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     patient = relationship("Patient", back_populates="recalls", lazy="joined")
     communications = relationship(
@@ -2,7 +2,16 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Boolean, DateTime, Integer, String, Text, UniqueConstraint
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.models.base import AuditMixin, Base
@@ -16,12 +25,27 @@ class R4Appointment(Base, AuditMixin):
             "legacy_appointment_id",
             name="uq_r4_appointments_legacy_key",
         ),
+        Index(
+            "ix_r4_appointments_starts_at_clinician_status",
+            "starts_at",
+            "clinician_code",
+            "status",
+        ),
+        Index(
+            "ix_r4_appointments_clinician_starts_at",
+            "clinician_code",
+            "starts_at",
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     legacy_source: Mapped[str] = mapped_column(String(120), nullable=False, default="r4")
     legacy_appointment_id: Mapped[int] = mapped_column(Integer, nullable=False)
     patient_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Manual link wins over the patient_code match; maintained at import/link time.
+    resolved_patient_id: Mapped[int | None] = mapped_column(
+        ForeignKey("patients.id"), nullable=True, index=True
+    )
     starts_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     ends_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     duration_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import DateTime, Integer, String, func, text
+from sqlalchemy import DateTime, Integer, String, UniqueConstraint, func, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -12,6 +12,14 @@ from app.models.base import Base
 
 class R4LinkageIssue(Base):
     __tablename__ = "r4_linkage_issues"
+    __table_args__ = (
+        UniqueConstraint(
+            "legacy_source",
+            "entity_type",
+            "legacy_id",
+            name="uq_r4_linkage_issues_legacy_key",
+        ),
+    )
 
     id: Mapped[UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import Date, Enum, Integer, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+from app.models.patient import RecallStatus
+from app.models.patient_recall_communication import PatientRecallCommunicationChannel
+
+
+class RecallKpiBucket(Base):
+    """Live patients per (recall due date, recall status, contact day).
+
+    `contacted_on` is only set for contacted recalls; it is the UTC day of
+    `patients.recall_last_contacted_at`.
+    """
+
+    __tablename__ = "recall_kpi_buckets"
+    __table_args__ = (
+        UniqueConstraint(
+            "due_date",
+            "recall_status",
+            "contacted_on",
+            name="uq_recall_kpi_buckets_key",
+            postgresql_nulls_not_distinct=True,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    recall_status: Mapped[RecallStatus] = mapped_column(
+        Enum(RecallStatus, name="recall_status"), nullable=False
+    )
+    contacted_on: Mapped[date | None] = mapped_column(Date, nullable=True)
+    patients: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class RecallContactDaily(Base):
+    """Recall communications logged per UTC day and channel."""
+
+    __tablename__ = "recall_contact_daily"
+
+    contacted_on: Mapped[date] = mapped_column(Date, primary_key=True)
+    channel: Mapped[PatientRecallCommunicationChannel] = mapped_column(
+        Enum(PatientRecallCommunicationChannel, name="patient_recall_comm_channel"),
+        primary_key=True,
+    )
+    contacts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
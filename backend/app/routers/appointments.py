@@ -1,15 +1,18 @@
+import asyncio
 from datetime import date, datetime, time, timezone
 from typing import Literal
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import run_in_threadpool
 
-from app.db.session import get_db
-from app.deps import get_current_user, require_capability
+from app.db.session import get_async_db, get_db
+from app.deps import get_current_user, require_capability, require_capability_async
 from app.models.appointment import Appointment, AppointmentLocationType, AppointmentStatus
-from app.models.audit_log import AuditLog
+from app.models.audit_log import AuditLog, resolve_audit_states
 from app.models.estimate import Estimate
 from app.models.patient import CareSetting, Patient
 from app.models.user import Role, User
@@ -21,14 +24,32 @@ from app.schemas.appointment import (
 )
 from app.schemas.audit_log import AuditLogOut
 from app.schemas.estimate import EstimateOut
-from app.services.appointments_snapshot import build_appointments_snapshot
-from app.services.audit import log_event, snapshot_model
+from app.services.appointments_snapshot import resolve_snapshot_window
+from app.services.audit import AUDIT_LOG_KEYSET, log_event, snapshot_model
 from app.services.capabilities import get_user_capabilities
-from app.services.run_sheet_pdf import build_run_sheet_pdf
+from app.services.diary_events import diary_event_hub, format_sse, publish_diary_event
+from app.services.diary_snapshot_cache import (
+    bump_diary_for_appointment,
+    diary_snapshot_etag,
+    diary_snapshot_version,
+    etag_matches,
+    load_diary_snapshot,
+)
+from app.services.pagination import Keyset, set_next_cursor
+from app.services.run_sheet_pdf import build_run_sheet_pdf, load_run_sheet_visits
 from app.services.schedule import LOCAL_TZ, load_schedule, validate_appointment_window
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
+EVENT_STREAM_HEARTBEAT_SECONDS = 15.0
+EVENT_STREAM_MAX_DAYS = 62
+RUN_SHEET_MAX_DAYS = 31
+RUN_SHEET_INLINE_VISITS = 40
+# Page size for GET /appointments when a cursor is passed without a limit.
+APPOINTMENT_LIST_DEFAULT_LIMIT = 500
+
+APPOINTMENT_KEYSET = Keyset(Appointment.starts_at, Appointment.id, descending=True)
+
 
 def find_conflicting_appointments(
     db: Session,
@@ -175,12 +196,12 @@ def conflict_response(conflicts: list[Appointment]) -> JSONResponse:
 
 
 @router.get("/range", response_model=list[AppointmentOut])
-def list_appointments_range(
+async def list_appointments_range(
     start: date,
     end: date,
     location: str | None = Query(default=None),
-    db: Session = Depends(get_db),
-    _user: User = Depends(require_capability("appointments.view")),
+    db: AsyncSession = Depends(get_async_db),
+    _user: User = Depends(require_capability_async("appointments.view")),
 ):
     start_dt = datetime.combine(start, time.min, tzinfo=timezone.utc)
     end_dt = datetime.combine(end, time.min, tzinfo=timezone.utc)
@@ -196,27 +217,85 @@ def list_appointments_range(
         stmt = stmt.where(Appointment.location_type == AppointmentLocationType.clinic)
     elif location == "visit":
         stmt = stmt.where(Appointment.location_type == AppointmentLocationType.visit)
-    return list(db.scalars(stmt))
+    return list(await db.scalars(stmt))
 
 
 @router.get("/snapshot", response_model=DiarySnapshotOut)
-def appointments_snapshot(
+async def appointments_snapshot(
     snapshot_date: date = Query(..., alias="date"),
     view: Literal["day", "week"] = Query(default="day"),
     mask_names: bool = Query(default=True),
-    db: Session = Depends(get_db),
-    _user: User = Depends(require_capability("appointments.view")),
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_async_db),
+    _user: User = Depends(require_capability_async("appointments.view")),
 ):
-    return build_appointments_snapshot(
-        db,
+    range_start, range_end = resolve_snapshot_window(snapshot_date, view)
+    # The snapshot services are shared with sync callers; run_sync drives
+    # them over the async connection without a threadpool hop.
+    version = await db.run_sync(diary_snapshot_version, range_start, range_end)
+    etag = diary_snapshot_etag(snapshot_date, view, mask_names, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    payload = await db.run_sync(
+        load_diary_snapshot,
         anchor_date=snapshot_date,
         view=view,
         mask_names=mask_names,
+        version=version,
+    )
+    return JSONResponse(content=payload, headers=headers)
+
+
+@router.get("/events")
+async def appointment_events(
+    request: Request,
+    start: date,
+    end: date,
+    _user: User = Depends(require_capability("appointments.view")),
+):
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be on or after start",
+        )
+    if (end - start).days > EVENT_STREAM_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Event window cannot exceed {EVENT_STREAM_MAX_DAYS} days",
+        )
+    subscription = diary_event_hub.subscribe(start, end)
+
+    async def _stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=EVENT_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event.get("type") == "resync":
+                    # The backlog is gone; deliver events again from here on.
+                    subscription.overflowed = False
+                yield format_sse(event)
+        finally:
+            diary_event_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("", response_model=list[AppointmentOut])
 def list_appointments(
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(require_capability("appointments.view")),
     patient_id: int | None = Query(default=None),
@@ -228,6 +307,8 @@ def list_appointments(
     domiciliary: bool | None = Query(default=None),
     location_type: AppointmentLocationType | None = Query(default=None),
     include_deleted: bool = Query(default=False),
+    limit: int | None = Query(default=None, ge=1, le=2000),
+    cursor: str | None = Query(default=None),
 ):
     stmt = select(Appointment)
     if q:
@@ -239,7 +320,6 @@ def list_appointments(
                 (Patient.first_name + " " + Patient.last_name).ilike(q_like),
             )
         )
-    stmt = stmt.order_by(Appointment.starts_at.desc())
     if not include_deleted:
         stmt = stmt.where(Appointment.deleted_at.is_(None))
     stmt = stmt.where(Appointment.patient_id.is_not(None))
@@ -258,7 +338,14 @@ def list_appointments(
         stmt = stmt.where(Appointment.is_domiciliary == domiciliary)
     if location_type is not None:
         stmt = stmt.where(Appointment.location_type == location_type)
-    return list(db.scalars(stmt))
+    if limit is None and cursor is None:
+        # Callers that don't page still get every row.
+        return list(db.scalars(stmt.order_by(*APPOINTMENT_KEYSET.order_by())))
+    page = APPOINTMENT_KEYSET.paginate(
+        db, stmt, limit=limit or APPOINTMENT_LIST_DEFAULT_LIMIT, cursor=cursor
+    )
+    set_next_cursor(response, page)
+    return page.items
 
 
 @router.post("", response_model=AppointmentOut, status_code=status.HTTP_201_CREATED)
@@ -332,6 +419,8 @@ def create_appointment(
         appt.is_domiciliary = False
     db.add(appt)
     db.flush()
+    bump_diary_for_appointment(db, appt)
+    publish_diary_event(db, "appointment.created", appt)
     log_event(
         db,
         actor=user,
@@ -348,6 +437,42 @@ def create_appointment(
     return appt
 
 
+@router.get("/run-sheet.pdf")
+async def get_run_sheet_pdf(
+    date: date,
+    end: date | None = Query(default=None),
+    location: str | None = Query(default="visit"),
+    clinician_user_id: int | None = Query(default=None),
+    db: AsyncSession = Depends(get_async_db),
+    _user: User = Depends(require_capability_async("appointments.view")),
+):
+    end_date = end or date
+    if end_date < date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be on or after date",
+        )
+    if (end_date - date).days > RUN_SHEET_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Run sheet cannot exceed {RUN_SHEET_MAX_DAYS} days",
+        )
+    visits = await db.run_sync(
+        load_run_sheet_visits,
+        date,
+        end_date,
+        location=location,
+        clinician_user_id=clinician_user_id,
+    )
+    if len(visits) > RUN_SHEET_INLINE_VISITS:
+        # Week-long domiciliary sheets run to dozens of pages; keep the event loop free.
+        pdf_bytes = await run_in_threadpool(build_run_sheet_pdf, visits, date, end_date)
+    else:
+        pdf_bytes = build_run_sheet_pdf(visits, date, end_date)
+    headers = {"Content-Disposition": 'attachment; filename="run-sheet.pdf"'}
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+
 @router.get("/{appointment_id}", response_model=AppointmentOut)
 def get_appointment(
     appointment_id: int,
@@ -466,6 +591,7 @@ def update_appointment(
 
     before_data = snapshot_model(appt)
     previous_status = appt.status
+    previous_starts_at = appt.starts_at
     if "starts_at" in fields:
         appt.starts_at = starts_at
     if "ends_at" in fields:
@@ -533,6 +659,14 @@ def update_appointment(
         audit_action = "appointment.updated"
     appt.updated_by_user_id = user.id
     db.add(appt)
+    bump_diary_for_appointment(db, appt, previous_starts_at=previous_starts_at)
+    if previous_status != appt.status:
+        event_type = "appointment.status_changed"
+    elif reschedule_changed:
+        event_type = "appointment.moved"
+    else:
+        event_type = "appointment.updated"
+    publish_diary_event(db, event_type, appt, previous_starts_at=previous_starts_at)
     log_event(
         db,
         actor=user,
@@ -568,6 +702,8 @@ def archive_appointment(
     appt.deleted_by_user_id = user.id
     appt.updated_by_user_id = user.id
     db.add(appt)
+    bump_diary_for_appointment(db, appt)
+    publish_diary_event(db, "appointment.archived", appt)
     log_event(
         db,
         actor=user,
@@ -603,6 +739,8 @@ def restore_appointment(
     appt.deleted_by_user_id = None
     appt.updated_by_user_id = user.id
     db.add(appt)
+    bump_diary_for_appointment(db, appt)
+    publish_diary_event(db, "appointment.restored", appt)
     log_event(
         db,
         actor=user,
@@ -622,22 +760,20 @@ def restore_appointment(
 @router.get("/{appointment_id}/audit", response_model=list[AuditLogOut])
 def appointment_audit(
     appointment_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(require_capability("appointments.view")),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = (
-        select(AuditLog)
-        .where(
-            AuditLog.entity_type == "appointment",
-            AuditLog.entity_id == str(appointment_id),
-        )
-        .order_by(AuditLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    stmt = select(AuditLog).where(
+        AuditLog.entity_type == "appointment",
+        AuditLog.entity_id == str(appointment_id),
     )
-    return list(db.scalars(stmt))
+    page = AUDIT_LOG_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
+    return resolve_audit_states(db, page.items)
 
 
 @router.get("/{appointment_id}/estimates", response_model=list[EstimateOut])
@@ -690,33 +826,3 @@ def attach_estimate_to_appointment(
     db.commit()
     db.refresh(estimate)
     return estimate
-
-
-@router.get("/run-sheet.pdf")
-def get_run_sheet_pdf(
-    date: date,
-    end: date | None = Query(default=None),
-    location: str | None = Query(default="visit"),
-    db: Session = Depends(get_db),
-    _user: User = Depends(require_capability("appointments.view")),
-):
-    end_date = end or date
-    start_dt = datetime.combine(date, time.min, tzinfo=timezone.utc)
-    end_dt = datetime.combine(end_date, time.max, tzinfo=timezone.utc)
-    stmt = (
-        select(Appointment)
-        .where(Appointment.deleted_at.is_(None))
-        .where(Appointment.patient_id.is_not(None))
-        .where(Appointment.starts_at >= start_dt, Appointment.starts_at <= end_dt)
-        .options(selectinload(Appointment.patient), selectinload(Appointment.estimates))
-        .order_by(Appointment.starts_at.asc())
-    )
-    if location == "clinic":
-        stmt = stmt.where(Appointment.location_type == AppointmentLocationType.clinic)
-    elif location == "visit":
-        stmt = stmt.where(Appointment.location_type == AppointmentLocationType.visit)
-
-    appointments = list(db.scalars(stmt))
-    pdf_bytes = build_run_sheet_pdf(appointments, date, end_date)
-    headers = {"Content-Disposition": 'attachment; filename="run-sheet.pdf"'}
-    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import re
+from pathlib import Path
 
+import anyio
 from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, UploadFile, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response
+from starlette.types import Receive, Scope, Send
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -14,12 +17,15 @@ from app.models.patient import Patient
 from app.models.user import User
 from app.schemas.attachment import AttachmentOut
 from app.services import storage
-from app.services.audit import log_event
+from app.services.audit import log_event, queue_event
 
 router = APIRouter(prefix="/patients/{patient_id}/attachments", tags=["attachments"])
 attachments_router = APIRouter(prefix="/attachments", tags=["attachments"])
 
 MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024
+RANGE_CHUNK_BYTES = 64 * 1024
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
 
 
 def sanitize_filename(value: str) -> str:
@@ -41,6 +47,117 @@ def get_attachment_or_404(db: Session, attachment_id: int) -> Attachment:
     return attachment
 
 
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Return the inclusive (start, end) of a single "bytes=" range.
+
+    None means serve the whole file (no header, or a multi-range request);
+    ValueError means the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.fullmatch(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class FileRangeResponse(Response):
+    """206 response that reads only the requested slice of a file."""
+
+    def __init__(
+        self,
+        path: Path,
+        start: int,
+        end: int,
+        size: int,
+        media_type: str,
+        headers: dict[str, str],
+    ):
+        self.path = path
+        self.start = start
+        self.end = end
+        super().__init__(
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers={
+                **headers,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as handle:
+            await handle.seek(self.start)
+            while remaining > 0:
+                chunk = await handle.read(min(RANGE_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": remaining > 0}
+                )
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def attachment_file_response(
+    request: Request,
+    attachment: Attachment,
+    path: Path,
+    disposition: str,
+) -> Response:
+    filename = sanitize_filename(attachment.original_filename)
+    headers = {
+        "Content-Disposition": f'{disposition}; filename="{filename}"',
+        "Accept-Ranges": "bytes",
+        # Stored files are never rewritten in place, so the key identifies the bytes.
+        "ETag": f'"{attachment.storage_key}"',
+    }
+    size = path.stat().st_size
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if if_range is None or if_range == headers["ETag"]:
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+    if byte_range is None:
+        return FileResponse(path, media_type=attachment.content_type, headers=headers)
+    start, end = byte_range
+    return FileRangeResponse(path, start, end, size, attachment.content_type, headers)
+
+
+def _store_upload(db: Session, file: UploadFile) -> tuple[str, int]:
+    def _save() -> tuple[str, int]:
+        file.file.seek(0)
+        return storage.save_upload(file, MAX_ATTACHMENT_BYTES)
+
+    return storage.save_and_retain(db, _save)
+
+
 @router.get("", response_model=list[AttachmentOut])
 def list_attachments(
     patient_id: int,
@@ -70,10 +187,11 @@ def upload_attachment(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Filename required")
 
     try:
-        storage_key, byte_size = storage.save_upload(file, MAX_ATTACHMENT_BYTES)
+        storage_key, byte_size = _store_upload(db, file)
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
     except Exception:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to store attachment",
@@ -119,16 +237,14 @@ def download_attachment(
 ):
     attachment = get_attachment_or_404(db, attachment_id)
     filename = sanitize_filename(attachment.original_filename)
-    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
     try:
-        handle = storage.open_file(attachment.storage_key)
+        path = storage.file_path(attachment.storage_key)
     except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Attachment file missing",
         )
-    log_event(
-        db,
+    queue_event(
         actor=user,
         action="attachment.downloaded",
         entity_type="attachment",
@@ -140,12 +256,7 @@ def download_attachment(
         request_id=request_id,
         ip_address=request.client.host if request else None,
     )
-    db.commit()
-    return StreamingResponse(
-        handle,
-        media_type=attachment.content_type,
-        headers=headers,
-    )
+    return attachment_file_response(request, attachment, path, "attachment")
 
 
 @attachments_router.get("/{attachment_id}/preview")
@@ -158,16 +269,14 @@ def preview_attachment(
 ):
     attachment = get_attachment_or_404(db, attachment_id)
     filename = sanitize_filename(attachment.original_filename)
-    headers = {"Content-Disposition": f'inline; filename="{filename}"'}
     try:
-        handle = storage.open_file(attachment.storage_key)
+        path = storage.file_path(attachment.storage_key)
     except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Attachment file missing",
         )
-    log_event(
-        db,
+    queue_event(
         actor=user,
         action="attachment.previewed",
         entity_type="attachment",
@@ -179,12 +288,7 @@ def preview_attachment(
         request_id=request_id,
         ip_address=request.client.host if request else None,
     )
-    db.commit()
-    return StreamingResponse(
-        handle,
-        media_type=attachment.content_type,
-        headers=headers,
-    )
+    return attachment_file_response(request, attachment, path, "inline")
 
 
 @attachments_router.delete("/{attachment_id}", response_model=AttachmentOut)
@@ -202,7 +306,7 @@ def delete_attachment(
         "content_type": attachment.content_type,
         "byte_size": attachment.byte_size,
     }
-    storage.delete_file(attachment.storage_key)
+    storage.release_blob(db, attachment.storage_key)
     db.delete(attachment)
     log_event(
         db,
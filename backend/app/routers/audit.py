@@ -1,86 +1,116 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.deps import get_current_user, require_capability
-from app.models.audit_log import AuditLog
+from app.models.audit_log import AuditLog, resolve_audit_states
 from app.models.user import User
 from app.schemas.audit_log import AuditLogOut
+from app.services.audit import AUDIT_LOG_KEYSET
+from app.services.audit_buffer import audit_buffer
+from app.services.pagination import set_next_cursor
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
 
+def _audit_page(
+    db: Session,
+    response: Response,
+    *filters,
+    limit: int,
+    cursor: str | None,
+    offset: int,
+) -> list[AuditLog]:
+    page = AUDIT_LOG_KEYSET.paginate(
+        db, select(AuditLog).where(*filters), limit=limit, cursor=cursor, offset=offset
+    )
+    set_next_cursor(response, page)
+    return resolve_audit_states(db, page.items)
+
+
 @router.get("", response_model=list[AuditLogOut])
 def list_audit(
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     entity_type: str | None = Query(default=None),
     entity_id: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = select(AuditLog).order_by(AuditLog.created_at.desc())
+    # Read-your-writes for buffered events queued by this worker.
+    audit_buffer.flush()
+    filters = []
     if entity_type:
-        stmt = stmt.where(AuditLog.entity_type == entity_type)
+        filters.append(AuditLog.entity_type == entity_type)
     if entity_id:
-        stmt = stmt.where(AuditLog.entity_id == entity_id)
-    stmt = stmt.limit(limit).offset(offset)
-    return list(db.scalars(stmt))
+        filters.append(AuditLog.entity_id == entity_id)
+    return _audit_page(db, response, *filters, limit=limit, cursor=cursor, offset=offset)
 
 
 @router.get("/patients/{patient_id}", response_model=list[AuditLogOut])
 def patient_audit(
     patient_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = (
-        select(AuditLog)
-        .where(AuditLog.entity_type == "patient", AuditLog.entity_id == str(patient_id))
-        .order_by(AuditLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    audit_buffer.flush()
+    return _audit_page(
+        db,
+        response,
+        AuditLog.entity_type == "patient",
+        AuditLog.entity_id == str(patient_id),
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
     )
-    return list(db.scalars(stmt))
 
 
 @router.get("/appointments/{appointment_id}", response_model=list[AuditLogOut])
 def appointment_audit(
     appointment_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(require_capability("appointments.view")),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = (
-        select(AuditLog)
-        .where(
-            AuditLog.entity_type == "appointment",
-            AuditLog.entity_id == str(appointment_id),
-        )
-        .order_by(AuditLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    audit_buffer.flush()
+    return _audit_page(
+        db,
+        response,
+        AuditLog.entity_type == "appointment",
+        AuditLog.entity_id == str(appointment_id),
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
     )
-    return list(db.scalars(stmt))
 
 
 @router.get("/notes/{note_id}", response_model=list[AuditLogOut])
 def note_audit(
     note_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = (
-        select(AuditLog)
-        .where(AuditLog.entity_type == "note", AuditLog.entity_id == str(note_id))
-        .order_by(AuditLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    audit_buffer.flush()
+    return _audit_page(
+        db,
+        response,
+        AuditLog.entity_type == "note",
+        AuditLog.entity_id == str(note_id),
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
     )
-    return list(db.scalars(stmt))
@@ -6,7 +6,7 @@ from app.core.settings import settings
 from app.core.security import create_access_token, generate_reset_token, hash_reset_token, verify_password
 from app.db.session import get_db
 from app.services.audit import log_event
-from app.services.rate_limit import SimpleRateLimiter
+from app.services.rate_limit import RateLimiter
 from app.schemas.auth import (
     ChangePasswordRequest,
     ChangePasswordResponse,
@@ -37,14 +37,14 @@ RESET_DEBUG = settings.reset_token_debug
 RESET_REQUESTS_PER_MINUTE = settings.reset_requests_per_minute
 RESET_CONFIRM_PER_MINUTE = settings.reset_confirm_per_minute
 
-RESET_REQUEST_LIMITER = SimpleRateLimiter(
-    max_events=RESET_REQUESTS_PER_MINUTE, window_seconds=60
+RESET_REQUEST_LIMITER = RateLimiter(
+    "password_reset_request", max_events=RESET_REQUESTS_PER_MINUTE, window_seconds=60
 )
-RESET_CONFIRM_LIMITER = SimpleRateLimiter(
-    max_events=RESET_CONFIRM_PER_MINUTE, window_seconds=60
+RESET_CONFIRM_LIMITER = RateLimiter(
+    "password_reset_confirm", max_events=RESET_CONFIRM_PER_MINUTE, window_seconds=60
 )
-LOGIN_LIMITER = SimpleRateLimiter(max_events=10, window_seconds=60)
-LOGIN_IP_LIMITER = SimpleRateLimiter(max_events=20, window_seconds=60)
+LOGIN_LIMITER = RateLimiter("login", max_events=10, window_seconds=60)
+LOGIN_IP_LIMITER = RateLimiter("login_ip", max_events=20, window_seconds=60)
 
 
 @router.post("/login", response_model=Token)
@@ -1,25 +1,39 @@
 from __future__ import annotations
 
 import re
+import tempfile
+from urllib.parse import quote
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
-from app.deps import get_current_user, require_roles
+from app.deps import get_current_user, require_capability, require_roles
 from app.models.document_template import DocumentTemplate, DocumentTemplateKind
 from app.models.user import User
 from app.schemas.document_template import (
     DocumentTemplateCreate,
+    DocumentTemplateMailMergeRequest,
     DocumentTemplateOut,
     DocumentTemplateUpdate,
 )
-from app.services.audit import log_event
+from app.services.audit import log_event, queue_event
+from app.services.document_render import (
+    compile_document_template,
+    compile_template,
+    iter_mail_merge,
+    write_mail_merge_pdf,
+)
+from app.services.practice_profile import load_profile
 
 router = APIRouter(prefix="/document-templates", tags=["document-templates"])
 
+MAIL_MERGE_SPOOL_BYTES = 8 * 1024 * 1024
+MAIL_MERGE_CHUNK_BYTES = 64 * 1024
+
 
 def sanitize_filename(value: str) -> str:
     cleaned = re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_")
@@ -179,8 +193,7 @@ def download_document_template(
     safe_name = sanitize_filename(template.name)
     filename = f"{safe_name}-{template.kind.value}.txt"
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    log_event(
-        db,
+    queue_event(
         actor=user,
         action="document_template.downloaded",
         entity_type="document_template",
@@ -189,5 +202,85 @@ def download_document_template(
         request_id=request_id,
         ip_address=request.client.host if request else None,
     )
-    db.commit()
     return Response(content=template.content, media_type="text/plain", headers=headers)
+
+
+def _iter_spooled(spool):
+    try:
+        spool.seek(0)
+        while True:
+            chunk = spool.read(MAIL_MERGE_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+@router.post("/{template_id}/mail-merge")
+def mail_merge_document_template(
+    template_id: int,
+    payload: DocumentTemplateMailMergeRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_capability("documents.download")),
+    format: str = Query(default="ndjson"),
+    request_id: str | None = Header(default=None),
+):
+    """Render the template for every listed patient (default: all patients).
+
+    `format=ndjson` returns one `{patient_id, title, content}` object per line
+    in patient id order; `format=pdf` returns every letter in one PDF. Output
+    is written to a spooled file while the cursor is open, then streamed, so
+    memory stays flat for practice-wide runs.
+    """
+    if format not in {"ndjson", "pdf"}:
+        raise HTTPException(status_code=400, detail="Unsupported format")
+    template = get_template_or_404(db, template_id)
+    if not template.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    content = compile_document_template(template)
+    title = compile_template(payload.title or template.name)
+    unknown_fields = sorted({*content.unknown_fields, *title.unknown_fields})
+
+    spool = tempfile.SpooledTemporaryFile(max_size=MAIL_MERGE_SPOOL_BYTES)
+    rendered = 0
+    try:
+        if format == "pdf":
+            rendered = write_mail_merge_pdf(
+                db, content, title, payload.patient_ids, load_profile(db), spool
+            )
+        else:
+            for line in iter_mail_merge(db, content, title, payload.patient_ids):
+                spool.write(line)
+                rendered += 1
+    except Exception:
+        spool.close()
+        raise
+    queue_event(
+        actor=user,
+        action="document_template.mail_merge",
+        entity_type="document_template",
+        entity_id=str(template.id),
+        after_data={
+            "format": format,
+            "patients": rendered,
+            "requested_patient_ids": len(payload.patient_ids)
+            if payload.patient_ids is not None
+            else None,
+        },
+        request_id=request_id,
+        ip_address=request.client.host if request else None,
+    )
+    size = spool.seek(0, 2)
+    filename = f"{sanitize_filename(template.name)}-mail-merge.{format}"
+    return StreamingResponse(
+        _iter_spooled(spool),
+        media_type="application/pdf" if format == "pdf" else "application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(size),
+            "X-Mail-Merge-Count": str(rendered),
+            "X-Unknown-Fields": ",".join(quote(field, safe="._-") for field in unknown_fields),
+        },
+    )
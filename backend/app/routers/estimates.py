@@ -11,6 +11,8 @@ from app.models.treatment import Treatment
 from app.models.user import User
 from app.services.audit import log_event
 from app.services.estimate_pdf import build_estimate_pdf
+from app.services.pdf_cache import cached_pdf, row_fingerprint
+from app.services.practice_profile import load_profile
 from app.schemas.estimate import (
     EstimateCreate,
     EstimateItemCreate,
@@ -251,7 +253,17 @@ def get_estimate_pdf(
     request_id: str | None = Header(default=None),
 ):
     estimate = get_estimate_or_404(db, estimate_id)
-    pdf_bytes = build_estimate_pdf(estimate)
+    pdf_bytes = cached_pdf(
+        "estimate",
+        estimate.id,
+        [
+            row_fingerprint(estimate),
+            [row_fingerprint(item) for item in sorted(estimate.items, key=lambda row: row.id)],
+            row_fingerprint(estimate.patient),
+            load_profile(db),
+        ],
+        lambda: build_estimate_pdf(estimate),
+    )
     log_event(
         db,
         actor=user,
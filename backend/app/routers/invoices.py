@@ -23,10 +23,15 @@ from app.schemas.invoice import (
     PaymentOut,
 )
 from app.services.audit import log_event, snapshot_model
+from app.services.pagination import Keyset, set_next_cursor
 from app.services.pdf import build_invoice_pdf
+from app.services.pdf_cache import cached_pdf, row_fingerprint
+from app.services.practice_profile import load_profile
 
 router = APIRouter(prefix="/invoices", tags=["invoices"])
 
+INVOICE_KEYSET = Keyset(Invoice.created_at, Invoice.id, descending=True)
+
 
 def format_invoice_number(invoice_id: int) -> str:
     return f"INV-{invoice_id:06d}"
@@ -152,6 +157,7 @@ def create_invoice(
 
 @router.get("", response_model=list[InvoiceSummaryOut])
 def list_invoices(
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     patient_id: int | None = Query(default=None),
@@ -159,6 +165,7 @@ def list_invoices(
     q: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
     stmt = select(Invoice)
     if patient_id is not None:
@@ -167,8 +174,9 @@ def list_invoices(
         stmt = stmt.where(Invoice.status == status)
     if q:
         stmt = stmt.where(Invoice.invoice_number.ilike(f"%{q.strip()}%"))
-    stmt = stmt.order_by(Invoice.created_at.desc()).limit(limit).offset(offset)
-    return list(db.scalars(stmt))
+    page = INVOICE_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @router.get("/{invoice_id}", response_model=InvoiceOut)
@@ -527,7 +535,18 @@ def get_invoice_pdf(
     invoice = db.get(Invoice, invoice_id)
     if not invoice:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice not found")
-    pdf_bytes = build_invoice_pdf(invoice)
+    pdf_bytes = cached_pdf(
+        "invoice",
+        invoice.id,
+        [
+            row_fingerprint(invoice),
+            [row_fingerprint(line) for line in sorted(invoice.lines, key=lambda row: row.id)],
+            [row_fingerprint(payment) for payment in sorted(invoice.payments, key=lambda row: row.id)],
+            row_fingerprint(invoice.patient),
+            load_profile(db),
+        ],
+        lambda: build_invoice_pdf(invoice),
+    )
     log_event(
         db,
         actor=user,
@@ -37,6 +37,7 @@ from app.schemas.r4_manual_mappings import (
     R4ManualMappingCreate,
     R4ManualMappingOut,
 )
+from app.services.pagination import Keyset
 from app.services.r4_import.treatment_plan_importer import (
     backfill_r4_treatment_plan_patients_chunked,
 )
@@ -45,6 +46,12 @@ router = APIRouter(prefix="/admin/legacy", tags=["legacy-admin"])
 r4_router = APIRouter(prefix="/admin/r4", tags=["r4-admin"])
 logger = logging.getLogger(__name__)
 
+UNMAPPED_APPOINTMENT_KEYSETS = {
+    (column, descending): Keyset(getattr(Appointment, column), Appointment.id, descending=descending)
+    for column in ("starts_at", "created_at")
+    for descending in (False, True)
+}
+
 
 @router.get("/unmapped-appointments", response_model=UnmappedLegacyAppointmentList)
 def list_unmapped_appointments(
@@ -55,6 +62,7 @@ def list_unmapped_appointments(
     to_date: date | None = Query(default=None, alias="to"),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     sort: str = Query(default="starts_at"),
     direction: str = Query(default="asc", alias="dir"),
 ):
@@ -71,27 +79,23 @@ def list_unmapped_appointments(
         end_dt = datetime.combine(to_date, time.max, tzinfo=timezone.utc)
         filters.append(Appointment.starts_at <= end_dt)
 
-    sort_fields = {
-        "starts_at": Appointment.starts_at,
-        "created_at": Appointment.created_at,
-    }
-    sort_col = sort_fields.get(sort, Appointment.starts_at)
-    order_by = sort_col.asc() if direction.lower() == "asc" else desc(sort_col)
+    sort_col = "created_at" if sort == "created_at" else "starts_at"
+    keyset = UNMAPPED_APPOINTMENT_KEYSETS[(sort_col, direction.lower() != "asc")]
 
     total = db.scalar(select(func.count()).select_from(Appointment).where(*filters)) or 0
-    stmt = (
-        select(Appointment)
-        .where(*filters)
-        .order_by(order_by)
-        .limit(limit)
-        .offset(offset)
+    page = keyset.paginate(
+        db,
+        select(Appointment).where(*filters),
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
     )
-    items = list(db.scalars(stmt))
     return UnmappedLegacyAppointmentList(
-        items=items,
+        items=page.items,
         total=int(total),
         limit=limit,
         offset=offset,
+        next_cursor=page.next_cursor,
     )
 
 
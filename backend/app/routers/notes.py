@@ -1,24 +1,28 @@
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, Header, HTTPException, Request, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Query, Response, status
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.deps import get_current_user
-from app.models.audit_log import AuditLog
+from app.models.audit_log import AuditLog, resolve_audit_states
 from app.models.note import Note, NoteType
 from app.models.patient import Patient
 from app.models.appointment import Appointment
 from app.models.user import User
 from app.schemas.note import AppointmentNoteCreate, NoteCreate, NoteOut, NoteUpdate
 from app.schemas.audit_log import AuditLogOut
-from app.services.audit import log_event, snapshot_model
+from app.services.audit import AUDIT_LOG_KEYSET, log_event, snapshot_model
+from app.services.diary_snapshot_cache import bump_diary_for_note
+from app.services.pagination import Keyset, set_next_cursor
 
 patient_router = APIRouter(prefix="/patients/{patient_id}/notes", tags=["notes"])
 appointment_router = APIRouter(prefix="/appointments/{appointment_id}/notes", tags=["notes"])
 router = APIRouter(prefix="/notes", tags=["notes"])
 
+NOTE_KEYSET = Keyset(Note.created_at, Note.id, descending=True)
+
 
 def _require_patient(db: Session, patient_id: int) -> Patient:
     patient = db.get(Patient, patient_id)
@@ -72,6 +76,7 @@ def _create_note_record(
     )
     db.add(note)
     db.flush()
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -254,6 +259,7 @@ def archive_appointment_note(
     note.deleted_by_user_id = user.id
     note.updated_by_user_id = user.id
     db.add(note)
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -293,6 +299,7 @@ def restore_appointment_note(
     note.deleted_by_user_id = None
     note.updated_by_user_id = user.id
     db.add(note)
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -329,6 +336,7 @@ def archive_note(
     note.deleted_by_user_id = user.id
     note.updated_by_user_id = user.id
     db.add(note)
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -365,6 +373,7 @@ def restore_note(
     note.deleted_by_user_id = None
     note.updated_by_user_id = user.id
     db.add(note)
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -383,20 +392,23 @@ def restore_note(
 
 @router.get("", response_model=list[NoteOut])
 def list_all_notes(
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     include_deleted: bool = Query(default=False),
     patient_id: int | None = Query(default=None),
     limit: int = Query(default=100, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = select(Note).order_by(Note.created_at.desc())
+    stmt = select(Note)
     if patient_id is not None:
         stmt = stmt.where(Note.patient_id == patient_id)
     if not include_deleted:
         stmt = stmt.where(Note.deleted_at.is_(None))
-    stmt = stmt.limit(limit).offset(offset)
-    return list(db.scalars(stmt))
+    page = NOTE_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @router.post("", response_model=NoteOut, status_code=status.HTTP_201_CREATED)
@@ -482,6 +494,7 @@ def archive_note_global(
     note.deleted_by_user_id = user.id
     note.updated_by_user_id = user.id
     db.add(note)
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -517,6 +530,7 @@ def restore_note_global(
     note.deleted_by_user_id = None
     note.updated_by_user_id = user.id
     db.add(note)
+    bump_diary_for_note(db, note)
     log_event(
         db,
         actor=user,
@@ -536,16 +550,16 @@ def restore_note_global(
 @router.get("/{note_id}/audit", response_model=list[AuditLogOut])
 def note_audit(
     note_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = (
-        select(AuditLog)
-        .where(AuditLog.entity_type == "note", AuditLog.entity_id == str(note_id))
-        .order_by(AuditLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    stmt = select(AuditLog).where(
+        AuditLog.entity_type == "note", AuditLog.entity_id == str(note_id)
     )
-    return list(db.scalars(stmt))
+    page = AUDIT_LOG_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
+    return resolve_audit_states(db, page.items)
@@ -20,11 +20,17 @@ from app.schemas.patient_document import (
     PatientDocumentOut,
     PatientDocumentPreview,
 )
-from app.services.document_render import render_template, render_template_with_warnings
+from app.services.document_render import (
+    compile_document_template,
+    render_compiled_with_warnings,
+    render_template,
+    render_template_with_warnings,
+)
+from app.services.pdf_cache import cached_pdf, row_fingerprint
 from app.services.pdf_documents import generate_patient_document_pdf
 from app.services import storage
 from app.services.practice_profile import load_profile
-from app.services.audit import log_event
+from app.services.audit import log_event, queue_event
 from datetime import date
 
 router = APIRouter(prefix="/patients/{patient_id}/documents", tags=["patient-documents"])
@@ -83,7 +89,9 @@ def preview_patient_document(
     template = get_template_or_404(db, payload.template_id)
     title_input = payload.title or template.name
     rendered_title, title_unknown = render_template_with_warnings(title_input, patient)
-    rendered, content_unknown = render_template_with_warnings(template.content, patient)
+    rendered, content_unknown = render_compiled_with_warnings(
+        compile_document_template(template), patient
+    )
     unknown_fields = sorted({*title_unknown, *content_unknown})
     return PatientDocumentPreview(
         title=rendered_title,
@@ -105,7 +113,9 @@ def create_patient_document(
     template = get_template_or_404(db, payload.template_id)
     title_input = payload.title or template.name
     rendered_title, title_unknown = render_template_with_warnings(title_input, patient)
-    rendered, content_unknown = render_template_with_warnings(template.content, patient)
+    rendered, content_unknown = render_compiled_with_warnings(
+        compile_document_template(template), patient
+    )
     unknown_fields = sorted({*title_unknown, *content_unknown})
     document = PatientDocument(
         patient_id=patient_id,
@@ -163,12 +173,22 @@ def download_patient_document(
     if format == "pdf":
         filename = f"{safe_title}_{patient.last_name}_{date_suffix}.pdf"
         profile = load_profile(db)
-        pdf_bytes = generate_patient_document_pdf(
-            patient, document.title, document.rendered_content, profile
+        # The PDF prints its generation date, so the day is part of the version.
+        pdf_bytes = cached_pdf(
+            "patient_document",
+            document.id,
+            [
+                row_fingerprint(document),
+                row_fingerprint(patient),
+                profile,
+                date.today(),
+            ],
+            lambda: generate_patient_document_pdf(
+                patient, document.title, document.rendered_content, profile
+            ),
         )
         headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-        log_event(
-            db,
+        queue_event(
             actor=user,
             action="patient_document.downloaded_pdf",
             entity_type="patient_document",
@@ -180,7 +200,6 @@ def download_patient_document(
             request_id=request_id,
             ip_address=request.client.host if request else None,
         )
-        db.commit()
         return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
     if format != "text":
         raise HTTPException(
@@ -189,8 +208,7 @@ def download_patient_document(
         )
     filename = f"{safe_title}_{patient.last_name}_{date_suffix}.txt"
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    log_event(
-        db,
+    queue_event(
         actor=user,
         action="patient_document.downloaded",
         entity_type="patient_document",
@@ -202,7 +220,6 @@ def download_patient_document(
         request_id=request_id,
         ip_address=request.client.host if request else None,
     )
-    db.commit()
     return Response(content=document.rendered_content, media_type="text/plain", headers=headers)
 
 
@@ -251,7 +268,7 @@ def attach_patient_document_pdf(
     pdf_bytes = generate_patient_document_pdf(
         patient, document.title, document.rendered_content, profile
     )
-    storage_key, byte_size = storage.save_bytes(pdf_bytes)
+    storage_key, byte_size = storage.save_and_retain(db, lambda: storage.save_bytes(pdf_bytes))
     safe_title = sanitize_filename(document.title)
     filename = f"{safe_title}.pdf"
     attachment = Attachment(
@@ -1,22 +1,20 @@
 from calendar import monthrange
 from datetime import date, datetime, timedelta, timezone
-import base64
-import json
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
-from sqlalchemy import and_, func, literal, nullslast, or_, select
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, literal, nullslast, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
 
-from app.db.session import get_db
-from app.deps import get_current_user, require_capability
-from app.models.audit_log import AuditLog
+from app.db.session import get_async_db, get_db
+from app.deps import get_current_user, require_capability, require_capability_async
+from app.models.audit_log import AuditLog, resolve_audit_states
 from app.models.appointment import Appointment
 from app.models.capability import Capability, UserCapability
 from app.models.invoice import Invoice, Payment
 from app.models.ledger import LedgerEntryType, PatientLedgerEntry
 from app.models.patient import Patient, PatientCategory, RecallStatus
 from app.models.patient_recall import PatientRecall, PatientRecallStatus
-from app.models.r4_treatment_plan import R4Treatment
 from app.models.r4_treatment_transaction import R4TreatmentTransaction
 from app.models.patient_recall_communication import (
     PatientRecallCommunication,
@@ -24,10 +22,15 @@ from app.models.patient_recall_communication import (
     PatientRecallCommunicationDirection,
     PatientRecallCommunicationStatus,
 )
-from app.models.r4_user import R4User
-from app.services.audit import log_event, snapshot_model
+from app.services.audit import AUDIT_LOG_KEYSET, log_event, snapshot_model
+from app.services.audit_buffer import audit_buffer
+from app.services.diary_snapshot_cache import bump_diary_for_patient
+from app.services.finance_month_pack import invalidate_month_packs_for_patient
+from app.services.pagination import Keyset, set_next_cursor
+from app.services.recall_kpis import recall_kpi_key, track_recall_kpi
 from app.services.recall_letter_pdf import build_recall_letter_pdf
 from app.services.recalls import resolve_recall_status
+from app.services.reference_cache import reference_cache
 from app.schemas.audit_log import AuditLogOut
 from app.schemas.patient import (
     PatientCreate,
@@ -73,6 +76,18 @@ PATIENT_RECALL_RESPONSE_FIELDS = PATIENT_RECALL_FIELDS | {
     "recall_last_set_at",
     "recall_last_set_by_user_id",
 }
+# Patient fields rendered in the diary snapshot (display name and alert flag).
+DIARY_PATIENT_FIELDS = {
+    "first_name",
+    "last_name",
+    "allergies",
+    "medical_alerts",
+    "safeguarding_notes",
+    "alerts_financial",
+    "alerts_access",
+}
+# Patient fields printed in stored finance month packs (top debtors).
+FINANCE_PACK_PATIENT_FIELDS = {"first_name", "last_name"}
 
 
 def _user_has_capability(db: Session, user: User, code: str) -> bool:
@@ -112,34 +127,24 @@ def add_months(base_date: date, months: int) -> date:
     return date(year, month, day)
 
 
-def _encode_tx_cursor(performed_at: datetime, legacy_transaction_id: int) -> str:
-    payload = {
-        "performed_at": performed_at.isoformat(),
-        "legacy_transaction_id": legacy_transaction_id,
-    }
-    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
-    return encoded
-
-
 def _naive_utc_sort_key(value: datetime) -> datetime:
     if value.tzinfo is None:
         return value
     return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
-def _decode_tx_cursor(cursor: str) -> tuple[datetime, int]:
-    try:
-        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
-        payload = json.loads(raw)
-        performed_at = datetime.fromisoformat(payload["performed_at"])
-        legacy_transaction_id = int(payload["legacy_transaction_id"])
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail="Invalid cursor.") from exc
-    return performed_at, legacy_transaction_id
+PATIENT_KEYSET = Keyset(Patient.last_name, Patient.first_name, Patient.id)
+LEDGER_KEYSET = Keyset(PatientLedgerEntry.created_at, PatientLedgerEntry.id)
+TREATMENT_TX_KEYSET = Keyset(
+    R4TreatmentTransaction.performed_at,
+    R4TreatmentTransaction.legacy_transaction_id,
+    descending=True,
+)
 
 
 @router.get("", response_model=list[PatientOut])
 def list_patients(
+    response: Response,
     db: Session = Depends(get_db),
     user: User = Depends(require_capability("patients.view")),
     query: str | None = Query(default=None, alias="query"),
@@ -150,8 +155,9 @@ def list_patients(
     include_deleted: bool = Query(default=False),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
-    stmt = select(Patient).order_by(Patient.last_name, Patient.first_name)
+    stmt = select(Patient)
     if not include_deleted:
         stmt = stmt.where(Patient.deleted_at.is_(None))
     search = q or query
@@ -172,18 +178,19 @@ def list_patients(
         stmt = stmt.where(Patient.date_of_birth == dob)
     if category:
         stmt = stmt.where(Patient.patient_category == category)
-    stmt = stmt.limit(limit).offset(offset)
+    page = PATIENT_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
     can_view_recalls = _user_has_capability(db, user, "recalls.view")
     return [
         _patient_response(patient, can_view_recalls=can_view_recalls)
-        for patient in db.scalars(stmt)
+        for patient in page.items
     ]
 
 
 @router.get("/search", response_model=list[PatientSearchOut])
-def search_patients(
-    db: Session = Depends(get_db),
-    _user: User = Depends(require_capability("patients.view")),
+async def search_patients(
+    db: AsyncSession = Depends(get_async_db),
+    _user: User = Depends(require_capability_async("patients.view")),
     q: str = Query(min_length=1),
     limit: int = Query(default=20, ge=1, le=50),
 ):
@@ -201,7 +208,7 @@ def search_patients(
     except ValueError:
         pass
     stmt = stmt.where(or_(*criteria)).order_by(Patient.last_name, Patient.first_name).limit(limit)
-    return list(db.scalars(stmt))
+    return list(await db.scalars(stmt))
 
 
 @router.post("", response_model=PatientOut, status_code=status.HTTP_201_CREATED)
@@ -254,6 +261,7 @@ def create_patient(
         patient.recall_status = RecallStatus.due
     db.add(patient)
     db.flush()
+    track_recall_kpi(db, patient, None)
     log_event(
         db,
         actor=user,
@@ -320,6 +328,7 @@ def update_patient(
         )
 
     before_data = snapshot_model(patient)
+    before_kpi = recall_kpi_key(patient)
     for field, value in changed_updates.items():
         setattr(patient, field, value)
     if any(
@@ -335,6 +344,11 @@ def update_patient(
     patient.updated_by_user_id = user.id
     patient.updated_at = datetime.now(timezone.utc)
     db.add(patient)
+    track_recall_kpi(db, patient, before_kpi)
+    if DIARY_PATIENT_FIELDS.intersection(changed_updates):
+        bump_diary_for_patient(db, patient.id)
+    if FINANCE_PACK_PATIENT_FIELDS.intersection(changed_updates):
+        invalidate_month_packs_for_patient(db, patient.id)
     log_event(
         db,
         actor=user,
@@ -372,10 +386,13 @@ def archive_patient(
         )
 
     before_data = snapshot_model(patient)
+    before_kpi = recall_kpi_key(patient)
     patient.deleted_at = datetime.now(timezone.utc)
     patient.deleted_by_user_id = user.id
     patient.updated_by_user_id = user.id
     db.add(patient)
+    track_recall_kpi(db, patient, before_kpi)
+    invalidate_month_packs_for_patient(db, patient.id)
     log_event(
         db,
         actor=user,
@@ -418,6 +435,8 @@ def restore_patient(
     patient.deleted_by_user_id = None
     patient.updated_by_user_id = user.id
     db.add(patient)
+    track_recall_kpi(db, patient, None)
+    invalidate_month_packs_for_patient(db, patient.id)
     log_event(
         db,
         actor=user,
@@ -453,6 +472,7 @@ def set_patient_recall(
 
     before_data = build_patient_recall_settings_snapshot(patient)
     before_notes = patient.recall_notes
+    before_kpi = recall_kpi_key(patient)
     fields = payload.model_fields_set
     if "interval_months" in fields and payload.interval_months is not None:
         patient.recall_interval_months = payload.interval_months
@@ -487,6 +507,7 @@ def set_patient_recall(
     patient.updated_by_user_id = user.id
     patient.updated_at = datetime.now(timezone.utc)
     db.add(patient)
+    track_recall_kpi(db, patient, before_kpi)
     log_patient_recall_settings_changes(
         db,
         user=user,
@@ -506,43 +527,42 @@ def set_patient_recall(
 @router.get("/{patient_id}/audit", response_model=list[AuditLogOut])
 def patient_audit(
     patient_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(require_capability("patients.view")),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
     patient = db.get(Patient, patient_id)
     if not patient:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    stmt = (
-        select(AuditLog)
-        .where(AuditLog.entity_type == "patient", AuditLog.entity_id == str(patient_id))
-        .order_by(AuditLog.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    audit_buffer.flush()
+    stmt = select(AuditLog).where(
+        AuditLog.entity_type == "patient", AuditLog.entity_id == str(patient_id)
     )
-    return list(db.scalars(stmt))
+    page = AUDIT_LOG_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
+    return resolve_audit_states(db, page.items)
 
 
 @router.get("/{patient_id}/ledger", response_model=list[LedgerEntryOut])
 def list_patient_ledger(
     patient_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     _user: User = Depends(get_current_user),
     limit: int = Query(default=200, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ):
     patient = db.get(Patient, patient_id)
     if not patient or patient.deleted_at is not None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    stmt = (
-        select(PatientLedgerEntry)
-        .where(PatientLedgerEntry.patient_id == patient_id)
-        .order_by(PatientLedgerEntry.created_at.asc(), PatientLedgerEntry.id.asc())
-        .limit(limit)
-        .offset(offset)
-    )
-    return list(db.scalars(stmt))
+    stmt = select(PatientLedgerEntry).where(PatientLedgerEntry.patient_id == patient_id)
+    page = LEDGER_KEYSET.paginate(db, stmt, limit=limit, cursor=cursor, offset=offset)
+    set_next_cursor(response, page)
+    return page.items
 
 
 @router.get(
@@ -578,9 +598,6 @@ def list_patient_treatment_transactions(
             "total_count": 0 if include_total else None,
         }
 
-    recorded_user = aliased(R4User)
-    entry_user = aliased(R4User)
-    treatment = aliased(R4Treatment)
     filters = [R4TreatmentTransaction.patient_code == patient_code]
     if cost_only:
         filters.append(
@@ -597,63 +614,10 @@ def list_patient_treatment_transactions(
             tzinfo=timezone.utc
         ) + timedelta(days=1)
         filters.append(R4TreatmentTransaction.performed_at < end)
-    stmt = (
-        select(
-            R4TreatmentTransaction,
-            recorded_user.display_name.label("recorded_by_name"),
-            entry_user.display_name.label("user_name"),
-            treatment.description.label("treatment_name"),
-            recorded_user.is_current.label("recorded_by_is_current"),
-            entry_user.is_current.label("user_is_current"),
-            recorded_user.role.label("recorded_by_role"),
-            entry_user.role.label("user_role"),
-        )
-        .where(*filters)
-        .outerjoin(
-            recorded_user,
-            and_(
-                recorded_user.legacy_source == R4TreatmentTransaction.legacy_source,
-                recorded_user.legacy_user_code == R4TreatmentTransaction.recorded_by,
-            ),
-        )
-        .outerjoin(
-            entry_user,
-            and_(
-                entry_user.legacy_source == R4TreatmentTransaction.legacy_source,
-                entry_user.legacy_user_code == R4TreatmentTransaction.user_code,
-            ),
-        )
-        .outerjoin(
-            treatment,
-            and_(
-                treatment.legacy_source == R4TreatmentTransaction.legacy_source,
-                treatment.legacy_treatment_code == R4TreatmentTransaction.treatment_code,
-            ),
-        )
+    page = TREATMENT_TX_KEYSET.paginate(
+        db, select(R4TreatmentTransaction).where(*filters), limit=limit, cursor=cursor
     )
-    if cursor:
-        cursor_dt, cursor_id = _decode_tx_cursor(cursor)
-        stmt = stmt.where(
-            or_(
-                R4TreatmentTransaction.performed_at < cursor_dt,
-                and_(
-                    R4TreatmentTransaction.performed_at == cursor_dt,
-                    R4TreatmentTransaction.legacy_transaction_id < cursor_id,
-                ),
-            )
-        )
-
-    stmt = stmt.order_by(
-        R4TreatmentTransaction.performed_at.desc(),
-        R4TreatmentTransaction.legacy_transaction_id.desc(),
-    ).limit(limit + 1)
-    rows = list(db.execute(stmt).all())
-    has_more = len(rows) > limit
-    items = rows[:limit]
-    next_cursor = None
-    if has_more and items:
-        last_tx = items[-1][0]
-        next_cursor = _encode_tx_cursor(last_tx.performed_at, last_tx.legacy_transaction_id)
+    items = page.items
     total_count = None
     if include_total:
         total_count = (
@@ -664,17 +628,13 @@ def list_patient_treatment_transactions(
             )
             or 0
         )
+    # User and treatment-code labels come from the process-wide reference cache
+    # instead of three outer joins per page.
+    refs = reference_cache.get(db)
     payload_items: list[dict[str, object]] = []
-    for (
-        tx,
-        recorded_name,
-        user_name,
-        treatment_name,
-        recorded_is_current,
-        user_is_current,
-        recorded_role,
-        user_role,
-    ) in items:
+    for tx in items:
+        recorded_user = refs.r4_user(tx.recorded_by, tx.legacy_source)
+        entry_user = refs.r4_user(tx.user_code, tx.legacy_source)
         payload_items.append(
             {
                 "legacy_transaction_id": tx.legacy_transaction_id,
@@ -683,20 +643,20 @@ def list_patient_treatment_transactions(
                 "trans_code": tx.trans_code,
                 "patient_cost": tx.patient_cost,
                 "dpb_cost": tx.dpb_cost,
-                "treatment_name": treatment_name,
+                "treatment_name": refs.r4_treatment_name(tx.treatment_code, tx.legacy_source),
                 "recorded_by": tx.recorded_by,
                 "user_code": tx.user_code,
-                "recorded_by_name": recorded_name,
-                "user_name": user_name,
-                "recorded_by_is_current": recorded_is_current,
-                "user_is_current": user_is_current,
-                "recorded_by_role": recorded_role,
-                "user_role": user_role,
+                "recorded_by_name": recorded_user.display_name if recorded_user else None,
+                "user_name": entry_user.display_name if entry_user else None,
+                "recorded_by_is_current": recorded_user.is_current if recorded_user else None,
+                "user_is_current": entry_user.is_current if entry_user else None,
+                "recorded_by_role": recorded_user.role if recorded_user else None,
+                "user_role": entry_user.role if entry_user else None,
             }
         )
     return {
         "items": payload_items,
-        "next_cursor": next_cursor,
+        "next_cursor": page.next_cursor,
         "total_count": total_count,
     }
 
@@ -753,6 +713,7 @@ def get_patient_finance_summary(
         db.scalars(
             select(Payment)
             .join(Invoice, Payment.invoice_id == Invoice.id)
+            .options(contains_eager(Payment.invoice))
             .where(Invoice.patient_id == patient_id)
             .order_by(Payment.paid_at.desc())
             .limit(limit)
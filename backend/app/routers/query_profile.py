@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query
+
+from app.db.session import pool_status
+from app.deps import require_roles
+from app.schemas.query_profile import PoolStatusOut, QueryProfileOut
+from app.services.query_profile import recent_profiles
+
+router = APIRouter(prefix="/admin/query-profile", tags=["admin"])
+
+
+@router.get("", response_model=list[QueryProfileOut])
+def list_query_profiles(
+    _=Depends(require_roles("superadmin")),
+    flagged: bool = Query(default=False),
+    path: str | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=200),
+):
+    # Recent requests served by this worker, newest first; statements are
+    # fingerprints, so no bound values (patient data) are exposed.
+    profiles = recent_profiles()
+    if flagged:
+        profiles = [item for item in profiles if item["over_budget"] or item["repeated"]]
+    if path:
+        profiles = [item for item in profiles if item["path"].startswith(path)]
+    return profiles[:limit]
+
+
+@router.get("/pool", response_model=dict[str, PoolStatusOut])
+def get_pool_status(_=Depends(require_roles("superadmin"))):
+    # This worker's sync and async pools; waits accumulate since the worker started.
+    return pool_status()
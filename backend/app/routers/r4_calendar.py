@@ -4,16 +4,16 @@ from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import String, cast, func, select
-from sqlalchemy.orm import aliased, Session
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.deps import get_current_user
 from app.models.patient import Patient
 from app.models.r4_appointment import R4Appointment
 from app.models.r4_appointment_patient_link import R4AppointmentPatientLink
-from app.models.r4_user import R4User
 from app.services.r4_import.status import normalize_status
+from app.services.reference_cache import R4UserRef, reference_cache
 
 router = APIRouter(prefix="/api/appointments", tags=["appointments"])
 
@@ -84,7 +84,7 @@ def _build_status_expression():
     )
 
 
-def _clinician_name(user: R4User | None) -> str | None:
+def _clinician_name(user: R4UserRef | None) -> str | None:
     if not user:
         return None
     if user.display_name:
@@ -117,10 +117,7 @@ def _patient_name(patient: Patient | None) -> str | None:
     return name or None
 
 
-def _resolve_patient_display(
-    linked_patient: Patient | None, code_patient: Patient | None
-) -> dict[str, object]:
-    patient = linked_patient or code_patient
+def _resolve_patient_display(patient: Patient | None) -> dict[str, object]:
     name = _patient_name(patient)
     if patient and name:
         return {
@@ -191,58 +188,20 @@ def list_r4_calendar(
     from_dt = from_local.astimezone(timezone.utc)
     to_dt = to_local.astimezone(timezone.utc)
 
-    link_alias = aliased(R4AppointmentPatientLink)
-    linked_patient = aliased(Patient)
-    code_patient = aliased(Patient)
     status_expr = _build_status_expression()
     include_statuses = _parse_status_values(statuses)
     exclude_statuses = _parse_status_values(exclude_statuses)
     if not include_statuses and not show_hidden:
         include_statuses = list(DEFAULT_VISIBLE_STATUSES)
 
-    join_condition = code_patient.legacy_id == cast(R4Appointment.patient_code, String)
-    resolved_patient_id = func.coalesce(linked_patient.id, code_patient.id)
-
-    base_stmt = (
-        select(R4Appointment)
-        .outerjoin(
-            link_alias,
-            (link_alias.legacy_source == R4Appointment.legacy_source)
-            & (link_alias.legacy_appointment_id == R4Appointment.legacy_appointment_id),
-        )
-        .outerjoin(linked_patient, linked_patient.id == link_alias.patient_id)
-        .outerjoin(code_patient, join_condition)
-    )
-    base_stmt = _apply_filters(
-        base_stmt,
-        resolved_patient_id,
-        status_expr,
-        from_dt,
-        to_dt,
-        clinician_code,
-        show_hidden,
-        show_unlinked,
-        unlinked_only,
-        linked_only,
-        include_statuses,
-        exclude_statuses,
-    )
-
-    total_count: int | None = None
+    # resolved_patient_id is maintained at import/link time, so the patient join is an
+    # integer key lookup and the total comes from a window over the same filtered rows.
+    resolved_patient_id = R4Appointment.resolved_patient_id
+    columns = [R4Appointment, Patient]
     if include_total:
-        total_stmt = select(func.count()).select_from(base_stmt.subquery())
-        total_count = int(db.scalar(total_stmt) or 0)
-
-    data_stmt = (
-        select(R4Appointment, linked_patient, code_patient, R4User)
-        .outerjoin(
-            link_alias,
-            (link_alias.legacy_source == R4Appointment.legacy_source)
-            & (link_alias.legacy_appointment_id == R4Appointment.legacy_appointment_id),
-        )
-        .outerjoin(linked_patient, linked_patient.id == link_alias.patient_id)
-        .outerjoin(code_patient, join_condition)
-        .outerjoin(R4User, R4User.legacy_user_code == R4Appointment.clinician_code)
+        columns.append(func.count().over().label("total_count"))
+    data_stmt = select(*columns).outerjoin(
+        Patient, Patient.id == R4Appointment.resolved_patient_id
     )
     data_stmt = _apply_filters(
         data_stmt,
@@ -265,9 +224,16 @@ def list_r4_calendar(
 
     rows = db.execute(data_stmt).all()
 
+    total_count: int | None = None
+    if include_total:
+        total_count = int(rows[0].total_count) if rows else 0
+
+    refs = reference_cache.get(db)
     items: List[CalendarItem] = []
-    for appointment, linked_patient_row, code_patient_row, clinician in rows:
-        patient_payload = _resolve_patient_display(linked_patient_row, code_patient_row)
+    for row in rows:
+        appointment, patient = row[0], row[1]
+        clinician = refs.r4_user(appointment.clinician_code, appointment.legacy_source)
+        patient_payload = _resolve_patient_display(patient)
         item = CalendarItem(
             legacy_appointment_id=appointment.legacy_appointment_id,
             starts_at=appointment.starts_at,
@@ -322,8 +288,20 @@ def link_r4_appointment(
         )
     )
     now = datetime.now(timezone.utc)
+    # Same write as refresh_r4_appointment_patient_ids: keep updated_at, which
+    # tracks changes from R4, so incremental syncs don't see linked rows as new.
+    db.execute(
+        update(R4Appointment)
+        .where(
+            R4Appointment.id == appointment.id,
+            R4Appointment.resolved_patient_id.is_distinct_from(payload.patient_id),
+        )
+        .values(resolved_patient_id=payload.patient_id, updated_at=R4Appointment.updated_at)
+        .execution_options(synchronize_session=False)
+    )
     if link:
         if link.patient_id == payload.patient_id:
+            db.commit()
             return link
         link.patient_id = payload.patient_id
         link.linked_by_user_id = user.id
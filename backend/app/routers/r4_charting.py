@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import csv
 import io
 import json
 import logging
+import tempfile
 import time
 import zipfile
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
-from sqlalchemy import and_, func, literal, nullslast, select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Text, and_, cast, func, literal, nullsfirst, nullslast, select
 from sqlalchemy.orm import Session
 
 from app.core.settings import settings
@@ -28,7 +31,6 @@ from app.models.r4_charting import (
     R4PerioProbe,
     R4ToothSurface,
 )
-from app.models.r4_treatment_plan import R4Treatment
 from app.services.charting_csv import (
     ENTITY_ALIASES,
     ENTITY_COLUMNS,
@@ -42,7 +44,8 @@ from app.services.charting_csv import (
     parse_entities,
     rows_for_csv,
 )
-from app.services.audit import log_event
+from app.services.audit import log_event, queue_event
+from app.services.pagination import MAX_INTEGER, MAX_SMALLINT, MAX_TIMESTAMPTZ, Keyset
 from app.services.r4_charting.tooth_state_engine import (
     build_tooth_state_engine_row,
     project_tooth_state_rows,
@@ -68,16 +71,41 @@ from app.schemas.r4_charting import (
     R4ToothStateRestorationOut,
     R4ToothSurfaceOut,
 )
-from app.services.rate_limit import SimpleRateLimiter
+from app.services.rate_limit import RateLimiter
+from app.services.reference_cache import reference_cache
 
 router = APIRouter(prefix="/patients/{patient_id}/charting", tags=["charting"])
 logger = logging.getLogger("dental_pms.charting")
 
 DEFAULT_LIMIT = 500
 MAX_LIMIT = 5000
-CHARTING_RATE_LIMITER = SimpleRateLimiter(max_events=60, window_seconds=60)
-CHARTING_EXPORT_RATE_LIMITER = SimpleRateLimiter(max_events=10, window_seconds=60)
+CHARTING_RATE_LIMITER = RateLimiter("charting", max_events=60, window_seconds=60)
+CHARTING_EXPORT_RATE_LIMITER = RateLimiter("charting_export", max_events=10, window_seconds=60)
 EXPORT_MAX_ROWS = max(settings.charting_export_max_rows, 1)
+EXPORT_SPOOL_BYTES = max(settings.charting_export_spool_bytes, 1)
+EXPORT_FETCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+# Same order as the old NULLS LAST sorts, as coalesced keys so a page is one
+# row-value seek on the matching expression indexes (0055).
+PERIO_PROBE_KEYSET = Keyset(
+    ("recorded_at", func.coalesce(R4PerioProbe.recorded_at, MAX_TIMESTAMPTZ)),
+    ("tooth", func.coalesce(R4PerioProbe.tooth, MAX_SMALLINT)),
+    ("probing_point", func.coalesce(R4PerioProbe.probing_point, MAX_SMALLINT)),
+    ("legacy_trans_id", func.coalesce(R4PerioProbe.legacy_trans_id, MAX_INTEGER)),
+    R4PerioProbe.legacy_probe_key,
+    R4PerioProbe.id,
+)
+PERIO_PLAQUE_KEYSET = Keyset(
+    ("recorded_at", func.coalesce(R4PerioPlaque.recorded_at, MAX_TIMESTAMPTZ)),
+    ("tooth", func.coalesce(R4PerioPlaque.tooth, MAX_SMALLINT)),
+    ("legacy_trans_id", func.coalesce(R4PerioPlaque.legacy_trans_id, MAX_INTEGER)),
+    R4PerioPlaque.legacy_plaque_key,
+    R4PerioPlaque.id,
+)
+TOOTH_SURFACE_KEYSET = Keyset(
+    R4ToothSurface.legacy_tooth_id, R4ToothSurface.legacy_surface_no, R4ToothSurface.id
+)
 
 
 def _log_charting_access(
@@ -182,15 +210,11 @@ def _resolve_legacy_patient_code(db: Session, patient_id: int) -> int | None:
     return int(legacy_id) if legacy_id.isdigit() else None
 
 
-def _pg_rows(db: Session, stmt):
-    rows = db.execute(stmt).mappings().all()
-    normalized: list[dict[str, object]] = []
-    for row in rows:
-        payload = {}
-        for key, value in row.items():
-            payload[key] = format_dt(value)
-        normalized.append(payload)
-    return normalized
+def _pg_row_batches(db: Session, stmt):
+    # yield_per opens a server-side cursor, so only one batch is held in memory.
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_FETCH_SIZE))
+    for partition in result.mappings().partitions():
+        yield [{key: format_dt(value) for key, value in row.items()} for row in partition]
 
 
 def _canonical_payload(record: R4ChartingCanonicalRecord) -> dict[str, object]:
@@ -364,6 +388,7 @@ def list_perio_probes(
     access=Depends(_charting_access_context),
     limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     from_: datetime | None = Query(default=None, alias="from"),
     to: datetime | None = Query(default=None, alias="to"),
     tooth: int | None = Query(default=None, ge=1),
@@ -426,27 +451,20 @@ def list_perio_probes(
                 filters.append(R4PerioProbe.plaque == 0)
         total = db.scalar(select(func.count()).select_from(R4PerioProbe).where(*filters))
         total = int(total or 0)
-        stmt = (
-            select(R4PerioProbe)
-            .where(*filters)
-            .order_by(
-                nullslast(R4PerioProbe.recorded_at.asc()),
-                nullslast(R4PerioProbe.tooth.asc()),
-                nullslast(R4PerioProbe.probing_point.asc()),
-                nullslast(R4PerioProbe.legacy_trans_id.asc()),
-                R4PerioProbe.legacy_probe_key.asc(),
-            )
-            .offset(offset)
-            .limit(limit)
+        page = PERIO_PROBE_KEYSET.paginate(
+            db,
+            select(R4PerioProbe).where(*filters),
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
         )
-        items = list(db.scalars(stmt))
-        has_more = offset + len(items) < total
         payload = PaginatedR4PerioProbeOut(
-            items=items,
+            items=page.items,
             total=total,
             limit=limit,
             offset=offset,
-            has_more=has_more,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor,
         ).model_dump()
         duration_ms = int((time.monotonic() - start) * 1000)
         _log_charting_access(
@@ -480,6 +498,7 @@ def list_perio_plaque(
     access=Depends(_charting_access_context),
     limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
     from_: datetime | None = Query(default=None, alias="from"),
     to: datetime | None = Query(default=None, alias="to"),
     tooth: int | None = Query(default=None, ge=1),
@@ -539,26 +558,20 @@ def list_perio_plaque(
                 filters.append(R4PerioPlaque.bleeding == 0)
         total = db.scalar(select(func.count()).select_from(R4PerioPlaque).where(*filters))
         total = int(total or 0)
-        stmt = (
-            select(R4PerioPlaque)
-            .where(*filters)
-            .order_by(
-                nullslast(R4PerioPlaque.recorded_at.asc()),
-                nullslast(R4PerioPlaque.tooth.asc()),
-                nullslast(R4PerioPlaque.legacy_trans_id.asc()),
-                R4PerioPlaque.legacy_plaque_key.asc(),
-            )
-            .offset(offset)
-            .limit(limit)
+        page = PERIO_PLAQUE_KEYSET.paginate(
+            db,
+            select(R4PerioPlaque).where(*filters),
+            limit=limit,
+            cursor=cursor,
+            offset=offset,
         )
-        items = list(db.scalars(stmt))
-        has_more = offset + len(items) < total
         payload = PaginatedR4PerioPlaqueOut(
-            items=items,
+            items=page.items,
             total=total,
             limit=limit,
             offset=offset,
-            has_more=has_more,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor,
         ).model_dump()
         duration_ms = int((time.monotonic() - start) * 1000)
         _log_charting_access(
@@ -643,14 +656,7 @@ def list_treatment_plan_items_overlay(
             return payload
 
         stmt = (
-            select(R4ChartingCanonicalRecord, R4Treatment.description.label("code_label"))
-            .outerjoin(
-                R4Treatment,
-                and_(
-                    R4Treatment.legacy_source == "r4",
-                    R4Treatment.legacy_treatment_code == R4ChartingCanonicalRecord.code_id,
-                ),
-            )
+            select(R4ChartingCanonicalRecord)
             .where(
                 R4ChartingCanonicalRecord.legacy_patient_code == patient_code,
                 R4ChartingCanonicalRecord.domain.in_(("treatment_plan_item", "treatment_plan_items")),
@@ -668,7 +674,9 @@ def list_treatment_plan_items_overlay(
         total_completed = 0
         total_items = 0
 
-        for record, code_label in db.execute(stmt).all():
+        refs = reference_cache.get(db)
+        for record in db.scalars(stmt):
+            code_label = refs.r4_treatment_name(record.code_id)
             payload = _canonical_payload(record)
             completed = _coerce_optional_bool(payload.get("completed"))
             is_completed = completed is True
@@ -784,14 +792,7 @@ def get_tooth_state(
             return response
 
         stmt = (
-            select(R4ChartingCanonicalRecord, R4Treatment.description.label("code_label"))
-            .outerjoin(
-                R4Treatment,
-                and_(
-                    R4Treatment.legacy_source == "r4",
-                    R4Treatment.legacy_treatment_code == R4ChartingCanonicalRecord.code_id,
-                ),
-            )
+            select(R4ChartingCanonicalRecord)
             .where(
                 R4ChartingCanonicalRecord.legacy_patient_code == patient_code,
                 R4ChartingCanonicalRecord.domain.in_(
@@ -810,10 +811,12 @@ def get_tooth_state(
             .limit(limit)
         )
 
+        refs = reference_cache.get(db)
         engine_rows = [
             row
-            for record, code_label in db.execute(stmt).all()
-            if (row := build_tooth_state_engine_row(record, code_label)) is not None
+            for record in db.scalars(stmt)
+            if (row := build_tooth_state_engine_row(record, refs.r4_treatment_name(record.code_id)))
+            is not None
         ]
         projected_teeth = project_tooth_state_rows(engine_rows)
         teeth = {
@@ -1197,6 +1200,7 @@ def list_tooth_surfaces(
     access=Depends(_charting_access_context),
     limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
     offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None),
 ) -> dict[str, object]:
     user = access["user"]
     start = access["start"]
@@ -1224,18 +1228,16 @@ def list_tooth_surfaces(
             return payload
         total = db.scalar(select(func.count()).select_from(R4ToothSurface))
         total = int(total or 0)
-        stmt = select(R4ToothSurface).order_by(
-            R4ToothSurface.legacy_tooth_id.asc(),
-            R4ToothSurface.legacy_surface_no.asc(),
-        ).offset(offset).limit(limit)
-        items = list(db.scalars(stmt))
-        has_more = offset + len(items) < total
+        page = TOOTH_SURFACE_KEYSET.paginate(
+            db, select(R4ToothSurface), limit=limit, cursor=cursor, offset=offset
+        )
         payload = PaginatedR4ToothSurfaceOut(
-            items=items,
+            items=page.items,
             total=total,
             limit=limit,
             offset=offset,
-            has_more=has_more,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor,
         ).model_dump()
         duration_ms = int((time.monotonic() - start) * 1000)
         _log_charting_access(
@@ -1310,11 +1312,7 @@ def get_charting_meta(
         raise
 
 
-def _export_rows_for_entity(
-    db: Session,
-    entity: str,
-    patient_code: int,
-) -> tuple[list[dict[str, object]], int]:
+def _export_statement(db: Session, entity: str, patient_code: int):
     if entity == "patient_notes":
         stmt = select(
             R4PatientNote.legacy_patient_code.label("patient_code"),
@@ -1328,8 +1326,7 @@ def _export_rows_for_entity(
             R4PatientNote.fixed_note_code.label("fixed_note_code"),
             R4PatientNote.user_code.label("user_code"),
         ).where(R4PatientNote.legacy_patient_code == patient_code)
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "bpe":
         stmt = select(
             R4BPEEntry.legacy_patient_code.label("patient_code"),
@@ -1343,8 +1340,7 @@ def _export_rows_for_entity(
             R4BPEEntry.sextant_5.label("sextant_5"),
             R4BPEEntry.sextant_6.label("sextant_6"),
         ).where(R4BPEEntry.legacy_patient_code == patient_code)
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "bpe_furcations":
         stmt = select(
             R4BPEFurcation.legacy_patient_code.label("patient_code"),
@@ -1355,8 +1351,7 @@ def _export_rows_for_entity(
             R4BPEFurcation.furcation.label("furcation"),
             R4BPEFurcation.sextant.label("sextant"),
         ).where(R4BPEFurcation.legacy_patient_code == patient_code)
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "perio_probes":
         stmt = select(
             R4PerioProbe.legacy_patient_code.label("patient_code"),
@@ -1369,8 +1364,7 @@ def _export_rows_for_entity(
             R4PerioProbe.bleeding.label("bleeding"),
             R4PerioProbe.plaque.label("plaque"),
         ).where(R4PerioProbe.legacy_patient_code == patient_code)
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "perio_plaque":
         stmt = select(
             R4PerioPlaque.legacy_patient_code.label("patient_code"),
@@ -1381,8 +1375,7 @@ def _export_rows_for_entity(
             R4PerioPlaque.plaque.label("plaque"),
             R4PerioPlaque.bleeding.label("bleeding"),
         ).where(R4PerioPlaque.legacy_patient_code == patient_code)
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "fixed_notes":
         codes = list(
             db.scalars(
@@ -1393,7 +1386,7 @@ def _export_rows_for_entity(
             )
         )
         if not codes:
-            return [], 0
+            return None
         stmt = select(
             literal(patient_code).label("patient_code"),
             R4FixedNote.legacy_fixed_note_code.label("legacy_fixed_note_code"),
@@ -1403,8 +1396,7 @@ def _export_rows_for_entity(
             R4FixedNote.tooth.label("tooth"),
             R4FixedNote.surface.label("surface"),
         ).where(R4FixedNote.legacy_fixed_note_code.in_(codes))
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "note_categories":
         categories = list(
             db.scalars(
@@ -1415,14 +1407,13 @@ def _export_rows_for_entity(
             )
         )
         if not categories:
-            return [], 0
+            return None
         stmt = select(
             literal(patient_code).label("patient_code"),
             R4NoteCategory.legacy_category_number.label("legacy_category_number"),
             R4NoteCategory.description.label("description"),
         ).where(R4NoteCategory.legacy_category_number.in_(categories))
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     if entity == "tooth_surfaces":
         stmt = select(
             R4ToothSurface.legacy_tooth_id.label("legacy_tooth_id"),
@@ -1431,79 +1422,109 @@ def _export_rows_for_entity(
             R4ToothSurface.short_label.label("short_label"),
             R4ToothSurface.sort_order.label("sort_order"),
         )
-        total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-        return _pg_rows(db, stmt.limit(EXPORT_MAX_ROWS)), total
+        return stmt
     raise HTTPException(status_code=400, detail=f"Unsupported export entity: {entity}")
 
 
-@router.get("/export")
-def export_charting(
-    patient_id: int,
-    db: Session = Depends(get_db),
-    access=Depends(_charting_access_context),
-    entities: str | None = Query(default=None),
-) -> Response:
-    user = access["user"]
-    start = access["start"]
-    request: Request = access["request"]
+def _order_export_statement(stmt, entity: str):
+    # The offline CSV tooling sorts on str(value) with None as "", so compare
+    # the text form byte-wise (numbers and timestamps included), nulls first.
+    columns = stmt.selected_columns
+    order_by = [
+        nullsfirst(cast(columns[key], Text).collate("C").asc())
+        for key in ENTITY_SORT_KEYS.get(entity, [])
+        if key in columns
+    ]
+    return stmt.order_by(*order_by)
+
+
+def _write_entity_csv(
+    db: Session,
+    archive: zipfile.ZipFile,
+    entity: str,
+    patient_code: int,
+) -> dict[str, object]:
+    columns = ENTITY_COLUMNS[entity]
+    date_fields = ENTITY_DATE_FIELDS.get(entity, [])
+    stmt = _export_statement(db, entity, patient_code)
+    total_rows = 0
+    if stmt is not None:
+        total_rows = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
+    count = 0
+    min_date: str | None = None
+    max_date: str | None = None
+    with archive.open(f"postgres_{entity}.csv", mode="w") as entry:
+        handle = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+        writer = csv.DictWriter(handle, fieldnames=columns)
+        writer.writeheader()
+        if stmt is not None and total_rows:
+            ordered = _order_export_statement(stmt, entity).limit(EXPORT_MAX_ROWS)
+            for batch in _pg_row_batches(db, ordered):
+                normalized = normalize_entity_rows(entity, batch, patient_code)
+                writer.writerows(rows_for_csv(normalized, columns, patient_code))
+                count += len(normalized)
+                batch_min, batch_max = date_range(normalized, date_fields)
+                if batch_min is not None and (min_date is None or batch_min < min_date):
+                    min_date = batch_min
+                if batch_max is not None and (max_date is None or batch_max > max_date):
+                    max_date = batch_max
+        handle.flush()
+        handle.detach()
+    return {
+        "entity": entity,
+        "linkage_method": ENTITY_LINKAGE.get(entity),
+        "sqlserver_status": None,
+        "sqlserver_reason": None,
+        "sqlserver_count": None,
+        "sqlserver_total": None,
+        "sqlserver_unique_count": None,
+        "sqlserver_duplicate_count": None,
+        "sqlserver_date_min": None,
+        "sqlserver_date_max": None,
+        "postgres_count": count,
+        "postgres_total": total_rows,
+        "postgres_unique_count": count,
+        "postgres_duplicate_count": 0,
+        "postgres_date_min": min_date,
+        "postgres_date_max": max_date,
+        "postgres_truncated": total_rows > EXPORT_MAX_ROWS,
+        "postgres_limit": EXPORT_MAX_ROWS,
+    }
+
+
+def _iter_spooled(spool, chunk_size: int = EXPORT_CHUNK_BYTES):
+    try:
+        spool.seek(0)
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+def _build_export_archive(
+    db: Session,
+    selected: list[str],
+    patient_code: int,
+) -> tempfile.SpooledTemporaryFile:
+    """Write the review pack ZIP entry by entry into a spooled file.
+
+    Small exports stay in memory; once the archive passes EXPORT_SPOOL_BYTES it
+    rolls over to a temp file, so worker memory no longer scales with history.
+
+    The archive is finished before the response starts on purpose, as for mail
+    merge: the request's session is closed before a streaming body runs, a
+    failure mid-export returns an error instead of a truncated ZIP, and the
+    audit entry and Content-Length describe the complete file.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
     try:
-        if settings.app_env.strip().lower() != "test":
-            if not CHARTING_EXPORT_RATE_LIMITER.allow(f"user:{user.id}"):
-                duration_ms = int((time.monotonic() - start) * 1000)
-                _log_charting_access(
-                    user_id=user.id,
-                    user_email=user.email,
-                    patient_id=patient_id,
-                    path=request.url.path,
-                    method=request.method,
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    duration_ms=duration_ms,
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail="Too many charting export requests",
-                )
-        patient_code = _resolve_legacy_patient_code(db, patient_id)
-        if patient_code is None:
-            raise HTTPException(status_code=404, detail="Patient is not linked to R4.")
-        selected = parse_entities(entities, ENTITY_ALIASES)
-        if not selected:
-            raise HTTPException(status_code=400, detail="No export entities requested.")
-        buffer = io.BytesIO()
         index_rows: list[dict[str, object]] = []
-        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with zipfile.ZipFile(spool, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
             for entity in selected:
-                raw_rows, total_rows = _export_rows_for_entity(db, entity, patient_code)
-                if len(raw_rows) > EXPORT_MAX_ROWS:
-                    raw_rows = raw_rows[:EXPORT_MAX_ROWS]
-                truncated = total_rows > EXPORT_MAX_ROWS
-                normalized = normalize_entity_rows(entity, raw_rows, patient_code)
-                csv_rows = rows_for_csv(normalized, ENTITY_COLUMNS[entity], patient_code)
-                csv_body = csv_text(csv_rows, ENTITY_COLUMNS[entity], ENTITY_SORT_KEYS.get(entity, []))
-                archive.writestr(f"postgres_{entity}.csv", csv_body)
-                min_date, max_date = date_range(normalized, ENTITY_DATE_FIELDS.get(entity, []))
-                index_rows.append(
-                    {
-                        "entity": entity,
-                        "linkage_method": ENTITY_LINKAGE.get(entity),
-                        "sqlserver_status": None,
-                        "sqlserver_reason": None,
-                        "sqlserver_count": None,
-                        "sqlserver_total": None,
-                        "sqlserver_unique_count": None,
-                        "sqlserver_duplicate_count": None,
-                        "sqlserver_date_min": None,
-                        "sqlserver_date_max": None,
-                        "postgres_count": len(normalized),
-                        "postgres_total": total_rows,
-                        "postgres_unique_count": len(normalized),
-                        "postgres_duplicate_count": 0,
-                        "postgres_date_min": min_date,
-                        "postgres_date_max": max_date,
-                        "postgres_truncated": truncated,
-                        "postgres_limit": EXPORT_MAX_ROWS,
-                    }
-                )
+                index_rows.append(_write_entity_csv(db, archive, entity, patient_code))
             index_columns = [
                 "entity",
                 "linkage_method",
@@ -1538,12 +1559,50 @@ def export_charting(
             archive.writestr(
                 "review_pack.json", json.dumps(review_pack, indent=2, sort_keys=True)
             )
-        buffer.seek(0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+@router.get("/export")
+def export_charting(
+    patient_id: int,
+    db: Session = Depends(get_db),
+    access=Depends(_charting_access_context),
+    entities: str | None = Query(default=None),
+) -> Response:
+    user = access["user"]
+    start = access["start"]
+    request: Request = access["request"]
+    try:
+        if settings.app_env.strip().lower() != "test":
+            if not CHARTING_EXPORT_RATE_LIMITER.allow(f"user:{user.id}"):
+                duration_ms = int((time.monotonic() - start) * 1000)
+                _log_charting_access(
+                    user_id=user.id,
+                    user_email=user.email,
+                    patient_id=patient_id,
+                    path=request.url.path,
+                    method=request.method,
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    duration_ms=duration_ms,
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many charting export requests",
+                )
+        patient_code = _resolve_legacy_patient_code(db, patient_id)
+        if patient_code is None:
+            raise HTTPException(status_code=404, detail="Patient is not linked to R4.")
+        selected = parse_entities(entities, ENTITY_ALIASES)
+        if not selected:
+            raise HTTPException(status_code=400, detail="No export entities requested.")
+        spool = _build_export_archive(db, selected, patient_code)
         stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d")
         filename = f"charting_{patient_code}_{stamp}.zip"
         duration_ms = int((time.monotonic() - start) * 1000)
-        log_event(
-            db,
+        queue_event(
             actor=user,
             action="charting.export",
             entity_type="patient",
@@ -1555,7 +1614,6 @@ def export_charting(
             },
             ip_address=request.client.host if request else None,
         )
-        db.commit()
         _log_charting_access(
             user_id=user.id,
             user_email=user.email,
@@ -1565,10 +1623,14 @@ def export_charting(
             status_code=200,
             duration_ms=duration_ms,
         )
-        return Response(
-            content=buffer.getvalue(),
+        archive_size = spool.seek(0, io.SEEK_END)
+        return StreamingResponse(
+            _iter_spooled(spool),
             media_type="application/zip",
-            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "Content-Length": str(archive_size),
+            },
         )
     except HTTPException as exc:
         duration_ms = int((time.monotonic() - start) * 1000)
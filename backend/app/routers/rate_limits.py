@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+
+from app.deps import require_roles
+from app.schemas.rate_limit import RateLimitMetricsOut
+from app.services.rate_limit import rate_limit_metrics
+
+router = APIRouter(prefix="/admin/rate-limits", tags=["admin"])
+
+
+@router.get("", response_model=list[RateLimitMetricsOut])
+def list_rate_limits(_=Depends(require_roles("superadmin"))):
+    # process_* counters cover only the worker serving this request;
+    # shared_throttled and active_keys are totals across workers.
+    return rate_limit_metrics()
@@ -10,10 +10,11 @@ import zipfile
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy import case, false, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
-from app.deps import require_capability
+from app.db.session import get_async_db, get_db
+from app.deps import require_capability, require_capability_async
 from app.models.patient import Patient, RecallStatus
 from app.models.patient_recall import (
     PatientRecall,
@@ -26,6 +27,7 @@ from app.models.patient_recall_communication import (
     PatientRecallCommunicationDirection,
     PatientRecallCommunicationStatus,
 )
+from app.models.recall_kpi import RecallContactDaily, RecallKpiBucket
 from app.models.user import User
 from app.schemas.patient import PatientRecallSettingsOut, RecallUpdate
 from app.schemas.patient_document import PatientDocumentCreate, PatientDocumentOut
@@ -33,7 +35,12 @@ from app.schemas.recalls import RecallContactCreate, RecallDashboardRow, RecallK
 from app.models.document_template import DocumentTemplate
 from app.models.patient_document import PatientDocument
 from app.services.audit import log_event
-from app.services.document_render import render_template_with_warnings
+from app.services.document_render import (
+    compile_document_template,
+    render_compiled_with_warnings,
+    render_template_with_warnings,
+)
+from app.services.recall_kpis import recall_kpi_key, track_recall_kpi
 from app.services.recall_letter_pdf import build_recall_letter_pdf
 from app.services.recall_communications import log_recall_communication
 from app.services.recalls_audit import (
@@ -43,7 +50,7 @@ from app.services.recalls_audit import (
     log_recall_activity,
     log_recall_export,
 )
-from app.services.recalls import resolve_recall_status
+from app.services.recalls import resolve_recall_status, resolved_status_clause
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -286,31 +293,23 @@ def _normalize_contact_filters(
     return contact_flag, within_days, older_than_days, requested_channel_members
 
 
-def _build_last_contact_subquery():
-    contact_ts = func.coalesce(
-        PatientRecallCommunication.contacted_at,
-        PatientRecallCommunication.created_at,
-    )
+def _last_contact_columns():
+    """Dashboard last-contact columns: the projection on the recall row, plus
+    the note text from the one communication it points at (a primary-key join).
+    """
     return (
-        select(
-            PatientRecallCommunication.id.label("comm_id"),
-            PatientRecallCommunication.recall_id.label("recall_id"),
-            contact_ts.label("contacted_at"),
-            PatientRecallCommunication.channel.label("channel"),
-            PatientRecallCommunication.notes.label("notes"),
-            PatientRecallCommunication.other_detail.label("other_detail"),
-            PatientRecallCommunication.outcome.label("outcome"),
-            func.row_number()
-            .over(
-                partition_by=PatientRecallCommunication.recall_id,
-                order_by=(
-                    contact_ts.desc(),
-                    PatientRecallCommunication.id.desc(),
-                ),
-            )
-            .label("rn"),
-        )
-        .subquery()
+        PatientRecall.last_contacted_at,
+        PatientRecall.last_contact_channel,
+        PatientRecallCommunication.notes.label("last_contact_note"),
+        PatientRecallCommunication.other_detail.label("last_contact_other_detail"),
+        PatientRecall.last_contact_outcome,
+    )
+
+
+def _join_last_contact(stmt):
+    return stmt.outerjoin(
+        PatientRecallCommunication,
+        PatientRecallCommunication.id == PatientRecall.last_contact_id,
     )
 
 
@@ -385,30 +384,9 @@ def bump_export_count_cache_epoch(reason: str) -> None:
     )
 
 
-def _resolved_status_expr(today: date):
-    return case(
-        (
-            PatientRecall.status.in_(
-                [
-                    PatientRecallStatus.completed,
-                    PatientRecallStatus.cancelled,
-                    PatientRecallStatus.due,
-                    PatientRecallStatus.overdue,
-                ]
-            ),
-            PatientRecall.status,
-        ),
-        (PatientRecall.due_date.is_(None), PatientRecall.status),
-        (PatientRecall.due_date < today, PatientRecallStatus.overdue),
-        (PatientRecall.due_date <= today, PatientRecallStatus.due),
-        else_=PatientRecall.status,
-    )
-
-
 def _apply_contact_filters(
     stmt,
     *,
-    last_contact_subq,
     contact_flag: str | None,
     within_days: int | None,
     older_than_days: int | None,
@@ -417,17 +395,17 @@ def _apply_contact_filters(
     if contact_flag == "no":
         if within_days or older_than_days or channels:
             return stmt.where(false())
-        return stmt.where(last_contact_subq.c.comm_id.is_(None))
+        return stmt.where(PatientRecall.last_contact_id.is_(None))
     if contact_flag == "yes":
-        stmt = stmt.where(last_contact_subq.c.comm_id.is_not(None))
+        stmt = stmt.where(PatientRecall.last_contact_id.is_not(None))
     if within_days:
         threshold = datetime.now(timezone.utc) - timedelta(days=within_days)
-        stmt = stmt.where(last_contact_subq.c.contacted_at >= threshold)
+        stmt = stmt.where(PatientRecall.last_contacted_at >= threshold)
     if older_than_days:
         threshold = datetime.now(timezone.utc) - timedelta(days=older_than_days)
-        stmt = stmt.where(last_contact_subq.c.contacted_at < threshold)
+        stmt = stmt.where(PatientRecall.last_contacted_at < threshold)
     if channels:
-        stmt = stmt.where(last_contact_subq.c.channel.in_(channels))
+        stmt = stmt.where(PatientRecall.last_contact_channel.in_(channels))
     return stmt
 
 
@@ -444,10 +422,9 @@ def _build_export_stmt(
     contacted_within_days: int | None,
     contact_channel: str | None,
 ):
-    requested_statuses, requested_type_members, stored_statuses = _normalize_recall_filters(
+    requested_statuses, requested_type_members, _stored_statuses = _normalize_recall_filters(
         status, recall_type
     )
-    requested_status_members = _requested_status_members(requested_statuses)
     contact_flag, within_days, older_than_days, channels = _normalize_contact_filters(
         contact_state,
         last_contact,
@@ -456,27 +433,21 @@ def _build_export_stmt(
         contacted_within_days,
         contact_channel,
     )
-    last_contact_subq = _build_last_contact_subquery()
     stmt = _build_recall_query(
         start=start,
         end=end,
-        stored_statuses=stored_statuses,
+        status_members=_requested_status_members(requested_statuses),
         requested_type_members=requested_type_members,
         limit=None,
         offset=None,
-        last_contact_subq=last_contact_subq,
     )
     stmt = _apply_contact_filters(
         stmt,
-        last_contact_subq=last_contact_subq,
         contact_flag=contact_flag,
         within_days=within_days,
         older_than_days=older_than_days,
         channels=channels,
     )
-    resolved_status = _resolved_status_expr(date.today())
-    if requested_status_members:
-        stmt = stmt.where(resolved_status.in_(requested_status_members))
     return stmt, requested_statuses
 
 
@@ -484,45 +455,25 @@ def _build_recall_query(
     *,
     start: date | None,
     end: date | None,
-    stored_statuses: set[PatientRecallStatus],
+    status_members: set[PatientRecallStatus],
     requested_type_members: list[PatientRecallKind],
     limit: int | None,
     offset: int | None,
-    last_contact_subq=None,
 ):
-    if last_contact_subq is not None:
-        stmt = (
-            select(
-                PatientRecall,
-                Patient,
-                last_contact_subq.c.contacted_at.label("last_contacted_at"),
-                last_contact_subq.c.channel.label("last_contact_channel"),
-                last_contact_subq.c.notes.label("last_contact_note"),
-                last_contact_subq.c.other_detail.label("last_contact_other_detail"),
-                last_contact_subq.c.outcome.label("last_contact_outcome"),
-            )
-            .join(Patient, PatientRecall.patient_id == Patient.id)
-            .join(
-                last_contact_subq,
-                (last_contact_subq.c.recall_id == PatientRecall.id)
-                & (last_contact_subq.c.rn == 1),
-                isouter=True,
-            )
-        )
-    else:
-        stmt = select(PatientRecall, Patient).join(
+    stmt = _join_last_contact(
+        select(PatientRecall, Patient, *_last_contact_columns()).join(
             Patient, PatientRecall.patient_id == Patient.id
         )
+    )
     stmt = (
         stmt.where(Patient.deleted_at.is_(None))
+        .where(resolved_status_clause(status_members))
         .order_by(PatientRecall.due_date.asc(), PatientRecall.id.asc())
     )
     if limit is not None:
         stmt = stmt.limit(limit)
     if offset is not None:
         stmt = stmt.offset(offset)
-    if stored_statuses:
-        stmt = stmt.where(PatientRecall.status.in_(stored_statuses))
     if requested_type_members:
         stmt = stmt.where(PatientRecall.kind.in_(requested_type_members))
     if start:
@@ -533,23 +484,11 @@ def _build_recall_query(
 
 
 def _load_recall_dashboard_row(db: Session, recall_id: int) -> RecallDashboardRow:
-    last_contact_subq = _build_last_contact_subquery()
     stmt = (
-        select(
-            PatientRecall,
-            Patient,
-            last_contact_subq.c.contacted_at.label("last_contacted_at"),
-            last_contact_subq.c.channel.label("last_contact_channel"),
-            last_contact_subq.c.notes.label("last_contact_note"),
-            last_contact_subq.c.other_detail.label("last_contact_other_detail"),
-            last_contact_subq.c.outcome.label("last_contact_outcome"),
-        )
-        .join(Patient, PatientRecall.patient_id == Patient.id)
-        .join(
-            last_contact_subq,
-            (last_contact_subq.c.recall_id == PatientRecall.id)
-            & (last_contact_subq.c.rn == 1),
-            isouter=True,
+        _join_last_contact(
+            select(PatientRecall, Patient, *_last_contact_columns()).join(
+                Patient, PatientRecall.patient_id == Patient.id
+            )
         )
         .where(PatientRecall.id == recall_id)
         .where(Patient.deleted_at.is_(None))
@@ -587,9 +526,9 @@ def _load_recall_dashboard_row(db: Session, recall_id: int) -> RecallDashboardRo
 
 
 @router.get("", response_model=list[RecallDashboardRow])
-def list_recalls(
-    db: Session = Depends(get_db),
-    _user: User = Depends(require_capability("recalls.view")),
+async def list_recalls(
+    db: AsyncSession = Depends(get_async_db),
+    _user: User = Depends(require_capability_async("recalls.view")),
     start: date | None = Query(default=None),
     end: date | None = Query(default=None),
     status: str | None = Query(default=None),
@@ -615,7 +554,7 @@ def list_recalls(
         contacted=contacted,
         contact_channel=contact_channel,
     )
-    requested_statuses, requested_type_members, stored_statuses = _normalize_recall_filters(
+    requested_statuses, requested_type_members, _stored_statuses = _normalize_recall_filters(
         status, recall_type
     )
     contact_flag, within_days, older_than_days, channels = _normalize_contact_filters(
@@ -626,26 +565,23 @@ def list_recalls(
         contacted_within_days,
         contact_channel,
     )
-    last_contact_subq = _build_last_contact_subquery()
     stmt = _build_recall_query(
         start=start,
         end=end,
-        stored_statuses=stored_statuses,
+        status_members=_requested_status_members(requested_statuses),
         requested_type_members=requested_type_members,
         limit=limit,
         offset=offset,
-        last_contact_subq=last_contact_subq,
     )
     stmt = _apply_contact_filters(
         stmt,
-        last_contact_subq=last_contact_subq,
         contact_flag=contact_flag,
         within_days=within_days,
         older_than_days=older_than_days,
         channels=channels,
     )
 
-    results = db.execute(stmt).all()
+    results = (await db.execute(stmt)).all()
     output: list[RecallDashboardRow] = []
     for (
         recall,
@@ -657,8 +593,6 @@ def list_recalls(
         last_contact_outcome,
     ) in results:
         resolved_status = resolve_recall_status(recall)
-        if resolved_status.value not in requested_statuses:
-            continue
         output.append(
             RecallDashboardRow(
                 id=recall.id,
@@ -1123,72 +1057,43 @@ def recall_kpis(
     range_end = end or today
     range_start = start or (range_end - timedelta(days=30))
 
-    base_filters = [
-        Patient.deleted_at.is_(None),
-        Patient.recall_due_date.is_not(None),
-        Patient.recall_due_date >= range_start,
-        Patient.recall_due_date <= range_end,
-    ]
-
-    counts_stmt = select(
-        func.coalesce(
+    # Counters are kept per due date, so "overdue" is just the due buckets
+    # before today and needs no job at midnight.
+    bucket_stmt = (
+        select(
+            RecallKpiBucket.recall_status,
+            func.sum(RecallKpiBucket.patients),
             func.sum(
-                case(
-                    (Patient.recall_status == RecallStatus.due, 1),
-                    else_=0,
-                )
+                case((RecallKpiBucket.due_date < today, RecallKpiBucket.patients), else_=0)
             ),
-            0,
-        ).label("due"),
-        func.coalesce(
             func.sum(
                 case(
                     (
-                        (Patient.recall_status == RecallStatus.due)
-                        & (Patient.recall_due_date < today),
-                        1,
+                        RecallKpiBucket.contacted_on.between(range_start, range_end),
+                        RecallKpiBucket.patients,
                     ),
                     else_=0,
                 )
             ),
-            0,
-        ).label("overdue"),
-        func.coalesce(
-            func.sum(
-                case(
-                    (
-                        (Patient.recall_status == RecallStatus.contacted)
-                        & (Patient.recall_last_contacted_at.is_not(None))
-                        & (func.date(Patient.recall_last_contacted_at) >= range_start)
-                        & (func.date(Patient.recall_last_contacted_at) <= range_end),
-                        1,
-                    ),
-                    else_=0,
-                )
-            ),
-            0,
-        ).label("contacted"),
-        func.coalesce(
-            func.sum(
-                case(
-                    (Patient.recall_status == RecallStatus.booked, 1),
-                    else_=0,
-                )
-            ),
-            0,
-        ).label("booked"),
-        func.coalesce(
-            func.sum(
-                case(
-                    (Patient.recall_status == RecallStatus.not_required, 1),
-                    else_=0,
-                )
-            ),
-            0,
-        ).label("declined"),
-    ).where(*base_filters)
-
-    due, overdue, contacted, booked, declined = db.execute(counts_stmt).one()
+        )
+        .where(RecallKpiBucket.due_date.between(range_start, range_end))
+        .group_by(RecallKpiBucket.recall_status)
+    )
+    totals = {bucket_status: (0, 0, 0) for bucket_status in RecallStatus}
+    for bucket_status, total, before_today, contacted_in_range in db.execute(bucket_stmt):
+        totals[bucket_status] = (int(total), int(before_today), int(contacted_in_range))
+    due, overdue, _ = totals[RecallStatus.due]
+    contacted = totals[RecallStatus.contacted][2]
+    booked = totals[RecallStatus.booked][0]
+    declined = totals[RecallStatus.not_required][0]
+
+    contacts_by_channel = {channel.value: 0 for channel in PatientRecallCommunicationChannel}
+    for channel, contacts in db.execute(
+        select(RecallContactDaily.channel, func.sum(RecallContactDaily.contacts))
+        .where(RecallContactDaily.contacted_on.between(range_start, range_end))
+        .group_by(RecallContactDaily.channel)
+    ):
+        contacts_by_channel[channel.value] = int(contacts)
 
     denominator = max(due + overdue, 0)
     contacted_rate = (contacted / denominator) if denominator else 0.0
@@ -1208,6 +1113,7 @@ def recall_kpis(
             "contacted_rate": contacted_rate,
             "booked_rate": booked_rate,
         },
+        contacts_by_channel=contacts_by_channel,
     )
 
 
@@ -1226,6 +1132,7 @@ def update_recall(
 
     before_data = build_patient_recall_settings_snapshot(patient)
     before_notes = patient.recall_notes
+    before_kpi = recall_kpi_key(patient)
     fields = payload.model_fields_set
     if "interval_months" in fields and payload.interval_months is not None:
         patient.recall_interval_months = payload.interval_months
@@ -1271,6 +1178,7 @@ def update_recall(
     patient.updated_by_user_id = user.id
     patient.updated_at = datetime.now(timezone.utc)
     db.add(patient)
+    track_recall_kpi(db, patient, before_kpi)
     log_patient_recall_settings_changes(
         db,
         user=user,
@@ -1319,7 +1227,9 @@ def generate_recall_document(
 
     title_input = payload.title or template.name
     rendered_title, title_unknown = render_template_with_warnings(title_input, patient)
-    rendered, content_unknown = render_template_with_warnings(template.content, patient)
+    rendered, content_unknown = render_compiled_with_warnings(
+        compile_document_template(template), patient
+    )
     unknown_fields = sorted({*title_unknown, *content_unknown})
 
     document = PatientDocument(
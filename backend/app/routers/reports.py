@@ -1,9 +1,4 @@
-from calendar import monthrange
 from datetime import date, datetime, time, timedelta, timezone
-from io import BytesIO
-import io
-import csv
-import zipfile
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy import case, func, select
@@ -24,8 +19,7 @@ from app.schemas.reports_finance import (
     FinanceTrendsOut,
 )
 from app.services.audit import log_event
-from app.services.practice_profile import load_profile
-from app.services.finance_reports_pdf import build_month_pack_pdf
+from app.services.finance_month_pack import MONTH_PACK_FORMATS, load_month_pack
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -131,50 +125,6 @@ def cashup_report_range(
     )
 
 
-def _monthly_cashup_data(
-    db: Session, *, start: date, end: date
-) -> tuple[dict[str, int], int, list[CashupDailyOut]]:
-    start_dt = datetime.combine(start, time.min, tzinfo=timezone.utc)
-    end_dt = datetime.combine(end, time.max, tzinfo=timezone.utc)
-    stmt = (
-        select(
-            func.date(PatientLedgerEntry.created_at).label("day"),
-            PatientLedgerEntry.method,
-            func.coalesce(func.sum(func.abs(PatientLedgerEntry.amount_pence)), 0).label(
-                "total_pence"
-            ),
-        )
-        .where(PatientLedgerEntry.entry_type == LedgerEntryType.payment)
-        .where(PatientLedgerEntry.created_at >= start_dt, PatientLedgerEntry.created_at <= end_dt)
-        .group_by(func.date(PatientLedgerEntry.created_at), PatientLedgerEntry.method)
-        .order_by(func.date(PatientLedgerEntry.created_at).asc())
-    )
-
-    totals_by_method: dict[str, int] = {}
-    totals_by_day: dict[date, dict[str, int]] = {}
-    total_pence = 0
-
-    for day, method, total in db.execute(stmt).all():
-        method_key = method.value if method else "other"
-        totals_by_method[method_key] = totals_by_method.get(method_key, 0) + int(total)
-        total_pence += int(total)
-        totals_by_day.setdefault(day, {})
-        totals_by_day[day][method_key] = int(total)
-
-    daily: list[CashupDailyOut] = []
-    for day in sorted(totals_by_day.keys()):
-        day_totals = totals_by_day[day]
-        daily.append(
-            CashupDailyOut(
-                date=day,
-                total_pence=sum(day_totals.values()),
-                totals_by_method=day_totals,
-            )
-        )
-
-    return totals_by_method, total_pence, daily
-
-
 @router.get("/finance/outstanding", response_model=FinanceOutstandingOut)
 def outstanding_report(
     db: Session = Depends(get_db),
@@ -229,54 +179,6 @@ def outstanding_report(
     )
 
 
-def _outstanding_snapshot(
-    db: Session, *, target: date, limit: int
-) -> FinanceOutstandingOut:
-    cutoff = datetime.combine(target, time.max, tzinfo=timezone.utc)
-    balances = (
-        select(
-            PatientLedgerEntry.patient_id.label("patient_id"),
-            func.coalesce(func.sum(PatientLedgerEntry.amount_pence), 0).label("balance_pence"),
-        )
-        .where(PatientLedgerEntry.created_at <= cutoff)
-        .group_by(PatientLedgerEntry.patient_id)
-        .subquery()
-    )
-
-    outstanding_stmt = (
-        select(
-            Patient.id,
-            Patient.first_name,
-            Patient.last_name,
-            balances.c.balance_pence,
-        )
-        .join(balances, balances.c.patient_id == Patient.id)
-        .where(Patient.deleted_at.is_(None))
-        .where(balances.c.balance_pence > 0)
-        .order_by(balances.c.balance_pence.desc())
-    )
-
-    rows = db.execute(outstanding_stmt).all()
-    total_outstanding = sum(row.balance_pence for row in rows)
-    count_patients = len(rows)
-
-    top_debtors = [
-        FinanceOutstandingDebtorOut(
-            patient_id=row.id,
-            patient_name=f"{row.last_name.upper()}, {row.first_name}",
-            balance_pence=row.balance_pence,
-        )
-        for row in rows[:limit]
-    ]
-
-    return FinanceOutstandingOut(
-        as_of=target,
-        total_outstanding_pence=total_outstanding,
-        count_patients_with_balance=count_patients,
-        top_debtors=top_debtors,
-    )
-
-
 @router.get("/finance/trends", response_model=FinanceTrendsOut)
 def finance_trends(
     db: Session = Depends(get_db),
@@ -355,93 +257,25 @@ def finance_month_pack(
     user: User = Depends(get_current_user),
     request_id: str | None = Header(default=None),
 ):
-    period_start = date(year, month, 1)
-    period_end = date(year, month, monthrange(year, month)[1])
-
-    totals_by_method, total_pence, daily = _monthly_cashup_data(
-        db, start=period_start, end=period_end
-    )
-    outstanding = _outstanding_snapshot(db, target=period_end, limit=10)
-    period_label = f"{period_start.strftime('%B %Y')}"
-
-    if format == "pdf":
-        profile = load_profile(db)
-        pdf_bytes = build_month_pack_pdf(
-            profile=profile,
-            period_label=period_label,
-            totals_by_method=totals_by_method,
-            total_pence=total_pence,
-            daily_rows=[(row.date.isoformat(), row.total_pence) for row in daily],
-            outstanding_total_pence=outstanding.total_outstanding_pence,
-            top_debtors=[(d.patient_name, d.balance_pence) for d in outstanding.top_debtors],
-            notes=[
-                "Cash-up totals use ledger payment entries.",
-                "Outstanding balances use ledger entries up to month end.",
-            ],
-        )
-        filename = f"finance_pack_{year}_{month:02d}.pdf"
-        log_event(
-            db,
-            actor=user,
-            action="reports.finance.month_pack.download_pdf",
-            entity_type="report",
-            entity_id=f"{year}-{month:02d}",
-            after_data={"year": year, "month": month, "format": "pdf"},
-            request_id=request_id,
-            ip_address=request.client.host if request else None,
-        )
-        db.commit()
-        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
-
-    if format == "zip":
-        buffer = BytesIO()
-        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-            cashup_rows = [["Date", "Total", "Cash", "Card", "Bank transfer", "Other"]]
-            for row in daily:
-                cashup_rows.append(
-                    [
-                        row.date.isoformat(),
-                        str(row.total_pence),
-                        str(row.totals_by_method.get("cash", 0)),
-                        str(row.totals_by_method.get("card", 0)),
-                        str(row.totals_by_method.get("bank_transfer", 0)),
-                        str(row.totals_by_method.get("other", 0)),
-                    ]
-                )
-            method_rows = [["Method", "Total_pence"]]
-            for method in ["cash", "card", "bank_transfer", "other"]:
-                method_rows.append([method, str(totals_by_method.get(method, 0))])
-            debtor_rows = [["Patient", "Balance_pence"]]
-            for debtor in outstanding.top_debtors:
-                debtor_rows.append([debtor.patient_name, str(debtor.balance_pence)])
-
-            def _write_csv(name: str, rows: list[list[str]]) -> None:
-                csv_buffer = io.StringIO()
-                writer = csv.writer(csv_buffer)
-                writer.writerows(rows)
-                zipf.writestr(name, csv_buffer.getvalue())
-
-            _write_csv("cashup_daily.csv", cashup_rows)
-            _write_csv("cashup_by_method.csv", method_rows)
-            _write_csv("top_debtors.csv", debtor_rows)
-
-        filename = f"finance_pack_{year}_{month:02d}.zip"
-        log_event(
-            db,
-            actor=user,
-            action="reports.finance.month_pack.download_zip",
-            entity_type="report",
-            entity_id=f"{year}-{month:02d}",
-            after_data={"year": year, "month": month, "format": "zip"},
-            request_id=request_id,
-            ip_address=request.client.host if request else None,
+    if format not in MONTH_PACK_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be pdf or zip",
         )
-        db.commit()
-        headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-        return Response(content=buffer.getvalue(), media_type="application/zip", headers=headers)
 
-    raise HTTPException(
-        status_code=status.HTTP_400_BAD_REQUEST,
-        detail="format must be pdf or zip",
+    content = load_month_pack(db, year=year, month=month, fmt=format)
+    filename = f"finance_pack_{year}_{month:02d}.{format}"
+    log_event(
+        db,
+        actor=user,
+        action=f"reports.finance.month_pack.download_{format}",
+        entity_type="report",
+        entity_id=f"{year}-{month:02d}",
+        after_data={"year": year, "month": month, "format": format},
+        request_id=request_id,
+        ip_address=request.client.host if request else None,
     )
+    db.commit()
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    media_type = "application/pdf" if format == "pdf" else "application/zip"
+    return Response(content=content, media_type=media_type, headers=headers)
@@ -19,6 +19,11 @@ from app.schemas.practice_schedule import (
 )
 from app.services.schedule import load_schedule
 from app.services.practice_profile import default_profile
+from app.services.reference_cache import (
+    PRACTICE_PROFILE,
+    PRACTICE_SCHEDULE,
+    bump_reference_data,
+)
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
@@ -114,6 +119,7 @@ def update_schedule(
                 reason=entry.reason,
             )
         )
+    bump_reference_data(db, PRACTICE_SCHEDULE)
     db.commit()
 
     hours, closures, overrides = load_schedule(db)
@@ -136,6 +142,7 @@ def update_practice_profile(
     for field, value in payload.model_dump().items():
         setattr(profile, field, value)
     db.add(profile)
+    bump_reference_data(db, PRACTICE_PROFILE)
     db.commit()
     db.refresh(profile)
     return profile
@@ -1,55 +1,64 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.db.session import get_db
-from app.deps import get_current_user
+from app.db.session import get_async_db
+from app.deps import get_current_user_async
 from app.models.audit_log import AuditLog
 from app.models.appointment import Appointment
 from app.models.note import Note
 from app.models.patient import Patient
 from app.models.user import User
 from app.schemas.timeline import TimelineItem
+from app.services.audit_buffer import audit_buffer
 
 router = APIRouter(prefix="/patients/{patient_id}/timeline", tags=["timeline"])
 
 
 @router.get("", response_model=list[TimelineItem])
-def patient_timeline(
+async def patient_timeline(
     patient_id: int,
-    db: Session = Depends(get_db),
-    _user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _user: User = Depends(get_current_user_async),
     limit: int = Query(default=200, ge=1, le=500),
 ):
-    patient = db.get(Patient, patient_id)
-    if not patient:
+    patient_exists = await db.scalar(select(Patient.id).where(Patient.id == patient_id))
+    if patient_exists is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
 
-    appointment_ids = [str(row[0]) for row in db.execute(select(Appointment.id).where(Appointment.patient_id == patient_id)).all()]
-    note_ids = [str(row[0]) for row in db.execute(select(Note.id).where(Note.patient_id == patient_id)).all()]
+    appointment_ids = [
+        str(value)
+        for value in await db.scalars(select(Appointment.id).where(Appointment.patient_id == patient_id))
+    ]
+    note_ids = [
+        str(value) for value in await db.scalars(select(Note.id).where(Note.patient_id == patient_id))
+    ]
 
+    if audit_buffer.pending_count:
+        await run_in_threadpool(audit_buffer.flush)
     stmt = select(AuditLog).order_by(AuditLog.created_at.desc())
     logs: list[AuditLog] = []
 
     logs.extend(
-        db.scalars(
+        await db.scalars(
             stmt.where(AuditLog.entity_type == "patient", AuditLog.entity_id == str(patient_id))
-        ).all()
+        )
     )
     if appointment_ids:
         logs.extend(
-            db.scalars(
+            await db.scalars(
                 stmt.where(
                     AuditLog.entity_type == "appointment",
                     AuditLog.entity_id.in_(appointment_ids),
                 )
-            ).all()
+            )
         )
     if note_ids:
         logs.extend(
-            db.scalars(
+            await db.scalars(
                 stmt.where(AuditLog.entity_type == "note", AuditLog.entity_id.in_(note_ids))
-            ).all()
+            )
         )
 
     logs = sorted(logs, key=lambda l: l.created_at, reverse=True)[:limit]
@@ -9,6 +9,7 @@ from app.schemas.capability import CapabilityOut, UserCapabilitiesUpdate
 from app.schemas.user import UserCreate, UserOut, UserPasswordResetRequest, UserPasswordResetResponse, UserUpdate
 from app.services.audit import log_event
 from app.services.capabilities import get_user_capabilities, replace_user_capabilities
+from app.services.diary_snapshot_cache import invalidate_all_diary_snapshots
 from app.services.users import (
     PasswordPolicyError,
     atomic_user_write,
@@ -51,6 +52,7 @@ def add_user(
                 must_change_password=True,
                 commit=False,
             )
+            invalidate_all_diary_snapshots(db)
             log_event(
                 db,
                 actor=admin,
@@ -116,6 +118,7 @@ def patch_user(
             )
     previous_role = user.role
     previous_active = user.is_active
+    previous_name = user.full_name
     password_changed = payload.password is not None
     try:
         with atomic_user_write(db):
@@ -128,6 +131,9 @@ def patch_user(
                 password=payload.password,
                 commit=False,
             )
+            if updated.full_name != previous_name:
+                # Diary snapshots carry clinician labels taken from the user's name.
+                invalidate_all_diary_snapshots(db)
             if password_changed:
                 log_event(
                     db,
@@ -181,6 +187,7 @@ def reset_user_password(
                 must_change_password=True,
                 commit=False,
             )
+            invalidate_all_diary_snapshots(db)
             log_event(
                 db,
                 actor=admin,
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from app.models.document_template import DocumentTemplateKind
 from app.schemas.actor import ActorOut
@@ -35,3 +35,8 @@ class DocumentTemplateOut(DocumentTemplateBase):
     updated_by: Optional[ActorOut] = None
     deleted_at: Optional[datetime] = None
     deleted_by: Optional[ActorOut] = None
+
+
+class DocumentTemplateMailMergeRequest(BaseModel):
+    patient_ids: Optional[list[int]] = Field(default=None, max_length=50_000)
+    title: Optional[str] = None
@@ -29,6 +29,7 @@ class UnmappedLegacyAppointmentList(BaseModel):
     total: int
     limit: int
     offset: int
+    next_cursor: str | None = None
 
 
 class LegacyResolveRequest(BaseModel):
@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+
+
+class RepeatedStatementOut(BaseModel):
+    fingerprint: str
+    count: int
+
+
+class QueryProfileOut(BaseModel):
+    request_id: str | None = None
+    method: str
+    path: str
+    status_code: int | None = None
+    total_ms: float | None = None
+    query_count: int
+    db_ms: float
+    slowest_ms: float
+    slowest_statement: str | None = None
+    pool_wait_ms: float = 0.0
+    repeated: list[RepeatedStatementOut]
+    over_budget: bool
+
+
+class PoolStatusOut(BaseModel):
+    size: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    timeouts: int
+    wait_ms_total: float
+    wait_ms_max: float
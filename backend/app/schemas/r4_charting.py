@@ -135,6 +135,7 @@ class PaginatedR4PerioProbeOut(BaseModel):
     limit: int
     offset: int
     has_more: bool
+    next_cursor: str | None = None
 
 
 class PaginatedR4PerioPlaqueOut(BaseModel):
@@ -143,6 +144,7 @@ class PaginatedR4PerioPlaqueOut(BaseModel):
     limit: int
     offset: int
     has_more: bool
+    next_cursor: str | None = None
 
 
 class PaginatedR4ToothSurfaceOut(BaseModel):
@@ -151,6 +153,7 @@ class PaginatedR4ToothSurfaceOut(BaseModel):
     limit: int
     offset: int
     has_more: bool
+    next_cursor: str | None = None
 
 
 class R4ChartingMetaOut(BaseModel):
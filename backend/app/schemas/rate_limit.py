@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class RateLimitMetricsOut(BaseModel):
+    name: str
+    max_events: int
+    window_seconds: float
+    backend: str
+    process_allowed: int
+    process_throttled: int
+    process_fallbacks: int
+    shared_throttled: int | None = None
+    last_throttled_at: datetime | None = None
+    active_keys: int | None = None
@@ -80,3 +80,4 @@ class RecallKpiOut(BaseModel):
     range: RecallKpiRange
     counts: RecallKpiCounts
     rates: RecallKpiRates
+    contacts_by_channel: dict[str, int]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import json
+
+from sqlalchemy import delete, func, select, update
+
+from app.db.session import SessionLocal
+from app.models.attachment import Attachment, AttachmentBlob
+from app.services import storage
+
+
+def _legacy_keys(session) -> list[tuple[str, int]]:
+    rows = session.execute(
+        select(Attachment.storage_key, func.count(Attachment.id))
+        .where(func.length(Attachment.storage_key) != 64)
+        .group_by(Attachment.storage_key)
+        .order_by(Attachment.storage_key)
+    ).all()
+    return [(str(key), int(count)) for key, count in rows]
+
+
+def migrate(session, *, apply: bool, limit: int | None = None) -> dict[str, object]:
+    """Move flat UUID-keyed attachment files onto SHA-256 content keys.
+
+    Each legacy file is committed separately, then removed from disk, so an
+    interrupted run can simply be repeated.
+    """
+    stats = {
+        "legacy_files": 0,
+        "migrated": 0,
+        "deduplicated": 0,
+        "missing": 0,
+        "bytes_freed": 0,
+    }
+    legacy = _legacy_keys(session)
+    if limit is not None:
+        legacy = legacy[:limit]
+    stats["legacy_files"] = len(legacy)
+    if not apply:
+        return stats
+    for legacy_key, references in legacy:
+        try:
+            content_key, byte_size = storage.content_address_file(legacy_key)
+        except FileNotFoundError:
+            stats["missing"] += 1
+            continue
+        already_stored = session.get(AttachmentBlob, content_key) is not None
+        session.execute(
+            update(Attachment)
+            .where(Attachment.storage_key == legacy_key)
+            .values(storage_key=content_key)
+        )
+        session.execute(delete(AttachmentBlob).where(AttachmentBlob.storage_key == legacy_key))
+        storage.retain_blob(session, content_key, byte_size, count=references)
+        session.commit()
+        storage.delete_file(legacy_key)
+        stats["migrated"] += 1
+        if already_stored:
+            stats["deduplicated"] += 1
+            stats["bytes_freed"] += byte_size
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Re-key attachments stored under flat UUID names onto sharded SHA-256 "
+            "content keys, merging identical files. Dry-run unless --apply is given."
+        )
+    )
+    parser.add_argument("--apply", action="store_true", help="Move files and update rows.")
+    parser.add_argument("--limit", type=int, help="Only process this many legacy files.")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        stats = migrate(session, apply=args.apply, limit=args.limit)
+    finally:
+        session.close()
+    print(json.dumps({"apply": args.apply, **stats}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date, datetime, timezone
+
+from app.db.session import SessionLocal
+from app.services.audit_partitions import ensure_audit_partitions, existing_partitions
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + (month.month - 1) + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Create upcoming monthly audit_logs partitions (run monthly, e.g. from the "
+            "backup timer) so new events never land in the default partition."
+        )
+    )
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=3,
+        help="Months after the current one to prepare (default: 3).",
+    )
+    parser.add_argument("--start", help="First month to ensure (YYYY-MM); default: this month.")
+    args = parser.parse_args()
+    if args.months_ahead < 0:
+        raise RuntimeError("--months-ahead must not be negative.")
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    start = date.fromisoformat(f"{args.start}-01") if args.start else this_month
+    through = _add_months(this_month, args.months_ahead)
+
+    session = SessionLocal()
+    try:
+        created = ensure_audit_partitions(session, start=start, through=through)
+        session.commit()
+        partitions = existing_partitions(session)
+    finally:
+        session.close()
+    print(json.dumps({"created": created, "partitions": partitions}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from app.core.settings import settings
+from app.services.benchmark_suite import compare_results, run_benchmarks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time the hot API paths and the canonical charting import in-process against the "
+            "synthetic dataset from app.scripts.benchmark_seed, and optionally compare the "
+            "medians with a saved baseline."
+        )
+    )
+    parser.add_argument("--iterations", type=int, default=5, help="Timed calls per case (default: 5).")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed calls per case (default: 1).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed the dataset was generated with.")
+    parser.add_argument("--cases", help="Comma-separated case names to run (default: all).")
+    parser.add_argument("--output", help="Write the JSON result here as well as to stdout.")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed median slowdown against the baseline before failing (default: 0.2 = 20%%).",
+    )
+    args = parser.parse_args()
+    if args.iterations <= 0:
+        raise RuntimeError("--iterations must be positive.")
+    if args.warmup < 0:
+        raise RuntimeError("--warmup must not be negative.")
+
+    only = [name.strip() for name in args.cases.split(",") if name.strip()] if args.cases else None
+    report = run_benchmarks(
+        email=str(settings.admin_email),
+        password=settings.admin_password,
+        seed=args.seed,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        only=only,
+    )
+
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        comparison = compare_results(baseline, report, threshold=args.threshold)
+        report["comparison"] = {
+            "baseline_commit": baseline.get("meta", {}).get("commit"),
+            "threshold": args.threshold,
+            "cases": comparison,
+        }
+        if any(row["regressed"] for row in comparison):
+            exit_code = 1
+
+    rendered = json.dumps(report, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(rendered + "\n", encoding="utf-8")
+    print(rendered)
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+
+from app.db.session import SessionLocal
+from app.services.benchmark_data import (
+    generate_synthetic_dataset,
+    purge_synthetic_dataset,
+    spec_for_scale,
+    synthetic_patient_count,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Seed a practice-scale synthetic dataset for app.scripts.benchmark_run. At scale 1.0 "
+            "that is 100k patients, 2M ledger entries, 1M appointments, 5M charting records and "
+            "500k audit rows. Refuses to run when APP_ENV is production."
+        )
+    )
+    parser.add_argument("--scale", type=float, default=1.0, help="Fraction of full size (default: 1.0).")
+    parser.add_argument("--seed", type=int, default=1, help="Generator seed (default: 1).")
+    parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Write the dataset; without it only the planned row counts are printed.",
+    )
+    parser.add_argument(
+        "--purge",
+        action="store_true",
+        help="Delete previously generated synthetic rows (runs before --apply when both are given).",
+    )
+    args = parser.parse_args()
+    if args.scale <= 0:
+        raise RuntimeError("--scale must be positive.")
+
+    spec = spec_for_scale(args.scale)
+    report: dict[str, object] = {"scale": args.scale, "seed": args.seed, "planned": spec.as_dict()}
+    session = SessionLocal()
+    try:
+        report["existing_patients"] = synthetic_patient_count(session)
+        if args.purge:
+            report["purged"] = purge_synthetic_dataset(session)
+            session.commit()
+        if args.apply:
+            started = time.perf_counter()
+
+            def _progress(done: int, total: int) -> None:
+                print(f"seeded {done}/{total} patients", file=sys.stderr)
+
+            report["written"] = generate_synthetic_dataset(
+                session, spec, seed=args.seed, progress=_progress
+            )
+            report["seconds"] = round(time.perf_counter() - started, 1)
+    finally:
+        session.close()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
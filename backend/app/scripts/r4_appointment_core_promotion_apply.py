@@ -15,6 +15,7 @@ from app.models.r4_appointment_patient_link import R4AppointmentPatientLink
 from app.models.r4_patient_mapping import R4PatientMapping
 from app.models.user import User
 from app.services.appointment_conflicts import ExistingAppointmentConflict
+from app.services.diary_snapshot_cache import invalidate_all_diary_snapshots
 from app.services.r4_import.appointment_core_promotion_apply import (
     GUARDED_CORE_PROMOTION_CONFIRMATION,
     GuardedCoreAppointmentPromotionApplyPlan,
@@ -162,6 +163,7 @@ def _apply_plan_to_session(
     if models:
         session.add_all(models)
         session.flush()
+        invalidate_all_diary_snapshots(session)
     return {
         "created": len(models),
         "updated": 0,
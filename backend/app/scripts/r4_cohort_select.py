@@ -8,6 +8,10 @@ from datetime import date
 from pathlib import Path
 
 from app.scripts import r4_import as r4_import_script
+from app.services.r4_charting.patient_presence import (
+    ACTIVE_PATIENTS_DOMAIN,
+    PatientPresenceIndex,
+)
 from app.services.r4_charting.sqlserver_extract import (
     get_distinct_active_patient_codes,
     get_distinct_appointment_notes_patient_codes,
@@ -71,7 +75,10 @@ def _build_domain_codes(
     date_from: str,
     date_to: str,
     limit: int,
+    presence_index: PatientPresenceIndex | None = None,
 ) -> list[int]:
+    if presence_index is not None and presence_index.has_domain(domain):
+        return presence_index.domain_codes(domain, date_from, date_to, limit=limit)
     if domain == "perioprobe":
         return get_distinct_perioprobe_patient_codes(date_from, date_to, limit=limit)
     if domain == "perio_plaque":
@@ -114,7 +121,12 @@ def _build_active_patient_codes(
     active_from: str,
     active_to: str,
     limit: int,
+    presence_index: PatientPresenceIndex | None = None,
 ) -> list[int]:
+    if presence_index is not None and presence_index.has_domain(ACTIVE_PATIENTS_DOMAIN):
+        return presence_index.domain_codes(
+            ACTIVE_PATIENTS_DOMAIN, active_from, active_to, limit=limit
+        )
     return get_distinct_active_patient_codes(active_from, active_to, limit=limit)
 
 
@@ -168,6 +180,7 @@ def select_cohort(
     seed: int | None = None,
     active_months: int = 24,
     active_from_override: str | None = None,
+    presence_index: PatientPresenceIndex | None = None,
 ) -> dict[str, object]:
     if limit <= 0:
         raise RuntimeError("--limit must be positive.")
@@ -187,7 +200,12 @@ def select_cohort(
             active_from = _subtract_months(active_to_day, active_months).isoformat()
         active_to = date_to
         merged_codes = _order_patient_codes(
-            _build_active_patient_codes(active_from=active_from, active_to=active_to, limit=limit),
+            _build_active_patient_codes(
+                active_from=active_from,
+                active_to=active_to,
+                limit=limit,
+                presence_index=presence_index,
+            ),
             order=order,
             seed=seed,
         )
@@ -196,7 +214,13 @@ def select_cohort(
             raise RuntimeError("--date-from is required unless --mode=active_patients.")
         for domain in domains:
             try:
-                codes = _build_domain_codes(domain, date_from=date_from, date_to=date_to, limit=limit)
+                codes = _build_domain_codes(
+                    domain,
+                    date_from=date_from,
+                    date_to=date_to,
+                    limit=limit,
+                    presence_index=presence_index,
+                )
                 domain_codes[domain] = sorted(set(codes))
             except RuntimeError as exc:
                 domain_codes[domain] = []
@@ -308,6 +332,13 @@ def main() -> int:
         "--exclude-patient-codes-file",
         help="Optional path to patient codes file (CSV/newline) to exclude before limit.",
     )
+    parser.add_argument(
+        "--presence-index",
+        help=(
+            "Optional patient-presence index built by r4_patient_presence_index; "
+            "indexed domains are answered locally instead of querying SQL Server."
+        ),
+    )
     parser.add_argument("--output", required=True, help="Path to output CSV file.")
     args = parser.parse_args()
 
@@ -324,6 +355,9 @@ def main() -> int:
         seed=args.seed,
         active_months=args.active_months,
         active_from_override=args.active_from,
+        presence_index=(
+            PatientPresenceIndex.load(args.presence_index) if args.presence_index else None
+        ),
     )
 
     out = Path(args.output)
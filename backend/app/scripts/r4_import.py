@@ -29,6 +29,7 @@ from app.services.r4_charting.canonical_importer import (
 from app.services.r4_charting.sqlserver_extract import SqlServerChartingExtractor
 from app.services.r4_import.treatment_transactions_importer import (
     import_r4_treatment_transactions,
+    import_r4_treatment_transactions_copy,
 )
 from app.services.r4_import.treatment_plan_importer import (
     backfill_r4_treatment_plan_patients,
@@ -815,6 +816,15 @@ def main() -> int:
         default=5000,
         help="Progress update frequency in items/plans (default: 5000).",
     )
+    parser.add_argument(
+        "--load-mode",
+        choices=("orm", "copy"),
+        default="orm",
+        help=(
+            "treatment_transactions only: 'orm' upserts row by row; 'copy' stages rows with "
+            "COPY and applies them set-based (for full-history loads). Default: orm."
+        ),
+    )
     parser.add_argument(
         "--mapping-quality-out",
         dest="mapping_quality_out",
@@ -972,6 +982,9 @@ def main() -> int:
     if args.stop_after_batches is not None and args.stop_after_batches <= 0:
         print("--stop-after-batches must be a positive integer.")
         return 2
+    if args.load_mode != "orm" and args.entity != "treatment_transactions":
+        print("--load-mode is only supported for --entity treatment_transactions.")
+        return 2
 
     effective_batch_size = _effective_batch_size(args.entity, args.batch_size)
 
@@ -1077,7 +1090,12 @@ def main() -> int:
                             limit=args.limit,
                         )
                     elif args.entity == "treatment_transactions":
-                        stats = import_r4_treatment_transactions(
+                        transactions_loader = (
+                            import_r4_treatment_transactions_copy
+                            if args.load_mode == "copy"
+                            else import_r4_treatment_transactions
+                        )
+                        stats = transactions_loader(
                             session,
                             source,
                             actor_id,
@@ -1332,7 +1350,12 @@ def main() -> int:
         elif args.entity == "users":
             stats = import_r4_users(session, source, actor_id)
         elif args.entity == "treatment_transactions":
-            stats = import_r4_treatment_transactions(
+            transactions_loader = (
+                import_r4_treatment_transactions_copy
+                if args.load_mode == "copy"
+                else import_r4_treatment_transactions
+            )
+            stats = transactions_loader(
                 session,
                 source,
                 actor_id,
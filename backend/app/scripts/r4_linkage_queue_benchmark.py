@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections import Counter
+
+from sqlalchemy import delete
+
+from app.db.session import SessionLocal
+from app.models.r4_linkage_issue import R4LinkageIssue
+from app.services.r4_import.linkage_queue import (
+    LOAD_CHUNK_SIZE,
+    REASON_MISSING_MAPPING,
+    REASON_MAPPED_TO_DELETED_PATIENT,
+    REASON_PATIENT_CODE_NOT_FOUND,
+    R4LinkageIssueInput,
+    is_actionable_reason,
+    load_linkage_issues,
+    normalize_reason_code,
+    upsert_linkage_issue,
+)
+
+_REASONS = (
+    REASON_MISSING_MAPPING,
+    REASON_PATIENT_CODE_NOT_FOUND,
+    REASON_MAPPED_TO_DELETED_PATIENT,
+)
+
+
+def _synthetic_issues(count: int, legacy_source: str, *, revision: int) -> list[R4LinkageIssueInput]:
+    return [
+        R4LinkageIssueInput(
+            entity_type="appointment",
+            legacy_source=legacy_source,
+            legacy_id=str(idx),
+            patient_code=100000 + (idx % 25000) + revision,
+            reason_code=_REASONS[idx % len(_REASONS)],
+            details_json={"appointment_id": str(idx), "revision": revision},
+        )
+        for idx in range(count)
+    ]
+
+
+def _load_rowwise(session, issues: list[R4LinkageIssueInput]) -> dict[str, object]:
+    # The previous per-issue path: one SELECT (plus autoflush) per issue.
+    created = 0
+    updated = 0
+    reason_counts: Counter[str] = Counter()
+    for issue in issues:
+        reason = normalize_reason_code(issue.reason_code)
+        if reason is None or not is_actionable_reason(reason):
+            continue
+        reason_counts[reason] += 1
+        _, is_created = upsert_linkage_issue(
+            session,
+            R4LinkageIssueInput(
+                entity_type=issue.entity_type,
+                legacy_source=issue.legacy_source,
+                legacy_id=issue.legacy_id,
+                patient_code=issue.patient_code,
+                reason_code=reason,
+                details_json=issue.details_json,
+            ),
+        )
+        if is_created:
+            created += 1
+        else:
+            updated += 1
+    return {"created": created, "updated": updated, "reason_counts": dict(reason_counts)}
+
+
+def _clear(legacy_source: str) -> None:
+    session = SessionLocal()
+    try:
+        session.execute(delete(R4LinkageIssue).where(R4LinkageIssue.legacy_source == legacy_source))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _timed(label: str, loader, issues: list[R4LinkageIssueInput]) -> dict[str, object]:
+    session = SessionLocal()
+    try:
+        started = time.perf_counter()
+        stats = loader(session, issues)
+        session.commit()
+        elapsed = time.perf_counter() - started
+    finally:
+        session.close()
+    return {
+        "loader": label,
+        "issues": len(issues),
+        "seconds": round(elapsed, 3),
+        "issues_per_second": round(len(issues) / elapsed) if elapsed else None,
+        "created": stats["created"],
+        "updated": stats["updated"],
+        "reason_counts": stats["reason_counts"],
+    }
+
+
+def run_benchmark(
+    count: int,
+    *,
+    legacy_source: str,
+    chunk_size: int = LOAD_CHUNK_SIZE,
+    include_rowwise: bool = True,
+) -> list[dict[str, object]]:
+    """Time a cold load (all inserts) and a warm reload (all updates) per loader."""
+
+    def _bulk(session, issues):
+        return load_linkage_issues(session, issues, actionable_only=True, chunk_size=chunk_size)
+
+    loaders = [("bulk", _bulk)]
+    if include_rowwise:
+        loaders.append(("rowwise", _load_rowwise))
+
+    results: list[dict[str, object]] = []
+    for label, loader in loaders:
+        _clear(legacy_source)
+        try:
+            for phase, revision in (("insert", 0), ("update", 1)):
+                result = _timed(label, loader, _synthetic_issues(count, legacy_source, revision=revision))
+                result["phase"] = phase
+                results.append(result)
+        finally:
+            _clear(legacy_source)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Benchmark linkage-queue loading with synthetic issues against the configured "
+            "database. Rows are written under a scratch legacy source and removed afterwards."
+        )
+    )
+    parser.add_argument("--count", type=int, default=100_000, help="Issues per run (default: 100000).")
+    parser.add_argument("--chunk-size", type=int, default=LOAD_CHUNK_SIZE)
+    parser.add_argument(
+        "--legacy-source",
+        default="r4-benchmark",
+        help="Scratch legacy source tag (default: r4-benchmark).",
+    )
+    parser.add_argument(
+        "--skip-rowwise",
+        action="store_true",
+        help="Only time the bulk loader.",
+    )
+    args = parser.parse_args()
+    if args.count <= 0:
+        raise RuntimeError("--count must be positive.")
+    if args.legacy_source == "r4":
+        raise RuntimeError("--legacy-source must not be the live 'r4' source.")
+
+    results = run_benchmark(
+        args.count,
+        legacy_source=args.legacy_source,
+        chunk_size=args.chunk_size,
+        include_rowwise=not args.skip_rowwise,
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date
+from pathlib import Path
+
+from app.scripts.r4_cohort_select import _parse_domains_csv
+from app.services.r4_charting.patient_presence import (
+    PatientPresenceIndex,
+    build_presence_index,
+    refresh_presence_index,
+)
+
+
+def _summary(index: PatientPresenceIndex, output: Path) -> dict[str, object]:
+    return {
+        "output": str(output),
+        "built_at": index.built_at,
+        "built_through": index.built_through.isoformat() if index.built_through else None,
+        "domains": {
+            name: {
+                "months": len(presence.months),
+                "first_month": min(presence.months) if presence.months else None,
+                "last_month": max(presence.months) if presence.months else None,
+                "undated_patients": len(presence.undated),
+                "error": presence.error,
+            }
+            for name, presence in sorted(index.domains.items())
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build or refresh the local per-domain, per-month R4 patient-presence index "
+            "used by r4_cohort_select --presence-index."
+        )
+    )
+    parser.add_argument(
+        "--domains",
+        help="Comma-separated subset of r4_cohort_select domains (default: all).",
+    )
+    parser.add_argument("--output", required=True, help="Path to the index file (.json.gz).")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Update an existing index from its last indexed month instead of rebuilding.",
+    )
+    parser.add_argument(
+        "--as-of",
+        help="Override the built-through date (YYYY-MM-DD); defaults to today (UTC).",
+    )
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    today = date.fromisoformat(args.as_of) if args.as_of else None
+    if args.refresh:
+        if not output.exists():
+            raise RuntimeError(f"--refresh requires an existing index at {output}.")
+        index = refresh_presence_index(PatientPresenceIndex.load(output), today=today)
+    else:
+        index = build_presence_index(_parse_domains_csv(args.domains), today=today)
+    index.save(output)
+    print(json.dumps(_summary(index, output), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
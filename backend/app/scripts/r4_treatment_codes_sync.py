@@ -14,6 +14,7 @@ from app.models.r4_treatment_plan import R4Treatment
 from app.models.user import User
 from app.services.r4_import.sqlserver_source import R4SqlServerConfig, R4SqlServerSource
 from app.services.r4_import.types import R4Treatment as R4TreatmentPayload
+from app.services.reference_cache import R4_TREATMENTS, bump_reference_data
 
 
 def _resolve_actor_id(session: Session) -> int:
@@ -163,6 +164,8 @@ def _sync_codes(
             stats=stats,
             apply=apply,
         )
+    if apply and (stats.created or stats.updated):
+        bump_reference_data(session, R4_TREATMENTS)
     return stats, fetched_codes, missing_codes
 
 
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.recall_kpis import rebuild_recall_kpis
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Recount the recall KPI counters from patients and the communication "
+            "history (nightly, or after bulk loads and manual edits)."
+        )
+    )
+    parser.add_argument("--apply", action="store_true", help="Write changes to the database.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count counter rows that are out of date (default).",
+    )
+    args = parser.parse_args()
+    apply = args.apply and not args.dry_run
+
+    session = SessionLocal()
+    try:
+        changed = rebuild_recall_kpis(session, apply=apply)
+        if apply:
+            session.commit()
+        print("Recall KPI rebuild")
+        print(f"Counter rows out of date: {changed}")
+        if not apply:
+            print("Dry run only. Use --apply to persist changes.")
+        return 0
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
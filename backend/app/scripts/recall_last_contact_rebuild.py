@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.recall_communications import rebuild_recall_last_contact
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Recompute the last-contact columns on patient_recalls from the "
+            "communication history (after manual edits or restores)."
+        )
+    )
+    parser.add_argument("--apply", action="store_true", help="Write changes to the database.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count recalls that are out of date (default).",
+    )
+    args = parser.parse_args()
+    apply = args.apply and not args.dry_run
+
+    session = SessionLocal()
+    try:
+        changed = rebuild_recall_last_contact(session, apply=apply)
+        if apply:
+            session.commit()
+        print("Recall last-contact rebuild")
+        print(f"Recalls out of date: {changed}")
+        if not apply:
+            print("Dry run only. Use --apply to persist changes.")
+        return 0
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
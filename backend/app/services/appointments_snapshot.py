@@ -23,7 +23,7 @@ DEFAULT_END_MINUTES = 18 * 60
 TIME_STEP_MINUTES = 10
 
 
-def _resolve_window(anchor_date: date, view: SnapshotView) -> tuple[date, date]:
+def resolve_snapshot_window(anchor_date: date, view: SnapshotView) -> tuple[date, date]:
     if view == "day":
         return anchor_date, anchor_date
     week_start = anchor_date - timedelta(days=anchor_date.weekday())
@@ -133,7 +133,7 @@ def build_appointments_snapshot(
     view: SnapshotView,
     mask_names: bool = True,
 ) -> DiarySnapshotOut:
-    range_start, range_end = _resolve_window(anchor_date, view)
+    range_start, range_end = resolve_snapshot_window(anchor_date, view)
     start_dt = datetime.combine(range_start, time.min, tzinfo=timezone.utc)
     end_dt = datetime.combine(range_end + timedelta(days=1), time.min, tzinfo=timezone.utc)
 
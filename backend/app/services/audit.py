@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-from datetime import date, datetime
+import hashlib
+import json
+from datetime import date, datetime, timezone
 from typing import Any
 
-from sqlalchemy import inspect
+from sqlalchemy import inspect, select
 from sqlalchemy.orm import Session
 
 from app.models.audit_log import AuditLog
 from app.models.user import User
+from app.services.audit_buffer import audit_buffer
+from app.services.pagination import Keyset
+
+# Diff chains are capped so rebuilding a state never walks more than this many
+# events back to a full snapshot.
+MAX_CHAIN_DEPTH = 20
+
+# Newest first; served by ix_audit_logs_entity_created / ix_audit_logs_created_at_id.
+AUDIT_LOG_KEYSET = Keyset(AuditLog.created_at, AuditLog.id, descending=True)
 
 
 def snapshot_model(obj: Any | None) -> dict | None:
@@ -26,6 +37,36 @@ def snapshot_model(obj: Any | None) -> dict | None:
     return data
 
 
+def state_hash(state: dict) -> str:
+    payload = json.dumps(state, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def diff_states(before: dict, after: dict) -> dict[str, list[Any]]:
+    return {key: [before[key], after[key]] for key in after if before[key] != after[key]}
+
+
+def _chain_parent(
+    db: Session, entity_type: str, entity_id: str, before_hash: str
+) -> tuple[int, int] | None:
+    # No autoflush: pending request rows must not be flushed early just to
+    # find the previous event; an unflushed parent simply starts a new chain.
+    with db.no_autoflush:
+        row = db.execute(
+            select(AuditLog.id, AuditLog.chain_depth)
+            .where(
+                AuditLog.entity_type == entity_type,
+                AuditLog.entity_id == entity_id,
+                AuditLog.state_hash == before_hash,
+            )
+            .order_by(AuditLog.id.desc())
+            .limit(1)
+        ).first()
+    if row is None:
+        return None
+    return int(row.id), int(row.chain_depth)
+
+
 def log_event(
     db: Session,
     *,
@@ -40,6 +81,8 @@ def log_event(
     request_id: str | None = None,
     ip_address: str | None = None,
 ) -> AuditLog:
+    before = before_data if before_data is not None else snapshot_model(before_obj)
+    after = after_data if after_data is not None else snapshot_model(after_obj)
     entry = AuditLog(
         actor_user_id=actor.id if actor else None,
         actor_email=actor.email if actor else None,
@@ -48,8 +91,50 @@ def log_event(
         entity_id=str(entity_id),
         request_id=request_id,
         ip_address=ip_address,
-        before_json=before_data if before_data is not None else snapshot_model(before_obj),
-        after_json=after_data if after_data is not None else snapshot_model(after_obj),
+        stored_before_json=before,
+        stored_after_json=after,
+        state_hash=state_hash(after) if after is not None else None,
+        chain_depth=0,
     )
+    if before is not None and after is not None and before.keys() == after.keys():
+        parent = _chain_parent(db, entity_type, str(entity_id), state_hash(before))
+        if parent is not None and parent[1] < MAX_CHAIN_DEPTH:
+            entry.parent_id = parent[0]
+            entry.chain_depth = parent[1] + 1
+            entry.changes_json = diff_states(before, after)
+            entry.stored_before_json = None
+            entry.stored_after_json = None
+    entry.__dict__["_resolved_states"] = (before, after)
     db.add(entry)
     return entry
+
+
+def queue_event(
+    *,
+    actor: User | None,
+    action: str,
+    entity_type: str,
+    entity_id: str,
+    after_data: dict | None = None,
+    request_id: str | None = None,
+    ip_address: str | None = None,
+) -> None:
+    """Record a high-volume read event (downloads, exports) outside the request.
+
+    The row is handed to the process-wide buffered writer and inserted in bulk
+    with other events, so the request needs no write transaction of its own.
+    """
+    audit_buffer.add(
+        {
+            "created_at": datetime.now(timezone.utc),
+            "actor_user_id": actor.id if actor else None,
+            "actor_email": actor.email if actor else None,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": str(entity_id),
+            "request_id": request_id,
+            "ip_address": ip_address,
+            "before_json": None,
+            "after_json": after_data,
+        }
+    )
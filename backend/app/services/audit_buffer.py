@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger("dental_pms.audit_buffer")
+
+# Rows kept for retry while the database is unreachable; beyond this the
+# oldest are dropped (and logged) rather than growing without bound.
+MAX_PENDING_ROWS = 50_000
+
+
+class AuditBuffer:
+    """Per-process buffer that inserts queued audit rows in bulk.
+
+    A daemon thread flushes whenever `max_batch` rows are waiting or
+    `flush_seconds` have passed, so a burst of downloads becomes one
+    multi-row INSERT instead of one transaction per request.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        max_batch: int,
+        flush_seconds: float,
+    ):
+        self._session_factory = session_factory
+        self.max_batch = max(max_batch, 1)
+        self.flush_seconds = max(flush_seconds, 0.05)
+        self._pending: list[dict[str, object]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, row: dict[str, object]) -> None:
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.max_batch
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="audit-buffer", daemon=True
+                )
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Insert everything queued so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            session = self._session_factory()
+            try:
+                session.execute(insert(AuditLog.__table__), rows)
+                session.commit()
+            except Exception:
+                session.rollback()
+                logger.exception("audit_buffer flush failed rows=%s; will retry", len(rows))
+                with self._lock:
+                    self._pending = rows + self._pending
+                    overflow = len(self._pending) - MAX_PENDING_ROWS
+                    if overflow > 0:
+                        del self._pending[:overflow]
+                        logger.error("audit_buffer dropped oldest rows=%s", overflow)
+                return 0
+            finally:
+                session.close()
+            return len(rows)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        self.flush()
+
+
+audit_buffer = AuditBuffer(
+    SessionLocal,
+    max_batch=settings.audit_buffer_max_batch,
+    flush_seconds=settings.audit_buffer_flush_seconds,
+)
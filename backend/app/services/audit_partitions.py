@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+PARENT_TABLE = "audit_logs"
+DEFAULT_PARTITION = "audit_logs_default"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def existing_partitions(db: Session) -> list[str]:
+    rows = db.execute(
+        text(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+            ORDER BY child.relname
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    ).scalars()
+    return list(rows)
+
+
+def ensure_audit_partitions(db: Session, *, start: date, through: date) -> list[str]:
+    """Create monthly partitions covering start..through; returns the names created.
+
+    Rows for a month with no partition land in the default partition, and a
+    month cannot be added while its rows sit there, so rows are moved out of
+    the default partition inside the same transaction.
+    """
+    present = set(existing_partitions(db))
+    created: list[str] = []
+    month = start.replace(day=1)
+    while month <= through:
+        name = partition_name(month)
+        if name not in present:
+            lower = f"{month.isoformat()} 00:00:00+00"
+            upper = f"{_next_month(month).isoformat()} 00:00:00+00"
+            db.execute(
+                text(
+                    f"CREATE TEMP TABLE _audit_move ON COMMIT DROP AS "
+                    f"SELECT * FROM {DEFAULT_PARTITION} "
+                    f"WHERE created_at >= '{lower}' AND created_at < '{upper}'"
+                )
+            )
+            db.execute(
+                text(
+                    f"DELETE FROM {DEFAULT_PARTITION} "
+                    f"WHERE created_at >= '{lower}' AND created_at < '{upper}'"
+                )
+            )
+            db.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} "
+                    f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+                )
+            )
+            db.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM _audit_move"))
+            db.execute(text("DROP TABLE _audit_move"))
+            created.append(name)
+        month = _next_month(month)
+    return created
@@ -0,0 +1,533 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Callable, Iterable, Iterator
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.services.audit_partitions import ensure_audit_partitions
+from app.services.diary_snapshot_cache import invalidate_all_diary_snapshots
+from app.services.finance_month_pack import purge_finance_report_cache
+from app.services.r4_charting.canonical_importer import _build_unique_key, _compute_content_hash
+from app.services.r4_charting.canonical_types import CanonicalRecordInput
+from app.services.recall_communications import rebuild_recall_last_contact
+from app.services.recall_kpis import rebuild_recall_kpis
+
+# Synthetic patients are R4-linked (so charting routes see them) with legacy
+# codes from this base upwards; real R4 codes are far below it.
+SYNTHETIC_CODE_BASE = 900_000_000
+SYNTHETIC_R4_SOURCE = "synthetic_benchmark"
+SYNTHETIC_REQUEST_ID = "synthetic-benchmark"
+# Fixed "today" for the dataset so a given seed always produces the same rows.
+ANCHOR_DATE = date(2026, 1, 5)
+HISTORY_DAYS = 730
+FUTURE_DAYS = 90
+CHUNK_PATIENTS = 1_000
+
+FIRST_NAMES = (
+    "Amelia", "Oliver", "Isla", "George", "Ava", "Noah", "Mia", "Arthur", "Ivy", "Leo",
+    "Freya", "Oscar", "Lily", "Harry", "Florence", "Jack", "Grace", "Charlie", "Sophia", "Thomas",
+    "Evie", "Henry", "Ella", "Alfie", "Poppy", "Jacob", "Rosie", "Edward", "Alice", "William",
+)
+LAST_NAMES = (
+    "Smith", "Jones", "Taylor", "Brown", "Williams", "Wilson", "Johnson", "Davies", "Patel", "Robinson",
+    "Wright", "Thompson", "Evans", "Walker", "White", "Roberts", "Green", "Hall", "Wood", "Jackson",
+    "Clarke", "Hughes", "Edwards", "Turner", "Hill", "Moore", "Cooper", "Ward", "Morris", "King",
+)
+RESTORATION_LABELS = (
+    "Composite filling", "Amalgam filling", "Crown", "Root canal treatment",
+    "Extraction", "Veneer", "Bridge retainer", "Fissure sealant",
+)
+CHARTING_DOMAINS = (
+    ("restorative_treatment", 40),
+    ("treatment_plan_item", 20),
+    ("perio_probe", 25),
+    ("bpe_entry", 15),
+)
+TEETH = tuple(quadrant * 10 + tooth for quadrant in (1, 2, 3, 4) for tooth in range(1, 9))
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    patients: int
+    ledger_entries: int
+    appointments: int
+    charting_records: int
+    audit_rows: int
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+FULL_SCALE = DatasetSpec(
+    patients=100_000,
+    ledger_entries=2_000_000,
+    appointments=1_000_000,
+    charting_records=5_000_000,
+    audit_rows=500_000,
+)
+
+
+def spec_for_scale(scale: float) -> DatasetSpec:
+    """FULL_SCALE multiplied by `scale` (1.0 is a large practice after ~15 years)."""
+    if scale <= 0:
+        raise ValueError("scale must be positive")
+    values = {key: max(int(round(value * scale)), 1) for key, value in FULL_SCALE.as_dict().items()}
+    return DatasetSpec(**values)
+
+
+def synthetic_code(index: int) -> int:
+    return SYNTHETIC_CODE_BASE + index
+
+
+def _share(total: int, patients: int, index: int) -> int:
+    # Spread `total` rows evenly; the first `total % patients` patients get one extra.
+    base, extra = divmod(total, patients)
+    return base + (1 if index < extra else 0)
+
+
+def _rng(seed: int, index: int, kind: str) -> random.Random:
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def _history_day(rng: random.Random, *, future: bool = True) -> date:
+    span = HISTORY_DAYS + (FUTURE_DAYS if future else 0)
+    day = ANCHOR_DATE - timedelta(days=HISTORY_DAYS) + timedelta(days=rng.randrange(span))
+    if day.weekday() >= 5:
+        day -= timedelta(days=day.weekday() - 4)
+    return day
+
+
+def _at(day: date, hour: int, minute: int) -> datetime:
+    return datetime.combine(day, time(hour, minute), tzinfo=timezone.utc)
+
+
+@dataclass
+class PatientRows:
+    patient: tuple
+    recall: tuple
+    communication: tuple | None
+    appointments: list[tuple]
+    ledger: list[tuple]
+    charting: list[tuple]
+    audit: list[tuple]
+
+
+PATIENT_COLUMNS = (
+    "id", "legacy_source", "legacy_id", "first_name", "last_name", "date_of_birth", "phone",
+    "email", "postcode", "patient_category", "care_setting", "recall_interval_months",
+    "recall_due_date", "created_by_user_id", "created_at", "updated_at",
+)
+RECALL_COLUMNS = (
+    "id", "patient_id", "kind", "due_date", "status", "completed_at", "created_by_user_id",
+    "created_at", "updated_at",
+)
+COMMUNICATION_COLUMNS = (
+    "patient_id", "recall_id", "channel", "direction", "status", "outcome", "contacted_at",
+    "created_by_user_id", "created_at",
+)
+APPOINTMENT_COLUMNS = (
+    "patient_id", "starts_at", "ends_at", "status", "appointment_type", "clinician",
+    "location_type", "is_domiciliary", "created_by_user_id", "created_at", "updated_at",
+)
+LEDGER_COLUMNS = (
+    "patient_id", "entry_type", "amount_pence", "method", "reference", "created_by_user_id",
+    "created_at", "updated_at",
+)
+CHARTING_COLUMNS = (
+    "id", "unique_key", "domain", "r4_source", "r4_source_id", "legacy_patient_code",
+    "patient_id", "recorded_at", "tooth", "surface", "code_id", "status", "payload",
+    "content_hash",
+)
+AUDIT_COLUMNS = (
+    "created_at", "actor_user_id", "actor_email", "action", "entity_type", "entity_id",
+    "request_id", "before_json", "after_json",
+)
+
+
+def canonical_records_for_patient(
+    seed: int, index: int, count: int, *, revision: int = 0
+) -> list[CanonicalRecordInput]:
+    """The synthetic charting history of one patient, as importer input."""
+    rng = _rng(seed, index, "charting")
+    code = synthetic_code(index)
+    domains = [name for name, _weight in CHARTING_DOMAINS]
+    weights = [weight for _name, weight in CHARTING_DOMAINS]
+    records = []
+    for position in range(count):
+        domain = rng.choices(domains, weights)[0]
+        tooth = rng.choice(TEETH)
+        recorded_at = _at(_history_day(rng, future=False), rng.randrange(8, 17), rng.choice((0, 30)))
+        surface = rng.randrange(1, 32)
+        payload: dict[str, object] = {"tooth": tooth, "surface": surface}
+        status = None
+        code_id = None
+        if domain in {"restorative_treatment", "treatment_plan_item"}:
+            label = rng.choice(RESTORATION_LABELS)
+            code_id = 9000 + RESTORATION_LABELS.index(label)
+            payload.update({"completed": rng.random() < 0.85, "description": label})
+            status = "complete" if payload["completed"] else "planned"
+        elif domain == "perio_probe":
+            payload.update({"point": rng.randrange(1, 7), "depth": rng.randrange(1, 8)})
+        else:
+            payload.update({"sextant": rng.randrange(1, 7), "score": rng.randrange(0, 5)})
+        if revision:
+            payload["revision"] = revision
+        records.append(
+            CanonicalRecordInput(
+                domain=domain,
+                r4_source=SYNTHETIC_R4_SOURCE,
+                r4_source_id=f"{code}-{position}",
+                legacy_patient_code=code,
+                recorded_at=recorded_at,
+                entered_at=recorded_at,
+                tooth=tooth,
+                surface=surface,
+                code_id=code_id,
+                status=status,
+                payload=payload,
+            )
+        )
+    return records
+
+
+def build_patient_rows(
+    seed: int,
+    index: int,
+    spec: DatasetSpec,
+    *,
+    patient_id: int,
+    recall_id: int,
+    user_id: int,
+    user_email: str,
+) -> PatientRows:
+    """Every row for synthetic patient `index`; depends only on (seed, index, spec)."""
+    rng = _rng(seed, index, "patient")
+    code = synthetic_code(index)
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    registered = _at(ANCHOR_DATE - timedelta(days=HISTORY_DAYS + rng.randrange(3650)), 9, 0)
+    domiciliary = rng.random() < 0.08
+    recall_due = ANCHOR_DATE + timedelta(days=rng.randrange(-120, 180))
+    patient = (
+        patient_id,
+        "r4",
+        str(code),
+        first_name,
+        last_name,
+        date(1930, 1, 1) + timedelta(days=rng.randrange(32_000)),
+        f"07{rng.randrange(10**9):09d}",
+        f"{first_name}.{last_name}.{index}@example.com".lower(),
+        f"SY{rng.randrange(1, 99)} {rng.randrange(1, 9)}AB",
+        "domiciliary_private" if domiciliary else rng.choice(("clinic_private", "denplan")),
+        rng.choice(("home", "care_home")) if domiciliary else "clinic",
+        6,
+        recall_due,
+        user_id,
+        registered,
+        registered,
+    )
+
+    completed = rng.random() < 0.1
+    recall = (
+        recall_id,
+        patient_id,
+        rng.choice(("exam", "hygiene")),
+        recall_due,
+        "completed" if completed else "upcoming",
+        _at(recall_due, 10, 0) if completed else None,
+        user_id,
+        registered,
+        registered,
+    )
+    communication = None
+    if index % 3 == 0:
+        contacted = _at(recall_due - timedelta(days=rng.randrange(1, 30)), 11, 0)
+        communication = (
+            patient_id,
+            recall_id,
+            rng.choice(("letter", "phone", "email", "sms")),
+            "outbound",
+            "sent",
+            rng.choice((None, "no_answer", "booked")),
+            contacted,
+            user_id,
+            contacted,
+        )
+
+    appointments = []
+    for _ in range(_share(spec.appointments, spec.patients, index)):
+        day = _history_day(rng)
+        starts_at = _at(day, rng.randrange(8, 17), rng.choice((0, 15, 30, 45)))
+        ends_at = starts_at + timedelta(minutes=rng.choice((15, 30, 45)))
+        if day >= ANCHOR_DATE:
+            status = "booked"
+        else:
+            status = rng.choices(("completed", "no_show", "cancelled"), (90, 4, 6))[0]
+        appointments.append(
+            (
+                patient_id,
+                starts_at,
+                ends_at,
+                status,
+                rng.choice(("Exam", "Hygiene", "Filling", "Crown prep", "Emergency")),
+                rng.choice(("Dr Ahmed", "Dr Byrne", "Dr Chen", "Hygienist Doyle")),
+                "visit" if domiciliary else "clinic",
+                domiciliary,
+                user_id,
+                starts_at - timedelta(days=rng.randrange(1, 60)),
+                starts_at,
+            )
+        )
+
+    ledger = []
+    for position in range(_share(spec.ledger_entries, spec.patients, index)):
+        created = _at(_history_day(rng, future=False), rng.randrange(8, 18), rng.randrange(60))
+        if position % 2 == 0:
+            entry = ("charge", rng.randrange(25, 400) * 100, None, None)
+        else:
+            entry = (
+                "payment",
+                -rng.randrange(25, 400) * 100,
+                rng.choice(("cash", "card", "card", "bank_transfer")),
+                f"SYN-{code}-{position}",
+            )
+        ledger.append((patient_id, *entry, user_id, created, created))
+
+    charting = []
+    for record in canonical_records_for_patient(
+        seed, index, _share(spec.charting_records, spec.patients, index)
+    ):
+        unique_key = _build_unique_key(
+            domain=record.domain,
+            r4_source=record.r4_source,
+            r4_source_id=record.r4_source_id,
+            patient_id=patient_id,
+            legacy_patient_code=record.legacy_patient_code,
+        )
+        charting.append(
+            (
+                UUID(bytes=hashlib.md5(unique_key.encode("utf-8")).digest(), version=4),
+                unique_key,
+                record.domain,
+                record.r4_source,
+                record.r4_source_id,
+                record.legacy_patient_code,
+                patient_id,
+                record.recorded_at,
+                record.tooth,
+                record.surface,
+                record.code_id,
+                record.status,
+                json.dumps(record.payload),
+                _compute_content_hash(record),
+            )
+        )
+
+    audit = []
+    state = {"first_name": first_name, "last_name": last_name, "phone": patient[6]}
+    # Audit history stays inside the dataset window so it lands in monthly partitions.
+    created = _at(ANCHOR_DATE - timedelta(days=HISTORY_DAYS), 8, 0)
+    for position in range(_share(spec.audit_rows, spec.patients, index)):
+        before = None if position == 0 else dict(state)
+        if position:
+            state["phone"] = f"07{rng.randrange(10**9):09d}"
+        created = min(
+            created + timedelta(days=rng.randrange(1, 120), minutes=rng.randrange(600)),
+            _at(ANCHOR_DATE, 8, 0),
+        )
+        audit.append(
+            (
+                created,
+                user_id,
+                user_email,
+                "create" if position == 0 else "update",
+                "patient",
+                str(patient_id),
+                SYNTHETIC_REQUEST_ID,
+                json.dumps(before) if before is not None else None,
+                json.dumps(state),
+            )
+        )
+
+    return PatientRows(patient, recall, communication, appointments, ledger, charting, audit)
+
+
+def _copy_rows(session: Session, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+    dbapi = session.connection().connection.driver_connection
+    count = 0
+    with dbapi.cursor() as cursor:
+        with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+    return count
+
+
+def _reserve_ids(session: Session, table: str, count: int) -> int:
+    """Advance the table's id sequence by `count`; returns the first reserved id."""
+    last = session.execute(
+        text(
+            "SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+            "nextval(pg_get_serial_sequence(:table, 'id')) + :count - 1)"
+        ),
+        {"table": table, "count": count},
+    ).scalar_one()
+    return int(last) - count + 1
+
+
+SYNTHETIC_PATIENTS_SQL = (
+    "SELECT id FROM patients WHERE legacy_source = 'r4' AND legacy_id ~ '^[0-9]{9,}$' "
+    f"AND legacy_id::bigint >= {SYNTHETIC_CODE_BASE}"
+)
+
+
+def synthetic_patient_count(session: Session) -> int:
+    return int(session.execute(text(f"SELECT count(*) FROM ({SYNTHETIC_PATIENTS_SQL}) s")).scalar_one())
+
+
+def synthetic_patient_ids(session: Session, limit: int) -> list[int]:
+    return list(
+        session.execute(text(f"{SYNTHETIC_PATIENTS_SQL} ORDER BY id LIMIT :limit"), {"limit": limit})
+        .scalars()
+        .all()
+    )
+
+
+def purge_synthetic_dataset(session: Session) -> dict[str, int]:
+    """Delete every row the generator wrote (identified by legacy code range and markers)."""
+    _ensure_not_production()
+    session.execute(text(f"CREATE TEMP TABLE _synthetic_patients ON COMMIT DROP AS {SYNTHETIC_PATIENTS_SQL}"))
+    deleted: dict[str, int] = {}
+    for table in (
+        "patient_recall_communications",
+        "patient_recalls",
+        "patient_ledger_entries",
+        "appointments",
+    ):
+        deleted[table] = session.execute(
+            text(f"DELETE FROM {table} WHERE patient_id IN (SELECT id FROM _synthetic_patients)")
+        ).rowcount
+    deleted["r4_charting_canonical_records"] = session.execute(
+        text("DELETE FROM r4_charting_canonical_records WHERE r4_source = :source"),
+        {"source": SYNTHETIC_R4_SOURCE},
+    ).rowcount
+    deleted["audit_logs"] = session.execute(
+        text("DELETE FROM audit_logs WHERE request_id = :marker"), {"marker": SYNTHETIC_REQUEST_ID}
+    ).rowcount
+    deleted["patients"] = session.execute(
+        text("DELETE FROM patients WHERE id IN (SELECT id FROM _synthetic_patients)")
+    ).rowcount
+    rebuild_recall_kpis(session)
+    purge_finance_report_cache(session)
+    invalidate_all_diary_snapshots(session)
+    return deleted
+
+
+def _ensure_not_production() -> None:
+    if settings.app_env.strip().lower() in {"prod", "production"}:
+        raise RuntimeError(
+            "Synthetic benchmark data must not be written to or purged from a production database."
+        )
+
+
+def _chunks(total: int, size: int) -> Iterator[tuple[int, int]]:
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def generate_synthetic_dataset(
+    session: Session,
+    spec: DatasetSpec,
+    *,
+    seed: int = 1,
+    chunk_patients: int = CHUNK_PATIENTS,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict[str, int]:
+    """Write the dataset with COPY, committing once per chunk of patients.
+
+    Row contents depend only on the seed and spec; database ids follow the
+    sequences, so they differ between databases but not the data behind them.
+    """
+    _ensure_not_production()
+    if synthetic_patient_count(session):
+        raise RuntimeError("Synthetic data already present; purge it before generating again.")
+    actor = session.execute(
+        text("SELECT id, email FROM users WHERE role = 'superadmin' ORDER BY id LIMIT 1")
+    ).first()
+    if actor is None:
+        raise RuntimeError("No superadmin user to own the synthetic rows; start the app once first.")
+    user_id, user_email = int(actor.id), str(actor.email)
+
+    ensure_audit_partitions(
+        session,
+        start=(ANCHOR_DATE - timedelta(days=HISTORY_DAYS)).replace(day=1),
+        through=ANCHOR_DATE.replace(day=1),
+    )
+    session.commit()
+
+    written = {table: 0 for table in (
+        "patients", "patient_recalls", "patient_recall_communications", "appointments",
+        "patient_ledger_entries", "r4_charting_canonical_records", "audit_logs",
+    )}
+    for start, stop in _chunks(spec.patients, chunk_patients):
+        size = stop - start
+        first_patient = _reserve_ids(session, "patients", size)
+        first_recall = _reserve_ids(session, "patient_recalls", size)
+        batch = [
+            build_patient_rows(
+                seed,
+                index,
+                spec,
+                patient_id=first_patient + offset,
+                recall_id=first_recall + offset,
+                user_id=user_id,
+                user_email=user_email,
+            )
+            for offset, index in enumerate(range(start, stop))
+        ]
+        written["patients"] += _copy_rows(session, "patients", PATIENT_COLUMNS, (r.patient for r in batch))
+        written["patient_recalls"] += _copy_rows(
+            session, "patient_recalls", RECALL_COLUMNS, (r.recall for r in batch)
+        )
+        written["patient_recall_communications"] += _copy_rows(
+            session,
+            "patient_recall_communications",
+            COMMUNICATION_COLUMNS,
+            (r.communication for r in batch if r.communication is not None),
+        )
+        written["appointments"] += _copy_rows(
+            session, "appointments", APPOINTMENT_COLUMNS, (row for r in batch for row in r.appointments)
+        )
+        written["patient_ledger_entries"] += _copy_rows(
+            session, "patient_ledger_entries", LEDGER_COLUMNS, (row for r in batch for row in r.ledger)
+        )
+        written["r4_charting_canonical_records"] += _copy_rows(
+            session,
+            "r4_charting_canonical_records",
+            CHARTING_COLUMNS,
+            (row for r in batch for row in r.charting),
+        )
+        written["audit_logs"] += _copy_rows(
+            session, "audit_logs", AUDIT_COLUMNS, (row for r in batch for row in r.audit)
+        )
+        session.commit()
+        if progress is not None:
+            progress(stop, spec.patients)
+
+    # Communications are copied in bulk, bypassing log_recall_communication.
+    rebuild_recall_last_contact(session)
+    rebuild_recall_kpis(session)
+    invalidate_all_diary_snapshots(session)
+    session.commit()
+    for table in written:
+        session.execute(text(f"ANALYZE {table}"))
+    session.commit()
+    return written
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import math
+import platform
+import re
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import text
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.services.benchmark_data import (
+    ANCHOR_DATE,
+    SYNTHETIC_R4_SOURCE,
+    canonical_records_for_patient,
+    synthetic_code,
+    synthetic_patient_ids,
+)
+from app.services.r4_charting.canonical_importer import import_r4_charting_canonical
+from app.services.rate_limit import registered_limiters
+
+RESULT_FORMAT = 1
+SAMPLE_PATIENTS = 5
+IMPORT_PATIENTS = 20
+_QUERY_COUNT_RE = re.compile(r'desc="(\d+) queries"')
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    run: Callable[[int], object]
+
+
+class _ListSource:
+    select_only = True
+
+    def __init__(self, records):
+        self._records = records
+
+    def iter_canonical_records(self, patients_from=None, patients_to=None, limit=None):
+        return iter(self._records)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _table_counts() -> dict[str, int]:
+    session = SessionLocal()
+    try:
+        # Planner estimates: exact counts of multi-million row tables take seconds each.
+        rows = session.execute(
+            text(
+                "SELECT relname, greatest(reltuples, 0)::bigint FROM pg_class "
+                "WHERE relname IN ('patients', 'appointments', 'patient_ledger_entries', "
+                "'r4_charting_canonical_records', 'patient_recalls') AND relkind = 'r'"
+            )
+        ).all()
+        counts = {name: int(count) for name, count in rows}
+        counts["audit_logs"] = int(
+            session.execute(
+                text(
+                    "SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'audit_logs'"
+                )
+            ).scalar_one()
+        )
+        return counts
+    finally:
+        session.close()
+
+
+def _stored_record_counts(patients: int) -> dict[int, int]:
+    """Canonical records already stored for the first synthetic patients, by index."""
+    codes = {synthetic_code(index): index for index in range(patients)}
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            text(
+                "SELECT legacy_patient_code, count(*) FROM r4_charting_canonical_records "
+                "WHERE r4_source = :source AND legacy_patient_code = ANY(:codes) "
+                "GROUP BY legacy_patient_code"
+            ),
+            {"source": SYNTHETIC_R4_SOURCE, "codes": list(codes)},
+        ).all()
+    finally:
+        session.close()
+    return {codes[code]: int(count) for code, count in rows}
+
+
+def _summarize(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    p95_index = max(math.ceil(0.95 * len(ordered)) - 1, 0)
+    return {
+        "min_ms": round(ordered[0], 2),
+        "median_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[p95_index], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def build_cases(
+    client, headers: dict[str, str], patient_ids: list[int], *, seed: int = 1
+) -> list[BenchmarkCase]:
+    anchor = ANCHOR_DATE.isoformat()
+    week_end = (ANCHOR_DATE + timedelta(days=7)).isoformat()
+    month_start = (ANCHOR_DATE - timedelta(days=30)).isoformat()
+    surnames = ("Smi", "Pat", "Wil", "Cla", "Hug")
+
+    def get(path: str) -> Callable[[int], object]:
+        return lambda _iteration: client.get(path, headers=headers)
+
+    def per_patient(template: str) -> Callable[[int], object]:
+        return lambda iteration: client.get(
+            template.format(patient_id=patient_ids[iteration % len(patient_ids)]), headers=headers
+        )
+
+    stored_counts = _stored_record_counts(IMPORT_PATIENTS)
+
+    def canonical_import(revision: int) -> Callable[[int], object]:
+        # Re-import what the generator stored: revision 0 matches every
+        # content hash (the no-op path), revision 1 rewrites every row.
+        records = [
+            record
+            for index, count in sorted(stored_counts.items())
+            for record in canonical_records_for_patient(seed, index, count, revision=revision)
+        ]
+
+        def _run(_iteration: int):
+            session = SessionLocal()
+            try:
+                stats = import_r4_charting_canonical(
+                    session, _ListSource(records), allow_unmapped_patients=True
+                )
+                session.flush()
+                return stats
+            finally:
+                session.rollback()
+                session.close()
+
+        return _run
+
+    return [
+        BenchmarkCase(
+            "patient_search",
+            lambda iteration: client.get(
+                f"/patients/search?q={surnames[iteration % len(surnames)]}&limit=20", headers=headers
+            ),
+        ),
+        BenchmarkCase("patient_list", get("/patients?limit=50")),
+        BenchmarkCase("diary_snapshot_day", get(f"/appointments/snapshot?date={anchor}&view=day")),
+        BenchmarkCase("diary_snapshot_week", get(f"/appointments/snapshot?date={anchor}&view=week")),
+        BenchmarkCase("appointments_range_week", get(f"/appointments/range?start={anchor}&end={week_end}")),
+        BenchmarkCase("recalls_list", get("/recalls?limit=50")),
+        BenchmarkCase("recalls_list_overdue", get("/recalls?status=overdue&limit=200")),
+        BenchmarkCase("recalls_export_count", get("/recalls/export_count")),
+        BenchmarkCase("recalls_export_csv", get(f"/recalls/export.csv?start={month_start}&end={anchor}")),
+        BenchmarkCase("tooth_state", per_patient("/patients/{patient_id}/charting/tooth-state")),
+        BenchmarkCase("patient_timeline", per_patient("/patients/{patient_id}/timeline")),
+        BenchmarkCase("patient_finance_summary", per_patient("/patients/{patient_id}/finance-summary")),
+        BenchmarkCase("finance_cashup", get(f"/reports/finance/cashup?start={month_start}&end={anchor}")),
+        BenchmarkCase("finance_outstanding", get(f"/reports/finance/outstanding?as_of={anchor}")),
+        BenchmarkCase("finance_trends", get("/reports/finance/trends?days=90")),
+        BenchmarkCase("canonical_import_unchanged", canonical_import(revision=0)),
+        BenchmarkCase("canonical_import_changed", canonical_import(revision=1)),
+    ]
+
+
+def _time_case(case: BenchmarkCase, *, iterations: int, warmup: int) -> dict[str, object]:
+    statuses: dict[str, int] = {}
+    samples: list[float] = []
+    queries: list[int] = []
+    response_bytes = 0
+    detail: dict[str, int] | None = None
+    for iteration in range(warmup + iterations):
+        started = time.perf_counter()
+        outcome = case.run(iteration)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if iteration < warmup:
+            continue
+        samples.append(elapsed_ms)
+        status = getattr(outcome, "status_code", None)
+        key = str(status) if status is not None else "ok"
+        statuses[key] = statuses.get(key, 0) + 1
+        if hasattr(outcome, "as_dict"):
+            detail = outcome.as_dict()
+        elif status is not None:
+            response_bytes = len(outcome.content)
+            match = _QUERY_COUNT_RE.search(outcome.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+    result: dict[str, object] = {"iterations": iterations, "statuses": statuses, **_summarize(samples)}
+    if queries:
+        result["queries"] = max(queries)
+    if response_bytes:
+        result["response_bytes"] = response_bytes
+    if detail is not None:
+        result["detail"] = detail
+    return result
+
+
+def run_benchmarks(
+    *,
+    email: str,
+    password: str,
+    seed: int = 1,
+    iterations: int = 5,
+    warmup: int = 1,
+    only: list[str] | None = None,
+) -> dict[str, object]:
+    """Time each hot path in-process through the FastAPI TestClient."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    # Measure the handlers, not the throttles or a disabled feature flag.
+    settings.feature_charting_viewer = True
+    for limiter in registered_limiters():
+        limiter.max_events = 1_000_000
+        limiter.refill_per_second = 1_000_000.0
+
+    session = SessionLocal()
+    try:
+        patient_ids = synthetic_patient_ids(session, SAMPLE_PATIENTS)
+    finally:
+        session.close()
+    if not patient_ids:
+        raise RuntimeError("No synthetic patients found; run app.scripts.benchmark_seed first.")
+
+    results: dict[str, object] = {}
+    with TestClient(app) as client:
+        login = client.post("/auth/login", json={"email": email, "password": password})
+        if login.status_code != 200:
+            raise RuntimeError(f"Login failed ({login.status_code}): {login.text}")
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        for case in build_cases(client, headers, patient_ids, seed=seed):
+            if only and case.name not in only:
+                continue
+            results[case.name] = _time_case(case, iterations=iterations, warmup=warmup)
+
+    return {
+        "format": RESULT_FORMAT,
+        "meta": {
+            "commit": _git_commit(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "seed": seed,
+            "iterations": iterations,
+            "warmup": warmup,
+            "table_rows": _table_counts(),
+        },
+        "results": results,
+    }
+
+
+def compare_results(
+    baseline: dict[str, object], current: dict[str, object], *, threshold: float
+) -> list[dict[str, object]]:
+    """Median change per case; `regressed` when slower than baseline by more than `threshold`."""
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, result in current.get("results", {}).items():
+        before = base_results.get(name)
+        if not before:
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else None
+        rows.append(
+            {
+                "case": name,
+                "baseline_median_ms": before["median_ms"],
+                "median_ms": result["median_ms"],
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "baseline_queries": before.get("queries"),
+                "queries": result.get("queries"),
+                "regressed": ratio is not None and ratio > 1 + threshold,
+            }
+        )
+    return rows
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+
+import psycopg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.appointment import Appointment
+
+logger = logging.getLogger("dental_pms.diary_events")
+
+DIARY_EVENTS_CHANNEL = "diary_events"
+SUBSCRIBER_QUEUE_MAX = 200
+RECONNECT_DELAY_SECONDS = 2.0
+
+
+def _event_day(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date().isoformat()
+
+
+def build_diary_event(
+    event_type: str,
+    appointment: Appointment,
+    previous_starts_at: datetime | None = None,
+) -> dict[str, object]:
+    days = {_event_day(appointment.starts_at), _event_day(previous_starts_at)}
+    return {
+        "type": event_type,
+        "appointment_id": appointment.id,
+        "patient_id": appointment.patient_id,
+        "starts_at": appointment.starts_at.isoformat() if appointment.starts_at else None,
+        "ends_at": appointment.ends_at.isoformat() if appointment.ends_at else None,
+        "previous_starts_at": previous_starts_at.isoformat() if previous_starts_at else None,
+        "status": appointment.status.value if appointment.status else None,
+        "clinician_user_id": appointment.clinician_user_id,
+        "archived": appointment.deleted_at is not None,
+        "days": sorted(day for day in days if day),
+    }
+
+
+def publish_diary_event(
+    db: Session,
+    event_type: str,
+    appointment: Appointment,
+    previous_starts_at: datetime | None = None,
+) -> None:
+    """Queue a NOTIFY for the diary stream; Postgres delivers it only if the
+    surrounding transaction commits, so listeners never see rolled-back writes."""
+    payload = build_diary_event(event_type, appointment, previous_starts_at)
+    db.execute(
+        select(
+            func.pg_notify(DIARY_EVENTS_CHANNEL, json.dumps(payload, separators=(",", ":")))
+        )
+    )
+
+
+def format_sse(event: dict[str, object]) -> str:
+    data = json.dumps(event, separators=(",", ":"))
+    return f"event: {event.get('type', 'message')}\ndata: {data}\n\n"
+
+
+@dataclass(eq=False)
+class DiarySubscription:
+    start: date
+    end: date
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(SUBSCRIBER_QUEUE_MAX))
+    overflowed: bool = False
+
+    def wants(self, event: dict[str, object]) -> bool:
+        days = event.get("days")
+        if not isinstance(days, list):
+            return True
+        start_key = self.start.isoformat()
+        end_key = self.end.isoformat()
+        return any(isinstance(day, str) and start_key <= day <= end_key for day in days)
+
+    def offer(self, event: dict[str, object]) -> None:
+        # Runs on the subscriber's loop. A slow client gets one resync marker
+        # instead of an unbounded backlog.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class DiaryEventHub:
+    """Per-process fan-out of diary NOTIFY events to open SSE streams.
+
+    Each worker holds a single LISTEN connection regardless of how many diary tabs
+    are connected to it; the connection is opened on the first subscriber.
+    """
+
+    def __init__(self, database_url: str, channel: str = DIARY_EVENTS_CHANNEL):
+        self._conninfo = make_url(database_url).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self._channel = channel
+        self._subscribers: set[DiarySubscription] = set()
+        self._lock = threading.Lock()
+        self._listener: asyncio.Task | None = None
+        self._listener_loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, start: date, end: date) -> DiarySubscription:
+        loop = asyncio.get_running_loop()
+        subscription = DiarySubscription(start=start, end=end, loop=loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+        if self._listener is None or self._listener.done() or self._listener_loop is not loop:
+            self._listener = loop.create_task(self._listen())
+            self._listener_loop = loop
+        return subscription
+
+    def unsubscribe(self, subscription: DiarySubscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def dispatch(self, raw_payload: str) -> int:
+        try:
+            event = json.loads(raw_payload)
+        except ValueError:
+            logger.warning("diary_events ignored malformed payload")
+            return 0
+        with self._lock:
+            targets = [sub for sub in self._subscribers if sub.wants(event)]
+        for subscription in targets:
+            subscription.loop.call_soon_threadsafe(subscription.offer, event)
+        return len(targets)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    self._conninfo, autocommit=True
+                ) as conn:
+                    await conn.execute(f'LISTEN "{self._channel}"')
+                    logger.info("diary_events listening channel=%s", self._channel)
+                    async for notify in conn.notifies():
+                        self.dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("diary_events listener lost connection; reconnecting")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def aclose(self) -> None:
+        listener, self._listener = self._listener, None
+        self._listener_loop = None
+        if listener is None:
+            return
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+
+
+diary_event_hub = DiaryEventHub(settings.database_url)
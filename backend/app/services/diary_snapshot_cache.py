@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.appointment import Appointment
+from app.models.diary_snapshot import DiarySnapshotCacheEntry, DiarySnapshotVersion
+from app.models.note import Note
+from app.services.appointments_snapshot import (
+    SnapshotView,
+    build_appointments_snapshot,
+    resolve_snapshot_window,
+)
+
+ALL_SCOPE = "all"
+
+
+def _day_scope(day: date) -> str:
+    return f"day:{day.isoformat()}"
+
+
+def _snapshot_day(value: datetime) -> date:
+    # Snapshot windows are UTC days, so version scopes must be too.
+    if value.tzinfo is None:
+        return value.date()
+    return value.astimezone(timezone.utc).date()
+
+
+def bump_diary_scopes(db: Session, scopes: Iterable[str]) -> None:
+    keys = sorted(set(scopes))
+    if not keys:
+        return
+    stmt = pg_insert(DiarySnapshotVersion).values(
+        [{"scope": key, "version": 1} for key in keys]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DiarySnapshotVersion.scope],
+        set_={
+            "version": DiarySnapshotVersion.version + 1,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def bump_diary_for_datetimes(db: Session, *values: datetime | None) -> None:
+    bump_diary_scopes(db, (_day_scope(_snapshot_day(value)) for value in values if value))
+
+
+def bump_diary_for_appointment(
+    db: Session,
+    appointment: Appointment,
+    previous_starts_at: datetime | None = None,
+) -> None:
+    bump_diary_for_datetimes(db, appointment.starts_at, previous_starts_at)
+
+
+def bump_diary_for_note(db: Session, note: Note) -> None:
+    if note.appointment_id is None:
+        return
+    starts_at = db.scalar(
+        select(Appointment.starts_at).where(Appointment.id == note.appointment_id)
+    )
+    bump_diary_for_datetimes(db, starts_at)
+
+
+def bump_diary_for_patient(db: Session, patient_id: int) -> None:
+    """Invalidate every diary day showing the patient (names and alert flags)."""
+    starts = db.scalars(
+        select(Appointment.starts_at)
+        .where(Appointment.patient_id == patient_id)
+        .where(Appointment.deleted_at.is_(None))
+    )
+    bump_diary_for_datetimes(db, *starts)
+
+
+def invalidate_all_diary_snapshots(db: Session) -> None:
+    bump_diary_scopes(db, [ALL_SCOPE])
+
+
+def diary_snapshot_version(db: Session, range_start: date, range_end: date) -> int:
+    scopes = [ALL_SCOPE]
+    day = range_start
+    while day <= range_end:
+        scopes.append(_day_scope(day))
+        day += timedelta(days=1)
+    total = db.scalar(
+        select(func.coalesce(func.sum(DiarySnapshotVersion.version), 0)).where(
+            DiarySnapshotVersion.scope.in_(scopes)
+        )
+    )
+    return int(total or 0)
+
+
+def diary_snapshot_etag(
+    anchor_date: date, view: SnapshotView, mask_names: bool, version: int
+) -> str:
+    mask_flag = "m" if mask_names else "u"
+    return f'"diary-{view}-{anchor_date.isoformat()}-{mask_flag}-{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip() for value in if_none_match.split(",")}
+    weak_etag = f"W/{etag}"
+    return "*" in candidates or etag in candidates or weak_etag in candidates
+
+
+def load_diary_snapshot(
+    db: Session,
+    anchor_date: date,
+    view: SnapshotView,
+    mask_names: bool,
+    version: int,
+) -> dict:
+    """Return the snapshot payload for `version`, building and storing it on a miss.
+
+    The version must be read before building so a concurrent write can only make the
+    stored entry look older than it is, never newer.
+    """
+    range_start, _range_end = resolve_snapshot_window(anchor_date, view)
+    entry = db.scalar(
+        select(DiarySnapshotCacheEntry).where(
+            DiarySnapshotCacheEntry.range_start == range_start,
+            DiarySnapshotCacheEntry.view == view,
+            DiarySnapshotCacheEntry.mask_names == mask_names,
+        )
+    )
+    if entry is not None and entry.version == version:
+        payload = dict(entry.payload)
+        payload["date"] = anchor_date.isoformat()
+        return payload
+
+    snapshot = build_appointments_snapshot(
+        db,
+        anchor_date=anchor_date,
+        view=view,
+        mask_names=mask_names,
+    )
+    payload = snapshot.model_dump(mode="json")
+    stmt = pg_insert(DiarySnapshotCacheEntry).values(
+        range_start=range_start,
+        view=view,
+        mask_names=mask_names,
+        version=version,
+        payload=payload,
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_diary_snapshot_cache_key",
+        set_={
+            "version": stmt.excluded.version,
+            "payload": stmt.excluded.payload,
+            "built_at": func.now(),
+        },
+        where=DiarySnapshotCacheEntry.version <= stmt.excluded.version,
+    )
+    db.execute(stmt)
+    db.commit()
+    return payload
@@ -1,12 +1,30 @@
 from __future__ import annotations
 
-from datetime import date
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache, partial
+import json
 import re
+import threading
+from typing import BinaryIO, Callable, Iterable, Iterator
 
+from sqlalchemy import select
+from sqlalchemy.orm import Session, load_only
+
+from app.models.document_template import DocumentTemplate
 from app.models.patient import Patient
-from app.services.pdf import CLINIC_ADDRESS_LINES, CLINIC_NAME, CLINIC_PHONE
+from app.services.pdf_core import (
+    CLINIC_ADDRESS_LINES,
+    CLINIC_NAME,
+    CLINIC_PHONE,
+    PdfBatchWriter,
+)
+from app.services.pdf_documents import draw_patient_document
 
 PLACEHOLDER_PATTERN = re.compile(r"\{\{([^}]+)\}\}")
+COMPILED_TEMPLATE_CACHE_SIZE = 256
+MAIL_MERGE_FETCH_SIZE = 500
 
 
 def _build_patient_address(patient: Patient) -> str:
@@ -35,61 +53,247 @@ def _enum_value(value) -> str:
     return value.value if hasattr(value, "value") else str(value)
 
 
+def _full_name(patient: Patient) -> str:
+    return " ".join(part for part in [patient.first_name, patient.last_name] if part)
+
+
+def _recall_due_date(patient: Patient) -> str:
+    return patient.recall_due_date.isoformat() if patient.recall_due_date else ""
+
+
+# Patient fields: key -> (resolver, Patient columns it reads).
+PATIENT_FIELDS: dict[str, tuple[Callable[[Patient], str], tuple[str, ...]]] = {
+    "patient.id": (lambda p: str(p.id), ()),
+    "patient.first_name": (lambda p: p.first_name or "", ("first_name",)),
+    "patient.last_name": (lambda p: p.last_name or "", ("last_name",)),
+    "patient.full_name": (_full_name, ("first_name", "last_name")),
+    "patient.dob": (
+        lambda p: p.date_of_birth.isoformat() if p.date_of_birth else "",
+        ("date_of_birth",),
+    ),
+    "patient.email": (lambda p: p.email or "", ("email",)),
+    "patient.phone": (lambda p: p.phone or "", ("phone",)),
+    "patient.address": (
+        _build_patient_address,
+        ("address_line1", "address_line2", "city", "postcode"),
+    ),
+    "patient.address_line1": (lambda p: p.address_line1 or "", ("address_line1",)),
+    "patient.address_line2": (lambda p: p.address_line2 or "", ("address_line2",)),
+    "patient.city": (lambda p: p.city or "", ("city",)),
+    "patient.postcode": (lambda p: p.postcode or "", ("postcode",)),
+    "patient.nhs_number": (lambda p: p.nhs_number or "", ("nhs_number",)),
+    "patient.category": (lambda p: _enum_value(p.patient_category), ("patient_category",)),
+    "patient.care_setting": (lambda p: _enum_value(p.care_setting), ("care_setting",)),
+    "patient.denplan_member_no": (lambda p: p.denplan_member_no or "", ("denplan_member_no",)),
+    "patient.denplan_plan_name": (lambda p: p.denplan_plan_name or "", ("denplan_plan_name",)),
+    "patient.recall_due_date": (_recall_due_date, ("recall_due_date",)),
+    "patient.recall_status": (lambda p: _enum_value(p.recall_status), ("recall_status",)),
+    "patient.recall_type": (lambda p: p.recall_type or "", ("recall_type",)),
+    "recall.due_date": (_recall_due_date, ("recall_due_date",)),
+    "recall.status": (lambda p: _enum_value(p.recall_status), ("recall_status",)),
+    "recall.type": (lambda p: p.recall_type or "", ("recall_type",)),
+}
+
+# Fields that do not depend on the patient; resolved once per render or merge.
+STATIC_FIELDS: dict[str, Callable[[], str]] = {
+    "practice.name": lambda: CLINIC_NAME,
+    "practice.address": _build_practice_address,
+    "practice.address_line1": lambda: _practice_line(0),
+    "practice.website": lambda: _practice_line(1),
+    "practice.phone": lambda: CLINIC_PHONE,
+    "today": lambda: date.today().isoformat(),
+}
+
+
 def _build_field_map(patient: Patient) -> dict[str, str]:
-    full_name = " ".join(part for part in [patient.first_name, patient.last_name] if part)
-    return {
-        "patient.id": str(patient.id),
-        "patient.first_name": patient.first_name or "",
-        "patient.last_name": patient.last_name or "",
-        "patient.full_name": full_name,
-        "patient.dob": patient.date_of_birth.isoformat() if patient.date_of_birth else "",
-        "patient.email": patient.email or "",
-        "patient.phone": patient.phone or "",
-        "patient.address": _build_patient_address(patient),
-        "patient.address_line1": patient.address_line1 or "",
-        "patient.address_line2": patient.address_line2 or "",
-        "patient.city": patient.city or "",
-        "patient.postcode": patient.postcode or "",
-        "patient.nhs_number": patient.nhs_number or "",
-        "patient.category": _enum_value(patient.patient_category),
-        "patient.care_setting": _enum_value(patient.care_setting),
-        "patient.denplan_member_no": patient.denplan_member_no or "",
-        "patient.denplan_plan_name": patient.denplan_plan_name or "",
-        "patient.recall_due_date": patient.recall_due_date.isoformat()
-        if patient.recall_due_date
-        else "",
-        "patient.recall_status": _enum_value(patient.recall_status),
-        "patient.recall_type": patient.recall_type or "",
-        "recall.due_date": patient.recall_due_date.isoformat()
-        if patient.recall_due_date
-        else "",
-        "recall.status": _enum_value(patient.recall_status),
-        "recall.type": patient.recall_type or "",
-        "practice.name": CLINIC_NAME,
-        "practice.address": _build_practice_address(),
-        "practice.address_line1": _practice_line(0),
-        "practice.website": _practice_line(1),
-        "practice.phone": CLINIC_PHONE,
-        "today": date.today().isoformat(),
-    }
+    mapping = {key: resolve(patient) for key, (resolve, _columns) in PATIENT_FIELDS.items()}
+    mapping.update(static_field_values())
+    return mapping
 
 
-def render_template_with_warnings(content: str, patient: Patient) -> tuple[str, list[str]]:
-    mapping = _build_field_map(patient)
-    unknown: set[str] = set()
+def static_field_values(keys: Iterable[str] | None = None) -> dict[str, str]:
+    selected = STATIC_FIELDS if keys is None else [key for key in keys if key in STATIC_FIELDS]
+    return {key: STATIC_FIELDS[key]() for key in selected}
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A template split into literal text and placeholders.
+
+    `literals` has one more entry than `placeholders`; rendering interleaves
+    them. Each placeholder keeps its raw `{{ ... }}` text so unknown fields are
+    left in place, as `render_template_with_warnings` always did.
+    """
+
+    source: str
+    literals: tuple[str, ...]
+    placeholders: tuple[tuple[str, str], ...]
+    patient_fields: frozenset[str]
+    static_fields: frozenset[str]
+    unknown_fields: tuple[str, ...]
+
+    @property
+    def patient_columns(self) -> tuple[str, ...]:
+        columns: set[str] = set()
+        for key in self.patient_fields:
+            columns.update(PATIENT_FIELDS[key][1])
+        return tuple(sorted(columns))
+
+    def render(self, patient: Patient, static_values: dict[str, str] | None = None) -> str:
+        if not self.placeholders:
+            return self.source
+        if static_values is None:
+            static_values = static_field_values(self.static_fields)
+        values = {key: PATIENT_FIELDS[key][0](patient) for key in self.patient_fields}
+        values.update(static_values)
+        parts = [self.literals[0]]
+        for (key, raw), literal in zip(self.placeholders, self.literals[1:]):
+            parts.append(values.get(key, raw))
+            parts.append(literal)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=COMPILED_TEMPLATE_CACHE_SIZE)
+def compile_template(content: str) -> CompiledTemplate:
+    literals: list[str] = []
+    placeholders: list[tuple[str, str]] = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(content):
+        literals.append(content[position : match.start()])
+        placeholders.append((match.group(1).strip(), match.group(0)))
+        position = match.end()
+    literals.append(content[position:])
+    keys = {key for key, _raw in placeholders}
+    return CompiledTemplate(
+        source=content,
+        literals=tuple(literals),
+        placeholders=tuple(placeholders),
+        patient_fields=frozenset(keys & PATIENT_FIELDS.keys()),
+        static_fields=frozenset(keys & STATIC_FIELDS.keys()),
+        unknown_fields=tuple(sorted(keys - PATIENT_FIELDS.keys() - STATIC_FIELDS.keys())),
+    )
+
+
+class _TemplateCache:
+    """Compiled document templates keyed by template id and `updated_at`.
 
-    def replace(match: re.Match[str]) -> str:
-        key = match.group(1).strip()
-        value = mapping.get(key)
-        if value is None:
-            unknown.add(key)
-            return match.group(0)
-        return value
+    One entry per template: an edit bumps `updated_at`, so the next lookup
+    recompiles and replaces the stale entry.
+    """
 
-    rendered = PLACEHOLDER_PATTERN.sub(replace, content)
-    return rendered, sorted(unknown)
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[datetime | None, CompiledTemplate]] = OrderedDict()
+
+    def get(self, template: DocumentTemplate) -> CompiledTemplate:
+        with self._lock:
+            entry = self._entries.get(template.id)
+            if entry is not None:
+                version, compiled = entry
+                # The content check covers edits not yet flushed (same updated_at).
+                if version == template.updated_at and compiled.source == template.content:
+                    self._entries.move_to_end(template.id)
+                    return compiled
+        compiled = compile_template(template.content)
+        with self._lock:
+            self._entries[template.id] = (template.updated_at, compiled)
+            self._entries.move_to_end(template.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_template_cache = _TemplateCache(COMPILED_TEMPLATE_CACHE_SIZE)
+
+
+def compile_document_template(template: DocumentTemplate) -> CompiledTemplate:
+    if template.id is None:
+        return compile_template(template.content)
+    return _template_cache.get(template)
+
+
+def render_compiled_with_warnings(
+    compiled: CompiledTemplate, patient: Patient
+) -> tuple[str, list[str]]:
+    return compiled.render(patient), list(compiled.unknown_fields)
+
+
+def render_template_with_warnings(content: str, patient: Patient) -> tuple[str, list[str]]:
+    return render_compiled_with_warnings(compile_template(content), patient)
 
 
 def render_template(content: str, patient: Patient) -> str:
     rendered, _unknown = render_template_with_warnings(content, patient)
     return rendered
+
+
+def _merge_rows(
+    db: Session,
+    content: CompiledTemplate,
+    title: CompiledTemplate,
+    patient_ids: list[int] | None,
+    extra_columns: Iterable[str] = (),
+) -> Iterator[tuple[Patient, str, str]]:
+    """Yield (patient, title, content) for each patient, in patient id order.
+
+    Patients are read through a server-side cursor and only the columns the
+    templates reference are loaded; practice fields and today's date are
+    resolved once for the whole run.
+    """
+    columns = sorted({"id", *content.patient_columns, *title.patient_columns, *extra_columns})
+    static_values = static_field_values({*content.static_fields, *title.static_fields})
+    stmt = (
+        select(Patient)
+        .options(load_only(*(getattr(Patient, name) for name in columns), raiseload=True))
+        .where(Patient.deleted_at.is_(None))
+        .order_by(Patient.id)
+        .execution_options(yield_per=MAIL_MERGE_FETCH_SIZE)
+    )
+    if patient_ids is not None:
+        stmt = stmt.where(Patient.id.in_(patient_ids))
+    for patient in db.scalars(stmt):
+        yield patient, title.render(patient, static_values), content.render(patient, static_values)
+
+
+def iter_mail_merge(
+    db: Session,
+    content: CompiledTemplate,
+    title: CompiledTemplate,
+    patient_ids: list[int] | None = None,
+) -> Iterator[bytes]:
+    """Render one template for many patients as NDJSON lines, one per patient."""
+    for patient, rendered_title, rendered in _merge_rows(db, content, title, patient_ids):
+        line = {"patient_id": patient.id, "title": rendered_title, "content": rendered}
+        yield (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_mail_merge_pdf(
+    db: Session,
+    content: CompiledTemplate,
+    title: CompiledTemplate,
+    patient_ids: list[int] | None,
+    profile: dict[str, str | None],
+    stream: BinaryIO,
+) -> int:
+    """Render every letter into one PDF, sharing the letterhead across pages."""
+    writer = PdfBatchWriter(stream)
+    for patient, rendered_title, rendered in _merge_rows(
+        db, content, title, patient_ids, extra_columns=("first_name", "last_name")
+    ):
+        writer.add(
+            partial(
+                draw_patient_document,
+                patient=patient,
+                title=rendered_title,
+                rendered_text=rendered,
+                profile=profile,
+            ),
+            title=rendered_title,
+        )
+    writer.finish()
+    return writer.documents
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-from io import BytesIO
-
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Table, TableStyle
 
 from app.models.estimate import Estimate, EstimateFeeType
 from app.models.patient import PatientCategory
-from app.services.pdf import CLINIC_ADDRESS_LINES, CLINIC_NAME, CLINIC_PHONE
+from app.services.pdf_core import (
+    clinic_letterhead,
+    draw_rule,
+    draw_title,
+    format_gbp,
+    render_pdf,
+)
 
 CATEGORY_LABELS = {
     PatientCategory.clinic_private: "Clinic (Private)",
@@ -28,23 +31,10 @@ DISCLAIMER_TEXT = {
 }
 
 
-def _format_gbp(pence: int) -> str:
-    return f"£{pence / 100:.2f}"
-
-
 def _draw_header(pdf: canvas.Canvas, title: str) -> None:
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(20 * mm, 280 * mm, CLINIC_NAME)
-    pdf.setFont("Helvetica", 10)
-    y = 274 * mm
-    for line in CLINIC_ADDRESS_LINES:
-        pdf.drawString(20 * mm, y, line)
-        y -= 4 * mm
-    pdf.drawString(20 * mm, y, CLINIC_PHONE)
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawRightString(190 * mm, 280 * mm, title)
-    pdf.setStrokeColor(colors.lightgrey)
-    pdf.line(20 * mm, 258 * mm, 190 * mm, 258 * mm)
+    clinic_letterhead().draw(pdf)
+    draw_title(pdf, title)
+    draw_rule(pdf, 258 * mm)
 
 
 def _draw_patient_block(pdf: canvas.Canvas, estimate: Estimate) -> None:
@@ -91,12 +81,12 @@ def _draw_items_table(pdf: canvas.Canvas, estimate: Estimate) -> float:
         if item.fee_type == EstimateFeeType.range:
             min_unit = item.min_unit_amount_pence or 0
             max_unit = item.max_unit_amount_pence or 0
-            unit = f"{_format_gbp(min_unit)} - {_format_gbp(max_unit)}"
-            total = f"{_format_gbp(min_unit * qty)} - {_format_gbp(max_unit * qty)}"
+            unit = f"{format_gbp(min_unit)} - {format_gbp(max_unit)}"
+            total = f"{format_gbp(min_unit * qty)} - {format_gbp(max_unit * qty)}"
         else:
             unit_amount = item.unit_amount_pence or 0
-            unit = _format_gbp(unit_amount)
-            total = _format_gbp(unit_amount * qty)
+            unit = format_gbp(unit_amount)
+            total = format_gbp(unit_amount * qty)
         data.append([item.description, str(qty), unit, total])
 
     table = Table(data, colWidths=[95 * mm, 15 * mm, 35 * mm, 25 * mm])
@@ -138,9 +128,9 @@ def _draw_totals(pdf: canvas.Canvas, estimate: Estimate, y: float) -> None:
     pdf.setFont("Helvetica-Bold", 11)
     pdf.drawRightString(170 * mm, y, "Total")
     if has_range:
-        total_text = f"{_format_gbp(min_total)} - {_format_gbp(max_total)}"
+        total_text = f"{format_gbp(min_total)} - {format_gbp(max_total)}"
     else:
-        total_text = _format_gbp(min_total)
+        total_text = format_gbp(min_total)
     pdf.drawRightString(190 * mm, y, total_text)
 
 
@@ -165,9 +155,7 @@ def _draw_disclaimer(pdf: canvas.Canvas, estimate: Estimate, y: float) -> None:
     pdf.drawString(20 * mm, y - 10, disclaimer)
 
 
-def build_estimate_pdf(estimate: Estimate) -> bytes:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
+def draw_estimate(pdf: canvas.Canvas, estimate: Estimate) -> None:
     _draw_header(pdf, "Estimate")
     _draw_patient_block(pdf, estimate)
     _draw_estimate_meta(pdf, estimate)
@@ -176,5 +164,7 @@ def build_estimate_pdf(estimate: Estimate) -> bytes:
     next_y = _draw_notes(pdf, estimate, 100 * mm)
     _draw_disclaimer(pdf, estimate, next_y)
     pdf.showPage()
-    pdf.save()
-    return buffer.getvalue()
+
+
+def build_estimate_pdf(estimate: Estimate) -> bytes:
+    return render_pdf(lambda pdf: draw_estimate(pdf, estimate))
@@ -0,0 +1,444 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import zipfile
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.finance_report_cache import FinanceDayFragment, FinanceMonthPack
+from app.models.ledger import LedgerEntryType, PatientLedgerEntry
+from app.models.patient import Patient
+from app.schemas.reports_finance import (
+    CashupDailyOut,
+    FinanceOutstandingDebtorOut,
+    FinanceOutstandingOut,
+)
+from app.services.finance_reports_pdf import build_month_pack_pdf
+from app.services.practice_profile import load_profile
+
+# Bump when the PDF layout or CSV columns change so stored packs are rebuilt.
+MONTH_PACK_VERSION = 1
+MONTH_PACK_FORMATS = ("pdf", "zip")
+PAYMENT_METHODS = ["cash", "card", "bank_transfer", "other"]
+TOP_DEBTORS = 10
+
+CASHUP_FRAGMENT = "cashup"
+BALANCES_FRAGMENT = "balances"
+
+
+@dataclass
+class MonthPackData:
+    totals_by_method: dict[str, int]
+    total_pence: int
+    daily: list[CashupDailyOut]
+    outstanding: FinanceOutstandingOut
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _day_end(day: date) -> datetime:
+    return datetime.combine(day, time.max, tzinfo=timezone.utc)
+
+
+def _digest(parts: list[object]) -> str:
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ledger_watermark(db: Session) -> int:
+    """Highest ledger entry id; read before aggregating so a racing insert only looks newer."""
+    return int(db.scalar(select(func.coalesce(func.max(PatientLedgerEntry.id), 0))) or 0)
+
+
+def _ledger_moved(db: Session, watermark: int, *, until: datetime) -> bool:
+    # Entries are append-only (corrections are new adjustment entries), so
+    # anything that changes a closed period has an id above the watermark.
+    return (
+        db.scalar(
+            select(PatientLedgerEntry.id)
+            .where(PatientLedgerEntry.id > watermark)
+            .where(PatientLedgerEntry.created_at <= until)
+            .limit(1)
+        )
+        is not None
+    )
+
+
+def _cashup_by_day(db: Session, start: date, end: date) -> dict[date, dict[str, int]]:
+    stmt = (
+        select(
+            func.date(PatientLedgerEntry.created_at).label("day"),
+            PatientLedgerEntry.method,
+            func.coalesce(func.sum(func.abs(PatientLedgerEntry.amount_pence)), 0).label(
+                "total_pence"
+            ),
+        )
+        .where(PatientLedgerEntry.entry_type == LedgerEntryType.payment)
+        .where(
+            PatientLedgerEntry.created_at >= _day_start(start),
+            PatientLedgerEntry.created_at <= _day_end(end),
+        )
+        .group_by(func.date(PatientLedgerEntry.created_at), PatientLedgerEntry.method)
+    )
+    totals_by_day: dict[date, dict[str, int]] = {}
+    for day, method, total in db.execute(stmt).all():
+        method_key = method.value if method else "other"
+        totals_by_day.setdefault(day, {})[method_key] = int(total)
+    return totals_by_day
+
+
+def _cashup_summary(
+    totals_by_day: dict[date, dict[str, int]],
+) -> tuple[dict[str, int], int, list[CashupDailyOut]]:
+    totals_by_method: dict[str, int] = {}
+    total_pence = 0
+    daily: list[CashupDailyOut] = []
+    for day in sorted(totals_by_day):
+        day_totals = totals_by_day[day]
+        if not day_totals:
+            continue
+        for method_key, total in day_totals.items():
+            totals_by_method[method_key] = totals_by_method.get(method_key, 0) + total
+        total_pence += sum(day_totals.values())
+        daily.append(
+            CashupDailyOut(
+                date=day,
+                total_pence=sum(day_totals.values()),
+                totals_by_method=day_totals,
+            )
+        )
+    return totals_by_method, total_pence, daily
+
+
+def _outstanding_snapshot(db: Session, *, target: date) -> FinanceOutstandingOut:
+    balances = (
+        select(
+            PatientLedgerEntry.patient_id.label("patient_id"),
+            func.coalesce(func.sum(PatientLedgerEntry.amount_pence), 0).label("balance_pence"),
+        )
+        .where(PatientLedgerEntry.created_at <= _day_end(target))
+        .group_by(PatientLedgerEntry.patient_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Patient.id,
+            Patient.first_name,
+            Patient.last_name,
+            balances.c.balance_pence,
+        )
+        .join(balances, balances.c.patient_id == Patient.id)
+        .where(Patient.deleted_at.is_(None))
+        .where(balances.c.balance_pence > 0)
+        .order_by(balances.c.balance_pence.desc(), Patient.id)
+    ).all()
+    return FinanceOutstandingOut(
+        as_of=target,
+        total_outstanding_pence=sum(row.balance_pence for row in rows),
+        count_patients_with_balance=len(rows),
+        top_debtors=[
+            FinanceOutstandingDebtorOut(
+                patient_id=row.id,
+                patient_name=f"{row.last_name.upper()}, {row.first_name}",
+                balance_pence=row.balance_pence,
+            )
+            for row in rows[:TOP_DEBTORS]
+        ],
+    )
+
+
+def _balances(
+    db: Session, *, until: datetime, after: datetime | None = None
+) -> dict[int, int]:
+    stmt = (
+        select(PatientLedgerEntry.patient_id, func.sum(PatientLedgerEntry.amount_pence))
+        .where(PatientLedgerEntry.created_at <= until)
+        .group_by(PatientLedgerEntry.patient_id)
+    )
+    if after is not None:
+        stmt = stmt.where(PatientLedgerEntry.created_at > after)
+    return {patient_id: int(total) for patient_id, total in db.execute(stmt) if total}
+
+
+def _outstanding_from_balances(
+    db: Session, *, target: date, balances: dict[int, int]
+) -> FinanceOutstandingOut:
+    archived = set(db.scalars(select(Patient.id).where(Patient.deleted_at.is_not(None))))
+    owing = sorted(
+        (
+            (patient_id, balance)
+            for patient_id, balance in balances.items()
+            if balance > 0 and patient_id not in archived
+        ),
+        key=lambda item: (-item[1], item[0]),
+    )
+    top = owing[:TOP_DEBTORS]
+    names = {
+        row.id: f"{row.last_name.upper()}, {row.first_name}"
+        for row in db.execute(
+            select(Patient.id, Patient.first_name, Patient.last_name).where(
+                Patient.id.in_([patient_id for patient_id, _ in top])
+            )
+        )
+    }
+    return FinanceOutstandingOut(
+        as_of=target,
+        total_outstanding_pence=sum(balance for _, balance in owing),
+        count_patients_with_balance=len(owing),
+        top_debtors=[
+            FinanceOutstandingDebtorOut(
+                patient_id=patient_id,
+                patient_name=names[patient_id],
+                balance_pence=balance,
+            )
+            for patient_id, balance in top
+        ],
+    )
+
+
+def _store_fragments(
+    db: Session, kind: str, payloads: dict[date, dict], watermark: int
+) -> None:
+    stmt = pg_insert(FinanceDayFragment).values(
+        [
+            {"kind": kind, "day": day, "payload": payload, "ledger_watermark": watermark}
+            for day, payload in sorted(payloads.items())
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FinanceDayFragment.kind, FinanceDayFragment.day],
+        set_={
+            "payload": stmt.excluded.payload,
+            "ledger_watermark": stmt.excluded.ledger_watermark,
+            "built_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def _cashup_fragments(db: Session, start: date, end: date) -> dict[date, dict[str, int]]:
+    """Method totals for each closed day in [start, end], recounting only days that moved."""
+    stored = {
+        day: (payload, watermark)
+        for day, payload, watermark in db.execute(
+            select(
+                FinanceDayFragment.day,
+                FinanceDayFragment.payload,
+                FinanceDayFragment.ledger_watermark,
+            )
+            .where(FinanceDayFragment.kind == CASHUP_FRAGMENT)
+            .where(FinanceDayFragment.day.between(start, end))
+        )
+    }
+    stale = {
+        start + timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+        if start + timedelta(days=offset) not in stored
+    }
+    if stored:
+        floor = min(watermark for _, watermark in stored.values())
+        moved = db.execute(
+            select(func.date(PatientLedgerEntry.created_at), func.max(PatientLedgerEntry.id))
+            .where(PatientLedgerEntry.id > floor)
+            .where(PatientLedgerEntry.entry_type == LedgerEntryType.payment)
+            .where(
+                PatientLedgerEntry.created_at >= _day_start(start),
+                PatientLedgerEntry.created_at <= _day_end(end),
+            )
+            .group_by(func.date(PatientLedgerEntry.created_at))
+        )
+        stale.update(
+            day for day, max_id in moved if day in stored and max_id > stored[day][1]
+        )
+    totals_by_day = {day: payload for day, (payload, _) in stored.items() if day not in stale}
+    if stale:
+        watermark = ledger_watermark(db)
+        recounted = _cashup_by_day(db, min(stale), max(stale))
+        fresh = {day: recounted.get(day, {}) for day in stale}
+        _store_fragments(db, CASHUP_FRAGMENT, fresh, watermark)
+        totals_by_day.update(fresh)
+    return totals_by_day
+
+
+def _balances_fragment(db: Session, day: date) -> dict[int, int]:
+    """Every patient's ledger balance at the end of closed `day`."""
+    stored = db.execute(
+        select(FinanceDayFragment.payload, FinanceDayFragment.ledger_watermark)
+        .where(FinanceDayFragment.kind == BALANCES_FRAGMENT)
+        .where(FinanceDayFragment.day == day)
+    ).first()
+    if stored is not None and not _ledger_moved(db, stored.ledger_watermark, until=_day_end(day)):
+        return {int(patient_id): balance for patient_id, balance in stored.payload.items()}
+    watermark = ledger_watermark(db)
+    balances = _balances(db, until=_day_end(day))
+    _store_fragments(
+        db,
+        BALANCES_FRAGMENT,
+        {day: {str(patient_id): balance for patient_id, balance in balances.items()}},
+        watermark,
+    )
+    # Only the latest closed day is ever read again.
+    db.execute(
+        delete(FinanceDayFragment)
+        .where(FinanceDayFragment.kind == BALANCES_FRAGMENT)
+        .where(FinanceDayFragment.day < day)
+    )
+    return balances
+
+
+def month_pack_data(db: Session, *, start: date, end: date) -> MonthPackData:
+    """Cash-up and outstanding figures for a month, straight from the ledger."""
+    totals_by_method, total_pence, daily = _cashup_summary(_cashup_by_day(db, start, end))
+    return MonthPackData(
+        totals_by_method=totals_by_method,
+        total_pence=total_pence,
+        daily=daily,
+        outstanding=_outstanding_snapshot(db, target=end),
+    )
+
+
+def _open_month_data(db: Session, *, start: date, end: date, today: date) -> MonthPackData:
+    """Same figures for the current month: closed-day fragments plus today's live tail."""
+    yesterday = today - timedelta(days=1)
+    totals_by_day = _cashup_fragments(db, start, yesterday) if start <= yesterday else {}
+    totals_by_day.update(_cashup_by_day(db, today, end))
+    totals_by_method, total_pence, daily = _cashup_summary(totals_by_day)
+
+    balances = _balances_fragment(db, yesterday)
+    tail = _balances(db, until=_day_end(end), after=_day_end(yesterday))
+    for patient_id, delta in tail.items():
+        balances[patient_id] = balances.get(patient_id, 0) + delta
+    return MonthPackData(
+        totals_by_method=totals_by_method,
+        total_pence=total_pence,
+        daily=daily,
+        outstanding=_outstanding_from_balances(db, target=end, balances=balances),
+    )
+
+
+def _render(
+    fmt: str, *, period_start: date, data: MonthPackData, profile: dict | None
+) -> bytes:
+    if fmt == "pdf":
+        return build_month_pack_pdf(
+            profile=profile,
+            period_label=period_start.strftime("%B %Y"),
+            totals_by_method=data.totals_by_method,
+            total_pence=data.total_pence,
+            daily_rows=[(row.date.isoformat(), row.total_pence) for row in data.daily],
+            outstanding_total_pence=data.outstanding.total_outstanding_pence,
+            top_debtors=[(d.patient_name, d.balance_pence) for d in data.outstanding.top_debtors],
+            notes=[
+                "Cash-up totals use ledger payment entries.",
+                "Outstanding balances use ledger entries up to month end.",
+            ],
+        )
+
+    cashup_rows = [["Date", "Total", "Cash", "Card", "Bank transfer", "Other"]]
+    for row in data.daily:
+        cashup_rows.append(
+            [row.date.isoformat(), str(row.total_pence)]
+            + [str(row.totals_by_method.get(method, 0)) for method in PAYMENT_METHODS]
+        )
+    method_rows = [["Method", "Total_pence"]]
+    for method in PAYMENT_METHODS:
+        method_rows.append([method, str(data.totals_by_method.get(method, 0))])
+    debtor_rows = [["Patient", "Balance_pence"]]
+    for debtor in data.outstanding.top_debtors:
+        debtor_rows.append([debtor.patient_name, str(debtor.balance_pence)])
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for name, rows in (
+            ("cashup_daily.csv", cashup_rows),
+            ("cashup_by_method.csv", method_rows),
+            ("top_debtors.csv", debtor_rows),
+        ):
+            csv_buffer = io.StringIO()
+            csv.writer(csv_buffer).writerows(rows)
+            zipf.writestr(name, csv_buffer.getvalue())
+    return buffer.getvalue()
+
+
+def load_month_pack(db: Session, *, year: int, month: int, fmt: str) -> bytes:
+    """Return the month pack, serving closed months from their stored artifact.
+
+    Closed months are rebuilt only when a ledger entry dated inside the period
+    (or before it, for balances) has arrived since the pack was built, or when
+    the renderer or practice letterhead changed. Writes happen in the caller's
+    transaction.
+    """
+    period_start = date(year, month, 1)
+    period_end = date(year, month, monthrange(year, month)[1])
+    today = datetime.now(timezone.utc).date()
+    profile = load_profile(db) if fmt == "pdf" else None
+
+    if period_end >= today:
+        if period_start <= today:
+            data = _open_month_data(db, start=period_start, end=period_end, today=today)
+        else:
+            data = month_pack_data(db, start=period_start, end=period_end)
+        return _render(fmt, period_start=period_start, data=data, profile=profile)
+
+    render_digest = _digest([MONTH_PACK_VERSION, fmt, profile])
+    stored = db.execute(
+        select(FinanceMonthPack.content, FinanceMonthPack.ledger_watermark)
+        .where(FinanceMonthPack.period_start == period_start)
+        .where(FinanceMonthPack.format == fmt)
+        .where(FinanceMonthPack.render_digest == render_digest)
+    ).first()
+    if stored is not None and not _ledger_moved(
+        db, stored.ledger_watermark, until=_day_end(period_end)
+    ):
+        return stored.content
+
+    watermark = ledger_watermark(db)
+    data = month_pack_data(db, start=period_start, end=period_end)
+    content = _render(fmt, period_start=period_start, data=data, profile=profile)
+    stmt = pg_insert(FinanceMonthPack).values(
+        period_start=period_start,
+        format=fmt,
+        ledger_watermark=watermark,
+        render_digest=render_digest,
+        content=content,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FinanceMonthPack.period_start, FinanceMonthPack.format],
+        set_={
+            "ledger_watermark": stmt.excluded.ledger_watermark,
+            "render_digest": stmt.excluded.render_digest,
+            "content": stmt.excluded.content,
+            "built_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+    return content
+
+
+def invalidate_month_packs_for_patient(db: Session, patient_id: int) -> None:
+    """Drop stored packs after a patient with ledger history was archived, restored or renamed.
+
+    Outstanding balances skip archived patients and list debtors by name, which
+    the ledger watermark cannot see. Day fragments hold only ids and amounts.
+    """
+    has_ledger = db.scalar(
+        select(PatientLedgerEntry.id).where(PatientLedgerEntry.patient_id == patient_id).limit(1)
+    )
+    if has_ledger is not None:
+        db.execute(delete(FinanceMonthPack))
+
+
+def purge_finance_report_cache(db: Session) -> None:
+    """Drop stored packs and fragments after ledger rows were deleted or rewritten."""
+    db.execute(delete(FinanceMonthPack))
+    db.execute(delete(FinanceDayFragment))
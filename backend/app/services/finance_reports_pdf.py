@@ -1,54 +1,16 @@
 from __future__ import annotations
 
-from io import BytesIO
 from typing import Iterable
 
-from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 
-
-def _profile_lines(profile: dict[str, str | None]) -> tuple[str, list[str], str]:
-    name = profile.get("name") or "Practice"
-    address_line1 = profile.get("address_line1") or ""
-    address_line2 = profile.get("address_line2") or ""
-    city = profile.get("city") or ""
-    postcode = profile.get("postcode") or ""
-    phone = profile.get("phone") or ""
-    website = profile.get("website") or ""
-    email = profile.get("email") or ""
-
-    lines: list[str] = []
-    for entry in [address_line1, address_line2]:
-        if entry and entry not in lines:
-            lines.append(entry)
-    city_line = " ".join(part for part in [city, postcode] if part)
-    if city_line and city_line not in lines:
-        lines.append(city_line)
-    if website and website not in lines:
-        lines.append(website)
-    if email and email not in lines:
-        lines.append(email)
-
-    return name, lines, phone
+from app.services.pdf_core import draw_title, profile_letterhead, render_pdf
 
 
 def _draw_header(pdf: canvas.Canvas, profile: dict[str, str | None], title: str) -> float:
-    name, lines, phone = _profile_lines(profile)
-    left = 20 * mm
-    y = 280 * mm
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(left, y, name)
-    pdf.setFont("Helvetica", 10)
-    y -= 6 * mm
-    for line in lines:
-        pdf.drawString(left, y, line)
-        y -= 4 * mm
-    if phone:
-        pdf.drawString(left, y, f"Tel: {phone}")
-        y -= 4 * mm
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawRightString(190 * mm, 280 * mm, title)
+    y = profile_letterhead(profile).draw(pdf)
+    draw_title(pdf, title)
     return y - 6 * mm
 
 
@@ -58,7 +20,8 @@ def _draw_line(pdf: canvas.Canvas, left: float, y: float, text: str, bold: bool
     return y - 5 * mm
 
 
-def build_month_pack_pdf(
+def draw_month_pack(
+    pdf: canvas.Canvas,
     *,
     profile: dict[str, str | None],
     period_label: str,
@@ -68,9 +31,7 @@ def build_month_pack_pdf(
     outstanding_total_pence: int,
     top_debtors: Iterable[tuple[str, int]],
     notes: list[str],
-) -> bytes:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
+) -> None:
     left = 20 * mm
     y = _draw_header(pdf, profile, "Monthly finance pack")
 
@@ -102,5 +63,29 @@ def build_month_pack_pdf(
             y = _draw_line(pdf, left, y, f"- {note}")
 
     pdf.showPage()
-    pdf.save()
-    return buffer.getvalue()
+
+
+def build_month_pack_pdf(
+    *,
+    profile: dict[str, str | None],
+    period_label: str,
+    totals_by_method: dict[str, int],
+    total_pence: int,
+    daily_rows: Iterable[tuple[str, int]],
+    outstanding_total_pence: int,
+    top_debtors: Iterable[tuple[str, int]],
+    notes: list[str],
+) -> bytes:
+    return render_pdf(
+        lambda pdf: draw_month_pack(
+            pdf,
+            profile=profile,
+            period_label=period_label,
+            totals_by_method=totals_by_method,
+            total_pence=total_pence,
+            daily_rows=daily_rows,
+            outstanding_total_pence=outstanding_total_pence,
+            top_debtors=top_debtors,
+            notes=notes,
+        )
+    )
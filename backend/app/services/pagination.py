@@ -0,0 +1,148 @@
+"""Keyset ("seek") pagination shared by the list endpoints.
+
+A page is fetched with `WHERE (k1, k2, ..., id) < (:v1, :v2, ..., :id)` in
+the same order as a composite index, so page N reads the same number of
+index entries as page 1, unlike OFFSET which walks every skipped row.
+
+Cursors are opaque to clients: url-safe base64 of a JSON object holding the
+sort key values of the last row of the previous page.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Generic, TypeVar
+
+from fastapi import HTTPException, Response
+from sqlalchemy import literal_column, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Sort sentinels for nullable keys: `coalesce(col, <max>)` orders like
+# `col ASC NULLS LAST` and keeps the key comparable in a row value.
+MAX_SMALLINT = literal_column("32767")
+MAX_INTEGER = literal_column("2147483647")
+MAX_TIMESTAMPTZ = literal_column("'9999-12-31 00:00:00+00'::timestamptz")
+
+T = TypeVar("T")
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    payload = {
+        key: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for key, value in values.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor.") from exc
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return payload
+
+
+def _coerce(value: Any, python_type: type) -> Any:
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type in (int, str):
+        if isinstance(value, (dict, list)) or value is None:
+            raise ValueError("cursor value must be a scalar")
+        return python_type(value)
+    raise ValueError(f"unsupported cursor key type {python_type!r}")
+
+
+@dataclass(frozen=True)
+class Page(Generic[T]):
+    items: list[T]
+    next_cursor: str | None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+class Keyset:
+    """An ordering whose last key is unique, usable as a seek condition.
+
+    Keys are columns or `(name, expression)` pairs; every key must be
+    non-null and sort in the same direction so the page predicate is a
+    single row-value comparison that a matching composite index can serve.
+    """
+
+    def __init__(self, *keys: ColumnElement | tuple[str, ColumnElement], descending: bool = False):
+        if not keys:
+            raise ValueError("Keyset needs at least one key")
+        named: list[tuple[str, ColumnElement]] = []
+        for key in keys:
+            if isinstance(key, tuple):
+                named.append(key)
+            else:
+                named.append((key.key, key))
+        self.keys = tuple(named)
+        self.descending = descending
+
+    def order_by(self) -> list[ColumnElement]:
+        return [expr.desc() if self.descending else expr.asc() for _, expr in self.keys]
+
+    def after(self, cursor: str) -> ColumnElement[bool]:
+        """Condition selecting the rows that follow `cursor` in this ordering."""
+        payload = decode_cursor(cursor)
+        try:
+            values = [_coerce(payload[name], expr.type.python_type) for name, expr in self.keys]
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail="Invalid cursor.") from exc
+        row = tuple_(*(expr for _, expr in self.keys))
+        bound = tuple_(*values)
+        return row < bound if self.descending else row > bound
+
+    def paginate(
+        self,
+        db: Session,
+        stmt: Select,
+        *,
+        limit: int,
+        cursor: str | None = None,
+        offset: int = 0,
+    ) -> Page:
+        """Run a single-entity `stmt` for one page, ordered by this keyset.
+
+        `offset` is still honoured for callers that have not moved to
+        cursors, but cannot be combined with one.
+        """
+        if cursor and offset:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset, not both.")
+        stmt = stmt.add_columns(
+            *(expr.label(f"_keyset_{index}") for index, (_, expr) in enumerate(self.keys))
+        )
+        if cursor:
+            stmt = stmt.where(self.after(cursor))
+        stmt = stmt.order_by(*self.order_by()).limit(limit + 1)
+        if offset:
+            stmt = stmt.offset(offset)
+        rows = db.execute(stmt).all()
+        width = len(self.keys)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                {name: value for (name, _), value in zip(self.keys, last[-width:])}
+            )
+        return Page(items=[row[0] for row in rows], next_cursor=next_cursor)
+
+
+def set_next_cursor(response: Response, page: Page) -> None:
+    """Expose the next cursor on endpoints whose body is a bare list."""
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
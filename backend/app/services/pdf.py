@@ -1,41 +1,26 @@
 from __future__ import annotations
 
-from io import BytesIO
 from typing import Iterable
 
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from reportlab.platypus import Table, TableStyle
 
 from app.models.invoice import Invoice, Payment
-
-CLINIC_NAME = "Clinic for Implant & Orthodontic Dentistry"
-CLINIC_ADDRESS_LINES = [
-    "7 Chapel Road, Worthing, West Sussex BN11 1EG",
-    "dental-worthing.co.uk",
-]
-CLINIC_PHONE = "Tel: 01903 821822"
-
-
-def _format_gbp(pence: int) -> str:
-    return f"£{pence / 100:.2f}"
+from app.services.pdf_core import (
+    clinic_letterhead,
+    draw_rule,
+    draw_title,
+    format_gbp,
+    render_pdf,
+)
 
 
 def _draw_header(pdf: canvas.Canvas, title: str) -> None:
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(20 * mm, 280 * mm, CLINIC_NAME)
-    pdf.setFont("Helvetica", 10)
-    y = 274 * mm
-    for line in CLINIC_ADDRESS_LINES:
-        pdf.drawString(20 * mm, y, line)
-        y -= 4 * mm
-    pdf.drawString(20 * mm, y, CLINIC_PHONE)
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawRightString(190 * mm, 280 * mm, title)
-    pdf.setStrokeColor(colors.lightgrey)
-    pdf.line(20 * mm, 258 * mm, 190 * mm, 258 * mm)
+    clinic_letterhead().draw(pdf)
+    draw_title(pdf, title)
+    draw_rule(pdf, 258 * mm)
 
 
 def _draw_patient_block(pdf: canvas.Canvas, invoice: Invoice) -> None:
@@ -73,8 +58,8 @@ def _draw_lines_table(pdf: canvas.Canvas, invoice: Invoice) -> float:
             [
                 line.description,
                 str(line.quantity),
-                _format_gbp(line.unit_price_pence),
-                _format_gbp(line.line_total_pence),
+                format_gbp(line.unit_price_pence),
+                format_gbp(line.line_total_pence),
             ]
         )
     table = Table(data, colWidths=[95 * mm, 15 * mm, 25 * mm, 25 * mm])
@@ -99,17 +84,17 @@ def _draw_totals(pdf: canvas.Canvas, invoice: Invoice, y: float) -> None:
     balance = invoice.balance_pence
     pdf.setFont("Helvetica-Bold", 10)
     pdf.drawRightString(170 * mm, y, "Subtotal")
-    pdf.drawRightString(190 * mm, y, _format_gbp(invoice.subtotal_pence))
+    pdf.drawRightString(190 * mm, y, format_gbp(invoice.subtotal_pence))
     pdf.drawRightString(170 * mm, y - 12, "Discount")
-    pdf.drawRightString(190 * mm, y - 12, _format_gbp(invoice.discount_pence))
+    pdf.drawRightString(190 * mm, y - 12, format_gbp(invoice.discount_pence))
     pdf.drawRightString(170 * mm, y - 24, "Total")
-    pdf.drawRightString(190 * mm, y - 24, _format_gbp(invoice.total_pence))
+    pdf.drawRightString(190 * mm, y - 24, format_gbp(invoice.total_pence))
     pdf.setFont("Helvetica", 10)
     pdf.drawRightString(170 * mm, y - 40, "Paid")
-    pdf.drawRightString(190 * mm, y - 40, _format_gbp(paid))
+    pdf.drawRightString(190 * mm, y - 40, format_gbp(paid))
     pdf.setFont("Helvetica-Bold", 11)
     pdf.drawRightString(170 * mm, y - 56, "Balance")
-    pdf.drawRightString(190 * mm, y - 56, _format_gbp(balance))
+    pdf.drawRightString(190 * mm, y - 56, format_gbp(balance))
 
 
 def _draw_payments(pdf: canvas.Canvas, payments: Iterable[Payment], y: float) -> None:
@@ -122,7 +107,7 @@ def _draw_payments(pdf: canvas.Canvas, payments: Iterable[Payment], y: float) ->
         return
     for payment in payments:
         paid_at = payment.paid_at.strftime("%Y-%m-%d")
-        line = f"{paid_at} • {_format_gbp(payment.amount_pence)} • {payment.method.value}"
+        line = f"{paid_at} • {format_gbp(payment.amount_pence)} • {payment.method.value}"
         if payment.reference:
             line = f"{line} • {payment.reference}"
         pdf.drawString(20 * mm, y, line)
@@ -139,9 +124,7 @@ def _draw_void_watermark(pdf: canvas.Canvas) -> None:
     pdf.restoreState()
 
 
-def build_invoice_pdf(invoice: Invoice) -> bytes:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
+def draw_invoice(pdf: canvas.Canvas, invoice: Invoice) -> None:
     _draw_header(pdf, "Invoice")
     _draw_patient_block(pdf, invoice)
     _draw_invoice_meta(pdf, invoice)
@@ -151,26 +134,15 @@ def build_invoice_pdf(invoice: Invoice) -> bytes:
     if invoice.status.value == "void":
         _draw_void_watermark(pdf)
     pdf.showPage()
-    pdf.save()
-    return buffer.getvalue()
 
 
-def build_payment_receipt(payment: Payment) -> bytes:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
+def build_invoice_pdf(invoice: Invoice) -> bytes:
+    return render_pdf(lambda pdf: draw_invoice(pdf, invoice))
+
+
+def draw_payment_receipt(pdf: canvas.Canvas, payment: Payment) -> None:
     invoice = payment.invoice
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(20 * mm, 280 * mm, CLINIC_NAME)
-    pdf.setFont("Helvetica", 10)
-    y = 274 * mm
-    for line in CLINIC_ADDRESS_LINES:
-        pdf.drawString(20 * mm, y, line)
-        y -= 4 * mm
-    pdf.drawString(20 * mm, y, CLINIC_PHONE)
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawRightString(190 * mm, 280 * mm, "Payment receipt")
-    pdf.setStrokeColor(colors.lightgrey)
-    pdf.line(20 * mm, 258 * mm, 190 * mm, 258 * mm)
+    _draw_header(pdf, "Payment receipt")
 
     patient = invoice.patient
     pdf.setFont("Helvetica-Bold", 11)
@@ -191,9 +163,11 @@ def build_payment_receipt(payment: Payment) -> bytes:
         pdf.drawString(120 * mm, 230 * mm, f"Reference: {payment.reference}")
 
     pdf.setFont("Helvetica-Bold", 18)
-    pdf.drawString(20 * mm, 205 * mm, f"Amount received: {_format_gbp(payment.amount_pence)}")
+    pdf.drawString(20 * mm, 205 * mm, f"Amount received: {format_gbp(payment.amount_pence)}")
     pdf.setFont("Helvetica", 10)
-    pdf.drawString(20 * mm, 190 * mm, f"Balance remaining: {_format_gbp(invoice.balance_pence)}")
+    pdf.drawString(20 * mm, 190 * mm, f"Balance remaining: {format_gbp(invoice.balance_pence)}")
     pdf.showPage()
-    pdf.save()
-    return buffer.getvalue()
+
+
+def build_payment_receipt(payment: Payment) -> bytes:
+    return render_pdf(lambda pdf: draw_payment_receipt(pdf, payment))
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import enum
+import hashlib
+import json
+import logging
+from datetime import date, datetime
+from typing import Callable
+
+from sqlalchemy import inspect
+
+from app.services import storage
+
+logger = logging.getLogger("dental_pms.pdf_cache")
+
+PDF_CACHE_PREFIX = "pdf-cache"
+# Bump when a renderer's layout changes so previously cached files are ignored.
+PDF_RENDER_VERSION = 1
+
+
+def _json_default(value: object) -> object:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return str(value)
+
+
+def row_fingerprint(row: object | None) -> dict[str, object] | None:
+    """Column values of an ORM row, which change whenever the row is edited."""
+    if row is None:
+        return None
+    mapper = inspect(row).mapper
+    return {attr.key: getattr(row, attr.key) for attr in mapper.column_attrs}
+
+
+def pdf_cache_key(kind: str, entity_id: int, *parts: object) -> str:
+    payload = json.dumps(
+        [PDF_RENDER_VERSION, kind, entity_id, *parts],
+        default=_json_default,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"{PDF_CACHE_PREFIX}/{kind}/{entity_id}/{digest}.pdf"
+
+
+def _prune_stale(storage_key: str) -> None:
+    # Older versions of the same entity can never be requested again once an
+    # edit has changed the key, so drop them as soon as the new one is written.
+    directory = storage_key.rsplit("/", 1)[0]
+    for key in storage.list_keys(directory):
+        if key != storage_key:
+            storage.delete_file(key)
+
+
+def cached_pdf(
+    kind: str,
+    entity_id: int,
+    parts: list[object],
+    render: Callable[[], bytes],
+) -> bytes:
+    """Return the PDF for this exact source version, rendering only on a miss.
+
+    Storage failures never block a download; they only cost a re-render.
+    """
+    storage_key = pdf_cache_key(kind, entity_id, *parts)
+    try:
+        cached = storage.read_bytes(storage_key)
+    except OSError:
+        logger.warning("pdf_cache read failed key=%s", storage_key, exc_info=True)
+        cached = None
+    if cached is not None:
+        return cached
+    content = render()
+    try:
+        storage.write_bytes(storage_key, content)
+        _prune_stale(storage_key)
+    except OSError:
+        logger.warning("pdf_cache write failed key=%s", storage_key, exc_info=True)
+    return content
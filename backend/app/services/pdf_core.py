@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from io import BytesIO
+from textwrap import wrap
+from typing import BinaryIO, Callable, Iterable
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+CLINIC_NAME = "Clinic for Implant & Orthodontic Dentistry"
+CLINIC_ADDRESS_LINES = [
+    "7 Chapel Road, Worthing, West Sussex BN11 1EG",
+    "dental-worthing.co.uk",
+]
+CLINIC_PHONE = "Tel: 01903 821822"
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+LEFT = 20 * mm
+RIGHT = 190 * mm
+HEADER_TOP = 280 * mm
+PAGE_TOP = PAGE_HEIGHT - 20 * mm
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+Draw = Callable[[canvas.Canvas], None]
+
+_SAVE_LOCK = threading.Lock()
+
+
+def format_gbp(pence: int) -> str:
+    return f"£{pence / 100:.2f}"
+
+
+class BinaryStreamCanvas(canvas.Canvas):
+    """Canvas that writes compressed streams as raw binary instead of ASCII85 (~20% smaller).
+
+    ReportLab only reads this from the global `rl_config.useA85`, and does so
+    while formatting the document, so it is switched off just for this save.
+    """
+
+    def save(self) -> None:
+        with _SAVE_LOCK:
+            previous = rl_config.useA85
+            rl_config.useA85 = 0
+            try:
+                super().save()
+            finally:
+                rl_config.useA85 = previous
+
+
+def new_canvas(stream: BinaryIO) -> canvas.Canvas:
+    return BinaryStreamCanvas(stream, pagesize=A4, pageCompression=1)
+
+
+def use_form(pdf: canvas.Canvas, name: str, draw: Draw) -> None:
+    """Draw a fixed block, as a form XObject once the document repeats it.
+
+    The first use draws inline, so single-page documents carry no form
+    overhead. From the second use on the block is stored once in the PDF and
+    each page only references it (one operator instead of the full drawing).
+    """
+    if not pdf.hasForm(name):
+        drawn = pdf.__dict__.setdefault("_inline_forms", set())
+        if name not in drawn:
+            drawn.add(name)
+            pdf.saveState()
+            draw(pdf)
+            pdf.restoreState()
+            return
+        pdf.beginForm(name)
+        draw(pdf)
+        pdf.endForm()
+    pdf.doForm(name)
+
+
+@dataclass(frozen=True)
+class Letterhead:
+    """Practice name with the address/contact lines below it, 4mm apart."""
+
+    name: str
+    lines: tuple[str, ...]
+    top: float = HEADER_TOP
+
+    @property
+    def form_name(self) -> str:
+        return "lh" + hashlib.sha1(repr(self).encode("utf-8")).hexdigest()[:10]
+
+    @property
+    def bottom(self) -> float:
+        """Baseline just below the last line, where the old inline headers stopped."""
+        return self.top - 6 * mm - 4 * mm * len(self.lines)
+
+    def _draw(self, pdf: canvas.Canvas) -> None:
+        pdf.setFont(FONT_BOLD, 16)
+        pdf.drawString(LEFT, self.top, self.name)
+        pdf.setFont(FONT, 10)
+        y = self.top - 6 * mm
+        for line in self.lines:
+            pdf.drawString(LEFT, y, line)
+            y -= 4 * mm
+
+    def draw(self, pdf: canvas.Canvas) -> float:
+        use_form(pdf, self.form_name, self._draw)
+        return self.bottom
+
+
+@dataclass(frozen=True)
+class Footer:
+    """A fixed line of small text at the foot of every page."""
+
+    text: str
+    y: float = 12 * mm
+    size: int = 9
+
+    @property
+    def form_name(self) -> str:
+        return "ft" + hashlib.sha1(repr(self).encode("utf-8")).hexdigest()[:10]
+
+    def _draw(self, pdf: canvas.Canvas) -> None:
+        pdf.setFont(FONT, self.size)
+        pdf.drawString(LEFT, self.y, self.text)
+
+    def draw(self, pdf: canvas.Canvas) -> None:
+        use_form(pdf, self.form_name, self._draw)
+
+
+@lru_cache(maxsize=8)
+def clinic_letterhead(top: float = HEADER_TOP) -> Letterhead:
+    return Letterhead(CLINIC_NAME, (*CLINIC_ADDRESS_LINES, CLINIC_PHONE), top)
+
+
+def profile_letterhead(profile: dict[str, str | None], top: float = HEADER_TOP) -> Letterhead:
+    """Letterhead for a practice profile; one instance per profile version."""
+    return _profile_letterhead(tuple(sorted(profile.items())), top)
+
+
+@lru_cache(maxsize=32)
+def _profile_letterhead(items: tuple[tuple[str, str | None], ...], top: float) -> Letterhead:
+    profile = dict(items)
+    lines: list[str] = []
+    for entry in [profile.get("address_line1") or "", profile.get("address_line2") or ""]:
+        if entry and entry not in lines:
+            lines.append(entry)
+    city_line = " ".join(
+        part for part in [profile.get("city") or "", profile.get("postcode") or ""] if part
+    )
+    if city_line and city_line not in lines:
+        lines.append(city_line)
+    for entry in [profile.get("website") or "", profile.get("email") or ""]:
+        if entry and entry not in lines:
+            lines.append(entry)
+    phone = profile.get("phone") or ""
+    if phone:
+        lines.append(f"Tel: {phone}")
+    return Letterhead(profile.get("name") or "Practice", tuple(lines), top)
+
+
+def draw_title(pdf: canvas.Canvas, title: str, subtitle: str | None = None) -> None:
+    pdf.setFont(FONT_BOLD, 14)
+    pdf.drawRightString(RIGHT, HEADER_TOP, title)
+    if subtitle is not None:
+        pdf.setFont(FONT, 10)
+        pdf.drawRightString(RIGHT, HEADER_TOP - 6 * mm, subtitle)
+
+
+def draw_rule(pdf: canvas.Canvas, y: float) -> None:
+    pdf.setStrokeColor(colors.lightgrey)
+    pdf.line(LEFT, y, RIGHT, y)
+
+
+def draw_lines(
+    pdf: canvas.Canvas,
+    lines: Iterable[str],
+    y: float,
+    *,
+    x: float = LEFT,
+    font: str = FONT,
+    size: int = 10,
+    leading: float = 4 * mm,
+) -> float:
+    pdf.setFont(font, size)
+    for line in lines:
+        pdf.drawString(x, y, line)
+        y -= leading
+    return y
+
+
+def wrap_lines(lines: Iterable[str], width: int, **kwargs) -> list[str]:
+    wrapped: list[str] = []
+    for line in lines:
+        wrapped.extend(wrap(line, width=width, **kwargs) or [""])
+    return wrapped
+
+
+def render_pdf(draw: Draw) -> bytes:
+    """Render one document; `draw` must finish its last page with showPage()."""
+    buffer = BytesIO()
+    pdf = new_canvas(buffer)
+    draw(pdf)
+    pdf.save()
+    return buffer.getvalue()
+
+
+class PdfBatchWriter:
+    """Writes many documents into a single PDF.
+
+    Fonts and letterhead/footer forms are emitted once for the whole file
+    rather than once per document, and each document gets an outline entry.
+    Single-document outputs (run sheets, month packs) and the recall letter
+    ZIP, which ships one file per patient, go through render_pdf instead.
+    """
+
+    def __init__(self, stream: BinaryIO | None = None):
+        self._stream = stream
+        self._buffer = stream if stream is not None else BytesIO()
+        self.canvas = new_canvas(self._buffer)
+        self.documents = 0
+
+    def add(self, draw: Draw, title: str | None = None) -> None:
+        self.documents += 1
+        if title:
+            key = f"doc{self.documents}"
+            self.canvas.bookmarkPage(key)
+            self.canvas.addOutlineEntry(title, key, level=0)
+        draw(self.canvas)
+
+    def finish(self) -> bytes | None:
+        """Write the PDF; returns its bytes unless a stream was supplied."""
+        self.canvas.save()
+        if self._stream is None:
+            return self._buffer.getvalue()
+        return None
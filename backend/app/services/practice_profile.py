@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.models.practice_profile import PracticeProfile
-from app.services.pdf import CLINIC_ADDRESS_LINES, CLINIC_NAME, CLINIC_PHONE
+from app.services.pdf_core import CLINIC_ADDRESS_LINES, CLINIC_NAME, CLINIC_PHONE
+from app.services.reference_cache import reference_cache
 
 
 def default_profile() -> dict[str, str | None]:
@@ -24,17 +23,8 @@ def default_profile() -> dict[str, str | None]:
 
 
 def load_profile(db: Session) -> dict[str, str | None]:
-    profile = db.scalar(select(PracticeProfile).limit(1))
+    profile = reference_cache.get(db).profile
     defaults = default_profile()
     if not profile:
         return defaults
-    return {
-        "name": profile.name or defaults["name"],
-        "address_line1": profile.address_line1 or defaults["address_line1"],
-        "address_line2": profile.address_line2 or defaults["address_line2"],
-        "city": profile.city or defaults["city"],
-        "postcode": profile.postcode or defaults["postcode"],
-        "phone": profile.phone or defaults["phone"],
-        "website": profile.website or defaults["website"],
-        "email": profile.email or defaults["email"],
-    }
+    return {field: profile.get(field) or default for field, default in defaults.items()}
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.settings import settings
+from app.db.session import on_pool_wait
+
+logger = logging.getLogger("dental_pms.query_profile")
+
+RECENT_PROFILES = 200
+STATEMENT_PREVIEW_CHARS = 300
+
+_PARAM_RE = re.compile(r"%\([^)]+\)s|%s|\$\d+|\?")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and bound values replaced, so repeats compare equal."""
+    text = _STRING_RE.sub("?", statement)
+    text = _PARAM_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _LIST_RE.sub("(?...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+@dataclass
+class QueryProfile:
+    method: str = ""
+    path: str = ""
+    request_id: str | None = None
+    query_count: int = 0
+    db_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: str | None = None
+    pool_wait_ms: float = 0.0
+    fingerprints: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            self.query_count += 1
+            self.db_ms += elapsed_ms
+            self.fingerprints[key] += 1
+            if elapsed_ms >= self.slowest_ms:
+                self.slowest_ms = elapsed_ms
+                self.slowest_statement = key
+
+    def record_pool_wait(self, waited_ms: float) -> None:
+        with self._lock:
+            self.pool_wait_ms += waited_ms
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return [(key, count) for key, count in self.fingerprints.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries", '
+            f"db-slowest;dur={self.slowest_ms:.1f}, "
+            f"db-pool;dur={self.pool_wait_ms:.1f}"
+        )
+
+    def summary(self, *, status_code: int | None = None, total_ms: float | None = None) -> dict:
+        repeats = self.repeated(settings.query_repeat_threshold)
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": status_code,
+            "total_ms": round(total_ms, 1) if total_ms is not None else None,
+            "query_count": self.query_count,
+            "db_ms": round(self.db_ms, 1),
+            "slowest_ms": round(self.slowest_ms, 1),
+            "pool_wait_ms": round(self.pool_wait_ms, 1),
+            "slowest_statement": (self.slowest_statement or "")[:STATEMENT_PREVIEW_CHARS] or None,
+            "repeated": [
+                {"fingerprint": key[:STATEMENT_PREVIEW_CHARS], "count": count}
+                for key, count in repeats[:5]
+            ],
+            "over_budget": self.query_count > settings.query_budget_per_request,
+        }
+
+
+_current: ContextVar[QueryProfile | None] = ContextVar("query_profile", default=None)
+_recent: deque[dict] = deque(maxlen=RECENT_PROFILES)
+_recent_lock = threading.Lock()
+
+
+def current_profile() -> QueryProfile | None:
+    return _current.get()
+
+
+def recent_profiles() -> list[dict]:
+    with _recent_lock:
+        return list(reversed(_recent))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_profile_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None:
+        return
+    started = conn.info.get("query_profile_started")
+    if not started:
+        return
+    profile.record(statement, (time.perf_counter() - started.pop()) * 1000)
+
+
+def _handle_error(exception_context) -> None:
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    # so the pooled connection does not carry it into the next request.
+    conn = exception_context.connection
+    if conn is None or exception_context.execution_context is None:
+        return
+    started = conn.info.get("query_profile_started")
+    if started:
+        started.pop()
+
+
+def _record_pool_wait(waited_ms: float) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.record_pool_wait(waited_ms)
+
+
+def install_query_hooks() -> None:
+    """Listen on every Engine (sync, and the sync core of the async engine)."""
+    on_pool_wait(_record_pool_wait)
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+class QueryProfileMiddleware:
+    """Counts the queries each request runs and reports them.
+
+    Adds a Server-Timing header, logs one structured line per request
+    (warning when the request exceeds QUERY_BUDGET_PER_REQUEST or repeats a
+    statement QUERY_REPEAT_THRESHOLD times, the usual sign of an N+1), and
+    keeps recent summaries for GET /admin/query-profile.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        install_query_hooks()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.query_profile_enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id")
+        profile = QueryProfile(
+            method=scope.get("method", ""),
+            path=scope.get("path", ""),
+            request_id=request_id.decode("latin-1") if request_id else None,
+        )
+        token = _current.set(profile)
+        started = time.perf_counter()
+        status_code: int | None = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", profile.server_timing().encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._report(profile, status_code, (time.perf_counter() - started) * 1000)
+
+    def _report(self, profile: QueryProfile, status_code: int | None, total_ms: float) -> None:
+        if profile.query_count == 0:
+            return
+        summary = profile.summary(status_code=status_code, total_ms=total_ms)
+        flagged = summary["over_budget"] or bool(summary["repeated"])
+        with _recent_lock:
+            _recent.append(summary)
+        logger.log(
+            logging.WARNING if flagged else logging.DEBUG,
+            "request_queries",
+            extra=summary,
+        )
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app.services.r4_charting.sqlserver_extract import iter_patient_activity_days
+
+PRESENCE_INDEX_VERSION = 1
+ACTIVE_PATIENTS_DOMAIN = "active_patients"
+
+# (end_inclusive, include_undated) per domain, matching the live selectors:
+# perio selectors keep undated rows and compare whole days against date_to.
+_WINDOW_RULES: dict[str, tuple[bool, bool]] = {
+    "perioprobe": (True, True),
+    "perio_plaque": (True, True),
+}
+
+ActivitySource = Callable[..., Iterable[tuple[int, date | None]]]
+
+
+def _month_key(day: date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def _next_month(day: date) -> date:
+    return date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+
+
+def _encode_uints(values: Iterable[int]) -> str:
+    packed = array("I", values)
+    return base64.b64encode(zlib.compress(packed.tobytes())).decode("ascii")
+
+
+def _decode_uints(payload: str) -> array:
+    packed = array("I")
+    packed.frombytes(zlib.decompress(base64.b64decode(payload)))
+    return packed
+
+
+@dataclass
+class MonthPresence:
+    """Sorted patient codes active in one month, each with a bitmask of active days."""
+
+    codes: array
+    day_masks: array
+
+    def encode(self) -> dict[str, str]:
+        deltas = [code - prev for prev, code in zip([0, *self.codes[:-1]], self.codes)]
+        return {"codes": _encode_uints(deltas), "days": _encode_uints(self.day_masks)}
+
+    @classmethod
+    def decode(cls, payload: dict[str, str]) -> "MonthPresence":
+        codes = _decode_uints(payload["codes"])
+        total = 0
+        for idx, delta in enumerate(codes):
+            total += delta
+            codes[idx] = total
+        return cls(codes=codes, day_masks=_decode_uints(payload["days"]))
+
+    @classmethod
+    def from_mapping(cls, masks: dict[int, int]) -> "MonthPresence":
+        ordered = sorted(masks)
+        return cls(codes=array("I", ordered), day_masks=array("I", (masks[c] for c in ordered)))
+
+
+@dataclass
+class DomainPresence:
+    months: dict[str, MonthPresence] = field(default_factory=dict)
+    undated: set[int] = field(default_factory=set)
+    error: str | None = None
+
+    def latest_days(
+        self,
+        date_from: date,
+        date_to: date,
+        *,
+        end_inclusive: bool = False,
+        include_undated: bool = False,
+    ) -> dict[int, date | None]:
+        """Map each patient present in the window to their latest active day."""
+        last_day = date_to if end_inclusive else date_to - timedelta(days=1)
+        latest: dict[int, date | None] = {}
+        if include_undated:
+            latest.update({code: None for code in self.undated})
+        month = date(date_from.year, date_from.month, 1)
+        while month <= last_day:
+            presence = self.months.get(_month_key(month))
+            if presence is not None:
+                first_bit = date_from.day - 1 if month <= date_from else 0
+                last_bit = last_day.day - 1 if _next_month(month) > last_day else 30
+                window_mask = ((1 << (last_bit + 1)) - 1) & ~((1 << first_bit) - 1)
+                for code, mask in zip(presence.codes, presence.day_masks):
+                    hit = mask & window_mask
+                    if hit:
+                        latest[code] = month.replace(day=hit.bit_length())
+            month = _next_month(month)
+        return latest
+
+
+@dataclass
+class PatientPresenceIndex:
+    """Local per-domain, per-month patient-presence index for cohort selection.
+
+    Each month stores delta-encoded sorted patient codes plus a 31-bit mask of
+    the days each patient had activity, so window, union and intersection
+    queries never touch SQL Server.
+    """
+
+    domains: dict[str, DomainPresence] = field(default_factory=dict)
+    built_through: date | None = None
+    built_at: str | None = None
+
+    def has_domain(self, domain: str) -> bool:
+        presence = self.domains.get(domain)
+        return presence is not None and presence.error is None
+
+    def domain_codes(
+        self,
+        domain: str,
+        date_from: date | str,
+        date_to: date | str,
+        *,
+        limit: int,
+    ) -> list[int]:
+        """Most recently active patients first (ties by code), like the live selectors."""
+        presence = self.domains.get(domain)
+        if presence is None or presence.error is not None:
+            raise RuntimeError(f"Presence index has no data for domain: {domain}")
+        if limit <= 0:
+            return []
+        start = _coerce_date(date_from)
+        end = _coerce_date(date_to)
+        if end < start:
+            raise ValueError("charting_to must be on or after charting_from")
+        end_inclusive, include_undated = _WINDOW_RULES.get(domain, (False, False))
+        latest = presence.latest_days(
+            start, end, end_inclusive=end_inclusive, include_undated=include_undated
+        )
+        ranked = sorted(
+            latest.items(),
+            key=lambda item: (-(item[1].toordinal() if item[1] else 0), item[0]),
+        )
+        return [code for code, _day in ranked[:limit]]
+
+    def save(self, path: str | Path) -> None:
+        payload = {
+            "version": PRESENCE_INDEX_VERSION,
+            "built_at": self.built_at,
+            "built_through": self.built_through.isoformat() if self.built_through else None,
+            "domains": {
+                name: {
+                    "error": presence.error,
+                    "undated": _encode_uints(sorted(presence.undated)),
+                    "months": {
+                        key: presence.months[key].encode() for key in sorted(presence.months)
+                    },
+                }
+                for name, presence in sorted(self.domains.items())
+            },
+        }
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as handle:
+            json.dump(payload, handle, separators=(",", ":"))
+        tmp.replace(target)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "PatientPresenceIndex":
+        with gzip.open(Path(path), "rt", encoding="utf-8") as handle:
+            payload = json.load(handle)
+        if payload.get("version") != PRESENCE_INDEX_VERSION:
+            raise RuntimeError(
+                f"Unsupported presence index version: {payload.get('version')}; rebuild the index."
+            )
+        domains = {
+            name: DomainPresence(
+                months={
+                    key: MonthPresence.decode(month) for key, month in data["months"].items()
+                },
+                undated=set(_decode_uints(data["undated"])),
+                error=data.get("error"),
+            )
+            for name, data in payload["domains"].items()
+        }
+        built_through = payload.get("built_through")
+        return cls(
+            domains=domains,
+            built_through=date.fromisoformat(built_through) if built_through else None,
+            built_at=payload.get("built_at"),
+        )
+
+
+def _coerce_date(value: date | str) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _collect_domain(
+    domain: str,
+    *,
+    since: date | None,
+    activity_source: ActivitySource,
+) -> DomainPresence:
+    masks_by_month: dict[str, dict[int, int]] = {}
+    undated: set[int] = set()
+    for code, day in activity_source(domain, since=since):
+        if day is None:
+            undated.add(code)
+            continue
+        month = masks_by_month.setdefault(_month_key(day), {})
+        month[code] = month.get(code, 0) | (1 << (day.day - 1))
+    return DomainPresence(
+        months={key: MonthPresence.from_mapping(masks) for key, masks in masks_by_month.items()},
+        undated=undated,
+    )
+
+
+def build_presence_index(
+    domains: Iterable[str],
+    *,
+    today: date | None = None,
+    activity_source: ActivitySource = iter_patient_activity_days,
+) -> PatientPresenceIndex:
+    """Build the index with one activity pass per domain (plus active patients)."""
+    index = PatientPresenceIndex()
+    for domain in [*domains, ACTIVE_PATIENTS_DOMAIN]:
+        if domain in index.domains:
+            continue
+        try:
+            index.domains[domain] = _collect_domain(
+                domain, since=None, activity_source=activity_source
+            )
+        except RuntimeError as exc:
+            index.domains[domain] = DomainPresence(error=str(exc))
+    index.built_through = today or datetime.now(timezone.utc).date()
+    index.built_at = datetime.now(timezone.utc).isoformat()
+    return index
+
+
+def refresh_presence_index(
+    index: PatientPresenceIndex,
+    *,
+    today: date | None = None,
+    activity_source: ActivitySource = iter_patient_activity_days,
+) -> PatientPresenceIndex:
+    """Re-read activity from the start of the last indexed month onwards.
+
+    Earlier months are immutable history and are kept as-is; domains that failed
+    last time are rebuilt in full.
+    """
+    if index.built_through is None:
+        return build_presence_index(
+            list(index.domains), today=today, activity_source=activity_source
+        )
+    since = index.built_through.replace(day=1)
+    since_key = _month_key(since)
+    for domain, presence in list(index.domains.items()):
+        try:
+            if presence.error is not None:
+                index.domains[domain] = _collect_domain(
+                    domain, since=None, activity_source=activity_source
+                )
+                continue
+            fresh = _collect_domain(domain, since=since, activity_source=activity_source)
+        except RuntimeError as exc:
+            index.domains[domain] = DomainPresence(error=str(exc))
+            continue
+        kept = {key: month for key, month in presence.months.items() if key < since_key}
+        kept.update(fresh.months)
+        presence.months = kept
+        presence.undated |= fresh.undated
+    index.built_through = today or datetime.now(timezone.utc).date()
+    index.built_at = datetime.now(timezone.utc).isoformat()
+    return index
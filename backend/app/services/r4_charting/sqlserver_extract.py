@@ -2223,6 +2223,256 @@ def get_distinct_active_patient_codes(
     return codes
 
 
+def _activity_day(value) -> date | None:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return _coerce_date(str(value)[:10])
+
+
+def _sql_activity_spec(
+    source: R4SqlServerSource,
+    domain: str,
+) -> tuple[str, str, str, list[str], list[object]]:
+    """Return (from_clause, patient_expr, date_expr, where_parts, params) mirroring
+    the filters of the matching get_distinct_*_patient_codes query."""
+    pick = source._pick_column  # noqa: SLF001
+    if domain in {"bpe", "bpe_furcation"}:
+        patient_col = pick("BPE", ["PatientCode"])
+        date_col = pick("BPE", ["Date", "BPEDate", "RecordedDate", "EntryDate"])
+        if not patient_col or not date_col:
+            raise RuntimeError("BPE missing PatientCode/Date columns; cannot index presence.")
+        if domain == "bpe":
+            return "dbo.BPE WITH (NOLOCK)", patient_col, date_col, [], []
+        bpe_id_col = pick("BPE", ["BPEID", "BPEId", "ID", "RefId", "RefID"])
+        furcation_bpe_col = pick("BPEFurcation", ["BPEID", "BPEId"])
+        if not bpe_id_col or not furcation_bpe_col:
+            raise RuntimeError("BPE/BPEFurcation missing linkage columns; cannot index presence.")
+        return (
+            "dbo.BPE b WITH (NOLOCK) JOIN dbo.BPEFurcation f WITH (NOLOCK) "
+            f"ON f.{furcation_bpe_col} = b.{bpe_id_col}",
+            f"b.{patient_col}",
+            f"b.{date_col}",
+            [],
+            [],
+        )
+    if domain == "chart_healing_actions":
+        patient_col = pick("ChartHealingActions", ["PatientCode"])
+        date_col = pick(
+            "ChartHealingActions",
+            ["ActionDate", "Date", "CreatedDate", "ActionedDate", "ActionedOn"],
+        )
+        if not patient_col or not date_col:
+            raise RuntimeError(
+                "ChartHealingActions missing PatientCode/date columns; cannot index presence."
+            )
+        return "dbo.ChartHealingActions WITH (NOLOCK)", patient_col, date_col, [], []
+    if domain in {"patient_notes", "old_patient_notes", "treatment_notes"}:
+        table = {
+            "patient_notes": "PatientNotes",
+            "old_patient_notes": "OldPatientNotes",
+            "treatment_notes": "TreatmentNotes",
+        }[domain]
+        date_candidates = ["Date", "NoteDate", "CreatedDate", "CreatedOn"]
+        if domain == "treatment_notes":
+            date_candidates = ["Date", "NoteDate", "DateAdded", "CreatedDate", "CreatedOn"]
+        patient_col = pick(table, ["PatientCode"])
+        date_col = pick(table, date_candidates)
+        if not patient_col or not date_col:
+            raise RuntimeError(f"{table} missing PatientCode/Date columns; cannot index presence.")
+        return f"dbo.{table} WITH (NOLOCK)", patient_col, date_col, [], []
+    if domain in {"completed_questionnaire_notes", "temporary_notes"}:
+        if domain == "completed_questionnaire_notes":
+            table = "CompletedQuestionnaire"
+            date_candidates = ["DateTime", "Date", "CompletedDate", "CreatedDate", "LastEditDate"]
+            note_candidates = ["Notes", "Note", "NoteBody", "FreeText"]
+        else:
+            table = "TemporaryNotes"
+            date_candidates = ["UpdatedAt", "LastEditDate", "Date"]
+            note_candidates = ["NoteBody", "Note", "Notes", "NoteText"]
+        patient_col = pick(table, ["PatientCode", "patientcode"])
+        date_col = pick(table, date_candidates)
+        note_col = pick(table, note_candidates)
+        if not patient_col or not date_col or not note_col:
+            raise RuntimeError(f"{table} missing patient/date/note columns; cannot index presence.")
+        return (
+            f"dbo.{table} WITH (NOLOCK)",
+            patient_col,
+            date_col,
+            [
+                f"{note_col} IS NOT NULL",
+                f"LEN(LTRIM(RTRIM(CAST({note_col} AS NVARCHAR(MAX))))) > 0",
+            ],
+            [],
+        )
+    if domain in {"appointment_notes", "active_patients"}:
+        table = "vwAppointmentDetails"
+        patient_col = pick(table, ["patientcode", "PatientCode"])
+        date_col = pick(
+            table,
+            ["appointmentDateTimevalue", "AppointmentDateTimeValue", "AppointmentDateTime"],
+        )
+        if not patient_col or not date_col:
+            raise RuntimeError(
+                "vwAppointmentDetails missing patient/date columns; cannot index presence."
+            )
+        if domain == "active_patients":
+            return f"dbo.{table} WITH (NOLOCK)", patient_col, date_col, [], []
+        appt_id_col = pick(table, ["apptid", "ApptID", "AppointmentID"])
+        note_col = pick(table, ["notes", "Notes", "note", "Note"])
+        if not appt_id_col or not note_col:
+            raise RuntimeError(
+                "vwAppointmentDetails missing appt/notes columns; cannot index presence."
+            )
+        return (
+            f"dbo.{table} WITH (NOLOCK)",
+            patient_col,
+            date_col,
+            [
+                f"{appt_id_col} IS NOT NULL AND {appt_id_col} > 0",
+                f"{note_col} IS NOT NULL",
+                f"LEN(LTRIM(RTRIM(CAST({note_col} AS NVARCHAR(MAX))))) > 0",
+            ],
+            [],
+        )
+    if domain == "treatment_plan_items":
+        item_patient_col = pick("TreatmentPlanItems", ["PatientCode"])
+        item_tp_col = pick("TreatmentPlanItems", ["TPNumber", "TPNum", "TPNo"])
+        plan_patient_col = pick("TreatmentPlans", ["PatientCode"])
+        plan_tp_col = pick("TreatmentPlans", ["TPNumber", "TPNum", "TPNo"])
+        plan_date_col = pick("TreatmentPlans", ["CreationDate", "Date", "PlanDate"])
+        if not all([item_patient_col, item_tp_col, plan_patient_col, plan_tp_col, plan_date_col]):
+            raise RuntimeError(
+                "TreatmentPlanItems/TreatmentPlans missing patient/TP/date columns; "
+                "cannot index presence."
+            )
+        return (
+            "dbo.TreatmentPlanItems ti WITH (NOLOCK) JOIN dbo.TreatmentPlans tp WITH (NOLOCK) "
+            f"ON tp.{plan_patient_col} = ti.{item_patient_col} "
+            f"AND tp.{plan_tp_col} = ti.{item_tp_col}",
+            f"ti.{item_patient_col}",
+            f"tp.{plan_date_col}",
+            [],
+            [],
+        )
+    if domain == "restorative_treatments":
+        patient_col = pick("vwTreatments", ["PatientCode", "patientcode"])
+        status_col = pick("vwTreatments", ["StatusDescription", "statusdescription"])
+        tooth_col = pick("vwTreatments", ["Tooth", "tooth"])
+        date_col = pick(
+            "vwTreatments",
+            ["CompletionDate", "transactionDate", "CreationDate", "Date"],
+        )
+        completed_col = pick("vwTreatments", ["Completed", "Complete"])
+        if not patient_col or not status_col or not tooth_col or not date_col:
+            raise RuntimeError(
+                "vwTreatments missing patient/status/tooth/date columns; cannot index presence."
+            )
+        statuses = sorted(_RESTORATIVE_TREATMENT_STATUS_DESCRIPTIONS)
+        where_parts = [
+            f"{tooth_col} IS NOT NULL",
+            f"{tooth_col} > 0",
+            f"LOWER(CONVERT(nvarchar(200), {status_col})) IN ({', '.join(['?'] * len(statuses))})",
+        ]
+        if completed_col:
+            where_parts.append(f"{completed_col} = 1")
+        return "dbo.vwTreatments WITH (NOLOCK)", patient_col, date_col, where_parts, statuses
+    raise RuntimeError(f"Unsupported presence domain: {domain}")
+
+
+def iter_patient_activity_days(
+    domain: str,
+    *,
+    since: date | str | None = None,
+) -> Iterable[tuple[int, date | None]]:
+    """Yield distinct (patient_code, activity_day) pairs for a cohort domain.
+
+    One grouped pass per domain feeds the local patient-presence index, using
+    the same filters as the get_distinct_*_patient_codes selectors. A None day
+    marks undated rows, which only the perio selectors treat as eligible.
+    """
+    since_day = _coerce_date(since) if since is not None else None
+    config = R4SqlServerConfig.from_env()
+    config.require_enabled()
+    config.require_readonly()
+
+    if domain in {"perioprobe", "perio_plaque"}:
+        extractor = SqlServerChartingExtractor(config)
+        iterate = (
+            extractor._iter_perio_probes  # noqa: SLF001
+            if domain == "perioprobe"
+            else extractor._iter_perio_plaque  # noqa: SLF001
+        )
+        seen: set[tuple[int, date | None]] = set()
+        for row in iterate(patients_from=None, patients_to=None, patient_codes=None, limit=None):
+            if row.patient_code is None:
+                continue
+            day = _activity_day(row.recorded_at)
+            if day is not None and since_day is not None and day < since_day:
+                continue
+            key = (int(row.patient_code), day)
+            if key not in seen:
+                seen.add(key)
+                yield key
+        return
+
+    source = R4SqlServerSource(config)
+    source.ensure_select_only()
+
+    if domain in {"treatment_plans", "completed_treatment_findings"}:
+        if domain == "treatment_plans":
+            pairs = (
+                (item.patient_code, item.creation_date)
+                for item in source.list_treatment_plans(
+                    date_from=since_day,
+                    include_undated=False,
+                )
+            )
+        else:
+            accepted, _report = filter_completed_treatment_findings(
+                source.list_completed_treatment_findings(date_from=since_day),
+                date_from=since_day,
+                date_to=None,
+            )
+            pairs = ((item.patient_code, item.completed_date) for item in accepted)
+        seen = set()
+        for patient_code, recorded_at in pairs:
+            day = _activity_day(recorded_at)
+            if patient_code is None or day is None:
+                continue
+            key = (int(patient_code), day)
+            if key not in seen:
+                seen.add(key)
+                yield key
+        return
+
+    from_clause, patient_expr, date_expr, where_parts, params = _sql_activity_spec(source, domain)
+    where = [f"{patient_expr} IS NOT NULL", f"{date_expr} IS NOT NULL", *where_parts]
+    query_params = list(params)
+    if since_day is not None:
+        where.append(f"{date_expr} >= ?")
+        query_params.append(since_day)
+    day_expr = f"CAST({date_expr} AS date)"
+    rows = source._query(  # noqa: SLF001
+        (
+            f"SELECT {patient_expr} AS patient_code, {day_expr} AS activity_day "
+            f"FROM {from_clause} "
+            f"WHERE {' AND '.join(where)} "
+            f"GROUP BY {patient_expr}, {day_expr}"
+        ),
+        query_params,
+    )
+    for row in rows:
+        value = row.get("patient_code")
+        day = _activity_day(row.get("activity_day"))
+        if value is None or day is None:
+            continue
+        yield int(value), day
+
+
 def _date_in_range(
     recorded_at,
     date_from: date | None,
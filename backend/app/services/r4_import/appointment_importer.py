@@ -4,10 +4,12 @@ from collections import Counter
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import String, cast, func, select, update
 from sqlalchemy.orm import Session
 
+from app.models.patient import Patient
 from app.models.r4_appointment import R4Appointment
+from app.models.r4_appointment_patient_link import R4AppointmentPatientLink
 from app.services.r4_import.source import R4Source
 from app.services.r4_import.status import normalize_status
 from app.services.r4_import.types import R4AppointmentRecord
@@ -56,9 +58,59 @@ def import_r4_appointments(
     for appt in source.stream_appointments(date_from=date_from, date_to=date_to, limit=limit):
         _track_stats(stats, appt)
         _upsert_appointment(session, appt, actor_id, legacy_source, stats)
+    session.flush()
+    refresh_r4_appointment_patient_ids(session, legacy_source=legacy_source)
     return stats
 
 
+def refresh_r4_appointment_patient_ids(
+    session: Session,
+    legacy_source: str = "r4",
+    *,
+    unresolved_only: bool = False,
+) -> int:
+    """Recompute r4_appointments.resolved_patient_id in one set-based UPDATE.
+
+    A manual appointment link takes precedence over the patient_code match, mirroring
+    what the calendar used to resolve per request. Only rows whose value changes are
+    written, so repeated runs are cheap. `unresolved_only` limits the pass to rows that
+    have no patient yet (enough after a patient import, which never changes links).
+    """
+    link_patient_id = (
+        select(R4AppointmentPatientLink.patient_id)
+        .where(
+            R4AppointmentPatientLink.legacy_source == R4Appointment.legacy_source,
+            R4AppointmentPatientLink.legacy_appointment_id
+            == R4Appointment.legacy_appointment_id,
+        )
+        .scalar_subquery()
+    )
+    code_patient_id = (
+        select(func.min(Patient.id))
+        .where(
+            Patient.legacy_source == R4Appointment.legacy_source,
+            Patient.legacy_id == cast(R4Appointment.patient_code, String),
+        )
+        .scalar_subquery()
+    )
+    resolved = func.coalesce(link_patient_id, code_patient_id)
+    stmt = update(R4Appointment).where(
+        R4Appointment.legacy_source == legacy_source,
+        R4Appointment.resolved_patient_id.is_distinct_from(resolved),
+    )
+    if unresolved_only:
+        stmt = stmt.where(
+            R4Appointment.resolved_patient_id.is_(None),
+            R4Appointment.patient_code.is_not(None),
+        )
+    result = session.execute(
+        stmt
+        .values(resolved_patient_id=resolved, updated_at=R4Appointment.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return int(result.rowcount or 0)
+
+
 def _track_stats(stats: R4AppointmentImportStats, appt: R4AppointmentRecord) -> None:
     if appt.patient_code is None:
         stats.appointments_patient_null += 1
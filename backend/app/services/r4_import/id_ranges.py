@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from itertools import islice
+from typing import Iterable, Iterator
+
+
+class IdRanges:
+    """A set of integer ids stored as sorted, non-overlapping inclusive ranges.
+
+    Import ids are mostly consecutive, so millions of them usually collapse to
+    a handful of (start, end) pairs instead of a Python set entry each.
+    Iteration yields ids in ascending order.
+    """
+
+    __slots__ = ("_starts", "_ends", "_count")
+
+    def __init__(self, ids: Iterable[int] = ()) -> None:
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._count = 0
+        for value in ids:
+            self.add(value)
+
+    @classmethod
+    def from_ranges(cls, ranges: Iterable[tuple[int, int]]) -> IdRanges:
+        result = cls()
+        for start, end in ranges:
+            result.add_range(start, end)
+        return result
+
+    def add(self, value: int) -> None:
+        self.add_range(value, value)
+
+    def add_range(self, start: int, end: int) -> None:
+        if end < start:
+            raise ValueError("range end is before its start")
+        starts, ends = self._starts, self._ends
+        # Fast path: appending at or just past the end, the usual streaming order.
+        if not starts or start > ends[-1] + 1:
+            starts.append(start)
+            ends.append(end)
+            self._count += end - start + 1
+            return
+        # First range that could touch [start, end]: its end reaches start - 1.
+        low = bisect_right(ends, start - 2)
+        high = bisect_right(starts, end + 1)
+        if low == high:
+            starts.insert(low, start)
+            ends.insert(low, end)
+            self._count += end - start + 1
+            return
+        merged_start = min(start, starts[low])
+        merged_end = max(end, ends[high - 1])
+        removed = sum(ends[index] - starts[index] + 1 for index in range(low, high))
+        starts[low:high] = [merged_start]
+        ends[low:high] = [merged_end]
+        self._count += merged_end - merged_start + 1 - removed
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, int):
+            return False
+        index = bisect_right(self._starts, value) - 1
+        return index >= 0 and value <= self._ends[index]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IdRanges):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __repr__(self) -> str:
+        return f"IdRanges({self.ranges()!r})"
+
+    def ranges(self, limit: int | None = None) -> list[tuple[int, int]]:
+        pairs = zip(self._starts, self._ends)
+        return list(pairs if limit is None else islice(pairs, limit))
+
+    def range_count(self) -> int:
+        return len(self._starts)
+
+    def first(self, count: int) -> list[int]:
+        return list(islice(iter(self), count))
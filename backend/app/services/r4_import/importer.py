@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.models.appointment import Appointment, AppointmentLocationType, AppointmentStatus
 from app.models.patient import Patient
+from app.services.diary_snapshot_cache import invalidate_all_diary_snapshots
 from app.services.r4_import.source import R4Source
 from app.services.r4_import.types import R4Appointment, R4Patient
 
@@ -48,6 +49,8 @@ def import_r4(
     for appt in source.list_appts(date_from=appts_from, date_to=appts_to, limit=limit):
         _upsert_appt(session, appt, actor_id, legacy_source, patients_by_code, stats)
 
+    if stats.appts_created or stats.appts_updated:
+        invalidate_all_diary_snapshots(session)
     return stats
 
 
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
+import json
 from collections import Counter
 from dataclasses import dataclass
 from typing import Iterable
-
-from sqlalchemy import func, select
+from uuid import uuid4
+
+from sqlalchemy import (
+    Integer,
+    String,
+    Text,
+    bindparam,
+    case,
+    cast,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID as PG_UUID, insert
 
 from app.models.r4_linkage_issue import R4LinkageIssue
 
@@ -22,6 +37,8 @@ REASON_PMS_RECORD_ID_PARSE = "pmsrecordid_parse_failure"
 REASON_DUPLICATE_MAPPING = "duplicate_mapping"
 REASON_PATIENT_CODE_NOT_FOUND = "patient_code_not_found"
 
+LOAD_CHUNK_SIZE = 1000
+
 REASON_ALIASES = {
     REASON_MISSING_PATIENT_CODE: REASON_UNLINKABLE_MISSING_PATIENT_CODE,
     REASON_PATIENT_CODE_NOT_FOUND: REASON_MISSING_MAPPING,
@@ -78,16 +95,81 @@ def upsert_linkage_issue(session, issue: R4LinkageIssueInput) -> tuple[R4Linkage
     return row, True
 
 
+def _upsert_linkage_chunk(session, chunk: dict[tuple[str, str, str], R4LinkageIssueInput]) -> int:
+    """Upsert one chunk of distinct issue keys and return how many rows were inserted."""
+    issues = list(chunk.values())
+    table = R4LinkageIssue.__table__
+    # One array parameter per column keeps the SQL text fixed whatever the chunk
+    # size, so the statement is compiled once and the chunk is one round trip.
+    columns = {
+        "id": ([uuid4() for _ in issues], PG_UUID(as_uuid=True)),
+        "entity_type": ([issue.entity_type for issue in issues], String()),
+        "legacy_source": ([issue.legacy_source for issue in issues], String()),
+        "legacy_id": ([issue.legacy_id for issue in issues], String()),
+        "patient_code": ([issue.patient_code for issue in issues], Integer()),
+        "reason_code": ([issue.reason_code for issue in issues], String()),
+        "details_json": ([json.dumps(issue.details_json) for issue in issues], Text()),
+    }
+    source = select(
+        *(
+            func.unnest(bindparam(f"{name}_values", values, type_=ARRAY(item_type))).label(name)
+            for name, (values, item_type) in columns.items()
+        )
+    ).subquery()
+    stmt = insert(table).from_select(
+        [*columns, "status"],
+        select(
+            *(source.c[name] for name in columns if name != "details_json"),
+            cast(source.c.details_json, JSONB),
+            literal(STATUS_OPEN),
+        ),
+    )
+    excluded = stmt.excluded
+    changed = or_(
+        table.c.patient_code.is_distinct_from(excluded.patient_code),
+        table.c.reason_code.is_distinct_from(excluded.reason_code),
+        table.c.details_json.is_distinct_from(excluded.details_json),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_r4_linkage_issues_legacy_key",
+        set_={
+            "patient_code": excluded.patient_code,
+            "reason_code": excluded.reason_code,
+            "details_json": excluded.details_json,
+            # Match the ORM path: only rows whose values change get a new timestamp.
+            "updated_at": case((changed, func.now()), else_=table.c.updated_at),
+        },
+    ).returning(literal_column("(xmax = 0)").label("inserted"))
+    return sum(1 for inserted in session.execute(stmt).scalars() if inserted)
+
+
 def load_linkage_issues(
     session,
     issues: Iterable[R4LinkageIssueInput],
     *,
     actionable_only: bool = False,
+    chunk_size: int = LOAD_CHUNK_SIZE,
 ) -> dict[str, object]:
+    """Load issues with one INSERT ... ON CONFLICT round trip per chunk.
+
+    Repeated keys behave as they did with per-issue upserts: the first
+    occurrence creates (or updates) the row, later ones count as updates and the
+    last one wins.
+    """
     created = 0
     updated = 0
     reason_counts: Counter[str] = Counter()
     excluded_reason_counts: Counter[str] = Counter()
+    chunk: dict[tuple[str, str, str], R4LinkageIssueInput] = {}
+
+    def _flush() -> None:
+        nonlocal created, updated
+        if not chunk:
+            return
+        inserted = _upsert_linkage_chunk(session, chunk)
+        created += inserted
+        updated += len(chunk) - inserted
+        chunk.clear()
 
     for issue in issues:
         reason = normalize_reason_code(issue.reason_code)
@@ -97,7 +179,11 @@ def load_linkage_issues(
             excluded_reason_counts[reason] += 1
             continue
         reason_counts[reason] += 1
-        normalized_issue = R4LinkageIssueInput(
+        key = (issue.legacy_source, issue.entity_type, issue.legacy_id)
+        if key in chunk:
+            updated += 1
+            del chunk[key]
+        chunk[key] = R4LinkageIssueInput(
             entity_type=issue.entity_type,
             legacy_source=issue.legacy_source,
             legacy_id=issue.legacy_id,
@@ -105,11 +191,9 @@ def load_linkage_issues(
             reason_code=reason,
             details_json=issue.details_json,
         )
-        _, is_created = upsert_linkage_issue(session, normalized_issue)
-        if is_created:
-            created += 1
-        else:
-            updated += 1
+        if len(chunk) >= chunk_size:
+            _flush()
+    _flush()
 
     return {
         "created": created,
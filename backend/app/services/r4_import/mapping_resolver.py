@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from typing import Iterable
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
@@ -43,3 +44,46 @@ def resolve_patient_id_from_r4_patient_code(
         )
     )
     return int(mapped_id) if mapped_id is not None else None
+
+
+def resolve_patient_ids_from_r4_patient_codes(
+    session: Session,
+    patient_codes: Iterable[int],
+    legacy_source: str = "r4",
+) -> dict[int, int]:
+    """Batch form of resolve_patient_id_from_r4_patient_code: two queries per call.
+
+    Codes without a manual mapping or patient mapping are left out of the result.
+    """
+    codes = {int(code) for code in patient_codes if code is not None}
+    if not codes:
+        return {}
+
+    resolved: dict[int, int] = {
+        int(code): int(patient_id)
+        for code, patient_id in session.execute(
+            select(R4PatientMapping.legacy_patient_code, R4PatientMapping.patient_id).where(
+                R4PatientMapping.legacy_source == legacy_source,
+                R4PatientMapping.legacy_patient_code.in_(codes),
+            )
+        )
+        if patient_id is not None
+    }
+    manual_rows = session.execute(
+        select(R4ManualMapping.legacy_patient_code, R4ManualMapping.target_patient_id).where(
+            R4ManualMapping.legacy_source == legacy_source,
+            R4ManualMapping.legacy_patient_code.in_(codes),
+        )
+    )
+    for code, manual_id in manual_rows:
+        if manual_id is None:
+            continue
+        logger.info(
+            "R4 manual mapping used",
+            extra={
+                "patient_code": int(code),
+                "target_patient_id": int(manual_id),
+            },
+        )
+        resolved[int(code)] = int(manual_id)
+    return resolved
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 
 from app.models.patient import Patient
 from app.models.r4_patient_mapping import R4PatientMapping
+from app.services.r4_import.appointment_importer import refresh_r4_appointment_patient_ids
 from app.services.r4_import.mapping_quality import PatientMappingQualityReportBuilder
 from app.services.r4_import.source import R4Source
 from app.services.r4_import.types import R4Patient
@@ -69,6 +70,9 @@ def import_r4_patients(
             started_at,
             limit,
         )
+    if processed:
+        session.flush()
+        refresh_r4_appointment_patient_ids(session, legacy_source, unresolved_only=True)
     stats.mapping_quality = report.finalize()
     return stats
 
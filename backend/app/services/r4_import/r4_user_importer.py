@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from app.models.r4_user import R4User
 from app.services.r4_import.source import R4Source
 from app.services.r4_import.types import R4User as R4UserPayload
+from app.services.reference_cache import R4_USERS, bump_reference_data
 
 
 @dataclass
@@ -34,6 +35,8 @@ def import_r4_users(
     stats = R4UserImportStats()
     for user in source.stream_users(limit=limit):
         _upsert_user(session, user, actor_id, legacy_source, stats)
+    if stats.users_created or stats.users_updated:
+        bump_reference_data(session, R4_USERS)
     return stats
 
 
@@ -7,7 +7,7 @@ import json
 import os
 import time
 
-from sqlalchemy import func, or_, select, text
+from sqlalchemy import func, or_, select, text, tuple_
 from sqlalchemy.orm import Session
 
 from app.models.patient import Patient
@@ -25,7 +25,8 @@ from app.services.r4_import.types import (
     R4TreatmentPlanItem as R4TreatmentPlanItemPayload,
     R4TreatmentPlanReview as R4TreatmentPlanReviewPayload,
 )
-from app.services.r4_import.mapping_resolver import resolve_patient_id_from_r4_patient_code
+from app.services.r4_import.mapping_resolver import resolve_patient_ids_from_r4_patient_codes
+from app.services.reference_cache import R4_TREATMENTS, bump_reference_data
 
 
 @dataclass
@@ -85,6 +86,8 @@ def import_r4_treatments(
     stats = TreatmentImportStats()
     for treatment in source.list_treatments(limit=limit):
         _upsert_treatment(session, treatment, actor_id, legacy_source, stats)
+    if stats.treatments_created or stats.treatments_updated:
+        bump_reference_data(session, R4_TREATMENTS)
     return stats
 
 
@@ -104,22 +107,38 @@ def import_r4_treatment_plans(
     progress_enabled: bool = False,
 ) -> TreatmentPlanImportStats:
     stats = TreatmentPlanImportStats()
-    patients_by_code: dict[int, Patient | None] = {}
+    patient_ids_by_code: dict[int, int | None] = {}
     started_at = time.monotonic()
     plans_processed = 0
     items_processed = 0
     batch_size = max(1, batch_size)
 
+    # Each batch prefetches what it needs with one IN query per kind (patients,
+    # plans, items, reviews) and leaves the writes to a single flush, so round
+    # trips grow with the number of batches rather than the number of rows.
     def process_plan_batch(batch: list[R4TreatmentPlanPayload]) -> None:
         nonlocal plans_processed
+        _resolve_patient_ids(
+            session,
+            legacy_source,
+            {plan.patient_code for plan in batch},
+            patient_ids_by_code,
+        )
+        plans_by_key = _load_plans(
+            session,
+            legacy_source,
+            {(plan.patient_code, plan.tp_number) for plan in batch},
+        )
         for plan in batch:
-            _upsert_plan(
+            key = (plan.patient_code, plan.tp_number)
+            plans_by_key[key] = _upsert_plan(
                 session,
                 plan,
                 actor_id,
                 legacy_source,
                 stats,
-                patients_by_code,
+                plans_by_key.get(key),
+                patient_ids_by_code.get(plan.patient_code),
             )
             plans_processed += 1
             _maybe_emit_progress(
@@ -152,28 +171,37 @@ def import_r4_treatment_plans(
 
     def process_item_batch(batch: list[R4TreatmentPlanItemPayload]) -> None:
         nonlocal items_processed
+        plan_ids = _load_plan_ids(
+            session,
+            legacy_source,
+            {(item.patient_code, item.tp_number) for item in batch},
+        )
+        items_by_key, items_by_plan_item = _load_items(
+            session,
+            legacy_source,
+            {item.tp_item_key for item in batch if item.tp_item_key is not None},
+            {
+                (plan_ids[(item.patient_code, item.tp_number)], item.tp_item)
+                for item in batch
+                if (item.patient_code, item.tp_number) in plan_ids
+            },
+        )
         for item in batch:
-            plan = session.scalar(
-                select(R4TreatmentPlan).where(
-                    R4TreatmentPlan.legacy_source == legacy_source,
-                    R4TreatmentPlan.legacy_patient_code == item.patient_code,
-                    R4TreatmentPlan.legacy_tp_number == item.tp_number,
-                )
-            )
-            if plan is None:
+            plan_id = plan_ids.get((item.patient_code, item.tp_number))
+            if plan_id is None:
                 stats.items_missing_plan_refs += 1
-                items_processed += 1
-                _maybe_emit_progress(
-                    progress_enabled,
-                    progress_every,
-                    started_at,
-                    stats,
-                    "items",
-                    plans_processed,
-                    items_processed,
+            else:
+                existing = None
+                if item.tp_item_key is not None:
+                    existing = items_by_key.get(item.tp_item_key)
+                if existing is None:
+                    existing = items_by_plan_item.get((plan_id, item.tp_item))
+                row = _upsert_item(
+                    session, plan_id, item, actor_id, legacy_source, stats, existing
                 )
-                continue
-            _upsert_item(session, plan, item, actor_id, legacy_source, stats)
+                if row.legacy_tp_item_key is not None:
+                    items_by_key[row.legacy_tp_item_key] = row
+                items_by_plan_item[(plan_id, row.legacy_tp_item)] = row
             items_processed += 1
             _maybe_emit_progress(
                 progress_enabled,
@@ -203,6 +231,40 @@ def import_r4_treatment_plans(
     if batch:
         process_item_batch(batch)
 
+    def process_review_batch(batch: list[R4TreatmentPlanReviewPayload]) -> None:
+        plan_ids = _load_plan_ids(
+            session,
+            legacy_source,
+            {(review.patient_code, review.tp_number) for review in batch},
+        )
+        reviews_by_plan_id: dict[int, R4TreatmentPlanReview] = {}
+        if plan_ids:
+            reviews_by_plan_id = {
+                row.treatment_plan_id: row
+                for row in session.scalars(
+                    select(R4TreatmentPlanReview).where(
+                        R4TreatmentPlanReview.treatment_plan_id.in_(set(plan_ids.values()))
+                    )
+                )
+            }
+        for review in batch:
+            plan_id = plan_ids.get((review.patient_code, review.tp_number))
+            if plan_id is None:
+                stats.reviews_missing_plan_refs += 1
+                continue
+            reviews_by_plan_id[plan_id] = _upsert_review(
+                session,
+                plan_id,
+                review,
+                actor_id,
+                stats,
+                reviews_by_plan_id.get(plan_id),
+            )
+        session.flush()
+        session.expunge_all()
+        _maybe_sleep(sleep_ms)
+
+    batch = []
     for review in source.list_treatment_plan_reviews(
         patients_from=patients_from,
         patients_to=patients_to,
@@ -210,17 +272,12 @@ def import_r4_treatment_plans(
         tp_to=tp_to,
         limit=limit,
     ):
-        plan = session.scalar(
-            select(R4TreatmentPlan).where(
-                R4TreatmentPlan.legacy_source == legacy_source,
-                R4TreatmentPlan.legacy_patient_code == review.patient_code,
-                R4TreatmentPlan.legacy_tp_number == review.tp_number,
-            )
-        )
-        if plan is None:
-            stats.reviews_missing_plan_refs += 1
-            continue
-        _upsert_review(session, plan, review, actor_id, stats)
+        batch.append(review)
+        if len(batch) >= batch_size:
+            process_review_batch(batch)
+            batch = []
+    if batch:
+        process_review_batch(batch)
 
     return stats
 
@@ -335,65 +392,56 @@ def backfill_r4_treatment_plan_patients_chunked(
     dry_run: bool = True,
     only_unmapped: bool = True,
 ) -> TreatmentPlanBackfillChunkStats:
+    """Map up to `limit` plans to their patients in one UPDATE ... FROM statement.
+
+    The candidate select, the remaining count and the update share a single
+    round trip; a dry run executes the same statement with the update disabled.
+    """
     stats = TreatmentPlanBackfillChunkStats()
-    filters = [R4TreatmentPlan.legacy_source == legacy_source]
     if only_unmapped:
-        filters.append(R4TreatmentPlan.patient_id.is_(None))
+        candidate_filter = "p.patient_id IS NULL"
     else:
-        filters.append(
-            or_(
-                R4TreatmentPlan.patient_id.is_(None),
-                R4TreatmentPlan.patient_id != R4PatientMapping.patient_id,
-            )
-        )
-
-    join_clause = (
-        (R4PatientMapping.legacy_source == R4TreatmentPlan.legacy_source)
-        & (R4PatientMapping.legacy_patient_code == R4TreatmentPlan.legacy_patient_code)
-    )
-    total_candidates = session.scalar(
-        select(func.count())
-        .select_from(R4TreatmentPlan)
-        .join(R4PatientMapping, join_clause)
-        .where(*filters)
-    ) or 0
-
-    ids = list(
-        session.scalars(
-            select(R4TreatmentPlan.id)
-            .join(R4PatientMapping, join_clause)
-            .where(*filters)
-            .order_by(R4TreatmentPlan.id.asc())
-            .limit(limit)
-        )
-    )
-    stats.processed = len(ids)
-    stats.remaining_estimate = max(int(total_candidates) - stats.processed, 0)
-
-    if dry_run or not ids:
-        return stats
-
-    result = session.execute(
+        candidate_filter = "p.patient_id IS DISTINCT FROM m.patient_id"
+    row = session.execute(
         text(
-            """
-        UPDATE r4_treatment_plans AS p
-        SET patient_id = m.patient_id,
-            updated_by_user_id = :actor_id,
-            updated_at = now()
-        FROM r4_patient_mappings AS m
-        WHERE p.id = ANY(:ids)
-          AND p.legacy_source = :legacy_source
-          AND m.legacy_source = p.legacy_source
-          AND m.legacy_patient_code = p.legacy_patient_code
+            f"""
+        WITH candidates AS (
+            SELECT p.id, m.patient_id, count(*) OVER () AS total
+            FROM r4_treatment_plans AS p
+            JOIN r4_patient_mappings AS m
+              ON m.legacy_source = p.legacy_source
+             AND m.legacy_patient_code = p.legacy_patient_code
+            WHERE p.legacy_source = :legacy_source
+              AND {candidate_filter}
+            ORDER BY p.id
+            LIMIT :limit
+        ),
+        upd AS (
+            UPDATE r4_treatment_plans AS p
+            SET patient_id = c.patient_id,
+                updated_by_user_id = :actor_id,
+                updated_at = now()
+            FROM candidates AS c
+            WHERE p.id = c.id
+              AND NOT :dry_run
+            RETURNING p.id
+        )
+        SELECT
+            (SELECT count(*) FROM candidates) AS processed,
+            (SELECT coalesce(max(total), 0) FROM candidates) AS total,
+            (SELECT count(*) FROM upd) AS updated
         """
         ),
         {
             "actor_id": actor_id,
             "legacy_source": legacy_source,
-            "ids": ids,
+            "limit": limit,
+            "dry_run": dry_run,
         },
-    )
-    stats.updated = int(result.rowcount or 0)
+    ).one()
+    stats.processed = int(row.processed)
+    stats.remaining_estimate = max(int(row.total) - stats.processed, 0)
+    stats.updated = int(row.updated)
     return stats
 
 
@@ -443,19 +491,9 @@ def _upsert_plan(
     actor_id: int,
     legacy_source: str,
     stats: TreatmentPlanImportStats,
-    patients_by_code: dict[int, Patient | None],
+    existing: R4TreatmentPlan | None,
+    mapped_patient_id: int | None,
 ) -> R4TreatmentPlan:
-    existing = session.scalar(
-        select(R4TreatmentPlan).where(
-            R4TreatmentPlan.legacy_source == legacy_source,
-            R4TreatmentPlan.legacy_patient_code == plan.patient_code,
-            R4TreatmentPlan.legacy_tp_number == plan.tp_number,
-        )
-    )
-    patient = _resolve_patient(
-        session, legacy_source, plan.patient_code, patients_by_code
-    )
-    mapped_patient_id = patient.id if patient else None
     updates = {
         "legacy_patient_code": plan.patient_code,
         "legacy_tp_number": plan.tp_number,
@@ -499,29 +537,15 @@ def _upsert_plan(
 
 def _upsert_item(
     session: Session,
-    plan: R4TreatmentPlan,
+    plan_id: int,
     item: R4TreatmentPlanItemPayload,
     actor_id: int,
     legacy_source: str,
     stats: TreatmentPlanImportStats,
+    existing: R4TreatmentPlanItem | None,
 ) -> R4TreatmentPlanItem:
-    existing = None
-    if item.tp_item_key is not None:
-        existing = session.scalar(
-            select(R4TreatmentPlanItem).where(
-                R4TreatmentPlanItem.legacy_source == legacy_source,
-                R4TreatmentPlanItem.legacy_tp_item_key == item.tp_item_key,
-            )
-        )
-    if existing is None:
-        existing = session.scalar(
-            select(R4TreatmentPlanItem).where(
-                R4TreatmentPlanItem.treatment_plan_id == plan.id,
-                R4TreatmentPlanItem.legacy_tp_item == item.tp_item,
-            )
-        )
     updates = {
-        "treatment_plan_id": plan.id,
+        "treatment_plan_id": plan_id,
         "legacy_tp_item": item.tp_item,
         "legacy_tp_item_key": item.tp_item_key,
         "code_id": item.code_id,
@@ -558,16 +582,12 @@ def _upsert_item(
 
 def _upsert_review(
     session: Session,
-    plan: R4TreatmentPlan,
+    plan_id: int,
     review: R4TreatmentPlanReviewPayload,
     actor_id: int,
     stats: TreatmentPlanImportStats,
+    existing: R4TreatmentPlanReview | None,
 ) -> R4TreatmentPlanReview:
-    existing = session.scalar(
-        select(R4TreatmentPlanReview).where(
-            R4TreatmentPlanReview.treatment_plan_id == plan.id,
-        )
-    )
     updates = {
         "temporary_note": review.temporary_note,
         "reviewed": review.reviewed,
@@ -584,7 +604,7 @@ def _upsert_review(
         return existing
 
     row = R4TreatmentPlanReview(
-        treatment_plan_id=plan.id,
+        treatment_plan_id=plan_id,
         created_by_user_id=actor_id,
         updated_by_user_id=actor_id,
         **updates,
@@ -594,29 +614,114 @@ def _upsert_review(
     return row
 
 
-def _resolve_patient(
+def _resolve_patient_ids(
     session: Session,
     legacy_source: str,
-    patient_code: int,
-    patients_by_code: dict[int, Patient | None],
-) -> Patient | None:
-    if patient_code in patients_by_code:
-        return patients_by_code[patient_code]
-    manual_or_mapping_id = resolve_patient_id_from_r4_patient_code(
-        session, patient_code, legacy_source=legacy_source
+    patient_codes: set[int],
+    patient_ids_by_code: dict[int, int | None],
+) -> None:
+    """Fill patient_ids_by_code for codes not seen yet; unresolved codes map to None."""
+    codes = patient_codes - patient_ids_by_code.keys()
+    if not codes:
+        return
+    mapped = resolve_patient_ids_from_r4_patient_codes(
+        session, codes, legacy_source=legacy_source
     )
-    if manual_or_mapping_id is not None:
-        patient = session.get(Patient, manual_or_mapping_id)
-        patients_by_code[patient_code] = patient
-        return patient
-    patient = session.scalar(
-        select(Patient).where(
-            Patient.legacy_source == legacy_source,
-            Patient.legacy_id == str(patient_code),
+    existing_ids: set[int] = set()
+    if mapped:
+        existing_ids = set(
+            session.scalars(select(Patient.id).where(Patient.id.in_(set(mapped.values()))))
+        )
+    # Codes without a mapping fall back to patients imported with the code as legacy_id.
+    fallback: dict[int, int] = {}
+    unmapped = codes - mapped.keys()
+    if unmapped:
+        fallback = {
+            int(legacy_id): patient_id
+            for patient_id, legacy_id in session.execute(
+                select(Patient.id, Patient.legacy_id).where(
+                    Patient.legacy_source == legacy_source,
+                    Patient.legacy_id.in_([str(code) for code in unmapped]),
+                )
+            )
+        }
+    for code in codes:
+        if code in mapped:
+            patient_id = mapped[code]
+            patient_ids_by_code[code] = patient_id if patient_id in existing_ids else None
+        else:
+            patient_ids_by_code[code] = fallback.get(code)
+
+
+def _load_plans(
+    session: Session,
+    legacy_source: str,
+    keys: set[tuple[int, int]],
+) -> dict[tuple[int, int], R4TreatmentPlan]:
+    if not keys:
+        return {}
+    rows = session.scalars(
+        select(R4TreatmentPlan).where(
+            R4TreatmentPlan.legacy_source == legacy_source,
+            tuple_(R4TreatmentPlan.legacy_patient_code, R4TreatmentPlan.legacy_tp_number).in_(
+                keys
+            ),
+        )
+    )
+    return {(row.legacy_patient_code, row.legacy_tp_number): row for row in rows}
+
+
+def _load_plan_ids(
+    session: Session,
+    legacy_source: str,
+    keys: set[tuple[int, int]],
+) -> dict[tuple[int, int], int]:
+    if not keys:
+        return {}
+    rows = session.execute(
+        select(
+            R4TreatmentPlan.legacy_patient_code,
+            R4TreatmentPlan.legacy_tp_number,
+            R4TreatmentPlan.id,
+        ).where(
+            R4TreatmentPlan.legacy_source == legacy_source,
+            tuple_(R4TreatmentPlan.legacy_patient_code, R4TreatmentPlan.legacy_tp_number).in_(
+                keys
+            ),
         )
     )
-    patients_by_code[patient_code] = patient
-    return patient
+    return {(patient_code, tp_number): plan_id for patient_code, tp_number, plan_id in rows}
+
+
+def _load_items(
+    session: Session,
+    legacy_source: str,
+    item_keys: set[int],
+    plan_items: set[tuple[int, int]],
+) -> tuple[dict[int, R4TreatmentPlanItem], dict[tuple[int, int], R4TreatmentPlanItem]]:
+    """Existing items matching either lookup the per-row path used, in one query."""
+    clauses = []
+    if item_keys:
+        clauses.append(
+            (R4TreatmentPlanItem.legacy_source == legacy_source)
+            & R4TreatmentPlanItem.legacy_tp_item_key.in_(item_keys)
+        )
+    if plan_items:
+        clauses.append(
+            tuple_(R4TreatmentPlanItem.treatment_plan_id, R4TreatmentPlanItem.legacy_tp_item).in_(
+                plan_items
+            )
+        )
+    by_key: dict[int, R4TreatmentPlanItem] = {}
+    by_plan_item: dict[tuple[int, int], R4TreatmentPlanItem] = {}
+    if not clauses:
+        return by_key, by_plan_item
+    for row in session.scalars(select(R4TreatmentPlanItem).where(or_(*clauses))):
+        if row.legacy_source == legacy_source and row.legacy_tp_item_key in item_keys:
+            by_key[row.legacy_tp_item_key] = row
+        if (row.treatment_plan_id, row.legacy_tp_item) in plan_items:
+            by_plan_item[(row.treatment_plan_id, row.legacy_tp_item)] = row
+    return by_key, by_plan_item
 
 
 def _apply_updates(model, updates: dict, debug_label: str | None = None) -> bool:
@@ -6,10 +6,11 @@ from decimal import Decimal, ROUND_HALF_UP
 import json
 import time
 
-from sqlalchemy import select
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 
 from app.models.r4_treatment_transaction import R4TreatmentTransaction
+from app.services.r4_import.id_ranges import IdRanges
 from app.services.r4_import.source import R4Source
 from app.services.r4_import.types import R4TreatmentTransaction as R4TreatmentTransactionPayload
 
@@ -19,7 +20,7 @@ class TreatmentTransactionImportStats:
     transactions_created: int = 0
     transactions_updated: int = 0
     transactions_skipped: int = 0
-    updated_transaction_ids: set[int] = field(default_factory=set, repr=False)
+    updated_transaction_ids: IdRanges = field(default_factory=IdRanges, repr=False)
 
     def as_dict(self) -> dict[str, object]:
         data: dict[str, object] = {
@@ -28,8 +29,10 @@ class TreatmentTransactionImportStats:
             "transactions_skipped": self.transactions_skipped,
         }
         if self.updated_transaction_ids:
-            sample = sorted(self.updated_transaction_ids)[:20]
-            data["updated_transaction_ids_sample"] = sample
+            ids = self.updated_transaction_ids
+            data["updated_transaction_ids_sample"] = ids.first(20)
+            data["updated_transaction_id_ranges"] = [list(pair) for pair in ids.ranges(20)]
+            data["updated_transaction_id_range_count"] = ids.range_count()
         return data
 
 
@@ -44,7 +47,7 @@ def import_r4_treatment_transactions(
     progress_every: int | None = None,
 ) -> TreatmentTransactionImportStats:
     stats = TreatmentTransactionImportStats()
-    updated_ids: set[int] = set()
+    updated_ids = IdRanges()
     processed = 0
     last_transaction_id: int | None = None
     started_at = time.monotonic()
@@ -69,6 +72,198 @@ def import_r4_treatment_transactions(
     return stats
 
 
+COPY_CHUNK_ROWS = 250_000
+_STAGE_COLUMNS = (
+    ("seq", "int8"),
+    ("legacy_transaction_id", "int4"),
+    ("patient_code", "int4"),
+    ("performed_at", "timestamptz"),
+    ("treatment_code", "int4"),
+    ("trans_code", "int4"),
+    ("patient_cost", "numeric"),
+    ("dpb_cost", "numeric"),
+    ("recorded_by", "int4"),
+    ("user_code", "int4"),
+    ("tp_number", "int4"),
+    ("tp_item", "int4"),
+)
+_DATA_COLUMNS = tuple(name for name, _type in _STAGE_COLUMNS[2:])
+# Same comparison as _apply_updates: any data column or the last updater differs.
+_CHANGED = " OR ".join(f"t.{name} IS DISTINCT FROM s.{name}" for name in _DATA_COLUMNS)
+_MERGE_SQL = text(
+    f"""
+    WITH src AS (
+        SELECT DISTINCT ON (legacy_transaction_id) *
+        FROM r4_tx_stage
+        ORDER BY legacy_transaction_id, seq DESC
+    ),
+    upd AS (
+        UPDATE r4_treatment_transactions AS t
+        SET {", ".join(f"{name} = s.{name}" for name in _DATA_COLUMNS)},
+            updated_by_user_id = :actor_id,
+            updated_at = now()
+        FROM src AS s
+        WHERE t.legacy_source = :legacy_source
+          AND t.legacy_transaction_id = s.legacy_transaction_id
+          AND ({_CHANGED} OR t.updated_by_user_id IS DISTINCT FROM :actor_id)
+        RETURNING t.legacy_transaction_id
+    ),
+    upd_ids AS (
+        INSERT INTO r4_tx_updated (legacy_transaction_id)
+        SELECT legacy_transaction_id FROM upd
+        RETURNING 1
+    ),
+    ins AS (
+        INSERT INTO r4_treatment_transactions (
+            legacy_source, legacy_transaction_id, {", ".join(_DATA_COLUMNS)},
+            created_by_user_id, updated_by_user_id
+        )
+        SELECT :legacy_source, s.legacy_transaction_id, {", ".join(f"s.{name}" for name in _DATA_COLUMNS)},
+            :actor_id, :actor_id
+        FROM src AS s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM r4_treatment_transactions AS t
+            WHERE t.legacy_source = :legacy_source
+              AND t.legacy_transaction_id = s.legacy_transaction_id
+        )
+        RETURNING 1
+    )
+    SELECT
+        (SELECT count(*) FROM r4_tx_stage) AS staged,
+        (SELECT count(*) FROM ins) AS created,
+        (SELECT count(*) FROM upd_ids) AS updated
+    """
+)
+# Gaps-and-islands: consecutive ids share (id - row_number()).
+_UPDATED_RANGES_SQL = text(
+    """
+    SELECT min(legacy_transaction_id), max(legacy_transaction_id)
+    FROM (
+        SELECT legacy_transaction_id,
+               legacy_transaction_id - row_number() OVER (ORDER BY legacy_transaction_id) AS grp
+        FROM (SELECT DISTINCT legacy_transaction_id FROM r4_tx_updated) AS ids
+    ) AS numbered
+    GROUP BY grp
+    ORDER BY 1
+    """
+)
+
+
+def import_r4_treatment_transactions_copy(
+    session: Session,
+    source: R4Source,
+    actor_id: int,
+    legacy_source: str = "r4",
+    patients_from: int | None = None,
+    patients_to: int | None = None,
+    limit: int | None = None,
+    progress_every: int | None = None,
+    chunk_rows: int = COPY_CHUNK_ROWS,
+) -> TreatmentTransactionImportStats:
+    """Set-based variant of import_r4_treatment_transactions for full-history loads.
+
+    Rows are normalised exactly as the per-row path does, streamed into a temp
+    staging table with binary COPY, and applied with one UPDATE + INSERT
+    statement per `chunk_rows` rows. Counts match the per-row path; when a
+    transaction id repeats within a run the last row wins and earlier copies
+    count as skipped. Updated ids come back as ranges, computed in SQL.
+    """
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows must be positive")
+    stats = TreatmentTransactionImportStats()
+    session.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS r4_tx_stage ("
+            + ", ".join(f"{name} {sql_type}" for name, sql_type in _STAGE_COLUMNS)
+            + ") ON COMMIT DROP"
+        )
+    )
+    session.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS r4_tx_updated (legacy_transaction_id int4) "
+            "ON COMMIT DROP"
+        )
+    )
+    session.execute(text("TRUNCATE r4_tx_stage, r4_tx_updated"))
+    dbapi = session.connection().connection.driver_connection
+
+    processed = 0
+    staged = 0
+    last_transaction_id: int | None = None
+    started_at = time.monotonic()
+    rows = iter(
+        source.stream_treatment_transactions(
+            patients_from=patients_from,
+            patients_to=patients_to,
+            limit=limit,
+        )
+    )
+    exhausted = False
+    while not exhausted:
+        exhausted = True
+        with dbapi.cursor() as cursor:
+            with cursor.copy(
+                f"COPY r4_tx_stage ({', '.join(name for name, _ in _STAGE_COLUMNS)}) "
+                "FROM STDIN (FORMAT BINARY)"
+            ) as copy:
+                copy.set_types([sql_type for _name, sql_type in _STAGE_COLUMNS])
+                for tx in rows:
+                    processed += 1
+                    staged += 1
+                    last_transaction_id = tx.transaction_id
+                    copy.write_row(_stage_row(processed, tx))
+                    _maybe_emit_checkpoint(
+                        processed,
+                        last_transaction_id,
+                        progress_every,
+                        started_at,
+                        limit,
+                    )
+                    if staged >= chunk_rows:
+                        exhausted = False
+                        break
+        if staged:
+            _merge_staged(session, actor_id, legacy_source, stats)
+            staged = 0
+
+    stats.updated_transaction_ids = IdRanges.from_ranges(
+        (int(start), int(end)) for start, end in session.execute(_UPDATED_RANGES_SQL)
+    )
+    return stats
+
+
+def _stage_row(seq: int, tx: R4TreatmentTransactionPayload) -> tuple:
+    return (
+        seq,
+        tx.transaction_id,
+        tx.patient_code,
+        _normalize_datetime(tx.performed_at),
+        tx.treatment_code,
+        tx.trans_code,
+        _normalize_money(tx.patient_cost),
+        _normalize_money(tx.dpb_cost),
+        tx.recorded_by,
+        tx.user_code,
+        tx.tp_number,
+        tx.tp_item,
+    )
+
+
+def _merge_staged(
+    session: Session,
+    actor_id: int,
+    legacy_source: str,
+    stats: TreatmentTransactionImportStats,
+) -> None:
+    result = session.execute(
+        _MERGE_SQL, {"actor_id": actor_id, "legacy_source": legacy_source}
+    ).one()
+    stats.transactions_created += int(result.created)
+    stats.transactions_updated += int(result.updated)
+    stats.transactions_skipped += int(result.staged) - int(result.created) - int(result.updated)
+    session.execute(text("TRUNCATE r4_tx_stage"))
+
+
 def _upsert_transaction(
     session: Session,
     tx: R4TreatmentTransactionPayload,
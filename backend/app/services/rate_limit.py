@@ -1,22 +1,317 @@
 from __future__ import annotations
 
+import logging
+import threading
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict
+from typing import Protocol
 
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
 
-class SimpleRateLimiter:
-    def __init__(self, *, max_events: int, window_seconds: int) -> None:
-        self.max_events = max_events
+logger = logging.getLogger("dental_pms.rate_limit")
+
+# Upper bound on keys kept by an in-memory store; least recently used keys
+# are dropped first (a dropped key simply starts again with a full bucket).
+MAX_MEMORY_KEYS = 100_000
+# How often a process deletes expired rows from the shared table.
+SWEEP_INTERVAL_SECONDS = 60.0
+# Minimum gap between "shared store unavailable" warnings.
+FALLBACK_LOG_INTERVAL_SECONDS = 60.0
+
+
+class BucketStore(Protocol):
+    name: str
+
+    def take(self, key: str, *, capacity: float, refill_per_second: float) -> bool: ...
+
+
+class MemoryBucketStore:
+    """Token buckets in this process only: (tokens, last refill) per key.
+
+    A bucket idle long enough to refill completely is indistinguishable from
+    a new one, so such keys are evicted instead of being kept forever.
+    """
+
+    name = "memory"
+
+    def __init__(self, *, max_keys: int = MAX_MEMORY_KEYS) -> None:
+        self.max_keys = max(max_keys, 1)
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(
+        self,
+        key: str,
+        *,
+        capacity: float,
+        refill_per_second: float,
+        now: float | None = None,
+    ) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens, updated, _full_at = bucket
+                tokens = min(capacity, tokens + max(now - updated, 0.0) * refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            full_at = now + (capacity - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now, full_at)
+            return allowed
+
+    def _evict(self, now: float) -> None:
+        # Buckets are ordered by last use; stop at the first one still refilling.
+        while self._buckets:
+            key, (_tokens, _updated, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) < self.max_keys:
+                break
+            del self._buckets[key]
+
+
+class PostgresBucketStore:
+    """Token buckets in the UNLOGGED `rate_limit_buckets` table, shared by all workers.
+
+    Each check is one upsert that refills, spends and reports in a single
+    statement using the database clock, so concurrent workers cannot both
+    spend the last token. It runs on its own autocommit connection so a
+    request that later rolls back still counts against the limit.
+    """
+
+    name = "postgres"
+
+    TAKE_SQL = text(
+        """
+        INSERT INTO rate_limit_buckets AS b (bucket_key, tokens, updated_at, allowed, expires_at)
+        VALUES (
+            :key,
+            :capacity - 1,
+            extract(epoch FROM clock_timestamp()),
+            true,
+            clock_timestamp() + make_interval(secs => 1 / :rate)
+        )
+        ON CONFLICT (bucket_key) DO UPDATE SET
+            tokens = CASE
+                WHEN least(:capacity, b.tokens + greatest(excluded.updated_at - b.updated_at, 0) * :rate) >= 1
+                THEN least(:capacity, b.tokens + greatest(excluded.updated_at - b.updated_at, 0) * :rate) - 1
+                ELSE least(:capacity, b.tokens + greatest(excluded.updated_at - b.updated_at, 0) * :rate)
+            END,
+            allowed = least(:capacity, b.tokens + greatest(excluded.updated_at - b.updated_at, 0) * :rate) >= 1,
+            updated_at = excluded.updated_at,
+            expires_at = clock_timestamp() + make_interval(
+                secs => (:capacity - least(:capacity, b.tokens + greatest(excluded.updated_at - b.updated_at, 0) * :rate) + 1) / :rate
+            )
+        RETURNING allowed
+        """
+    )
+    THROTTLED_SQL = text(
+        """
+        INSERT INTO rate_limit_throttle_counts AS c (limiter, throttled, last_throttled_at)
+        VALUES (:limiter, 1, clock_timestamp())
+        ON CONFLICT (limiter) DO UPDATE SET
+            throttled = c.throttled + 1,
+            last_throttled_at = excluded.last_throttled_at
+        """
+    )
+    SWEEP_SQL = text("DELETE FROM rate_limit_buckets WHERE expires_at < clock_timestamp()")
+
+    def __init__(self, engine: Engine, *, sweep_interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+        self._engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def take(self, key: str, *, capacity: float, refill_per_second: float) -> bool:
+        with self._engine.connect() as conn:
+            allowed = conn.execute(
+                self.TAKE_SQL,
+                {"key": key, "capacity": float(capacity), "rate": float(refill_per_second)},
+            ).scalar_one()
+            self._maybe_sweep(conn)
+        return bool(allowed)
+
+    def record_throttled(self, limiter: str) -> None:
+        with self._engine.connect() as conn:
+            conn.execute(self.THROTTLED_SQL, {"limiter": limiter})
+
+    def active_keys(self, prefix: str) -> int:
+        with self._engine.connect() as conn:
+            return int(
+                conn.execute(
+                    text(
+                        "SELECT count(*) FROM rate_limit_buckets "
+                        "WHERE bucket_key LIKE :prefix AND expires_at >= clock_timestamp()"
+                    ),
+                    {"prefix": f"{prefix}%"},
+                ).scalar_one()
+            )
+
+    def throttle_counts(self) -> dict[str, tuple[int, object]]:
+        with self._engine.connect() as conn:
+            rows = conn.execute(
+                text("SELECT limiter, throttled, last_throttled_at FROM rate_limit_throttle_counts")
+            ).all()
+        return {row.limiter: (int(row.throttled), row.last_throttled_at) for row in rows}
+
+    def sweep(self) -> int:
+        with self._engine.connect() as conn:
+            return conn.execute(self.SWEEP_SQL).rowcount or 0
+
+    def _maybe_sweep(self, conn) -> None:
+        now = time.monotonic()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + self.sweep_interval
+            conn.execute(self.SWEEP_SQL)
+        finally:
+            self._sweep_lock.release()
+
+
+class RateLimiter:
+    """Token bucket allowing bursts of `max_events`, refilled evenly over `window_seconds`.
+
+    Buckets live in the shared store when one is configured; if it cannot
+    be reached the limiter keeps working from a per-process store and logs
+    a warning, so an outage degrades to per-worker limits instead of
+    rejecting or admitting every request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_events: int,
+        window_seconds: float,
+        store: BucketStore | None = None,
+    ) -> None:
+        self.name = name
+        self.max_events = max(max_events, 1)
         self.window_seconds = window_seconds
-        self._events: dict[str, deque[float]] = defaultdict(deque)
+        self.refill_per_second = self.max_events / max(window_seconds, 0.001)
+        self._store = store
+        self._fallback = MemoryBucketStore()
+        self._lock = threading.Lock()
+        self._last_fallback_log = 0.0
+        self.allowed_total = 0
+        self.throttled_total = 0
+        self.fallback_total = 0
+        _registry[name] = self
+
+    @property
+    def store(self) -> BucketStore:
+        return self._store if self._store is not None else get_shared_store()
 
     def allow(self, key: str) -> bool:
+        store = self.store
+        bucket_key = f"{self.name}:{key}"
+        try:
+            allowed = store.take(
+                bucket_key, capacity=self.max_events, refill_per_second=self.refill_per_second
+            )
+        except Exception as exc:
+            allowed = self._fallback.take(
+                bucket_key, capacity=self.max_events, refill_per_second=self.refill_per_second
+            )
+            self._note_fallback(store, exc)
+        with self._lock:
+            if allowed:
+                self.allowed_total += 1
+            else:
+                self.throttled_total += 1
+        if not allowed:
+            logger.info("rate_limit throttled limiter=%s key=%s", self.name, key)
+            record = getattr(store, "record_throttled", None)
+            if record is not None:
+                try:
+                    record(self.name)
+                except Exception:
+                    logger.debug("rate_limit throttle count not recorded", exc_info=True)
+        return allowed
+
+    def _note_fallback(self, store: BucketStore, exc: Exception) -> None:
         now = time.monotonic()
-        window_start = now - self.window_seconds
-        events = self._events[key]
-        while events and events[0] < window_start:
-            events.popleft()
-        if len(events) >= self.max_events:
-            return False
-        events.append(now)
-        return True
+        with self._lock:
+            self.fallback_total += 1
+            if now - self._last_fallback_log < FALLBACK_LOG_INTERVAL_SECONDS:
+                return
+            self._last_fallback_log = now
+        logger.warning(
+            "rate_limit store=%s unavailable for limiter=%s; using per-process buckets (%s)",
+            store.name,
+            self.name,
+            exc,
+        )
+
+    def snapshot(self) -> dict[str, object]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_events": self.max_events,
+                "window_seconds": self.window_seconds,
+                "backend": self.store.name,
+                "process_allowed": self.allowed_total,
+                "process_throttled": self.throttled_total,
+                "process_fallbacks": self.fallback_total,
+            }
+
+
+_registry: dict[str, RateLimiter] = {}
+_shared_store: BucketStore | None = None
+_shared_store_lock = threading.Lock()
+
+
+def get_shared_store() -> BucketStore:
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                from app.core.settings import settings
+
+                backend = settings.rate_limit_backend.strip().lower()
+                if backend == "memory":
+                    _shared_store = MemoryBucketStore()
+                else:
+                    from app.db.session import engine
+
+                    _shared_store = PostgresBucketStore(engine)
+    return _shared_store
+
+
+def registered_limiters() -> list[RateLimiter]:
+    return [_registry[name] for name in sorted(_registry)]
+
+
+def rate_limit_metrics() -> list[dict[str, object]]:
+    """Per-limiter counters for this process plus, when shared, totals across workers."""
+    store = get_shared_store()
+    shared_counts: dict[str, tuple[int, object]] = {}
+    if isinstance(store, PostgresBucketStore):
+        try:
+            shared_counts = store.throttle_counts()
+        except Exception:
+            logger.warning("rate_limit shared counters unavailable", exc_info=True)
+    metrics = []
+    for limiter in registered_limiters():
+        entry = limiter.snapshot()
+        throttled, last_throttled_at = shared_counts.get(limiter.name, (0, None))
+        entry["shared_throttled"] = throttled if isinstance(store, PostgresBucketStore) else None
+        entry["last_throttled_at"] = last_throttled_at
+        active = None
+        if isinstance(store, PostgresBucketStore):
+            try:
+                active = store.active_keys(f"{limiter.name}:")
+            except Exception:
+                active = None
+        elif isinstance(store, MemoryBucketStore):
+            active = sum(1 for key in list(store._buckets) if key.startswith(f"{limiter.name}:"))
+        entry["active_keys"] = active
+        metrics.append(entry)
+    return metrics
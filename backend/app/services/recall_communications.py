@@ -2,15 +2,17 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select, update
 from sqlalchemy.orm import Session
 
+from app.models.patient_recall import PatientRecall
 from app.models.patient_recall_communication import (
     PatientRecallCommunication,
     PatientRecallCommunicationChannel,
     PatientRecallCommunicationDirection,
     PatientRecallCommunicationStatus,
 )
+from app.services.recall_kpis import record_recall_contact
 
 
 def log_recall_communication(
@@ -68,4 +70,98 @@ def log_recall_communication(
         created_by_user_id=created_by_user_id,
     )
     db.add(entry)
+    db.flush()
+    _record_last_contact(db, entry)
+    record_recall_contact(db, entry)
     return entry
+
+
+def _record_last_contact(db: Session, entry: PatientRecallCommunication) -> None:
+    """Point the recall's last-contact columns at `entry` if it is the newest.
+
+    The WHERE clause makes the check and the write one statement, so a
+    back-dated contact never replaces a later one, even under concurrency.
+    """
+    db.execute(
+        update(PatientRecall)
+        .where(PatientRecall.id == entry.recall_id)
+        .where(
+            or_(
+                PatientRecall.last_contacted_at.is_(None),
+                PatientRecall.last_contacted_at < entry.contacted_at,
+                and_(
+                    PatientRecall.last_contacted_at == entry.contacted_at,
+                    PatientRecall.last_contact_id < entry.id,
+                ),
+            )
+        )
+        .values(
+            last_contact_id=entry.id,
+            last_contacted_at=entry.contacted_at,
+            last_contact_channel=entry.channel,
+            last_contact_outcome=entry.outcome,
+            # A derived projection, not an edit of the recall.
+            updated_at=PatientRecall.updated_at,
+        )
+        .execution_options(synchronize_session="fetch")
+    )
+
+
+def rebuild_recall_last_contact(db: Session, *, apply: bool = True) -> int:
+    """Recompute every recall's last-contact columns from the history.
+
+    Returns the number of recalls whose stored values were wrong (and, with
+    `apply`, have been fixed).
+    """
+    contact_ts = func.coalesce(
+        PatientRecallCommunication.contacted_at,
+        PatientRecallCommunication.created_at,
+    )
+    latest = (
+        select(
+            PatientRecallCommunication.recall_id,
+            PatientRecallCommunication.id,
+            contact_ts.label("contacted_at"),
+            PatientRecallCommunication.channel,
+            PatientRecallCommunication.outcome,
+        )
+        .distinct(PatientRecallCommunication.recall_id)
+        .order_by(
+            PatientRecallCommunication.recall_id,
+            contact_ts.desc(),
+            PatientRecallCommunication.id.desc(),
+        )
+        .subquery()
+    )
+    stale = (
+        select(
+            PatientRecall.id.label("recall_id"),
+            latest.c.id,
+            latest.c.contacted_at,
+            latest.c.channel,
+            latest.c.outcome,
+        )
+        .outerjoin(latest, latest.c.recall_id == PatientRecall.id)
+        .where(
+            PatientRecall.last_contact_id.is_distinct_from(latest.c.id)
+            | PatientRecall.last_contacted_at.is_distinct_from(latest.c.contacted_at)
+            | PatientRecall.last_contact_channel.is_distinct_from(latest.c.channel)
+            | PatientRecall.last_contact_outcome.is_distinct_from(latest.c.outcome)
+        )
+        .subquery()
+    )
+    if not apply:
+        return int(db.scalar(select(func.count()).select_from(stale)) or 0)
+    result = db.execute(
+        update(PatientRecall)
+        .where(PatientRecall.id == stale.c.recall_id)
+        .values(
+            last_contact_id=stale.c.id,
+            last_contacted_at=stale.c.contacted_at,
+            last_contact_channel=stale.c.channel,
+            last_contact_outcome=stale.c.outcome,
+            updated_at=PatientRecall.updated_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return int(result.rowcount or 0)
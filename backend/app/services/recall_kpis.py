@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Date, case, cast, delete, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.patient import Patient, RecallStatus
+from app.models.patient_recall_communication import PatientRecallCommunication
+from app.models.recall_kpi import RecallContactDaily, RecallKpiBucket
+
+# (recall due date, recall status, UTC contact day for contacted recalls)
+RecallKpiKey = tuple[date, RecallStatus, date | None]
+
+
+def _utc_day(value: datetime) -> date:
+    if value.tzinfo is None:
+        return value.date()
+    return value.astimezone(timezone.utc).date()
+
+
+def _utc_day_sql(column):
+    return cast(func.timezone("UTC", column), Date)
+
+
+def _key_order(key: RecallKpiKey) -> tuple[date, str, date]:
+    due_date, status, contacted_on = key
+    return (due_date, status.value, contacted_on or date.min)
+
+
+def recall_kpi_key(patient: Patient) -> RecallKpiKey | None:
+    """The KPI bucket a patient counts in, or None when it counts nowhere."""
+    if (
+        patient.deleted_at is not None
+        or patient.recall_due_date is None
+        or patient.recall_status is None
+    ):
+        return None
+    status = RecallStatus(patient.recall_status)
+    contacted_on = None
+    if status == RecallStatus.contacted and patient.recall_last_contacted_at:
+        contacted_on = _utc_day(patient.recall_last_contacted_at)
+    return (patient.recall_due_date, status, contacted_on)
+
+
+def move_recall_kpi(
+    db: Session, before: RecallKpiKey | None, after: RecallKpiKey | None
+) -> None:
+    """Move one patient between KPI buckets in the caller's transaction.
+
+    Take `before` with `recall_kpi_key` before changing the patient's recall
+    fields or `deleted_at`, and `after` once the changes are made.
+    """
+    if before == after:
+        return
+    deltas: dict[RecallKpiKey, int] = {}
+    if before is not None:
+        deltas[before] = -1
+    if after is not None:
+        deltas[after] = deltas.get(after, 0) + 1
+    # A fixed row order keeps two opposite moves from deadlocking.
+    stmt = pg_insert(RecallKpiBucket).values(
+        [
+            {
+                "due_date": due_date,
+                "recall_status": status,
+                "contacted_on": contacted_on,
+                "patients": delta,
+            }
+            for (due_date, status, contacted_on), delta in sorted(
+                deltas.items(), key=lambda item: _key_order(item[0])
+            )
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_recall_kpi_buckets_key",
+        set_={"patients": RecallKpiBucket.patients + stmt.excluded.patients},
+    )
+    db.execute(stmt)
+
+
+def track_recall_kpi(db: Session, patient: Patient, before: RecallKpiKey | None) -> None:
+    move_recall_kpi(db, before, recall_kpi_key(patient))
+
+
+def record_recall_contact(db: Session, entry: PatientRecallCommunication) -> None:
+    contacted_at = entry.contacted_at or entry.created_at or datetime.now(timezone.utc)
+    stmt = pg_insert(RecallContactDaily).values(
+        contacted_on=_utc_day(contacted_at), channel=entry.channel, contacts=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RecallContactDaily.contacted_on, RecallContactDaily.channel],
+        set_={"contacts": RecallContactDaily.contacts + 1},
+    )
+    db.execute(stmt)
+
+
+def _bucket_source():
+    contacted_on = case(
+        (
+            Patient.recall_status == RecallStatus.contacted,
+            _utc_day_sql(Patient.recall_last_contacted_at),
+        ),
+        else_=None,
+    )
+    return (
+        select(
+            Patient.recall_due_date,
+            Patient.recall_status,
+            contacted_on,
+            func.count(),
+        )
+        .where(Patient.deleted_at.is_(None))
+        .where(Patient.recall_due_date.is_not(None))
+        .where(Patient.recall_status.is_not(None))
+        .group_by(Patient.recall_due_date, Patient.recall_status, contacted_on)
+    )
+
+
+def _contact_source():
+    contacted_on = _utc_day_sql(
+        func.coalesce(
+            PatientRecallCommunication.contacted_at,
+            PatientRecallCommunication.created_at,
+        )
+    )
+    return select(
+        contacted_on,
+        PatientRecallCommunication.channel,
+        func.count(),
+    ).group_by(contacted_on, PatientRecallCommunication.channel)
+
+
+def rebuild_recall_kpis(db: Session, *, apply: bool = True) -> int:
+    """Recount both KPI tables from patients and the communication history.
+
+    Returns the number of counter rows that were wrong or missing (and, with
+    `apply`, have been replaced).
+    """
+    if apply:
+        # Incremental writers wait until the recount commits, then add their
+        # deltas on top, so nothing is lost or counted twice.
+        db.execute(
+            text("LOCK TABLE recall_kpi_buckets, recall_contact_daily IN EXCLUSIVE MODE")
+        )
+    expected_buckets = {
+        (due_date, status, contacted_on): count
+        for due_date, status, contacted_on, count in db.execute(_bucket_source())
+    }
+    stored_buckets = {
+        (due_date, status, contacted_on): count
+        for due_date, status, contacted_on, count in db.execute(
+            select(
+                RecallKpiBucket.due_date,
+                RecallKpiBucket.recall_status,
+                RecallKpiBucket.contacted_on,
+                RecallKpiBucket.patients,
+            ).where(RecallKpiBucket.patients != 0)
+        )
+    }
+    expected_contacts = {
+        (contacted_on, channel): count
+        for contacted_on, channel, count in db.execute(_contact_source())
+    }
+    stored_contacts = {
+        (contacted_on, channel): count
+        for contacted_on, channel, count in db.execute(
+            select(
+                RecallContactDaily.contacted_on,
+                RecallContactDaily.channel,
+                RecallContactDaily.contacts,
+            ).where(RecallContactDaily.contacts != 0)
+        )
+    }
+    stale = sum(
+        1
+        for expected, stored in (
+            (expected_buckets, stored_buckets),
+            (expected_contacts, stored_contacts),
+        )
+        for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    )
+    if not apply:
+        return stale
+
+    db.execute(delete(RecallKpiBucket))
+    db.execute(delete(RecallContactDaily))
+    if expected_buckets:
+        db.execute(
+            insert(RecallKpiBucket),
+            [
+                {
+                    "due_date": due_date,
+                    "recall_status": status,
+                    "contacted_on": contacted_on,
+                    "patients": count,
+                }
+                for (due_date, status, contacted_on), count in expected_buckets.items()
+            ],
+        )
+    if expected_contacts:
+        db.execute(
+            insert(RecallContactDaily),
+            [
+                {"contacted_on": contacted_on, "channel": channel, "contacts": count}
+                for (contacted_on, channel), count in expected_contacts.items()
+            ],
+        )
+    return stale
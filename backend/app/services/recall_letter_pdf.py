@@ -1,45 +1,40 @@
 from __future__ import annotations
 
 from datetime import date
-from io import BytesIO
-from textwrap import wrap
+from functools import lru_cache
 
-from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 
 from app.models.patient import Patient
 from app.models.patient_recall import PatientRecall
-from app.services.pdf import CLINIC_NAME, CLINIC_PHONE
+from app.services.pdf_core import (
+    CLINIC_NAME,
+    CLINIC_PHONE,
+    LEFT,
+    PAGE_TOP,
+    RIGHT,
+    Footer,
+    Letterhead,
+    draw_lines,
+    render_pdf,
+    wrap_lines,
+)
 
 CLINIC_ADDRESS = "7 Chapel Road, Worthing, BN11 1EG"
 CLINIC_WEBSITE = "https://www.dental-worthing.co.uk"
 
 
-def build_recall_letter_pdf(patient: Patient, recall: PatientRecall) -> bytes:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    left = 20 * mm
-    right = width - 20 * mm
-    top = height - 20 * mm
-    y = top
-
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(left, y, CLINIC_NAME)
+def draw_recall_letter(pdf: canvas.Canvas, patient: Patient, recall: PatientRecall) -> None:
+    left = LEFT
+    top = PAGE_TOP
+
+    y = _letterhead().draw(pdf)
     pdf.setFont("Helvetica", 10)
-    y -= 6 * mm
-    for line in _build_header_lines():
-        pdf.drawString(left, y, line)
-        y -= 4 * mm
-    pdf.drawRightString(right, y + 4 * mm, f"Date: {date.today().isoformat()}")
+    pdf.drawRightString(RIGHT, y + 4 * mm, f"Date: {date.today().isoformat()}")
     y -= 6 * mm
 
-    pdf.setFont("Helvetica", 10)
-    for line in _build_patient_lines(patient):
-        pdf.drawString(left, y, line)
-        y -= 4 * mm
-    y -= 4 * mm
+    y = draw_lines(pdf, _build_patient_lines(patient), y) - 4 * mm
 
     pdf.setFont("Helvetica-Bold", 12)
     pdf.drawString(left, y, "Recall Reminder")
@@ -47,7 +42,7 @@ def build_recall_letter_pdf(patient: Patient, recall: PatientRecall) -> bytes:
 
     pdf.setFont("Helvetica", 11)
     body_lines = _build_body_lines(recall)
-    for line in _wrap_lines(body_lines, width=98):
+    for line in wrap_lines(body_lines, 98):
         if y < 25 * mm:
             pdf.showPage()
             y = top
@@ -55,17 +50,33 @@ def build_recall_letter_pdf(patient: Patient, recall: PatientRecall) -> bytes:
         pdf.drawString(left, y, line)
         y -= 6 * mm
 
-    _draw_footer(pdf, left)
-    pdf.save()
-    return buffer.getvalue()
+    _footer().draw(pdf)
+    pdf.showPage()
 
 
-def _build_header_lines() -> list[str]:
+def build_recall_letter_pdf(patient: Patient, recall: PatientRecall) -> bytes:
+    return render_pdf(lambda pdf: draw_recall_letter(pdf, patient, recall))
+
+
+def _phone_line() -> str:
     phone = CLINIC_PHONE.replace("Tel: ", "").strip()
-    phone_line = f"Telephone: {phone}" if phone else "Telephone: 01903 821822"
+    return f"Telephone: {phone}" if phone else "Telephone: 01903 821822"
+
+
+@lru_cache(maxsize=1)
+def _letterhead() -> Letterhead:
+    return Letterhead(CLINIC_NAME, tuple(_build_header_lines()), PAGE_TOP)
+
+
+@lru_cache(maxsize=1)
+def _footer() -> Footer:
+    return Footer(f"{_phone_line()} · Website: {CLINIC_WEBSITE}")
+
+
+def _build_header_lines() -> list[str]:
     return [
         CLINIC_ADDRESS,
-        phone_line,
+        _phone_line(),
         f"Website: {CLINIC_WEBSITE}",
     ]
 
@@ -92,17 +103,3 @@ def _build_body_lines(recall: PatientRecall) -> list[str]:
         "Please contact us to arrange an appointment at your convenience.",
         "If you have already booked, please disregard this letter.",
     ]
-
-
-def _wrap_lines(lines: list[str], *, width: int) -> list[str]:
-    wrapped: list[str] = []
-    for line in lines:
-        wrapped.extend(wrap(line, width=width) or [""])
-    return wrapped
-
-
-def _draw_footer(pdf: canvas.Canvas, left: float) -> None:
-    phone = CLINIC_PHONE.replace("Tel: ", "").strip()
-    phone_line = f"Telephone: {phone}" if phone else "Telephone: 01903 821822"
-    pdf.setFont("Helvetica", 9)
-    pdf.drawString(left, 12 * mm, f"{phone_line} · Website: {CLINIC_WEBSITE}")
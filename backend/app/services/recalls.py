@@ -2,18 +2,23 @@ from __future__ import annotations
 
 from datetime import date
 
+from sqlalchemy import and_, false, or_
+
 from app.models.patient_recall import PatientRecall, PatientRecallStatus
 
+# Stored statuses that resolve_recall_status returns unchanged.
+_FIXED_STATUSES = (
+    PatientRecallStatus.completed,
+    PatientRecallStatus.cancelled,
+    PatientRecallStatus.due,
+    PatientRecallStatus.overdue,
+)
+
 
 def resolve_recall_status(
     recall: PatientRecall, *, today: date | None = None
 ) -> PatientRecallStatus:
-    if recall.status in (
-        PatientRecallStatus.completed,
-        PatientRecallStatus.cancelled,
-        PatientRecallStatus.due,
-        PatientRecallStatus.overdue,
-    ):
+    if recall.status in _FIXED_STATUSES:
         return recall.status
     if not recall.due_date:
         return recall.status
@@ -23,3 +28,32 @@ def resolve_recall_status(
     if recall.due_date <= resolved_today:
         return PatientRecallStatus.due
     return recall.status
+
+
+def resolved_status_clause(
+    statuses: set[PatientRecallStatus], *, today: date | None = None
+):
+    """SQL filter matching recalls whose resolve_recall_status() is in `statuses`.
+
+    Only stored `upcoming` recalls move with the calendar, so each status is a
+    status equality plus, at most, a due-date range on upcoming rows; both are
+    range scans on ix_patient_recalls_status_due_date.
+    """
+    resolved_today = today or date.today()
+    upcoming = PatientRecall.status == PatientRecallStatus.upcoming
+    clauses = []
+    fixed = [member for member in _FIXED_STATUSES if member in statuses]
+    if fixed:
+        clauses.append(PatientRecall.status.in_(fixed))
+    if PatientRecallStatus.overdue in statuses:
+        clauses.append(and_(upcoming, PatientRecall.due_date < resolved_today))
+    if PatientRecallStatus.due in statuses:
+        clauses.append(and_(upcoming, PatientRecall.due_date == resolved_today))
+    if PatientRecallStatus.upcoming in statuses:
+        clauses.append(
+            and_(
+                upcoming,
+                or_(PatientRecall.due_date > resolved_today, PatientRecall.due_date.is_(None)),
+            )
+        )
+    return or_(*clauses) if clauses else false()
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, time as dt_time
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.practice_profile import PracticeProfile
+from app.models.practice_schedule import PracticeClosure, PracticeHour, PracticeOverride
+from app.models.r4_treatment_plan import R4Treatment
+from app.models.r4_user import R4User
+from app.models.reference_data import ReferenceDataVersion
+
+logger = logging.getLogger("dental_pms.reference_cache")
+
+R4_USERS = "r4_users"
+R4_TREATMENTS = "r4_treatments"
+PRACTICE_PROFILE = "practice_profile"
+PRACTICE_SCHEDULE = "practice_schedule"
+SCOPES = (R4_USERS, R4_TREATMENTS, PRACTICE_PROFILE, PRACTICE_SCHEDULE)
+
+PROFILE_FIELDS = (
+    "name",
+    "address_line1",
+    "address_line2",
+    "city",
+    "postcode",
+    "phone",
+    "website",
+    "email",
+)
+
+
+@dataclass(frozen=True)
+class R4UserRef:
+    legacy_user_code: int
+    display_name: str | None
+    full_name: str | None
+    forename: str | None
+    surname: str | None
+    is_current: bool
+    role: str | None
+
+
+@dataclass(frozen=True)
+class CachedPracticeHour:
+    id: int
+    day_of_week: int
+    start_time: dt_time | None
+    end_time: dt_time | None
+    is_closed: bool
+
+
+@dataclass(frozen=True)
+class CachedPracticeClosure:
+    id: int
+    start_date: date
+    end_date: date
+    reason: str | None
+
+
+@dataclass(frozen=True)
+class CachedPracticeOverride:
+    id: int
+    date: date
+    start_time: dt_time | None
+    end_time: dt_time | None
+    is_closed: bool
+    reason: str | None
+
+
+@dataclass(frozen=True)
+class PracticeScheduleSnapshot:
+    hours: tuple[CachedPracticeHour, ...]
+    closures: tuple[CachedPracticeClosure, ...]
+    overrides: tuple[CachedPracticeOverride, ...]
+
+
+def bump_reference_data(db: Session, *scopes: str) -> None:
+    """Record that reference tables changed, in the caller's transaction.
+
+    Every worker reloads the scope on its next version check; this process
+    checks again as soon as the transaction commits.
+    """
+    keys = sorted(set(scopes))
+    if not keys:
+        return
+    unknown = set(keys) - set(SCOPES)
+    if unknown:
+        raise ValueError(f"Unknown reference data scope(s): {', '.join(sorted(unknown))}")
+    stmt = pg_insert(ReferenceDataVersion).values(
+        [{"scope": key, "version": 1} for key in keys]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ReferenceDataVersion.scope],
+        set_={
+            "version": ReferenceDataVersion.version + 1,
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+    if not event.contains(db, "after_commit", _expire_after_commit):
+        event.listen(db, "after_commit", _expire_after_commit)
+
+
+def _expire_after_commit(_session: Session) -> None:
+    reference_cache.expire()
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """Immutable view of the cached tables; lookups are plain dict hits."""
+
+    users: dict[tuple[str, int], R4UserRef] = field(default_factory=dict)
+    treatment_names: dict[tuple[str, int], str | None] = field(default_factory=dict)
+    profile: dict[str, str | None] | None = None
+    schedule: PracticeScheduleSnapshot = PracticeScheduleSnapshot((), (), ())
+
+    def r4_user(self, user_code: int | None, legacy_source: str = "r4") -> R4UserRef | None:
+        if user_code is None:
+            return None
+        return self.users.get((legacy_source, user_code))
+
+    def r4_treatment_name(
+        self, treatment_code: int | None, legacy_source: str = "r4"
+    ) -> str | None:
+        if treatment_code is None:
+            return None
+        return self.treatment_names.get((legacy_source, treatment_code))
+
+
+class ReferenceCache:
+    """Per-process copy of small, rarely changing reference tables.
+
+    `get()` reads the version counters (one small query) and reloads any scope
+    whose counter moved since it was loaded. With `check_seconds` above zero
+    the counters are read at most that often, so changes made by other
+    workers or import scripts can take that long to show up; changes
+    committed through `bump_reference_data` in this process apply at once.
+    """
+
+    def __init__(self, *, check_seconds: float):
+        self.check_seconds = max(check_seconds, 0.0)
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self._checked_at: float | None = None
+        self._data = ReferenceData()
+
+    def expire(self) -> None:
+        """Force a version check on the next lookup."""
+        self._checked_at = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions = {}
+            self._checked_at = None
+
+    def get(self, db: Session) -> ReferenceData:
+        self.refresh(db)
+        return self._data
+
+    def refresh(self, db: Session, *, force: bool = False) -> list[str]:
+        """Reload stale scopes; returns the scopes that were reloaded."""
+        if not force and self._fresh():
+            return []
+        with self._lock:
+            if not force and self._fresh():
+                return []
+            # Versions are read before the data, so a concurrent change can only
+            # make the loaded data newer than its version, never older.
+            versions = {
+                scope: int(version)
+                for scope, version in db.execute(
+                    select(ReferenceDataVersion.scope, ReferenceDataVersion.version).where(
+                        ReferenceDataVersion.scope.in_(SCOPES)
+                    )
+                )
+            }
+            stale = [
+                scope
+                for scope in SCOPES
+                if scope not in self._versions
+                or self._versions[scope] != versions.get(scope, 0)
+            ]
+            if stale:
+                data = self._data
+                for scope in stale:
+                    data = self._load(db, scope, data)
+                    self._versions[scope] = versions.get(scope, 0)
+                self._data = data
+            self._checked_at = time.monotonic()
+        if stale:
+            logger.info("reference_cache reloaded scopes=%s", ",".join(stale))
+        return stale
+
+    def _fresh(self) -> bool:
+        checked_at = self._checked_at
+        return (
+            self.check_seconds > 0
+            and checked_at is not None
+            and time.monotonic() - checked_at < self.check_seconds
+        )
+
+    def _load(self, db: Session, scope: str, data: ReferenceData) -> ReferenceData:
+        if scope == R4_USERS:
+            users = {
+                (row.legacy_source, row.legacy_user_code): R4UserRef(
+                    legacy_user_code=row.legacy_user_code,
+                    display_name=row.display_name,
+                    full_name=row.full_name,
+                    forename=row.forename,
+                    surname=row.surname,
+                    is_current=bool(row.is_current),
+                    role=row.role,
+                )
+                for row in db.execute(
+                    select(
+                        R4User.legacy_source,
+                        R4User.legacy_user_code,
+                        R4User.display_name,
+                        R4User.full_name,
+                        R4User.forename,
+                        R4User.surname,
+                        R4User.is_current,
+                        R4User.role,
+                    )
+                )
+            }
+            return replace(data, users=users)
+        if scope == R4_TREATMENTS:
+            treatment_names = {
+                (legacy_source, code): description
+                for legacy_source, code, description in db.execute(
+                    select(
+                        R4Treatment.legacy_source,
+                        R4Treatment.legacy_treatment_code,
+                        R4Treatment.description,
+                    )
+                )
+            }
+            return replace(data, treatment_names=treatment_names)
+        if scope == PRACTICE_PROFILE:
+            row = db.execute(
+                select(*(getattr(PracticeProfile, name) for name in PROFILE_FIELDS))
+                .order_by(PracticeProfile.id)
+                .limit(1)
+            ).first()
+            profile = dict(zip(PROFILE_FIELDS, row)) if row is not None else None
+            return replace(data, profile=profile)
+        if scope == PRACTICE_SCHEDULE:
+            schedule = PracticeScheduleSnapshot(
+                hours=_snapshot(
+                    db,
+                    CachedPracticeHour,
+                    select(
+                        PracticeHour.id,
+                        PracticeHour.day_of_week,
+                        PracticeHour.start_time,
+                        PracticeHour.end_time,
+                        PracticeHour.is_closed,
+                    ).order_by(PracticeHour.day_of_week),
+                ),
+                closures=_snapshot(
+                    db,
+                    CachedPracticeClosure,
+                    select(
+                        PracticeClosure.id,
+                        PracticeClosure.start_date,
+                        PracticeClosure.end_date,
+                        PracticeClosure.reason,
+                    ).order_by(PracticeClosure.start_date),
+                ),
+                overrides=_snapshot(
+                    db,
+                    CachedPracticeOverride,
+                    select(
+                        PracticeOverride.id,
+                        PracticeOverride.date,
+                        PracticeOverride.start_time,
+                        PracticeOverride.end_time,
+                        PracticeOverride.is_closed,
+                        PracticeOverride.reason,
+                    ).order_by(PracticeOverride.date),
+                ),
+            )
+            return replace(data, schedule=schedule)
+        raise ValueError(f"Unknown reference data scope: {scope}")
+
+
+def _snapshot(db: Session, row_type: type, stmt) -> tuple:
+    return tuple(row_type(*row) for row in db.execute(stmt))
+
+
+def warm_reference_cache(db: Session) -> list[str]:
+    return reference_cache.refresh(db, force=True)
+
+
+reference_cache = ReferenceCache(check_seconds=settings.reference_cache_check_seconds)
@@ -1,96 +1,248 @@
 from __future__ import annotations
 
-from datetime import date
-from io import BytesIO
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from itertools import groupby
 
 from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
-
-from app.models.appointment import Appointment
-from app.services.pdf import CLINIC_ADDRESS_LINES, CLINIC_NAME, CLINIC_PHONE
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.appointment import Appointment, AppointmentLocationType
+from app.models.estimate import Estimate
+from app.models.note import Note
+from app.models.patient import Patient
+from app.models.user import User
+from app.services.pdf_core import clinic_letterhead, draw_rule, draw_title, render_pdf
+
+UNASSIGNED_CLINICIAN = "Unassigned"
+
+
+@dataclass(frozen=True)
+class RunSheetVisit:
+    """One flattened run sheet row; everything the PDF prints, nothing lazy."""
+
+    appointment_id: int
+    starts_at: datetime
+    ends_at: datetime
+    status: str
+    clinician: str
+    patient_name: str
+    date_of_birth: date | None
+    address: str
+    access_notes: str | None
+    contact_name: str | None
+    contact_phone: str | None
+    estimate_status: str | None
+    has_alerts: bool
+    has_notes: bool
+
+
+def _has_text(column):
+    return func.coalesce(func.btrim(column), "") != ""
+
+
+def load_run_sheet_visits(
+    db: Session,
+    start: date,
+    end: date,
+    *,
+    location: str | None = "visit",
+    clinician_user_id: int | None = None,
+) -> list[RunSheetVisit]:
+    """Run sheet rows for the date range in one query, ordered by clinician then time."""
+    start_dt = datetime.combine(start, time.min, tzinfo=timezone.utc)
+    end_dt = datetime.combine(end, time.max, tzinfo=timezone.utc)
+    latest_estimate_status = (
+        select(Estimate.status)
+        .where(Estimate.appointment_id == Appointment.id)
+        .order_by(Estimate.updated_at.desc())
+        .limit(1)
+        .correlate(Appointment)
+        .scalar_subquery()
+    )
+    has_notes = exists(
+        select(Note.id).where(
+            Note.appointment_id == Appointment.id, Note.deleted_at.is_(None)
+        )
+    ).correlate(Appointment)
+    has_alerts = or_(
+        _has_text(Patient.allergies),
+        _has_text(Patient.medical_alerts),
+        _has_text(Patient.safeguarding_notes),
+        _has_text(Patient.alerts_financial),
+        _has_text(Patient.alerts_access),
+    )
+    stmt = (
+        select(
+            Appointment.id,
+            Appointment.starts_at,
+            Appointment.ends_at,
+            Appointment.status,
+            Appointment.clinician_user_id,
+            Appointment.clinician,
+            Appointment.location_text,
+            Appointment.visit_address,
+            User.full_name.label("clinician_full_name"),
+            User.email.label("clinician_email"),
+            Patient.first_name,
+            Patient.last_name,
+            Patient.date_of_birth,
+            Patient.visit_address_text,
+            Patient.access_notes,
+            Patient.primary_contact_name,
+            Patient.primary_contact_phone,
+            latest_estimate_status.label("estimate_status"),
+            has_alerts.label("has_alerts"),
+            has_notes.label("has_notes"),
+        )
+        .join(Patient, Patient.id == Appointment.patient_id)
+        .outerjoin(User, User.id == Appointment.clinician_user_id)
+        .where(Appointment.deleted_at.is_(None))
+        .where(Appointment.starts_at >= start_dt, Appointment.starts_at <= end_dt)
+        .order_by(Appointment.starts_at.asc(), Appointment.id.asc())
+    )
+    if location == "clinic":
+        stmt = stmt.where(Appointment.location_type == AppointmentLocationType.clinic)
+    elif location == "visit":
+        stmt = stmt.where(Appointment.location_type == AppointmentLocationType.visit)
+    if clinician_user_id is not None:
+        stmt = stmt.where(Appointment.clinician_user_id == clinician_user_id)
+
+    visits = [
+        RunSheetVisit(
+            appointment_id=row.id,
+            starts_at=row.starts_at,
+            ends_at=row.ends_at,
+            status=row.status.value,
+            clinician=_clinician_label(row),
+            patient_name=f"{row.first_name} {row.last_name}",
+            date_of_birth=row.date_of_birth,
+            address=row.location_text or row.visit_address or row.visit_address_text or "N/A",
+            access_notes=row.access_notes,
+            contact_name=row.primary_contact_name,
+            contact_phone=row.primary_contact_phone,
+            estimate_status=row.estimate_status.value if row.estimate_status else None,
+            has_alerts=bool(row.has_alerts),
+            has_notes=bool(row.has_notes),
+        )
+        for row in db.execute(stmt)
+    ]
+    # Stable sort keeps time order within each clinician.
+    visits.sort(key=lambda visit: _clinician_sort_key(visit.clinician))
+    return visits
+
+
+def _clinician_label(row) -> str:
+    if row.clinician_user_id is None:
+        return (row.clinician or "").strip() or UNASSIGNED_CLINICIAN
+    if row.clinician_full_name and row.clinician_full_name.strip():
+        return row.clinician_full_name.strip()
+    return row.clinician_email or row.clinician or f"Clinician {row.clinician_user_id}"
+
+
+def _clinician_sort_key(label: str) -> tuple[bool, str]:
+    return label == UNASSIGNED_CLINICIAN, label.lower()
 
 
 def _draw_header(pdf: canvas.Canvas, title: str, subtitle: str) -> None:
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(20 * mm, 280 * mm, CLINIC_NAME)
-    pdf.setFont("Helvetica", 10)
-    y = 274 * mm
-    for line in CLINIC_ADDRESS_LINES:
-        pdf.drawString(20 * mm, y, line)
-        y -= 4 * mm
-    pdf.drawString(20 * mm, y, CLINIC_PHONE)
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawRightString(190 * mm, 280 * mm, title)
-    pdf.setFont("Helvetica", 10)
-    pdf.drawRightString(190 * mm, 274 * mm, subtitle)
-    pdf.setStrokeColor(colors.lightgrey)
-    pdf.line(20 * mm, 260 * mm, 190 * mm, 260 * mm)
-
-
-def _format_window(appt: Appointment) -> str:
-    start_local = appt.starts_at.astimezone().strftime("%H:%M")
-    end_local = appt.ends_at.astimezone().strftime("%H:%M")
-    return f"{start_local}-{end_local}"
+    clinic_letterhead().draw(pdf)
+    draw_title(pdf, title, subtitle)
+    draw_rule(pdf, 260 * mm)
 
 
-def _estimate_status(appt: Appointment) -> str:
-    if not appt.estimates:
-        return "N/A"
-    latest = sorted(appt.estimates, key=lambda e: e.updated_at, reverse=True)[0]
-    return latest.status.value
+def _format_window(visit: RunSheetVisit) -> str:
+    start_local = visit.starts_at.astimezone().strftime("%H:%M")
+    end_local = visit.ends_at.astimezone().strftime("%H:%M")
+    return f"{start_local}-{end_local}"
 
 
-def build_run_sheet_pdf(appointments: list[Appointment], start: date, end: date) -> bytes:
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
+def _flags(visit: RunSheetVisit) -> str | None:
+    flags = []
+    if visit.has_alerts:
+        flags.append("Medical/other alerts")
+    if visit.has_notes:
+        flags.append("Appointment notes")
+    return ", ".join(flags) if flags else None
 
-    subtitle = start.isoformat() if start == end else f"{start.isoformat()} to {end.isoformat()}"
-    _draw_header(pdf, "Run sheet", subtitle)
 
-    y = 250 * mm
-    pdf.setFont("Helvetica-Bold", 10)
-    pdf.drawString(20 * mm, y, "Visits")
-    y -= 8 * mm
+def draw_run_sheet(
+    pdf: canvas.Canvas, visits: list[RunSheetVisit], start: date, end: date
+) -> None:
+    """One section per clinician, each starting on a new page, with day headings."""
+    subtitle = start.isoformat() if start == end else f"{start.isoformat()} to {end.isoformat()}"
+    multi_day = start != end
+    sections = [
+        (clinician, list(rows)) for clinician, rows in groupby(visits, key=lambda v: v.clinician)
+    ] or [(None, [])]
 
-    for appt in appointments:
-        if y < 40 * mm:
+    for index, (clinician, rows) in enumerate(sections):
+        if index:
             pdf.showPage()
-            _draw_header(pdf, "Run sheet", subtitle)
-            y = 250 * mm
-
-        patient = appt.patient
+        _draw_header(pdf, "Run sheet", subtitle)
+        heading = f"Visits: {clinician}" if clinician else "Visits"
+        y = 250 * mm
         pdf.setFont("Helvetica-Bold", 10)
-        pdf.drawString(20 * mm, y, f"{_format_window(appt)}  {patient.first_name} {patient.last_name}")
-        pdf.setFont("Helvetica", 9)
-        y -= 6 * mm
-
-        dob = patient.date_of_birth.isoformat() if patient.date_of_birth else "N/A"
-        pdf.drawString(20 * mm, y, f"DOB: {dob}  Status: {appt.status.value}")
-        y -= 5 * mm
-
-        address = appt.location_text or appt.visit_address or patient.visit_address_text or "N/A"
-        pdf.drawString(20 * mm, y, f"Address: {address}")
-        y -= 5 * mm
-
-        access = patient.access_notes or "N/A"
-        pdf.drawString(20 * mm, y, f"Access: {access}")
-        y -= 5 * mm
-
-        contact_name = patient.primary_contact_name or "N/A"
-        contact_phone = patient.primary_contact_phone or "N/A"
-        pdf.drawString(20 * mm, y, f"Contact: {contact_name}  {contact_phone}")
-        y -= 5 * mm
-
-        estimate_status = _estimate_status(appt)
-        pdf.drawString(20 * mm, y, f"Estimate: {estimate_status}")
+        pdf.drawString(20 * mm, y, heading)
         y -= 8 * mm
 
-        pdf.setStrokeColor(colors.lightgrey)
-        pdf.line(20 * mm, y, 190 * mm, y)
-        y -= 6 * mm
+        current_day = None
+        for visit in rows:
+            day = visit.starts_at.astimezone().date()
+            needs_day = multi_day and day != current_day
+            if y < (53 if needs_day else 45) * mm:
+                pdf.showPage()
+                _draw_header(pdf, "Run sheet", subtitle)
+                y = 250 * mm
+                pdf.setFont("Helvetica-Bold", 10)
+                pdf.drawString(20 * mm, y, f"{heading} (continued)")
+                y -= 8 * mm
+                needs_day = multi_day
+            if needs_day:
+                current_day = day
+                pdf.setFont("Helvetica-Bold", 10)
+                pdf.drawString(20 * mm, y, day.strftime("%A %d %B %Y"))
+                y -= 8 * mm
+
+            pdf.setFont("Helvetica-Bold", 10)
+            pdf.drawString(20 * mm, y, f"{_format_window(visit)}  {visit.patient_name}")
+            pdf.setFont("Helvetica", 9)
+            y -= 6 * mm
+
+            dob = visit.date_of_birth.isoformat() if visit.date_of_birth else "N/A"
+            pdf.drawString(20 * mm, y, f"DOB: {dob}  Status: {visit.status}")
+            y -= 5 * mm
+
+            pdf.drawString(20 * mm, y, f"Address: {visit.address}")
+            y -= 5 * mm
+
+            access = visit.access_notes or "N/A"
+            pdf.drawString(20 * mm, y, f"Access: {access}")
+            y -= 5 * mm
+
+            contact_name = visit.contact_name or "N/A"
+            contact_phone = visit.contact_phone or "N/A"
+            pdf.drawString(20 * mm, y, f"Contact: {contact_name}  {contact_phone}")
+            y -= 5 * mm
+
+            estimate_status = visit.estimate_status or "N/A"
+            pdf.drawString(20 * mm, y, f"Estimate: {estimate_status}")
+            y -= 5 * mm
+
+            flags = _flags(visit)
+            if flags:
+                pdf.drawString(20 * mm, y, f"Flags: {flags}")
+                y -= 5 * mm
+            y -= 3 * mm
+
+            pdf.setStrokeColor(colors.lightgrey)
+            pdf.line(20 * mm, y, 190 * mm, y)
+            y -= 6 * mm
 
     pdf.showPage()
-    pdf.save()
-    return buffer.getvalue()
+
+
+def build_run_sheet_pdf(visits: list[RunSheetVisit], start: date, end: date) -> bytes:
+    return render_pdf(lambda pdf: draw_run_sheet(pdf, visits, start, end))
@@ -7,6 +7,14 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.models.practice_schedule import PracticeClosure, PracticeHour, PracticeOverride
+from app.services.reference_cache import (
+    PRACTICE_SCHEDULE,
+    CachedPracticeClosure,
+    CachedPracticeHour,
+    CachedPracticeOverride,
+    bump_reference_data,
+    reference_cache,
+)
 
 LOCAL_TZ = ZoneInfo("Europe/London")
 
@@ -33,15 +41,21 @@ def ensure_default_hours(db: Session) -> None:
                 is_closed=closed,
             )
         )
+    bump_reference_data(db, PRACTICE_SCHEDULE)
     db.commit()
 
 
-def load_schedule(db: Session) -> tuple[list[PracticeHour], list[PracticeClosure], list[PracticeOverride]]:
-    ensure_default_hours(db)
-    hours = list(db.scalars(select(PracticeHour).order_by(PracticeHour.day_of_week)))
-    closures = list(db.scalars(select(PracticeClosure).order_by(PracticeClosure.start_date)))
-    overrides = list(db.scalars(select(PracticeOverride).order_by(PracticeOverride.date)))
-    return hours, closures, overrides
+def load_schedule(
+    db: Session,
+) -> tuple[list[CachedPracticeHour], list[CachedPracticeClosure], list[CachedPracticeOverride]]:
+    schedule = reference_cache.get(db).schedule
+    if not schedule.hours:
+        # First use, or hours written without a version bump: make sure the
+        # defaults exist and reload from the tables.
+        ensure_default_hours(db)
+        reference_cache.clear()
+        schedule = reference_cache.get(db).schedule
+    return list(schedule.hours), list(schedule.closures), list(schedule.overrides)
 
 
 def _is_date_closed(target: date, closures: list[PracticeClosure]) -> PracticeClosure | None:
@@ -1,20 +1,42 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import re
+import shutil
 import uuid
 from pathlib import Path
+from typing import Callable
 
 from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.attachment import AttachmentBlob
 
 ATTACHMENTS_DIR = Path("/data/attachments")
 CHUNK_SIZE = 1024 * 1024
+STAGING_DIR_NAME = ".staging"
+
+# Content keys are SHA-256 hex digests, fanned out as ab/cd/<digest> so no
+# directory grows past a few hundred entries. Older uploads keep their flat
+# UUID keys and cached artifacts use explicit "<prefix>/..." keys.
+_CONTENT_KEY_RE = re.compile(r"[0-9a-f]{64}")
 
 
 def _ensure_dir() -> None:
     ATTACHMENTS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _relative_path(storage_key: str) -> str:
+    if _CONTENT_KEY_RE.fullmatch(storage_key):
+        return f"{storage_key[:2]}/{storage_key[2:4]}/{storage_key}"
+    return storage_key
+
+
 def _resolve_path(storage_key: str) -> Path:
-    safe_key = storage_key.strip()
+    safe_key = _relative_path(storage_key.strip())
     path = (ATTACHMENTS_DIR / safe_key).resolve()
     base = ATTACHMENTS_DIR.resolve()
     if str(path) == str(base) or not str(path).startswith(f"{base}/"):
@@ -22,13 +44,29 @@ def _resolve_path(storage_key: str) -> Path:
     return path
 
 
+def _staging_path() -> Path:
+    staging = ATTACHMENTS_DIR / STAGING_DIR_NAME
+    staging.mkdir(parents=True, exist_ok=True)
+    return staging / uuid.uuid4().hex
+
+
+def _publish(staged: Path, storage_key: str) -> None:
+    path = _resolve_path(storage_key)
+    if path.exists():
+        # Identical content is already stored; the staged copy is discarded.
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(staged, path)
+
+
 def save_upload(upload_file: UploadFile, max_bytes: int) -> tuple[str, int]:
+    """Store an upload under its SHA-256, hashing while the bytes are copied to disk."""
     _ensure_dir()
-    storage_key = uuid.uuid4().hex
-    path = _resolve_path(storage_key)
+    staged = _staging_path()
+    digest = hashlib.sha256()
     total = 0
     try:
-        with path.open("wb") as handle:
+        with staged.open("wb") as handle:
             while True:
                 chunk = upload_file.file.read(CHUNK_SIZE)
                 if not chunk:
@@ -36,29 +74,162 @@ def save_upload(upload_file: UploadFile, max_bytes: int) -> tuple[str, int]:
                 total += len(chunk)
                 if total > max_bytes:
                     raise ValueError("File exceeds max upload size")
+                digest.update(chunk)
                 handle.write(chunk)
-    except Exception:
-        if path.exists():
-            path.unlink()
-        raise
+        storage_key = digest.hexdigest()
+        _publish(staged, storage_key)
+    finally:
+        staged.unlink(missing_ok=True)
     return storage_key, total
 
 
 def save_bytes(content: bytes) -> tuple[str, int]:
     _ensure_dir()
-    storage_key = uuid.uuid4().hex
-    path = _resolve_path(storage_key)
-    with path.open("wb") as handle:
-        handle.write(content)
+    storage_key = hashlib.sha256(content).hexdigest()
+    if _resolve_path(storage_key).exists():
+        return storage_key, len(content)
+    staged = _staging_path()
+    try:
+        staged.write_bytes(content)
+        _publish(staged, storage_key)
+    finally:
+        staged.unlink(missing_ok=True)
     return storage_key, len(content)
 
 
-def open_file(storage_key: str):
+def content_address_file(storage_key: str) -> tuple[str, int]:
+    """Hash an already-stored file and make it available under its content key.
+
+    The original key is left in place; the caller removes it once nothing
+    refers to it any more.
+    """
+    source = file_path(storage_key)
+    digest = hashlib.sha256()
+    total = 0
+    with source.open("rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+            total += len(chunk)
+    content_key = digest.hexdigest()
+    if content_key == storage_key:
+        return content_key, total
+    target = _resolve_path(content_key)
+    if not target.exists():
+        staged = _staging_path()
+        try:
+            try:
+                os.link(source, staged)
+            except OSError:
+                shutil.copyfile(source, staged)
+            _publish(staged, content_key)
+        finally:
+            staged.unlink(missing_ok=True)
+    return content_key, total
+
+
+def retain_blob(db: Session, storage_key: str, byte_size: int, count: int = 1) -> None:
+    """Count `count` more references to a stored file.
+
+    The blob row stays locked until the caller commits, so a concurrent
+    release_blob cannot remove the file underneath the new reference; if one
+    already did, FileNotFoundError tells the caller to roll back and save the
+    upload again (save_and_retain does this).
+    """
+    stmt = insert(AttachmentBlob).values(
+        storage_key=storage_key, byte_size=byte_size, ref_count=count
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[AttachmentBlob.storage_key],
+            set_={"ref_count": AttachmentBlob.ref_count + count},
+        )
+    )
+    if not _resolve_path(storage_key).exists():
+        raise FileNotFoundError(storage_key)
+
+
+def save_and_retain(db: Session, save: Callable[[], tuple[str, int]]) -> tuple[str, int]:
+    """Store a file with `save` and count a reference to its blob.
+
+    If a concurrent release_blob removed the identical file between the two
+    steps, the transaction is rolled back and the file is saved once more.
+    """
+    try:
+        storage_key, byte_size = save()
+        retain_blob(db, storage_key, byte_size)
+        return storage_key, byte_size
+    except FileNotFoundError:
+        db.rollback()
+    storage_key, byte_size = save()
+    retain_blob(db, storage_key, byte_size)
+    return storage_key, byte_size
+
+
+def release_blob(db: Session, storage_key: str) -> bool:
+    """Drop one reference and delete the file once nothing refers to it.
+
+    Returns True when the file was removed.
+    """
+    blob = db.scalars(
+        select(AttachmentBlob)
+        .where(AttachmentBlob.storage_key == storage_key)
+        .with_for_update()
+    ).one_or_none()
+    if blob is not None:
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return False
+        db.delete(blob)
+        db.flush()
+    delete_file(storage_key)
+    return True
+
+
+def file_path(storage_key: str) -> Path:
     path = _resolve_path(storage_key)
-    return path.open("rb")
+    if not path.is_file():
+        raise FileNotFoundError(storage_key)
+    return path
 
 
 def delete_file(storage_key: str) -> None:
+    """Remove a file unconditionally; shared attachment files go through release_blob."""
     path = _resolve_path(storage_key)
     if path.exists():
         path.unlink()
+
+
+def read_bytes(storage_key: str) -> bytes | None:
+    path = _resolve_path(storage_key)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def write_bytes(storage_key: str, content: bytes) -> int:
+    """Write content under a caller-chosen key; readers never see a partial file."""
+    path = _resolve_path(storage_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp_path.open("wb") as handle:
+            handle.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    return len(content)
+
+
+def list_keys(prefix: str) -> list[str]:
+    directory = _resolve_path(prefix)
+    if not directory.is_dir():
+        return []
+    base = ATTACHMENTS_DIR.resolve()
+    return sorted(
+        str(path.relative_to(base))
+        for path in directory.iterdir()
+        if path.is_file() and not path.name.startswith(".")
+    )
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete, select, text
+
+from app.db.session import SessionLocal
+from app.models.audit_log import AuditLog
+from app.services.audit import queue_event
+from app.services.audit_buffer import audit_buffer
+from app.services.audit_partitions import ensure_audit_partitions, partition_name
+
+
+def _patient_audit_rows(patient_id: int) -> list[tuple[AuditLog, dict, dict]]:
+    session = SessionLocal()
+    try:
+        rows = list(
+            session.scalars(
+                select(AuditLog)
+                .where(AuditLog.entity_type == "patient", AuditLog.entity_id == str(patient_id))
+                .order_by(AuditLog.id.asc())
+            )
+        )
+        return [(row, row.before_json, row.after_json) for row in rows]
+    finally:
+        session.close()
+
+
+def test_patient_updates_store_diffs_but_read_back_full_states(api_client, auth_headers):
+    created = api_client.post(
+        "/patients",
+        json={"first_name": "Diff", "last_name": "Chain", "phone": "0100"},
+        headers=auth_headers,
+    )
+    assert created.status_code == 201, created.text
+    patient_id = created.json()["id"]
+    for last_name in ("Chain-2", "Chain-3"):
+        res = api_client.patch(
+            f"/patients/{patient_id}", json={"last_name": last_name}, headers=auth_headers
+        )
+        assert res.status_code == 200, res.text
+
+    rows = _patient_audit_rows(patient_id)
+    updates = [item for item in rows if item[0].action == "update"]
+    assert len(updates) == 2
+    for entry, before, after in updates:
+        assert entry.stored_before_json is None
+        assert entry.stored_after_json is None
+        assert entry.parent_id is not None
+        assert entry.changes_json["last_name"] == [before["last_name"], after["last_name"]]
+        assert before["first_name"] == after["first_name"] == "Diff"
+        assert before["phone"] == after["phone"] == "0100"
+    assert [item[2]["last_name"] for item in updates] == ["Chain-2", "Chain-3"]
+    assert updates[1][1] == updates[0][2]
+
+    audit = api_client.get(f"/patients/{patient_id}/audit", headers=auth_headers)
+    assert audit.status_code == 200, audit.text
+    latest = audit.json()[0]
+    assert latest["before_json"]["last_name"] == "Chain-2"
+    assert latest["after_json"]["last_name"] == "Chain-3"
+    assert latest["after_json"]["first_name"] == "Diff"
+
+
+def test_queued_read_events_are_written_in_bulk(api_client, auth_headers):
+    entity_id = f"buffer-{uuid4().hex[:12]}"
+    audit_buffer.flush()
+    for idx in range(3):
+        queue_event(
+            actor=None,
+            action="attachment.downloaded",
+            entity_type="attachment",
+            entity_id=entity_id,
+            after_data={"n": idx},
+        )
+    session = SessionLocal()
+    try:
+        # The audit endpoints flush this worker's buffer before reading.
+        res = api_client.get(
+            "/audit",
+            params={"entity_type": "attachment", "entity_id": entity_id},
+            headers=auth_headers,
+        )
+        assert res.status_code == 200, res.text
+        assert sorted(entry["after_json"]["n"] for entry in res.json()) == [0, 1, 2]
+        session.execute(delete(AuditLog).where(AuditLog.entity_id == entity_id))
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_ensure_partitions_moves_rows_out_of_default():
+    month = date(2099, 1, 1)
+    entity_id = f"partition-{uuid4().hex[:12]}"
+    session = SessionLocal()
+    try:
+        session.add(
+            AuditLog(
+                created_at=datetime(2099, 1, 15, tzinfo=timezone.utc),
+                action="partition.check",
+                entity_type="audit",
+                entity_id=entity_id,
+            )
+        )
+        session.commit()
+        located = text("SELECT tableoid::regclass::text FROM audit_logs WHERE entity_id = :e")
+        assert session.execute(located, {"e": entity_id}).scalar() == "audit_logs_default"
+
+        assert ensure_audit_partitions(session, start=month, through=month) == [
+            partition_name(month)
+        ]
+        session.commit()
+        assert session.execute(located, {"e": entity_id}).scalar() == partition_name(month)
+        assert ensure_audit_partitions(session, start=month, through=month) == []
+    finally:
+        session.rollback()
+        session.execute(text(f"DROP TABLE IF EXISTS {partition_name(month)}"))
+        session.commit()
+        session.close()
@@ -0,0 +1,251 @@
+import asyncio
+import json
+from datetime import date, datetime, timezone
+
+import psycopg
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.patient import Patient
+from app.models.user import User
+from app.routers import appointments as appointments_router
+from app.services.diary_events import (
+    DIARY_EVENTS_CHANNEL,
+    DiaryEventHub,
+    build_diary_event,
+    format_sse,
+    publish_diary_event,
+)
+
+
+def _conninfo() -> str:
+    return make_url(settings.database_url).set(drivername="postgresql").render_as_string(
+        hide_password=False
+    )
+
+
+def _create_patient(api_client, auth_headers) -> int:
+    response = api_client.post(
+        "/patients",
+        json={"first_name": "Event", "last_name": "Stream"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    return int(response.json()["id"])
+
+
+def _appointment_payload(patient_id: int, hour: int) -> dict:
+    return {
+        "patient_id": patient_id,
+        "starts_at": datetime(2026, 3, 4, hour, 0, tzinfo=timezone.utc).isoformat(),
+        "ends_at": datetime(2026, 3, 4, hour, 30, tzinfo=timezone.utc).isoformat(),
+        "status": "booked",
+        "location_type": "clinic",
+        "location": "Events Room",
+        "allow_outside_hours": True,
+    }
+
+
+def test_appointment_writes_notify_diary_channel(api_client, auth_headers):
+    patient_id = _create_patient(api_client, auth_headers)
+    with psycopg.connect(_conninfo(), autocommit=True) as listener:
+        listener.execute(f'LISTEN "{DIARY_EVENTS_CHANNEL}"')
+
+        created = api_client.post(
+            "/appointments", json=_appointment_payload(patient_id, 9), headers=auth_headers
+        )
+        assert created.status_code == 201, created.text
+        appointment_id = created.json()["id"]
+
+        moved = api_client.patch(
+            f"/appointments/{appointment_id}",
+            json={
+                "starts_at": datetime(2026, 3, 5, 9, 0, tzinfo=timezone.utc).isoformat(),
+                "ends_at": datetime(2026, 3, 5, 9, 30, tzinfo=timezone.utc).isoformat(),
+                "allow_outside_hours": True,
+            },
+            headers=auth_headers,
+        )
+        assert moved.status_code == 200, moved.text
+
+        archived = api_client.post(f"/appointments/{appointment_id}/archive", headers=auth_headers)
+        assert archived.status_code == 200, archived.text
+
+        events = [
+            json.loads(notify.payload)
+            for notify in listener.notifies(timeout=5, stop_after=3)
+        ]
+
+    ours = [event for event in events if event["appointment_id"] == appointment_id]
+    assert [event["type"] for event in ours] == [
+        "appointment.created",
+        "appointment.moved",
+        "appointment.archived",
+    ]
+    assert ours[1]["days"] == ["2026-03-04", "2026-03-05"]
+    assert ours[2]["archived"] is True
+
+
+def test_publish_is_dropped_when_transaction_rolls_back():
+    session = SessionLocal()
+    try:
+        appointment = Appointment(
+            id=0,
+            starts_at=datetime(2026, 3, 6, 9, 0, tzinfo=timezone.utc),
+            ends_at=datetime(2026, 3, 6, 9, 30, tzinfo=timezone.utc),
+            status=AppointmentStatus.booked,
+        )
+        with psycopg.connect(_conninfo(), autocommit=True) as listener:
+            listener.execute(f'LISTEN "{DIARY_EVENTS_CHANNEL}"')
+            publish_diary_event(session, "appointment.updated", appointment)
+            session.rollback()
+            assert list(listener.notifies(timeout=0.5, stop_after=1)) == []
+    finally:
+        session.close()
+
+
+def test_hub_fans_out_only_to_matching_windows():
+    session = SessionLocal()
+    try:
+        actor = session.scalar(select(User).order_by(User.id.asc()).limit(1))
+        patient = Patient(
+            first_name="Hub",
+            last_name="Window",
+            created_by_user_id=actor.id,
+            updated_by_user_id=actor.id,
+        )
+        session.add(patient)
+        session.flush()
+        appointment = Appointment(
+            patient_id=patient.id,
+            starts_at=datetime(2026, 3, 10, 9, 0, tzinfo=timezone.utc),
+            ends_at=datetime(2026, 3, 10, 9, 30, tzinfo=timezone.utc),
+            status=AppointmentStatus.booked,
+            created_by_user_id=actor.id,
+            updated_by_user_id=actor.id,
+        )
+        session.add(appointment)
+        session.flush()
+
+        async def _run():
+            hub = DiaryEventHub(settings.database_url)
+            inside = hub.subscribe(date(2026, 3, 9), date(2026, 3, 15))
+            outside = hub.subscribe(date(2026, 4, 1), date(2026, 4, 7))
+            try:
+                for _ in range(50):
+                    await asyncio.sleep(0.05)
+                    if hub._listener is not None and not hub._listener.done():
+                        break
+                await asyncio.sleep(0.3)
+                await asyncio.to_thread(_publish_and_commit)
+                event = await asyncio.wait_for(inside.queue.get(), timeout=5)
+                assert outside.queue.empty()
+                return event
+            finally:
+                hub.unsubscribe(inside)
+                hub.unsubscribe(outside)
+                await hub.aclose()
+
+        def _publish_and_commit():
+            publish_diary_event(session, "appointment.created", appointment)
+            session.commit()
+
+        event = asyncio.run(_run())
+        assert event["type"] == "appointment.created"
+        assert event["appointment_id"] == appointment.id
+        assert event["days"] == ["2026-03-10"]
+    finally:
+        session.rollback()
+        session.close()
+
+
+def test_subscription_overflow_collapses_to_resync():
+    async def _run():
+        hub = DiaryEventHub(settings.database_url)
+        subscription = hub.subscribe(date(2026, 3, 1), date(2026, 3, 31))
+        await hub.aclose()
+        event = {"type": "appointment.updated", "days": ["2026-03-02"]}
+        for _ in range(subscription.queue.maxsize + 5):
+            subscription.offer(event)
+        hub.unsubscribe(subscription)
+        return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+
+    assert asyncio.run(_run()) == [{"type": "resync"}]
+
+
+def test_stream_delivers_events_again_after_a_resync(monkeypatch):
+    class _ConnectedRequest:
+        async def is_disconnected(self) -> bool:
+            return False
+
+    async def _run():
+        hub = DiaryEventHub(settings.database_url)
+        subscriptions = []
+        subscribe = hub.subscribe
+
+        def _subscribe(start, end):
+            subscriptions.append(subscribe(start, end))
+            return subscriptions[-1]
+
+        monkeypatch.setattr(hub, "subscribe", _subscribe)
+        monkeypatch.setattr(appointments_router, "diary_event_hub", hub)
+        response = await appointments_router.appointment_events(
+            _ConnectedRequest(), start=date(2026, 3, 1), end=date(2026, 3, 31), _user=None
+        )
+        frames = response.body_iterator
+        # Events are offered by hand, so stop the LISTEN task before it connects.
+        await hub.aclose()
+        try:
+            assert await anext(frames) == "retry: 5000\n\n"
+            subscription = subscriptions[0]
+            event = {"type": "appointment.updated", "days": ["2026-03-02"]}
+            for _ in range(subscription.queue.maxsize + 1):
+                subscription.offer(event)
+            resync = await asyncio.wait_for(anext(frames), timeout=1)
+            subscription.offer(event)
+            after = await asyncio.wait_for(anext(frames), timeout=1)
+        finally:
+            await frames.aclose()
+        return resync, after
+
+    resync, after = asyncio.run(_run())
+    assert resync.startswith("event: resync\n")
+    assert after.startswith("event: appointment.updated\n")
+
+
+def test_format_sse_frames_event():
+    appointment = Appointment(
+        id=42,
+        patient_id=7,
+        starts_at=datetime(2026, 3, 4, 9, 0, tzinfo=timezone.utc),
+        ends_at=datetime(2026, 3, 4, 9, 30, tzinfo=timezone.utc),
+        status=AppointmentStatus.arrived,
+    )
+    frame = format_sse(build_diary_event("appointment.status_changed", appointment))
+    assert frame.startswith("event: appointment.status_changed\ndata: {")
+    assert frame.endswith("\n\n")
+    assert '"status":"arrived"' in frame
+
+
+def test_events_endpoint_validates_window(api_client, auth_headers):
+    unauthenticated = api_client.get(
+        "/appointments/events", params={"start": "2026-03-01", "end": "2026-03-07"}
+    )
+    assert unauthenticated.status_code == 401
+
+    reversed_window = api_client.get(
+        "/appointments/events",
+        params={"start": "2026-03-07", "end": "2026-03-01"},
+        headers=auth_headers,
+    )
+    assert reversed_window.status_code == 400
+
+    too_wide = api_client.get(
+        "/appointments/events",
+        params={"start": "2026-01-01", "end": "2026-06-01"},
+        headers=auth_headers,
+    )
+    assert too_wide.status_code == 400
@@ -75,3 +75,52 @@ def test_range_excludes_end_day_includes_late_start(api_client, auth_headers):
 
     assert included_id in ids
     assert excluded_id not in ids
+
+
+def test_hot_read_routes_do_not_need_the_threadpool(api_client, auth_headers):
+    import anyio
+    import httpx
+
+    from app.db.session import async_engine
+    from app.main import app
+
+    created = api_client.post(
+        "/patients", json={"first_name": "Async", "last_name": "Reader"}, headers=auth_headers
+    )
+    assert created.status_code == 201, created.text
+    patient_id = created.json()["id"]
+    paths = [
+        "/appointments/range?start=2026-01-10&end=2026-01-11",
+        "/appointments/snapshot?date=2026-01-10",
+        "/patients/search?q=Range",
+        "/recalls?limit=5",
+        f"/patients/{patient_id}/timeline",
+    ]
+
+    async def run() -> list[int]:
+        statuses: list[int] = []
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                original = limiter.total_tokens
+                limiter.total_tokens = 1
+                try:
+                    # Hold the only worker thread: a sync dependency or endpoint would hang.
+                    async with limiter, anyio.create_task_group() as tg:
+
+                        async def fetch(path: str) -> None:
+                            with anyio.fail_after(20):
+                                res = await client.get(path, headers=auth_headers)
+                            statuses.append(res.status_code)
+
+                        for path in paths * 5:
+                            tg.start_soon(fetch, path)
+                finally:
+                    limiter.total_tokens = original
+        finally:
+            await async_engine.dispose()
+        return statuses
+
+    statuses = anyio.run(run)
+    assert statuses == [200] * 25
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from uuid import uuid4
 
 
 def _create_patient(api_client, auth_headers, *, first_name: str, last_name: str) -> int:
@@ -136,3 +137,178 @@ def test_snapshot_rejects_unsupported_view(api_client, auth_headers):
         headers=auth_headers,
     )
     assert response.status_code == 422, response.text
+
+
+def _get_snapshot(api_client, auth_headers, params: dict, etag: str | None = None):
+    headers = dict(auth_headers)
+    if etag:
+        headers["If-None-Match"] = etag
+    return api_client.get("/appointments/snapshot", params=params, headers=headers)
+
+
+def test_snapshot_etag_returns_304_until_diary_changes(api_client, auth_headers):
+    patient_id = _create_patient(
+        api_client,
+        auth_headers,
+        first_name="Etag",
+        last_name="Poll",
+    )
+    params = {"date": "2026-02-11", "view": "day", "mask_names": "false"}
+    first_id = _create_appointment(
+        api_client,
+        auth_headers,
+        patient_id=patient_id,
+        starts_at=datetime(2026, 2, 11, 9, 0, tzinfo=timezone.utc),
+        ends_at=datetime(2026, 2, 11, 9, 30, tzinfo=timezone.utc),
+        location="Etag Room",
+    )
+
+    first = _get_snapshot(api_client, auth_headers, params)
+    assert first.status_code == 200, first.text
+    etag = first.headers["etag"]
+    assert etag
+
+    unchanged = _get_snapshot(api_client, auth_headers, params, etag=etag)
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+
+    other_day = _create_appointment(
+        api_client,
+        auth_headers,
+        patient_id=patient_id,
+        starts_at=datetime(2026, 2, 12, 9, 0, tzinfo=timezone.utc),
+        ends_at=datetime(2026, 2, 12, 9, 30, tzinfo=timezone.utc),
+        location="Etag Room",
+    )
+    assert other_day
+    assert _get_snapshot(api_client, auth_headers, params, etag=etag).status_code == 304
+
+    moved = api_client.patch(
+        f"/appointments/{first_id}",
+        json={
+            "starts_at": datetime(2026, 2, 11, 10, 0, tzinfo=timezone.utc).isoformat(),
+            "ends_at": datetime(2026, 2, 11, 10, 30, tzinfo=timezone.utc).isoformat(),
+            "allow_outside_hours": True,
+        },
+        headers=auth_headers,
+    )
+    assert moved.status_code == 200, moved.text
+
+    refreshed = _get_snapshot(api_client, auth_headers, params, etag=etag)
+    assert refreshed.status_code == 200, refreshed.text
+    assert refreshed.headers["etag"] != etag
+    row = next(item for item in refreshed.json()["appointments"] if item["id"] == first_id)
+    assert row["starts_at"].startswith("2026-02-11T10:00")
+
+
+def test_snapshot_cache_invalidated_by_notes_archive_and_patient_edits(
+    api_client, auth_headers
+):
+    patient_id = _create_patient(
+        api_client,
+        auth_headers,
+        first_name="Cache",
+        last_name="Invalidation",
+    )
+    appointment_id = _create_appointment(
+        api_client,
+        auth_headers,
+        patient_id=patient_id,
+        starts_at=datetime(2026, 2, 18, 9, 0, tzinfo=timezone.utc),
+        ends_at=datetime(2026, 2, 18, 9, 30, tzinfo=timezone.utc),
+        location="Cache Room",
+    )
+    params = {"date": "2026-02-18", "view": "week", "mask_names": "false"}
+
+    def _row(response):
+        assert response.status_code == 200, response.text
+        return next(
+            (item for item in response.json()["appointments"] if item["id"] == appointment_id),
+            None,
+        )
+
+    assert _row(_get_snapshot(api_client, auth_headers, params))["flags"]["has_notes"] is False
+
+    note_response = api_client.post(
+        f"/appointments/{appointment_id}/notes",
+        json={"body": "Cache note", "note_type": "clinical"},
+        headers=auth_headers,
+    )
+    assert note_response.status_code == 201, note_response.text
+    assert _row(_get_snapshot(api_client, auth_headers, params))["flags"]["has_notes"] is True
+
+    rename = api_client.patch(
+        f"/patients/{patient_id}",
+        json={"first_name": "Renamed"},
+        headers=auth_headers,
+    )
+    assert rename.status_code == 200, rename.text
+    row = _row(_get_snapshot(api_client, auth_headers, params))
+    assert row["patient_display_name"] == "Renamed Invalidation"
+
+    archived = api_client.post(f"/appointments/{appointment_id}/archive", headers=auth_headers)
+    assert archived.status_code == 200, archived.text
+    assert _row(_get_snapshot(api_client, auth_headers, params)) is None
+
+    restored = api_client.post(f"/appointments/{appointment_id}/restore", headers=auth_headers)
+    assert restored.status_code == 200, restored.text
+    assert _row(_get_snapshot(api_client, auth_headers, params)) is not None
+
+    # Another anchor in the same week reuses the cached grid but reports its own date.
+    other_anchor = _get_snapshot(api_client, auth_headers, {**params, "date": "2026-02-16"})
+    assert other_anchor.status_code == 200, other_anchor.text
+    assert other_anchor.json()["date"] == "2026-02-16"
+    assert other_anchor.json()["range_start"] == "2026-02-16"
+
+
+def test_snapshot_cache_invalidated_by_clinician_rename(api_client, auth_headers):
+    created = api_client.post(
+        "/users",
+        json={
+            "email": f"snapshot-clinician-{uuid4().hex[:8]}@example.com",
+            "full_name": "Dr Before",
+            "role": "dentist",
+            "temp_password": "SnapshotClin12!",
+        },
+        headers=auth_headers,
+    )
+    assert created.status_code == 201, created.text
+    clinician_id = created.json()["id"]
+    patient_id = _create_patient(
+        api_client,
+        auth_headers,
+        first_name="Clinician",
+        last_name="Label",
+    )
+    response = api_client.post(
+        "/appointments",
+        json={
+            "patient_id": patient_id,
+            "clinician_user_id": clinician_id,
+            "starts_at": datetime(2026, 2, 25, 9, 0, tzinfo=timezone.utc).isoformat(),
+            "ends_at": datetime(2026, 2, 25, 9, 30, tzinfo=timezone.utc).isoformat(),
+            "status": "booked",
+            "location_type": "clinic",
+            "location": "Label Room",
+            "allow_outside_hours": True,
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 201, response.text
+    appointment_id = response.json()["id"]
+    params = {"date": "2026-02-25", "view": "day", "mask_names": "false"}
+
+    def _label(etag: str | None = None):
+        snapshot = _get_snapshot(api_client, auth_headers, params, etag=etag)
+        assert snapshot.status_code == 200, snapshot.text
+        row = next(item for item in snapshot.json()["appointments"] if item["id"] == appointment_id)
+        return row["clinician_label"], snapshot.headers["etag"]
+
+    label, etag = _label()
+    assert label == "Dr Before"
+
+    renamed = api_client.patch(
+        f"/users/{clinician_id}", json={"full_name": "Dr After"}, headers=auth_headers
+    )
+    assert renamed.status_code == 200, renamed.text
+    assert _label(etag=etag)[0] == "Dr After"
@@ -10,6 +10,8 @@ from app.models.r4_appointment import R4Appointment
 from app.models.r4_appointment_patient_link import R4AppointmentPatientLink
 from app.models.r4_user import R4User
 from app.models.user import User
+from app.services.r4_import.appointment_importer import refresh_r4_appointment_patient_ids
+from app.services.reference_cache import R4_USERS, bump_reference_data
 from app.services.users import ensure_admin_user
 
 
@@ -53,6 +55,7 @@ def _create_user(session, legacy_code: int, full_name: str) -> R4User:
     )
     session.add(user)
     session.flush()
+    bump_reference_data(session, R4_USERS)
     return user
 
 
@@ -80,6 +83,8 @@ def _create_appointment(
     )
     session.add(appt)
     session.flush()
+    refresh_r4_appointment_patient_ids(session)
+    session.refresh(appt)
     return appt
 
 
@@ -380,6 +385,7 @@ def test_r4_calendar_link_endpoint_idempotent_and_update(api_client, auth_header
         starts_at=datetime(2025, 6, 2, 9, 0, tzinfo=timezone.utc),
     )
     db_session.commit()
+    synced_at = appt.updated_at
 
     res_first = api_client.post(
         f"/api/appointments/{appt.legacy_appointment_id}/link",
@@ -406,6 +412,11 @@ def test_r4_calendar_link_endpoint_idempotent_and_update(api_client, auth_header
     assert res_update.json()["id"] == link_id
     assert res_update.json()["patient_id"] == patient_b.id
 
+    # Linking is a local decision, not an R4 change; updated_at stays as synced.
+    db_session.refresh(appt)
+    assert appt.resolved_patient_id == patient_b.id
+    assert appt.updated_at == synced_at
+
     _cleanup(db_session, [patient_a.id, patient_b.id])
 
 
@@ -428,3 +439,60 @@ def test_r4_calendar_link_endpoint_invalid_patient(api_client, auth_headers, db_
     assert res.status_code == 404, res.text
 
     _cleanup(db_session)
+
+
+def test_r4_calendar_resolves_patient_at_import_time(db_session):
+    patient = _create_patient(db_session, _unique_legacy_id())
+    appt = _create_appointment(
+        db_session,
+        legacy_id=10004,
+        patient_code=int(patient.legacy_id) + 1,
+        clinician_code=None,
+        status="Pending",
+        starts_at=datetime(2025, 6, 4, 9, 0, tzinfo=timezone.utc),
+    )
+    assert appt.resolved_patient_id is None
+
+    appt.patient_code = int(patient.legacy_id)
+    db_session.flush()
+    assert refresh_r4_appointment_patient_ids(db_session) == 1
+    assert refresh_r4_appointment_patient_ids(db_session) == 0
+    db_session.refresh(appt)
+    assert appt.resolved_patient_id == patient.id
+    db_session.commit()
+
+    _cleanup(db_session, [patient.id])
+
+
+def test_r4_calendar_total_count_ignores_limit(api_client, auth_headers, db_session):
+    patient = _create_patient(db_session, _unique_legacy_id())
+    for offset in range(3):
+        _create_appointment(
+            db_session,
+            legacy_id=11001 + offset,
+            patient_code=int(patient.legacy_id),
+            clinician_code=None,
+            status="Pending",
+            starts_at=datetime(2025, 7, 1, 9 + offset, 0, tzinfo=timezone.utc),
+        )
+    db_session.commit()
+
+    res = api_client.get(
+        "/api/appointments",
+        params={"from": "2025-07-01", "to": "2025-07-01", "include_total": "true", "limit": 2},
+        headers=auth_headers,
+    )
+    assert res.status_code == 200, res.text
+    body = res.json()
+    assert len(body["items"]) == 2
+    assert body["total_count"] == 3
+
+    res_empty = api_client.get(
+        "/api/appointments",
+        params={"from": "2025-07-02", "to": "2025-07-02", "include_total": "true"},
+        headers=auth_headers,
+    )
+    assert res_empty.status_code == 200, res_empty.text
+    assert res_empty.json() == {"items": [], "total_count": 0}
+
+    _cleanup(db_session, [patient.id])
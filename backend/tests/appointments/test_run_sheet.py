@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import event
+
+from app.db.session import SessionLocal, engine
+from app.services.run_sheet_pdf import (
+    UNASSIGNED_CLINICIAN,
+    build_run_sheet_pdf,
+    load_run_sheet_visits,
+)
+
+DAY = date(2043, 3, 9)
+
+
+def _create_patient(api_client, auth_headers, last_name: str, **extra) -> int:
+    res = api_client.post(
+        "/patients",
+        json={"first_name": "Run", "last_name": last_name, **extra},
+        headers=auth_headers,
+    )
+    assert res.status_code == 201, res.text
+    return int(res.json()["id"])
+
+
+def _create_visit(api_client, auth_headers, patient_id: int, starts_at: datetime, **extra) -> int:
+    res = api_client.post(
+        "/appointments",
+        json={
+            "patient_id": patient_id,
+            "starts_at": starts_at.isoformat(),
+            "ends_at": (starts_at + timedelta(minutes=30)).isoformat(),
+            "status": "booked",
+            "location_type": "visit",
+            "location_text": "1 Sea Lane",
+            "allow_outside_hours": True,
+            **extra,
+        },
+        headers=auth_headers,
+    )
+    assert res.status_code == 201, res.text
+    return int(res.json()["id"])
+
+
+def test_run_sheet_groups_clinicians_and_days_from_one_query(api_client, auth_headers):
+    label = uuid4().hex[:8]
+    admin_id = api_client.get("/me", headers=auth_headers).json()["id"]
+    alert_patient = _create_patient(
+        api_client, auth_headers, f"Alert-{label}", medical_alerts="Warfarin"
+    )
+    plain_patient = _create_patient(api_client, auth_headers, f"Plain-{label}")
+    created = []
+    for offset in range(3):
+        starts_at = datetime.combine(DAY + timedelta(days=offset), datetime.min.time(), timezone.utc)
+        created.append(
+            _create_visit(
+                api_client,
+                auth_headers,
+                alert_patient,
+                starts_at + timedelta(hours=10),
+                clinician_user_id=admin_id,
+            )
+        )
+        created.append(
+            _create_visit(api_client, auth_headers, plain_patient, starts_at + timedelta(hours=11))
+        )
+    res = api_client.post(
+        "/notes",
+        json={"patient_id": plain_patient, "appointment_id": created[1], "body": "Key safe 1234"},
+        headers=auth_headers,
+    )
+    assert res.status_code == 201, res.text
+
+    statements: list[str] = []
+
+    def _count(_conn, _cursor, statement, *_args):
+        statements.append(statement)
+
+    session = SessionLocal()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        visits = load_run_sheet_visits(session, DAY, DAY + timedelta(days=2))
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+        session.close()
+    assert len(statements) == 1
+
+    ours = [visit for visit in visits if visit.appointment_id in created]
+    assert len(ours) == 6
+    clinicians = [visit.clinician for visit in visits]
+    assert clinicians.index(UNASSIGNED_CLINICIAN) > max(
+        index for index, name in enumerate(clinicians) if name != UNASSIGNED_CLINICIAN
+    )
+    by_id = {visit.appointment_id: visit for visit in ours}
+    assert by_id[created[0]].has_alerts and not by_id[created[0]].has_notes
+    assert by_id[created[1]].has_notes and not by_id[created[1]].has_alerts
+    assert [by_id[appt_id].starts_at for appt_id in created[::2]] == sorted(
+        by_id[appt_id].starts_at for appt_id in created[::2]
+    )
+
+    pdf = build_run_sheet_pdf(ours, DAY, DAY + timedelta(days=2))
+    assert pdf.count(b"/Type /Page\n") == 2  # one page per clinician
+
+    res = api_client.get(
+        "/appointments/run-sheet.pdf",
+        params={"date": DAY.isoformat(), "end": (DAY + timedelta(days=2)).isoformat()},
+        headers=auth_headers,
+    )
+    assert res.status_code == 200, res.text
+    assert res.content.startswith(b"%PDF")
+
+    res = api_client.get(
+        "/appointments/run-sheet.pdf",
+        params={"date": DAY.isoformat(), "end": (DAY - timedelta(days=1)).isoformat()},
+        headers=auth_headers,
+    )
+    assert res.status_code == 400
@@ -0,0 +1,174 @@
+import hashlib
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.attachment import AttachmentBlob
+from app.services import storage
+
+
+def _create_patient(api_client, auth_headers, last_name: str) -> int:
+    res = api_client.post(
+        "/patients",
+        json={"first_name": "Stored", "last_name": last_name},
+        headers=auth_headers,
+    )
+    assert res.status_code == 201, res.text
+    return res.json()["id"]
+
+
+def _upload(api_client, auth_headers, patient_id: int, content: bytes) -> int:
+    res = api_client.post(
+        f"/patients/{patient_id}/attachments",
+        files={"file": ("scan.jpg", content, "image/jpeg")},
+        headers=auth_headers,
+    )
+    assert res.status_code == 201, res.text
+    return res.json()["id"]
+
+
+def _stored_files(root) -> list:
+    return [
+        path
+        for path in root.rglob("*")
+        if path.is_file() and storage.STAGING_DIR_NAME not in path.parts
+    ]
+
+
+def test_identical_uploads_share_one_file_until_last_delete(
+    api_client, auth_headers, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(storage, "ATTACHMENTS_DIR", tmp_path)
+    content = b"radiograph-bytes" * 1024
+    digest = hashlib.sha256(content).hexdigest()
+    first = _upload(api_client, auth_headers, _create_patient(api_client, auth_headers, "One"), content)
+    second = _upload(api_client, auth_headers, _create_patient(api_client, auth_headers, "Two"), content)
+
+    files = _stored_files(tmp_path)
+    assert [path.relative_to(tmp_path).as_posix() for path in files] == [
+        f"{digest[:2]}/{digest[2:4]}/{digest}"
+    ]
+
+    assert api_client.delete(f"/attachments/{first}", headers=auth_headers).status_code == 200
+    assert _stored_files(tmp_path) == files
+    download = api_client.get(f"/attachments/{second}/download", headers=auth_headers)
+    assert download.status_code == 200, download.text
+    assert download.content == content
+
+    assert api_client.delete(f"/attachments/{second}", headers=auth_headers).status_code == 200
+    assert _stored_files(tmp_path) == []
+
+
+def test_attachment_download_serves_byte_ranges(api_client, auth_headers, monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "ATTACHMENTS_DIR", tmp_path)
+    content = bytes(range(256)) * 512
+    patient_id = _create_patient(api_client, auth_headers, "Range")
+    attachment_id = _upload(api_client, auth_headers, patient_id, content)
+    url = f"/attachments/{attachment_id}/download"
+
+    full = api_client.get(url, headers=auth_headers)
+    assert full.status_code == 200
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.content == content
+    etag = full.headers["etag"]
+
+    partial = api_client.get(url, headers={**auth_headers, "Range": "bytes=1000-70999"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 1000-70999/{len(content)}"
+    assert partial.content == content[1000:71000]
+
+    suffix = api_client.get(url, headers={**auth_headers, "Range": "bytes=-10"})
+    assert suffix.status_code == 206
+    assert suffix.content == content[-10:]
+
+    stale = api_client.get(
+        url, headers={**auth_headers, "Range": "bytes=0-9", "If-Range": '"other"'}
+    )
+    assert stale.status_code == 200
+    assert stale.content == content
+
+    matching = api_client.get(url, headers={**auth_headers, "Range": "bytes=0-9", "If-Range": etag})
+    assert matching.status_code == 206
+    assert matching.content == content[:10]
+
+    unsatisfiable = api_client.get(
+        url, headers={**auth_headers, "Range": f"bytes={len(content)}-"}
+    )
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(content)}"
+
+
+def test_upload_saves_again_when_a_concurrent_delete_removed_the_file(
+    api_client, auth_headers, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(storage, "ATTACHMENTS_DIR", tmp_path)
+    content = b"released-underneath" * 512
+    digest = hashlib.sha256(content).hexdigest()
+    original = storage.retain_blob
+    calls: list[str] = []
+
+    def _racing_retain(db, storage_key, byte_size, count=1):
+        calls.append(storage_key)
+        if len(calls) == 1:
+            # The last holder of the same file was deleted after save_upload returned.
+            storage.delete_file(storage_key)
+        return original(db, storage_key, byte_size, count)
+
+    monkeypatch.setattr(storage, "retain_blob", _racing_retain)
+    patient_id = _create_patient(api_client, auth_headers, "Race")
+    attachment_id = _upload(api_client, auth_headers, patient_id, content)
+
+    assert calls == [digest, digest]
+    download = api_client.get(f"/attachments/{attachment_id}/download", headers=auth_headers)
+    assert download.status_code == 200, download.text
+    assert download.content == content
+    session = SessionLocal()
+    try:
+        assert session.scalar(
+            select(AttachmentBlob.ref_count).where(AttachmentBlob.storage_key == digest)
+        ) == 1
+    finally:
+        session.close()
+    assert api_client.delete(f"/attachments/{attachment_id}", headers=auth_headers).status_code == 200
+
+
+def test_document_attach_saves_again_when_a_concurrent_delete_removed_the_file(
+    api_client, auth_headers, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(storage, "ATTACHMENTS_DIR", tmp_path)
+    patient_id = _create_patient(api_client, auth_headers, "AttachRace")
+    template = api_client.post(
+        "/document-templates",
+        json={
+            "name": "Attach Race Template",
+            "kind": "letter",
+            "content": "Letter for {{patient.full_name}}",
+            "is_active": True,
+        },
+        headers=auth_headers,
+    )
+    assert template.status_code == 201, template.text
+    document = api_client.post(
+        f"/patients/{patient_id}/documents",
+        json={"template_id": template.json()["id"], "title": "Attach Race"},
+        headers=auth_headers,
+    )
+    assert document.status_code == 201, document.text
+    original = storage.retain_blob
+    calls: list[str] = []
+
+    def _racing_retain(db, storage_key, byte_size, count=1):
+        calls.append(storage_key)
+        if len(calls) == 1:
+            storage.delete_file(storage_key)
+        return original(db, storage_key, byte_size, count)
+
+    monkeypatch.setattr(storage, "retain_blob", _racing_retain)
+    res = api_client.post(
+        f"/patient-documents/{document.json()['id']}/attach-pdf", headers=auth_headers
+    )
+    assert res.status_code == 200, res.text
+    assert len(calls) == 2
+    download = api_client.get(f"/attachments/{res.json()['id']}/download", headers=auth_headers)
+    assert download.status_code == 200, download.text
+    assert download.content.startswith(b"%PDF")
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import threading
+from uuid import uuid4
+
+from sqlalchemy import create_engine, text
+
+from app.db.session import engine
+from app.services.rate_limit import MemoryBucketStore, PostgresBucketStore, RateLimiter
+
+
+def test_memory_bucket_refills_and_evicts_idle_keys():
+    store = MemoryBucketStore()
+    take = lambda key, now: store.take(key, capacity=3, refill_per_second=1.0, now=now)  # noqa: E731
+
+    assert [take("a", 0.0) for _ in range(4)] == [True, True, True, False]
+    assert take("a", 1.0) is True
+    assert take("a", 1.0) is False
+    # Once "a" would be full again it is dropped rather than kept forever.
+    assert take("b", 10.0) is True
+    assert len(store) == 1
+
+
+def test_memory_bucket_caps_number_of_keys():
+    store = MemoryBucketStore(max_keys=100)
+    for index in range(1000):
+        store.take(f"user:{index}", capacity=5, refill_per_second=0.01, now=0.0)
+    assert len(store) == 100
+
+
+def test_postgres_buckets_are_shared_between_limiters():
+    name = f"test_{uuid4().hex[:8]}"
+    store = PostgresBucketStore(engine)
+    # Two limiters with the same name stand in for two workers.
+    worker_a = RateLimiter(name, max_events=5, window_seconds=3600, store=store)
+    worker_b = RateLimiter(name, max_events=5, window_seconds=3600, store=store)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda limiter=limiter: results.append(limiter.allow("ip")))
+        for limiter in (worker_a, worker_b) * 5
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 5
+    assert worker_a.allow("ip") is False
+    assert worker_a.allow("other-ip") is True
+
+    assert store.throttle_counts()[name][0] == 6
+    assert store.active_keys(f"{name}:") == 2
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM rate_limit_buckets WHERE bucket_key LIKE :p"), {"p": f"{name}:%"})
+        conn.execute(text("DELETE FROM rate_limit_throttle_counts WHERE limiter = :n"), {"n": name})
+
+
+def test_limiter_falls_back_to_process_buckets_when_store_fails():
+    broken = PostgresBucketStore(create_engine("postgresql+psycopg://nobody@127.0.0.1:1/none"))
+    limiter = RateLimiter(f"test_{uuid4().hex[:8]}", max_events=2, window_seconds=60, store=broken)
+
+    assert [limiter.allow("k") for _ in range(3)] == [True, True, False]
+    assert limiter.fallback_total == 3
+    assert limiter.throttled_total == 1
+
+
+def test_rate_limit_metrics_require_superadmin(api_client, auth_headers):
+    res = api_client.get("/admin/rate-limits", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    names = {entry["name"] for entry in res.json()}
+    assert {"login", "login_ip", "charting_export"} <= names
+    assert api_client.get("/admin/rate-limits").status_code == 401
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import io
+import zipfile
+from calendar import monthrange
+from datetime import date, datetime, time, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete, select
+
+from app.db.session import SessionLocal
+from app.models.finance_report_cache import FinanceMonthPack
+from app.models.invoice import PaymentMethod
+from app.models.ledger import LedgerEntryType, PatientLedgerEntry
+from app.models.patient import Patient
+from app.models.user import User
+from app.services import finance_month_pack
+from app.services.finance_month_pack import load_month_pack, month_pack_data
+
+
+def _csvs(content: bytes) -> dict[str, str]:
+    with zipfile.ZipFile(io.BytesIO(content)) as zipf:
+        return {name: zipf.read(name).decode("utf-8") for name in zipf.namelist()}
+
+
+def _patient(session) -> Patient:
+    actor_id = session.scalar(select(User.id).order_by(User.id).limit(1))
+    patient = Patient(
+        first_name="Pack",
+        last_name=f"Ledger-{uuid4().hex[:8]}",
+        created_by_user_id=actor_id,
+    )
+    session.add(patient)
+    session.flush()
+    return patient
+
+
+def _entry(session, patient: Patient, entry_type, amount: int, at: datetime, method=None):
+    session.add(
+        PatientLedgerEntry(
+            patient_id=patient.id,
+            entry_type=entry_type,
+            amount_pence=amount,
+            method=method,
+            created_at=at,
+            created_by_user_id=patient.created_by_user_id,
+        )
+    )
+    session.flush()
+
+
+def _cleanup(session, patient: Patient) -> None:
+    session.rollback()
+    session.execute(delete(PatientLedgerEntry).where(PatientLedgerEntry.patient_id == patient.id))
+    session.execute(delete(Patient).where(Patient.id == patient.id))
+    finance_month_pack.purge_finance_report_cache(session)
+    session.commit()
+    session.close()
+
+
+def test_closed_month_pack_is_stored_until_a_backdated_entry_arrives(
+    api_client, auth_headers, monkeypatch
+):
+    builds: list[date] = []
+    original = finance_month_pack.month_pack_data
+
+    def _counting(db, *, start, end):
+        builds.append(start)
+        return original(db, start=start, end=end)
+
+    monkeypatch.setattr(finance_month_pack, "month_pack_data", _counting)
+    session = SessionLocal()
+    patient = _patient(session)
+    try:
+        may = datetime(2019, 5, 14, 10, 0, tzinfo=timezone.utc)
+        _entry(session, patient, LedgerEntryType.charge, 2500, may)
+        _entry(session, patient, LedgerEntryType.payment, -1000, may, PaymentMethod.card)
+        session.commit()
+
+        params = {"year": 2019, "month": 5, "format": "zip"}
+        first = api_client.get("/reports/finance/month-pack", headers=auth_headers, params=params)
+        assert first.status_code == 200, first.text
+        second = api_client.get("/reports/finance/month-pack", headers=auth_headers, params=params)
+        assert second.content == first.content
+        assert builds == [date(2019, 5, 1)]
+        csvs = _csvs(first.content)
+        assert "card,1000" in csvs["cashup_by_method.csv"]
+        debtor = f'"{patient.last_name.upper()}, Pack"'
+        assert f"{debtor},1500" in csvs["top_debtors.csv"]
+
+        _entry(
+            session,
+            patient,
+            LedgerEntryType.charge,
+            700,
+            datetime(2019, 4, 2, 9, 0, tzinfo=timezone.utc),
+        )
+        session.commit()
+        third = api_client.get("/reports/finance/month-pack", headers=auth_headers, params=params)
+        assert third.status_code == 200, third.text
+        assert builds == [date(2019, 5, 1), date(2019, 5, 1)]
+        assert f"{debtor},2200" in _csvs(third.content)["top_debtors.csv"]
+        assert session.scalar(
+            select(FinanceMonthPack.format).where(FinanceMonthPack.period_start == date(2019, 5, 1))
+        ) == "zip"
+
+        pdf = api_client.get(
+            "/reports/finance/month-pack",
+            headers=auth_headers,
+            params={"year": 2019, "month": 5, "format": "pdf"},
+        )
+        assert pdf.status_code == 200, pdf.text
+        assert pdf.content.startswith(b"%PDF")
+    finally:
+        _cleanup(session, patient)
+
+
+def test_current_month_pack_matches_a_full_ledger_pass():
+    today = datetime.now(timezone.utc).date()
+    session = SessionLocal()
+    patient = _patient(session)
+    try:
+        yesterday = datetime.combine(today - timedelta(days=1), time(15, 0), tzinfo=timezone.utc)
+        _entry(session, patient, LedgerEntryType.charge, 9000, yesterday)
+        _entry(session, patient, LedgerEntryType.payment, -2000, yesterday, PaymentMethod.cash)
+        _entry(
+            session,
+            patient,
+            LedgerEntryType.payment,
+            -500,
+            datetime.now(timezone.utc),
+            PaymentMethod.card,
+        )
+        session.commit()
+
+        start = today.replace(day=1)
+        end = today.replace(day=monthrange(today.year, today.month)[1])
+
+        def _expected() -> dict[str, str]:
+            data = month_pack_data(session, start=start, end=end)
+            return _csvs(
+                finance_month_pack._render("zip", period_start=start, data=data, profile=None)
+            )
+
+        def _pack() -> bytes:
+            return load_month_pack(session, year=today.year, month=today.month, fmt="zip")
+
+        first = _pack()
+        session.commit()
+        assert _csvs(first) == _expected()
+        assert _csvs(_pack()) == _expected()
+
+        # A back-dated entry invalidates the closed-day fragments it lands in.
+        _entry(session, patient, LedgerEntryType.payment, -300, yesterday, PaymentMethod.other)
+        session.commit()
+        refreshed = _pack()
+        assert _csvs(refreshed) == _expected()
+        assert _csvs(refreshed) != _csvs(first)
+    finally:
+        _cleanup(session, patient)
+
+
+def _debtors(api_client, auth_headers) -> str:
+    res = api_client.get(
+        "/reports/finance/month-pack",
+        headers=auth_headers,
+        params={"year": 2019, "month": 6, "format": "zip"},
+    )
+    assert res.status_code == 200, res.text
+    return _csvs(res.content)["top_debtors.csv"]
+
+
+def _owing_patient(session) -> Patient:
+    patient = _patient(session)
+    _entry(
+        session,
+        patient,
+        LedgerEntryType.charge,
+        4200,
+        datetime(2019, 6, 3, 9, 0, tzinfo=timezone.utc),
+    )
+    session.commit()
+    return patient
+
+
+def test_closed_month_pack_drops_archived_debtor(api_client, auth_headers):
+    session = SessionLocal()
+    patient = _owing_patient(session)
+    try:
+        debtor = f'"{patient.last_name.upper()}, Pack",4200'
+        assert debtor in _debtors(api_client, auth_headers)
+
+        res = api_client.post(f"/patients/{patient.id}/archive", headers=auth_headers)
+        assert res.status_code == 200, res.text
+        assert debtor not in _debtors(api_client, auth_headers)
+    finally:
+        _cleanup(session, patient)
+
+
+def test_closed_month_pack_lists_restored_debtor(api_client, auth_headers):
+    session = SessionLocal()
+    patient = _owing_patient(session)
+    try:
+        debtor = f'"{patient.last_name.upper()}, Pack",4200'
+        res = api_client.post(f"/patients/{patient.id}/archive", headers=auth_headers)
+        assert res.status_code == 200, res.text
+        assert debtor not in _debtors(api_client, auth_headers)
+
+        res = api_client.post(f"/patients/{patient.id}/restore", headers=auth_headers)
+        assert res.status_code == 200, res.text
+        assert debtor in _debtors(api_client, auth_headers)
+    finally:
+        _cleanup(session, patient)
+
+
+def test_closed_month_pack_follows_debtor_rename(api_client, auth_headers):
+    session = SessionLocal()
+    patient = _owing_patient(session)
+    try:
+        assert f'"{patient.last_name.upper()}, Pack",4200' in _debtors(api_client, auth_headers)
+
+        res = api_client.patch(
+            f"/patients/{patient.id}", headers=auth_headers, json={"first_name": "Renamed"}
+        )
+        assert res.status_code == 200, res.text
+        debtors = _debtors(api_client, auth_headers)
+        assert f'"{patient.last_name.upper()}, Renamed",4200' in debtors
+        assert f'"{patient.last_name.upper()}, Pack",4200' not in debtors
+    finally:
+        _cleanup(session, patient)
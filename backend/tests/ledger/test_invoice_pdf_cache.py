@@ -0,0 +1,75 @@
+from app.routers import invoices
+from app.services import pdf_cache, storage
+
+
+def _create_invoice(api_client, auth_headers) -> int:
+    patient = api_client.post(
+        "/patients",
+        json={"first_name": "Cached", "last_name": "Invoice"},
+        headers=auth_headers,
+    )
+    assert patient.status_code == 201, patient.text
+    invoice = api_client.post(
+        "/invoices",
+        json={"patient_id": patient.json()["id"]},
+        headers=auth_headers,
+    )
+    assert invoice.status_code == 201, invoice.text
+    return invoice.json()["id"]
+
+
+def _counting_renderer(monkeypatch) -> list[int]:
+    calls: list[int] = []
+    original = invoices.build_invoice_pdf
+
+    def _render(invoice):
+        calls.append(invoice.id)
+        return original(invoice)
+
+    monkeypatch.setattr(invoices, "build_invoice_pdf", _render)
+    return calls
+
+
+def test_invoice_pdf_is_served_from_cache_until_edited(
+    api_client, auth_headers, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(storage, "ATTACHMENTS_DIR", tmp_path)
+    calls = _counting_renderer(monkeypatch)
+    invoice_id = _create_invoice(api_client, auth_headers)
+
+    first = api_client.get(f"/invoices/{invoice_id}/pdf", headers=auth_headers)
+    assert first.status_code == 200, first.text
+    assert first.content.startswith(b"%PDF")
+    second = api_client.get(f"/invoices/{invoice_id}/pdf", headers=auth_headers)
+    assert second.status_code == 200, second.text
+    assert second.content == first.content
+    assert calls == [invoice_id]
+
+    line = api_client.post(
+        f"/invoices/{invoice_id}/lines",
+        json={"description": "Scale and polish", "quantity": 1, "unit_price_pence": 4500},
+        headers=auth_headers,
+    )
+    assert line.status_code == 201, line.text
+    third = api_client.get(f"/invoices/{invoice_id}/pdf", headers=auth_headers)
+    assert third.status_code == 200, third.text
+    assert calls == [invoice_id, invoice_id]
+
+    cached = storage.list_keys(f"{pdf_cache.PDF_CACHE_PREFIX}/invoice/{invoice_id}")
+    assert len(cached) == 1
+    assert storage.read_bytes(cached[0]) == third.content
+
+
+def test_invoice_pdf_renders_when_cache_storage_fails(
+    api_client, auth_headers, monkeypatch, tmp_path
+):
+    blocked = tmp_path / "blocked"
+    blocked.write_bytes(b"")
+    monkeypatch.setattr(storage, "ATTACHMENTS_DIR", blocked)
+    calls = _counting_renderer(monkeypatch)
+    invoice_id = _create_invoice(api_client, auth_headers)
+
+    res = api_client.get(f"/invoices/{invoice_id}/pdf", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    assert res.content.startswith(b"%PDF")
+    assert calls == [invoice_id]
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+from app.models.document_template import DocumentTemplate, DocumentTemplateKind
+from app.models.patient import Patient
+from app.services.document_render import (
+    PLACEHOLDER_PATTERN,
+    _build_field_map,
+    compile_document_template,
+    compile_template,
+    render_template_with_warnings,
+)
+
+
+def _patient() -> Patient:
+    return Patient(
+        id=42,
+        first_name="Ada",
+        last_name="Lovelace",
+        date_of_birth=date(1815, 12, 10),
+        address_line1="1 Analytical Row",
+        city="London",
+        postcode="W1 1AA",
+        recall_due_date=date(2035, 6, 15),
+        recall_type="exam",
+    )
+
+
+def test_compiled_render_matches_full_field_map():
+    content = (
+        "Dear {{ patient.full_name }} ({{patient.id}}),\n"
+        "{{patient.address}} / {{ practice.name }} / {{today}}\n"
+        "Due {{recall.due_date}} {{ not.a.field }} {{patient.email}}{{patient.first_name}}"
+    )
+    patient = _patient()
+    mapping = _build_field_map(patient)
+    expected = PLACEHOLDER_PATTERN.sub(
+        lambda match: mapping.get(match.group(1).strip(), match.group(0)), content
+    )
+
+    compiled = compile_template(content)
+    assert compiled.render(patient) == expected
+    assert compiled.unknown_fields == ("not.a.field",)
+    assert "date_of_birth" not in compiled.patient_columns
+    assert render_template_with_warnings(content, patient) == (expected, ["not.a.field"])
+    assert compile_template("no placeholders").render(patient) == "no placeholders"
+
+
+def test_document_template_compiled_once_per_version():
+    stamp = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    template = DocumentTemplate(
+        id=10_000_000 + int(uuid4().int % 1_000_000),
+        name="Cache",
+        kind=DocumentTemplateKind.letter,
+        content="Hello {{patient.first_name}}",
+        updated_at=stamp,
+    )
+    first = compile_document_template(template)
+    assert compile_document_template(template) is first
+
+    template.content = "Bye {{patient.first_name}}"
+    changed = compile_document_template(template)
+    assert changed is not first
+    assert changed.render(_patient()) == "Bye Ada"
+
+    template.updated_at = datetime(2030, 1, 2, tzinfo=timezone.utc)
+    assert compile_document_template(template).render(_patient()) == "Bye Ada"
+
+
+def test_mail_merge_streams_one_line_per_patient(api_client, auth_headers):
+    label = uuid4().hex[:8]
+    patient_ids = []
+    for first_name in ("Merge", "Bulk"):
+        res = api_client.post(
+            "/patients",
+            headers=auth_headers,
+            json={"first_name": first_name, "last_name": f"Letter-{label}"},
+        )
+        assert res.status_code == 201, res.text
+        patient_ids.append(res.json()["id"])
+    res = api_client.post(
+        "/document-templates",
+        headers=auth_headers,
+        json={
+            "name": f"Merge {label}",
+            "kind": "letter",
+            "content": "Dear {{patient.full_name}}, {{ unknown.thing }}",
+        },
+    )
+    assert res.status_code == 201, res.text
+    template_id = res.json()["id"]
+    try:
+        res = api_client.post(
+            f"/document-templates/{template_id}/mail-merge",
+            headers=auth_headers,
+            json={"patient_ids": list(reversed(patient_ids)), "title": "For {{patient.last_name}}"},
+        )
+        assert res.status_code == 200, res.text
+        assert res.headers["content-type"].startswith("application/x-ndjson")
+        assert res.headers["x-mail-merge-count"] == "2"
+        assert res.headers["x-unknown-fields"] == "unknown.thing"
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert lines == [
+            {
+                "patient_id": patient_ids[0],
+                "title": f"For Letter-{label}",
+                "content": f"Dear Merge Letter-{label}, {{{{ unknown.thing }}}}",
+            },
+            {
+                "patient_id": patient_ids[1],
+                "title": f"For Letter-{label}",
+                "content": f"Dear Bulk Letter-{label}, {{{{ unknown.thing }}}}",
+            },
+        ]
+
+        res = api_client.post(
+            f"/document-templates/{template_id}/mail-merge?format=pdf",
+            headers=auth_headers,
+            json={"patient_ids": patient_ids},
+        )
+        assert res.status_code == 200, res.text
+        assert res.headers["content-type"] == "application/pdf"
+        assert res.headers["x-mail-merge-count"] == "2"
+        assert res.content.startswith(b"%PDF")
+        assert res.content.count(b"/Type /Page\n") == 2
+
+        res = api_client.post(
+            "/document-templates/999999999/mail-merge", headers=auth_headers, json={}
+        )
+        assert res.status_code == 404
+    finally:
+        api_client.delete(f"/document-templates/{template_id}", headers=auth_headers)
@@ -9,6 +9,7 @@ from app.models.r4_treatment_plan import R4Treatment
 from app.models.r4_treatment_transaction import R4TreatmentTransaction
 from app.models.r4_user import R4User
 from app.models.user import User
+from app.services.reference_cache import R4_TREATMENTS, R4_USERS, bump_reference_data
 
 
 def _seed_patient_with_transactions():
@@ -134,6 +135,7 @@ def _seed_patient_with_transactions():
             ),
         ]
         session.add_all(txs)
+        bump_reference_data(session, R4_USERS, R4_TREATMENTS)
         session.commit()
         return {
             "patient_id": patient.id,
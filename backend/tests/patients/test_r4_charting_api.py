@@ -22,7 +22,10 @@ from app.models.r4_charting_canonical import R4ChartingCanonicalRecord
 from app.models.r4_treatment_plan import R4Treatment
 from app.models.capability import UserCapability
 from app.models.user import Role, User
+from app.services.audit_buffer import audit_buffer
+from app.services.charting_csv import ENTITY_SORT_KEYS, sorted_rows
 from app.services.charting_csv import ENTITY_COLUMNS
+from app.services.reference_cache import R4_TREATMENTS, bump_reference_data
 from app.routers import r4_charting
 from app.services.users import create_user
 
@@ -265,6 +268,17 @@ def test_charting_endpoints_return_ordered_rows(api_client, auth_headers):
         limited_payload = limited.json()
         assert limited_payload["total"] == 2
         assert len(limited_payload["items"]) == 1
+        assert limited_payload["has_more"] is True
+        next_page = api_client.get(
+            f"/patients/{patient.id}/charting/perio-probes",
+            params={"limit": 1, "cursor": limited_payload["next_cursor"]},
+            headers=auth_headers,
+        )
+        assert next_page.status_code == 200, next_page.text
+        next_payload = next_page.json()
+        assert [item["legacy_probe_key"] for item in next_payload["items"]] == [probe_key_newer]
+        assert next_payload["has_more"] is False
+        assert next_payload["next_cursor"] is None
 
         plaque_res = api_client.get(
             f"/patients/{patient.id}/charting/perio-plaque", headers=auth_headers
@@ -407,6 +421,7 @@ def test_treatment_plan_items_overlay_returns_grouped_items_with_code_labels(
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -571,6 +586,7 @@ def test_tooth_state_endpoint_contract(api_client, auth_headers):
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -750,6 +766,7 @@ def test_tooth_state_prefers_real_restorative_domain_over_tp_proxy(api_client, a
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -928,6 +945,7 @@ def test_tooth_state_latest_row_wins_per_family_and_status_value_does_not_change
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -1060,6 +1078,7 @@ def test_tooth_state_allows_different_families_to_coexist_on_one_tooth(api_clien
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -1210,6 +1229,7 @@ def test_tooth_state_allows_crown_root_canal_and_post_to_coexist_on_one_tooth(
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -1386,6 +1406,7 @@ def test_tooth_state_reset_boundary_ignores_older_rows_and_skips_tooth_present_s
                 ),
             ]
         )
+        bump_reference_data(session, R4_TREATMENTS)
         session.commit()
 
         res = api_client.get(
@@ -1667,6 +1688,7 @@ def test_charting_export_returns_csv_zip(api_client, auth_headers):
         )
         assert res.status_code == 200, res.text
         assert res.headers["content-type"].startswith("application/zip")
+        audit_buffer.flush()
         audit = session.scalar(
             select(AuditLog)
             .where(
@@ -1788,6 +1810,116 @@ def test_charting_export_truncates_rows(api_client, auth_headers, monkeypatch):
         session.close()
 
 
+def test_charting_export_streams_rows_in_database_order(api_client, auth_headers, monkeypatch):
+    session = SessionLocal()
+    patient_id = None
+    legacy_code: int | None = None
+    try:
+        if not _charting_enabled(api_client):
+            return
+        # Force the archive onto disk to exercise the spooled rollover path.
+        monkeypatch.setattr(r4_charting, "EXPORT_SPOOL_BYTES", 1)
+        monkeypatch.setattr(r4_charting, "EXPORT_FETCH_SIZE", 2)
+        actor_id = resolve_actor_id(session)
+        legacy_code = 990000000 + (uuid4().int % 100000)
+        patient = _create_patient(session, legacy_code, actor_id)
+        patient_id = patient.id
+        for idx in reversed(range(5)):
+            session.add(
+                R4PatientNote(
+                    legacy_source="r4",
+                    legacy_note_key=f"{legacy_code}:{idx}",
+                    legacy_patient_code=legacy_code,
+                    legacy_note_number=idx + 1,
+                    note_date=datetime(2024, 5, 1 + idx, tzinfo=timezone.utc),
+                    note=f"Export note {idx}",
+                    created_by_user_id=actor_id,
+                )
+            )
+        session.commit()
+
+        res = api_client.get(
+            f"/patients/{patient.id}/charting/export?entities=patient_notes",
+            headers=auth_headers,
+        )
+        assert res.status_code == 200, res.text
+        assert res.headers["content-length"] == str(len(res.content))
+        import csv
+        import io
+        import zipfile
+
+        with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+            note_rows = list(
+                csv.DictReader(
+                    archive.read("postgres_patient_notes.csv").decode("utf-8").splitlines()
+                )
+            )
+            index_rows = list(
+                csv.DictReader(archive.read("index.csv").decode("utf-8").splitlines())
+            )
+        assert [row["note_number"] for row in note_rows] == ["1", "2", "3", "4", "5"]
+        assert index_rows[0]["postgres_count"] == "5"
+        assert index_rows[0]["postgres_date_min"].startswith("2024-05-01")
+        assert index_rows[0]["postgres_date_max"].startswith("2024-05-05")
+    finally:
+        session.rollback()
+        if legacy_code is not None:
+            _cleanup(session, patient_id, legacy_code)
+            session.commit()
+        session.close()
+
+
+def test_charting_export_orders_rows_like_the_csv_tooling(api_client, auth_headers):
+    session = SessionLocal()
+    patient_id = None
+    legacy_code: int | None = None
+    try:
+        if not _charting_enabled(api_client):
+            return
+        actor_id = resolve_actor_id(session)
+        legacy_code = 990000000 + (uuid4().int % 100000)
+        patient = _create_patient(session, legacy_code, actor_id)
+        patient_id = patient.id
+        for number in (2, 10, 9):
+            session.add(
+                R4PatientNote(
+                    legacy_source="r4",
+                    legacy_note_key=f"{legacy_code}:{number}",
+                    legacy_patient_code=legacy_code,
+                    legacy_note_number=number,
+                    note_date=datetime(2024, 6, 1, tzinfo=timezone.utc),
+                    note=f"Parity note {number}",
+                    created_by_user_id=actor_id,
+                )
+            )
+        session.commit()
+
+        res = api_client.get(
+            f"/patients/{patient.id}/charting/export?entities=patient_notes",
+            headers=auth_headers,
+        )
+        assert res.status_code == 200, res.text
+        import csv
+        import io
+        import zipfile
+
+        with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+            note_rows = list(
+                csv.DictReader(
+                    archive.read("postgres_patient_notes.csv").decode("utf-8").splitlines()
+                )
+            )
+        # Same date, so note_number decides; the tooling compares it as text.
+        assert [row["note_number"] for row in note_rows] == ["10", "2", "9"]
+        assert note_rows == sorted_rows(note_rows, ENTITY_SORT_KEYS["patient_notes"])
+    finally:
+        session.rollback()
+        if legacy_code is not None:
+            _cleanup(session, patient_id, legacy_code)
+            session.commit()
+        session.close()
+
+
 @pytest.mark.parametrize(
     "endpoint",
     [
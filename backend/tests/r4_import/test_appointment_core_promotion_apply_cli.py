@@ -25,6 +25,7 @@ SCRATCH_DATABASE_URL = (
 class FakeSession:
     def __init__(self) -> None:
         self.added: list[object] = []
+        self.executed: list[object] = []
         self.flushed = False
         self.committed = False
         self.rolled_back = False
@@ -36,6 +37,9 @@ class FakeSession:
     def flush(self) -> None:
         self.flushed = True
 
+    def execute(self, statement) -> None:
+        self.executed.append(statement)
+
     def commit(self) -> None:
         self.committed = True
 
@@ -145,6 +149,7 @@ def test_apply_plan_to_session_materializes_only_create_rows():
     assert len(session.added) == 1
     assert session.added[0].legacy_id == "1"
     assert session.added[0].created_by_user_id == 42
+    assert len(session.executed) == 1
 
 
 def test_run_apply_refuses_default_database_before_opening_session(monkeypatch, tmp_path):
@@ -1,6 +1,6 @@
 from uuid import uuid4
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, event, select
 
 from app.db.session import SessionLocal
 from app.models.patient import Patient
@@ -9,6 +9,7 @@ from app.models.r4_treatment_plan import R4TreatmentPlan
 from app.models.user import User
 from app.services.r4_import.treatment_plan_importer import (
     backfill_r4_treatment_plan_patients,
+    backfill_r4_treatment_plan_patients_chunked,
 )
 
 
@@ -90,3 +91,87 @@ def test_backfill_r4_treatment_plan_patients():
         assert stats.plans_missing_mapping >= 0
     finally:
         session.close()
+
+
+def test_backfill_r4_treatment_plan_patients_chunked_single_statement():
+    session = SessionLocal()
+    statements: list[str] = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        actor_id = resolve_actor_id(session)
+        legacy_source = f"r4-chunk-{uuid4().hex[:8]}"
+        patient = Patient(
+            legacy_source=legacy_source,
+            legacy_id="1",
+            first_name="Chunked",
+            last_name="Backfill",
+            created_by_user_id=actor_id,
+            updated_by_user_id=actor_id,
+        )
+        session.add(patient)
+        session.flush()
+        session.add(
+            R4PatientMapping(
+                legacy_source=legacy_source,
+                legacy_patient_code=1,
+                patient_id=patient.id,
+                created_by_user_id=actor_id,
+                updated_by_user_id=actor_id,
+            )
+        )
+        for tp_number in (1, 2, 3):
+            session.add(
+                R4TreatmentPlan(
+                    legacy_source=legacy_source,
+                    legacy_patient_code=1,
+                    legacy_tp_number=tp_number,
+                    plan_index=tp_number,
+                    is_master=False,
+                    is_current=True,
+                    is_accepted=False,
+                    created_by_user_id=actor_id,
+                    updated_by_user_id=actor_id,
+                )
+            )
+        session.commit()
+
+        bind = session.get_bind()
+        event.listen(bind, "before_cursor_execute", count_statement)
+        try:
+            dry_run = backfill_r4_treatment_plan_patients_chunked(
+                session, actor_id, legacy_source=legacy_source, limit=2, dry_run=True
+            )
+            assert len(statements) == 1
+            statements.clear()
+            applied = backfill_r4_treatment_plan_patients_chunked(
+                session, actor_id, legacy_source=legacy_source, limit=2, dry_run=False
+            )
+            assert len(statements) == 1
+        finally:
+            event.remove(bind, "before_cursor_execute", count_statement)
+        session.commit()
+
+        assert dry_run.as_dict() == {"processed": 2, "updated": 0, "remaining_estimate": 1}
+        assert applied.as_dict() == {"processed": 2, "updated": 2, "remaining_estimate": 1}
+        mapped = session.scalars(
+            select(R4TreatmentPlan.legacy_tp_number).where(
+                R4TreatmentPlan.legacy_source == legacy_source,
+                R4TreatmentPlan.patient_id == patient.id,
+            )
+        ).all()
+        assert sorted(mapped) == [1, 2]
+
+        last = backfill_r4_treatment_plan_patients_chunked(
+            session, actor_id, legacy_source=legacy_source, limit=2, dry_run=False
+        )
+        assert last.as_dict() == {"processed": 1, "updated": 1, "remaining_estimate": 0}
+        session.rollback()
+        session.execute(delete(R4TreatmentPlan).where(R4TreatmentPlan.legacy_source == legacy_source))
+        session.execute(delete(R4PatientMapping).where(R4PatientMapping.legacy_source == legacy_source))
+        session.execute(delete(Patient).where(Patient.id == patient.id))
+        session.commit()
+    finally:
+        session.close()
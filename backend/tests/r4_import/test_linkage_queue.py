@@ -254,6 +254,53 @@ def test_linkage_queue_preserves_resolved_status():
         session.close()
 
 
+def test_linkage_queue_bulk_load_counts_across_chunks_and_repeats():
+    session = SessionLocal()
+    try:
+        _clear_issues(session, "r4-test")
+        session.commit()
+
+        def _issue(legacy_id: int, patient_code: int, reason: str = "patient_code_not_found"):
+            return R4LinkageIssueInput(
+                entity_type="appointment",
+                legacy_source="r4-test",
+                legacy_id=str(legacy_id),
+                patient_code=patient_code,
+                reason_code=reason,
+                details_json={"appointment_id": str(legacy_id)},
+            )
+
+        load_linkage_issues(session, [_issue(4000, 1)])
+        session.commit()
+
+        issues = [
+            _issue(4000, 2),
+            _issue(4001, 1),
+            _issue(4002, 1),
+            _issue(4001, 3),
+            _issue(4003, 1),
+            _issue(4004, 1, reason="missing_patient_code"),
+        ]
+        stats = load_linkage_issues(session, issues, actionable_only=True, chunk_size=2)
+        session.commit()
+
+        assert stats == {
+            "created": 3,
+            "updated": 2,
+            "reason_counts": {REASON_MISSING_MAPPING: 5},
+            "excluded_reason_counts": {REASON_UNLINKABLE_MISSING_PATIENT_CODE: 1},
+        }
+        rows = {
+            row.legacy_id: row.patient_code
+            for row in session.scalars(
+                select(R4LinkageIssue).where(R4LinkageIssue.legacy_source == "r4-test")
+            )
+        }
+        assert rows == {"4000": 2, "4001": 3, "4002": 1, "4003": 1}
+    finally:
+        session.close()
+
+
 def _appt(appt_id: int, patient_code: int | None) -> R4AppointmentRecord:
     return R4AppointmentRecord(
         appointment_id=appt_id,
@@ -806,3 +806,41 @@ def test_cli_charting_canonical_stats_out_separates_candidates_and_dropped(tmp_p
         "missing_date": 2,
         "out_of_range": 3,
     }
+
+
+def test_cli_rejects_load_mode_for_other_entities(monkeypatch):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["r4_import.py", "--entity", "patients", "--load-mode", "copy"],
+    )
+    assert r4_import_script.main() == 2
+
+
+def test_cli_fixtures_treatment_transactions_copy_load_mode(monkeypatch, capsys):
+    from app.services.r4_import.treatment_transactions_importer import (
+        TreatmentTransactionImportStats,
+    )
+
+    calls = []
+
+    def fake_copy_loader(session, source, actor_id, **kwargs):
+        calls.append(kwargs)
+        return TreatmentTransactionImportStats(transactions_created=2)
+
+    monkeypatch.setattr(r4_import_script, "import_r4_treatment_transactions_copy", fake_copy_loader)
+    monkeypatch.setattr(
+        r4_import_script,
+        "import_r4_treatment_transactions",
+        lambda *args, **kwargs: (_ for _ in ()).throw(
+            AssertionError("row-by-row import should not run in copy mode")
+        ),
+    )
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["r4_import.py", "--entity", "treatment_transactions", "--load-mode", "copy"],
+    )
+    assert r4_import_script.main() == 0
+    assert len(calls) == 1
+    assert '"transactions_created": 2' in capsys.readouterr().out
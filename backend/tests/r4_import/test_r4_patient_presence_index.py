@@ -0,0 +1,135 @@
+from datetime import date
+
+from app.scripts import r4_cohort_select
+from app.services.r4_charting.patient_presence import (
+    PatientPresenceIndex,
+    build_presence_index,
+    refresh_presence_index,
+)
+
+
+ACTIVITY = {
+    "bpe": [
+        (10, date(2024, 1, 5)),
+        (11, date(2024, 1, 31)),
+        (12, date(2024, 2, 1)),
+        (10, date(2024, 3, 15)),
+    ],
+    "patient_notes": [
+        (11, date(2024, 1, 20)),
+        (12, date(2024, 2, 10)),
+        (13, date(2023, 12, 31)),
+    ],
+    "perioprobe": [
+        (20, None),
+        (21, date(2024, 2, 29)),
+    ],
+    "active_patients": [
+        (10, date(2024, 3, 1)),
+        (30, date(2023, 6, 1)),
+    ],
+}
+
+
+def _activity_source(activity):
+    calls: list[tuple[str, date | None]] = []
+
+    def _source(domain, *, since=None):
+        calls.append((domain, since))
+        if domain == "treatment_notes":
+            raise RuntimeError("TreatmentNotes missing PatientCode/Date columns")
+        for code, day in activity.get(domain, []):
+            if since is None or day is None or day >= since:
+                yield code, day
+
+    return _source, calls
+
+
+def test_presence_index_answers_domain_windows():
+    source, calls = _activity_source(ACTIVITY)
+    index = build_presence_index(
+        ["bpe", "patient_notes", "perioprobe"],
+        today=date(2024, 3, 20),
+        activity_source=source,
+    )
+    assert [domain for domain, _since in calls] == [
+        "bpe",
+        "patient_notes",
+        "perioprobe",
+        "active_patients",
+    ]
+    # Most recent first, exclusive end date.
+    assert index.domain_codes("bpe", "2024-01-01", "2024-03-15", limit=10) == [12, 11, 10]
+    assert index.domain_codes("bpe", "2024-01-06", "2024-02-01", limit=10) == [11]
+    assert index.domain_codes("bpe", "2024-01-01", "2024-04-01", limit=2) == [10, 12]
+    # Perio keeps undated patients and an inclusive end date, like the live selector.
+    assert index.domain_codes("perioprobe", "2024-01-01", "2024-02-29", limit=10) == [21, 20]
+
+
+def test_select_cohort_uses_presence_index(tmp_path, monkeypatch):
+    source, _calls = _activity_source(ACTIVITY)
+    path = tmp_path / "presence.json.gz"
+    build_presence_index(
+        ["bpe", "patient_notes", "treatment_notes"],
+        today=date(2024, 3, 20),
+        activity_source=source,
+    ).save(path)
+    index = PatientPresenceIndex.load(path)
+    assert not index.has_domain("treatment_notes")
+
+    def _live(date_from, date_to, limit):
+        return [99]
+
+    monkeypatch.setattr(r4_cohort_select, "get_distinct_treatment_notes_patient_codes", _live)
+
+    union = r4_cohort_select.select_cohort(
+        domains=["bpe", "patient_notes", "treatment_notes"],
+        date_from="2024-01-01",
+        date_to="2024-03-01",
+        limit=10,
+        mode="union",
+        presence_index=index,
+    )
+    assert union["patient_codes"] == [10, 11, 12, 99]
+    assert union["domain_counts"] == {"bpe": 3, "patient_notes": 2, "treatment_notes": 1}
+
+    intersection = r4_cohort_select.select_cohort(
+        domains=["bpe", "patient_notes"],
+        date_from="2024-01-01",
+        date_to="2024-03-01",
+        limit=10,
+        mode="intersection",
+        presence_index=index,
+    )
+    assert intersection["patient_codes"] == [11, 12]
+
+    active = r4_cohort_select.select_cohort(
+        domains=[],
+        date_from=None,
+        date_to="2024-03-20",
+        limit=10,
+        mode="active_patients",
+        active_months=6,
+        presence_index=index,
+    )
+    assert active["patient_codes"] == [10]
+
+
+def test_refresh_presence_index_rereads_only_recent_months():
+    source, _calls = _activity_source(ACTIVITY)
+    index = build_presence_index(["bpe"], today=date(2024, 3, 20), activity_source=source)
+
+    updated = dict(ACTIVITY)
+    updated["bpe"] = [*ACTIVITY["bpe"], (40, date(2024, 3, 25)), (41, date(2024, 4, 2))]
+    refresh_source, refresh_calls = _activity_source(updated)
+    refresh_presence_index(index, today=date(2024, 4, 5), activity_source=refresh_source)
+
+    assert {since for _domain, since in refresh_calls} == {date(2024, 3, 1)}
+    assert index.built_through == date(2024, 4, 5)
+    assert index.domain_codes("bpe", "2024-01-01", "2024-05-01", limit=10) == [
+        41,
+        40,
+        10,
+        12,
+        11,
+    ]
@@ -1,7 +1,7 @@
 from decimal import Decimal
 import json
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, event, func, select
 
 from app.db.session import SessionLocal
 from app.models.patient import Patient
@@ -17,6 +17,11 @@ from app.services.r4_import.treatment_plan_importer import (
     import_r4_treatment_plans,
     import_r4_treatments,
 )
+from app.services.r4_import.types import (
+    R4TreatmentPlan as R4TreatmentPlanPayload,
+    R4TreatmentPlanItem as R4TreatmentPlanItemPayload,
+    R4TreatmentPlanReview as R4TreatmentPlanReviewPayload,
+)
 
 
 def resolve_actor_id(session) -> int:
@@ -189,3 +194,97 @@ def test_r4_treatment_plans_progress_output(capsys):
         assert "items" in {payload["phase"] for payload in payloads}
     finally:
         session.close()
+
+
+class PlanListSource:
+    def __init__(self, plans, items, reviews) -> None:
+        self.plans = plans
+        self.items = items
+        self.reviews = reviews
+
+    def list_treatment_plans(self, **_kwargs):
+        return list(self.plans)
+
+    def list_treatment_plan_items(self, **_kwargs):
+        return list(self.items)
+
+    def list_treatment_plan_reviews(self, **_kwargs):
+        return list(self.reviews)
+
+
+def test_r4_treatment_plans_round_trips_scale_with_batches():
+    session = SessionLocal()
+    statements: list[str] = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        clear_r4_clinical(session)
+        session.commit()
+
+        actor_id = resolve_actor_id(session)
+        patient_codes = [1001, 1002, 1003, 1004, 9999]
+        for patient_code in patient_codes[:-1]:
+            ensure_patient(session, actor_id, patient_code=patient_code)
+        session.commit()
+
+        plans = [
+            R4TreatmentPlanPayload(patient_code=code, tp_number=number)
+            for code in patient_codes
+            for number in range(1, 7)
+        ]
+        items = [
+            R4TreatmentPlanItemPayload(
+                patient_code=plan.patient_code,
+                tp_number=plan.tp_number,
+                tp_item=tp_item,
+                tp_item_key=plan.patient_code * 100 + plan.tp_number * 10 + tp_item,
+                patient_cost=Decimal("12.50"),
+            )
+            for plan in plans
+            for tp_item in (1, 2)
+        ] + [R4TreatmentPlanItemPayload(patient_code=1001, tp_number=99, tp_item=1)]
+        reviews = [
+            R4TreatmentPlanReviewPayload(patient_code=plan.patient_code, tp_number=plan.tp_number)
+            for plan in plans
+        ]
+        source = PlanListSource(plans, items, reviews)
+        # 30 plans, 61 items and 30 reviews in batches of 10: 3 + 7 + 3 batches.
+        batches = 13
+
+        bind = session.get_bind()
+        event.listen(bind, "before_cursor_execute", count_statement)
+        try:
+            stats_first = import_r4_treatment_plans(session, source, actor_id, batch_size=10)
+            session.commit()
+            first_round_trips = len(statements)
+            statements.clear()
+            stats_second = import_r4_treatment_plans(session, source, actor_id, batch_size=10)
+            session.commit()
+            second_round_trips = len(statements)
+        finally:
+            event.remove(bind, "before_cursor_execute", count_statement)
+
+        assert stats_first.plans_created == 30
+        assert stats_first.plans_unmapped_patient_refs == 6
+        assert stats_first.items_created == 60
+        assert stats_first.items_missing_plan_refs == 1
+        assert stats_first.reviews_created == 30
+        assert stats_second.plans_skipped == 30
+        assert stats_second.items_skipped == 60
+        assert stats_second.reviews_skipped == 30
+        # A per-row importer needs several statements per row (121 rows here).
+        assert first_round_trips <= 6 * batches
+        assert second_round_trips <= 4 * batches
+
+        mapped = session.scalar(
+            select(R4TreatmentPlan).where(
+                R4TreatmentPlan.legacy_patient_code == 1003,
+                R4TreatmentPlan.legacy_tp_number == 4,
+            )
+        )
+        assert mapped is not None
+        assert mapped.patient_id == ensure_patient(session, actor_id, patient_code=1003).id
+    finally:
+        session.close()
@@ -6,8 +6,10 @@ from app.db.session import SessionLocal
 from app.models.r4_treatment_transaction import R4TreatmentTransaction
 from app.models.user import User
 from app.services.r4_import.fixture_source import FixtureSource
+from app.services.r4_import.id_ranges import IdRanges
 from app.services.r4_import.treatment_transactions_importer import (
     import_r4_treatment_transactions,
+    import_r4_treatment_transactions_copy,
     TreatmentTransactionImportStats,
 )
 from app.services.r4_import.types import R4TreatmentTransaction as R4TreatmentTransactionPayload
@@ -63,9 +65,11 @@ def test_r4_treatment_transactions_idempotent_and_updates():
 
 def test_treatment_transactions_updated_ids_sample_capped():
     stats = TreatmentTransactionImportStats()
-    stats.updated_transaction_ids = set(range(1, 30))
-    sample = stats.as_dict()["updated_transaction_ids_sample"]
-    assert sample == list(range(1, 21))
+    stats.updated_transaction_ids = IdRanges(range(1, 30))
+    data = stats.as_dict()
+    assert data["updated_transaction_ids_sample"] == list(range(1, 21))
+    assert data["updated_transaction_id_ranges"] == [[1, 29]]
+    assert data["updated_transaction_id_range_count"] == 1
 
 
 def test_treatment_transactions_updated_ids_scoped_to_run():
@@ -129,3 +133,142 @@ def test_treatment_transactions_updated_ids_scoped_to_run():
         assert "updated_transaction_ids_sample" not in stats_second.as_dict()
     finally:
         session.close()
+
+
+def _payload(transaction_id: int, patient_cost=0, patient_code: int = 1000101):
+    return R4TreatmentTransactionPayload(
+        transaction_id=transaction_id,
+        patient_code=patient_code,
+        performed_at="2026-01-02T00:00:00.123456",
+        treatment_code=None,
+        trans_code=1,
+        patient_cost=patient_cost,
+        dpb_cost=0,
+    )
+
+
+class ListSource:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def stream_treatment_transactions(self, **_kwargs):
+        return iter(self.rows)
+
+
+def test_id_ranges_merge_out_of_order_ids():
+    ids = IdRanges([5, 1, 2, 9, 3, 7, 8])
+    assert ids.ranges() == [(1, 3), (5, 5), (7, 9)]
+    assert len(ids) == 7
+    ids.add(4)
+    ids.add(6)
+    assert ids.ranges() == [(1, 9)]
+    assert len(ids) == 9
+    assert 6 in ids and 10 not in ids
+    assert ids == IdRanges.from_ranges([(1, 4), (5, 9)])
+
+
+def _stored_transactions(session):
+    rows = session.scalars(
+        select(R4TreatmentTransaction).order_by(R4TreatmentTransaction.legacy_transaction_id)
+    ).all()
+    return [
+        (
+            row.legacy_transaction_id,
+            row.patient_code,
+            row.performed_at,
+            row.trans_code,
+            row.patient_cost,
+            row.dpb_cost,
+            row.created_by_user_id,
+            row.updated_by_user_id,
+        )
+        for row in rows
+    ]
+
+
+def test_copy_load_matches_row_by_row_import():
+    session = SessionLocal()
+    try:
+        actor_id = resolve_actor_id(session)
+        source = FixtureSource()
+
+        clear_r4_transactions(session)
+        import_r4_treatment_transactions(session, source, actor_id)
+        session.commit()
+        orm_rows = _stored_transactions(session)
+
+        clear_r4_transactions(session)
+        stats_first = import_r4_treatment_transactions_copy(session, source, actor_id)
+        session.commit()
+        session.expire_all()
+        assert _stored_transactions(session) == orm_rows
+        assert stats_first.as_dict() == {
+            "transactions_created": 2,
+            "transactions_updated": 0,
+            "transactions_skipped": 0,
+        }
+
+        tx = session.scalar(
+            select(R4TreatmentTransaction).where(
+                R4TreatmentTransaction.legacy_transaction_id == 9001
+            )
+        )
+        tx.patient_cost = Decimal("12.34")
+        session.commit()
+
+        copy_stats = import_r4_treatment_transactions_copy(session, source, actor_id)
+        session.rollback()
+        orm_stats = import_r4_treatment_transactions(session, source, actor_id)
+        session.rollback()
+        assert copy_stats.as_dict() == orm_stats.as_dict()
+        assert copy_stats.as_dict()["updated_transaction_ids_sample"] == [9001]
+    finally:
+        clear_r4_transactions(session)
+        session.commit()
+        session.close()
+
+
+def test_copy_load_chunks_dedupes_and_reports_ranges():
+    session = SessionLocal()
+    try:
+        clear_r4_transactions(session)
+        session.commit()
+        actor_id = resolve_actor_id(session)
+
+        initial = [_payload(transaction_id) for transaction_id in range(1, 11)]
+        stats = import_r4_treatment_transactions_copy(
+            session, ListSource(initial), actor_id, chunk_rows=3
+        )
+        session.commit()
+        assert (stats.transactions_created, stats.transactions_updated) == (10, 0)
+
+        changed = [
+            _payload(transaction_id, patient_cost=5 if transaction_id in {2, 3, 4, 8} else 0)
+            for transaction_id in range(1, 11)
+        ]
+        # A later duplicate wins and the earlier copy counts as skipped.
+        changed.append(_payload(10, patient_cost=7))
+        stats = import_r4_treatment_transactions_copy(
+            session, ListSource(changed), actor_id, chunk_rows=4
+        )
+        session.commit()
+        assert stats.transactions_created == 0
+        assert stats.transactions_updated == 5
+        assert stats.transactions_skipped == 6
+        assert stats.updated_transaction_ids.ranges() == [(2, 4), (8, 8), (10, 10)]
+
+        costs = dict(
+            session.execute(
+                select(
+                    R4TreatmentTransaction.legacy_transaction_id,
+                    R4TreatmentTransaction.patient_cost,
+                )
+            ).all()
+        )
+        assert costs[3] == Decimal("5.00")
+        assert costs[10] == Decimal("7.00")
+        assert costs[1] == Decimal("0.00")
+    finally:
+        clear_r4_transactions(session)
+        session.commit()
+        session.close()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete, select
+
+from app.db.session import SessionLocal
+from app.models.patient import Patient
+from app.models.patient_recall import PatientRecall, PatientRecallKind, PatientRecallStatus
+from app.models.patient_recall_communication import (
+    PatientRecallCommunication,
+    PatientRecallCommunicationChannel,
+    PatientRecallCommunicationDirection,
+    PatientRecallCommunicationStatus,
+)
+from app.models.user import User
+from app.services.recall_communications import log_recall_communication
+from app.services.recall_kpis import rebuild_recall_kpis
+
+FUTURE = {"start": "2097-03-01", "end": "2097-03-31"}
+PAST = {"start": "2020-01-01", "end": "2020-01-31"}
+
+
+def _kpis(api_client, auth_headers, params: dict) -> dict:
+    res = api_client.get("/recalls/kpis", headers=auth_headers, params=params)
+    assert res.status_code == 200, res.text
+    return res.json()
+
+
+def _create(api_client, auth_headers, due_date: str, recall_status: str) -> int:
+    res = api_client.post(
+        "/patients",
+        headers=auth_headers,
+        json={
+            "first_name": "Kpi",
+            "last_name": f"Counter-{uuid4().hex[:8]}",
+            "recall_due_date": due_date,
+            "recall_status": recall_status,
+        },
+    )
+    assert res.status_code == 201, res.text
+    return res.json()["id"]
+
+
+def test_kpi_counters_follow_recall_writes(api_client, auth_headers):
+    session = SessionLocal()
+    try:
+        rebuild_recall_kpis(session)
+        session.commit()
+    finally:
+        session.close()
+    future_before = _kpis(api_client, auth_headers, FUTURE)["counts"]
+    past_before = _kpis(api_client, auth_headers, PAST)["counts"]
+
+    due_id = _create(api_client, auth_headers, "2097-03-10", "due")
+    contacted_id = _create(api_client, auth_headers, "2097-03-11", "due")
+    _create(api_client, auth_headers, "2097-03-12", "booked")
+    archived_id = _create(api_client, auth_headers, "2097-03-13", "not_required")
+    moved_id = _create(api_client, auth_headers, "2097-03-14", "due")
+    _create(api_client, auth_headers, "2020-01-10", "due")
+
+    res = api_client.patch(
+        f"/recalls/{contacted_id}",
+        headers=auth_headers,
+        json={"status": "contacted", "last_contacted_at": "2097-03-20T09:00:00Z"},
+    )
+    assert res.status_code == 200, res.text
+    res = api_client.post(f"/patients/{archived_id}/archive", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    res = api_client.post(
+        f"/patients/{moved_id}/recall", headers=auth_headers, json={"due_date": "2097-05-01"}
+    )
+    assert res.status_code == 200, res.text
+    res = api_client.patch(
+        f"/patients/{due_id}", headers=auth_headers, json={"recall_due_date": "2097-03-15"}
+    )
+    assert res.status_code == 200, res.text
+
+    future = _kpis(api_client, auth_headers, FUTURE)["counts"]
+    past = _kpis(api_client, auth_headers, PAST)["counts"]
+    assert {key: future[key] - future_before[key] for key in future} == {
+        "due": 1,
+        "overdue": 0,
+        "contacted": 1,
+        "booked": 1,
+        "declined": 0,
+    }
+    assert past["due"] - past_before["due"] == 1
+    assert past["overdue"] - past_before["overdue"] == 1
+
+    session = SessionLocal()
+    try:
+        assert rebuild_recall_kpis(session, apply=False) == 0
+    finally:
+        session.close()
+
+
+def test_kpi_contacts_by_channel_counts_logged_contacts(api_client, auth_headers):
+    today = date.today().isoformat()
+    params = {"start": today, "end": today}
+    before = _kpis(api_client, auth_headers, params)["contacts_by_channel"]
+
+    session = SessionLocal()
+    actor_id = session.scalar(select(User.id).order_by(User.id).limit(1))
+    patient = Patient(
+        first_name="Kpi",
+        last_name=f"Channel-{uuid4().hex[:8]}",
+        created_by_user_id=actor_id,
+    )
+    session.add(patient)
+    session.flush()
+    recall = PatientRecall(
+        patient_id=patient.id,
+        kind=PatientRecallKind.exam,
+        due_date=date.today(),
+        status=PatientRecallStatus.due,
+        created_by_user_id=actor_id,
+    )
+    session.add(recall)
+    session.flush()
+    try:
+        for channel in (
+            PatientRecallCommunicationChannel.sms,
+            PatientRecallCommunicationChannel.sms,
+            PatientRecallCommunicationChannel.phone,
+        ):
+            log_recall_communication(
+                session,
+                patient_id=patient.id,
+                recall_id=recall.id,
+                channel=channel,
+                direction=PatientRecallCommunicationDirection.outbound,
+                status=PatientRecallCommunicationStatus.sent,
+                notes=None,
+                contacted_at=datetime.now(timezone.utc),
+                created_by_user_id=actor_id,
+                guard_seconds=None,
+            )
+        session.commit()
+
+        after = _kpis(api_client, auth_headers, params)["contacts_by_channel"]
+        assert {key: after[key] - before[key] for key in after} == {
+            "letter": 0,
+            "phone": 1,
+            "email": 0,
+            "sms": 2,
+            "other": 0,
+        }
+    finally:
+        session.rollback()
+        session.execute(
+            delete(PatientRecallCommunication).where(
+                PatientRecallCommunication.recall_id == recall.id
+            )
+        )
+        session.execute(delete(PatientRecall).where(PatientRecall.id == recall.id))
+        session.execute(delete(Patient).where(Patient.id == patient.id))
+        rebuild_recall_kpis(session)
+        session.commit()
+        session.close()
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import delete, select
+
+from app.db.session import SessionLocal
+from app.models.patient import Patient
+from app.models.patient_recall import PatientRecall, PatientRecallKind, PatientRecallStatus
+from app.models.patient_recall_communication import (
+    PatientRecallCommunication,
+    PatientRecallCommunicationChannel,
+    PatientRecallCommunicationDirection,
+    PatientRecallCommunicationStatus,
+)
+from app.models.user import User
+from app.services.recall_communications import (
+    log_recall_communication,
+    rebuild_recall_last_contact,
+)
+from app.services.recalls import resolve_recall_status, resolved_status_clause
+
+
+def _log(session, recall: PatientRecall, channel, contacted_at: datetime, outcome: str):
+    return log_recall_communication(
+        session,
+        patient_id=recall.patient_id,
+        recall_id=recall.id,
+        channel=channel,
+        direction=PatientRecallCommunicationDirection.outbound,
+        status=PatientRecallCommunicationStatus.sent,
+        notes=None,
+        outcome=outcome,
+        contacted_at=contacted_at,
+        created_by_user_id=recall.created_by_user_id,
+        guard_seconds=None,
+    )
+
+
+def test_last_contact_projection_tracks_newest_contact_and_rebuilds():
+    session = SessionLocal()
+    actor_id = session.scalar(select(User.id).order_by(User.id).limit(1))
+    patient = Patient(
+        first_name="Projection",
+        last_name=f"Recall-{uuid4().hex[:8]}",
+        created_by_user_id=actor_id,
+    )
+    session.add(patient)
+    session.flush()
+    today = date.today()
+    recalls = [
+        PatientRecall(
+            patient_id=patient.id,
+            kind=PatientRecallKind.exam,
+            due_date=today + timedelta(days=offset),
+            status=stored,
+            created_by_user_id=actor_id,
+        )
+        for offset in (-3, 0, 3)
+        for stored in PatientRecallStatus
+    ]
+    session.add_all(recalls)
+    session.flush()
+    recall = recalls[0]
+    try:
+        now = datetime.now(timezone.utc)
+        newest = _log(session, recall, PatientRecallCommunicationChannel.phone, now, "booked")
+        _log(
+            session,
+            recall,
+            PatientRecallCommunicationChannel.letter,
+            now - timedelta(days=5),
+            "no answer",
+        )
+        session.commit()
+        session.refresh(recall)
+        assert recall.last_contact_id == newest.id
+        assert recall.last_contact_channel == PatientRecallCommunicationChannel.phone
+        assert recall.last_contact_outcome == "booked"
+        assert rebuild_recall_last_contact(session, apply=False) == 0
+
+        recall.last_contact_id = None
+        recall.last_contacted_at = None
+        session.commit()
+        assert rebuild_recall_last_contact(session, apply=False) == 1
+        assert rebuild_recall_last_contact(session) == 1
+        session.commit()
+        session.refresh(recall)
+        assert (recall.last_contact_id, recall.last_contact_outcome) == (newest.id, "booked")
+
+        ids = [item.id for item in recalls]
+        for status in PatientRecallStatus:
+            matched = set(
+                session.scalars(
+                    select(PatientRecall.id).where(
+                        PatientRecall.id.in_(ids), resolved_status_clause({status})
+                    )
+                )
+            )
+            expected = {item.id for item in recalls if resolve_recall_status(item) == status}
+            assert matched == expected, status
+    finally:
+        session.rollback()
+        ids = [item.id for item in recalls]
+        session.execute(
+            delete(PatientRecallCommunication).where(PatientRecallCommunication.recall_id.in_(ids))
+        )
+        session.execute(delete(PatientRecall).where(PatientRecall.id.in_(ids)))
+        session.execute(delete(Patient).where(Patient.id == patient.id))
+        session.commit()
+        session.close()
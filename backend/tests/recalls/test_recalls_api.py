@@ -14,12 +14,12 @@ from app.db.session import SessionLocal
 from app.models.patient import Patient
 from app.models.patient_recall import PatientRecall, PatientRecallKind, PatientRecallStatus
 from app.models.patient_recall_communication import (
-    PatientRecallCommunication,
     PatientRecallCommunicationChannel,
     PatientRecallCommunicationDirection,
     PatientRecallCommunicationStatus,
 )
 from app.models.user import User
+from app.services.recall_communications import log_recall_communication
 
 SEED_DUE_DATE = date(2099, 1, 15)
 
@@ -49,7 +49,8 @@ def recall_seed():
         )
         session.add(recall)
         session.flush()
-        contact = PatientRecallCommunication(
+        log_recall_communication(
+            session,
             patient_id=patient.id,
             recall_id=recall.id,
             channel=PatientRecallCommunicationChannel.email,
@@ -58,8 +59,8 @@ def recall_seed():
             notes="seeded",
             contacted_at=datetime.now(timezone.utc) - timedelta(days=2),
             created_by_user_id=actor.id,
+            guard_seconds=None,
         )
-        session.add(contact)
         session.commit()
         return {"recall_id": recall.id, "due_date": SEED_DUE_DATE}
     finally:
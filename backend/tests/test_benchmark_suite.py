@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import pytest
+
+from app.core.settings import settings
+from app.db.session import SessionLocal
+from app.services.benchmark_data import (
+    build_patient_rows,
+    canonical_records_for_patient,
+    generate_synthetic_dataset,
+    purge_synthetic_dataset,
+    spec_for_scale,
+    synthetic_patient_count,
+    synthetic_patient_ids,
+)
+from app.services.benchmark_suite import _time_case, build_cases, compare_results
+
+
+def _rows(seed: int):
+    return build_patient_rows(
+        seed,
+        7,
+        spec_for_scale(0.001),
+        patient_id=1,
+        recall_id=1,
+        user_id=1,
+        user_email="admin@example.com",
+    )
+
+
+def test_generated_rows_depend_only_on_seed_and_index():
+    assert _rows(1) == _rows(1)
+    assert _rows(1) != _rows(2)
+    first = canonical_records_for_patient(1, 3, 20)
+    assert first == canonical_records_for_patient(1, 3, 20)
+    changed = canonical_records_for_patient(1, 3, 20, revision=1)
+    assert [record.r4_source_id for record in changed] == [record.r4_source_id for record in first]
+    assert all(record.payload["revision"] == 1 for record in changed)
+
+
+def test_compare_results_flags_median_slowdowns_over_threshold():
+    baseline = {"results": {"fast": {"median_ms": 10.0}, "slow": {"median_ms": 10.0, "queries": 3}}}
+    current = {
+        "results": {
+            "fast": {"median_ms": 11.0},
+            "slow": {"median_ms": 13.0, "queries": 9},
+            "new": {"median_ms": 5.0},
+        }
+    }
+    rows = {row["case"]: row for row in compare_results(baseline, current, threshold=0.2)}
+    assert set(rows) == {"fast", "slow"}
+    assert rows["fast"]["regressed"] is False
+    assert rows["slow"]["regressed"] is True
+    assert rows["slow"]["queries"] == 9
+
+
+def test_synthetic_data_is_refused_in_production(monkeypatch):
+    monkeypatch.setattr(settings, "app_env", "production")
+    session = SessionLocal()
+    try:
+        with pytest.raises(RuntimeError, match="production"):
+            generate_synthetic_dataset(session, spec_for_scale(0.0002))
+        with pytest.raises(RuntimeError, match="production"):
+            purge_synthetic_dataset(session)
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def synthetic_dataset(api_client):
+    session = SessionLocal()
+    try:
+        if synthetic_patient_count(session):
+            purge_synthetic_dataset(session)
+            session.commit()
+        written = generate_synthetic_dataset(session, spec_for_scale(0.0002), chunk_patients=8)
+        yield written
+    finally:
+        session.rollback()
+        purge_synthetic_dataset(session)
+        session.commit()
+        session.close()
+
+
+def test_every_benchmark_case_succeeds_on_a_small_dataset(
+    api_client, auth_headers, synthetic_dataset, monkeypatch
+):
+    monkeypatch.setattr(settings, "feature_charting_viewer", True)
+    assert synthetic_dataset["patients"] == 20
+    assert synthetic_dataset["r4_charting_canonical_records"] == 1000
+
+    session = SessionLocal()
+    try:
+        with pytest.raises(RuntimeError, match="already present"):
+            generate_synthetic_dataset(session, spec_for_scale(0.0002))
+        patient_ids = synthetic_patient_ids(session, 3)
+    finally:
+        session.close()
+    assert len(patient_ids) == 3
+
+    for case in build_cases(api_client, auth_headers, patient_ids):
+        result = _time_case(case, iterations=1, warmup=0)
+        assert set(result["statuses"]) <= {"200", "ok"}, (case.name, result)
+        if case.name == "canonical_import_unchanged":
+            assert result["detail"]["skipped"] == result["detail"]["total"] > 0
+        if case.name == "canonical_import_changed":
+            assert result["detail"]["updated"] == result["detail"]["total"] > 0
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.routers import appointments as appointments_router
+from app.services.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def _walk(api_client, auth_headers, path: str, params: dict) -> list[dict]:
+    items: list[dict] = []
+    cursor = None
+    for _ in range(20):
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        res = api_client.get(path, headers=auth_headers, params=query)
+        assert res.status_code == 200, res.text
+        items.extend(res.json())
+        cursor = res.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items
+    raise AssertionError("cursor walk did not finish")
+
+
+def test_cursor_round_trip_keeps_legacy_transaction_format():
+    performed_at = datetime(2024, 3, 1, 9, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor({"performed_at": performed_at, "legacy_transaction_id": 42})
+    # Same payload the treatment-transactions endpoint has always issued.
+    legacy = base64.urlsafe_b64encode(
+        json.dumps(
+            {"performed_at": performed_at.isoformat(), "legacy_transaction_id": 42}
+        ).encode("utf-8")
+    ).decode("ascii")
+    assert cursor == legacy
+    assert decode_cursor(cursor) == {
+        "performed_at": performed_at.isoformat(),
+        "legacy_transaction_id": 42,
+    }
+
+
+def test_list_endpoints_walk_with_cursors(api_client, auth_headers):
+    patient = api_client.post(
+        "/patients",
+        headers=auth_headers,
+        json={"first_name": "Keyset", "last_name": f"Walk-{uuid4().hex[:8]}"},
+    )
+    assert patient.status_code == 201, patient.text
+    patient_id = patient.json()["id"]
+    for index in range(5):
+        res = api_client.post(
+            f"/patients/{patient_id}/notes",
+            headers=auth_headers,
+            json={"body": f"keyset note {index}"},
+        )
+        assert res.status_code == 201, res.text
+
+    by_offset = api_client.get(
+        "/notes", headers=auth_headers, params={"patient_id": patient_id, "limit": 50}
+    ).json()
+    walked = _walk(api_client, auth_headers, "/notes", {"patient_id": patient_id, "limit": 2})
+    assert [note["id"] for note in walked] == [note["id"] for note in by_offset]
+    assert len(walked) == 5
+
+    for _ in range(2):
+        api_client.patch(
+            f"/patients/{patient_id}", headers=auth_headers, json={"phone": uuid4().hex[:10]}
+        )
+    audit_path = f"/patients/{patient_id}/audit"
+    full = api_client.get(audit_path, headers=auth_headers, params={"limit": 200}).json()
+    assert len(full) >= 3
+    walked_audit = _walk(api_client, auth_headers, audit_path, {"limit": 1})
+    assert [entry["id"] for entry in walked_audit] == [entry["id"] for entry in full]
+
+
+def test_invalid_cursor_is_rejected(api_client, auth_headers):
+    res = api_client.get("/invoices", headers=auth_headers, params={"cursor": "not-a-cursor"})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Invalid cursor."
+
+    stale = encode_cursor({"created_at": "yesterday", "id": 1})
+    res = api_client.get("/invoices", headers=auth_headers, params={"cursor": stale})
+    assert res.status_code == 400
+
+    valid = encode_cursor({"created_at": datetime.now(timezone.utc), "id": 1})
+    res = api_client.get(
+        "/invoices", headers=auth_headers, params={"cursor": valid, "offset": 10}
+    )
+    assert res.status_code == 400
+
+
+def test_appointment_list_pages_only_when_asked(api_client, auth_headers, monkeypatch):
+    monkeypatch.setattr(appointments_router, "APPOINTMENT_LIST_DEFAULT_LIMIT", 2)
+    patient = api_client.post(
+        "/patients",
+        headers=auth_headers,
+        json={"first_name": "Keyset", "last_name": f"Diary-{uuid4().hex[:8]}"},
+    )
+    assert patient.status_code == 201, patient.text
+    patient_id = patient.json()["id"]
+    for hour in (9, 10, 11):
+        res = api_client.post(
+            "/appointments",
+            headers=auth_headers,
+            json={
+                "patient_id": patient_id,
+                "starts_at": datetime(2031, 4, 7, hour, 0, tzinfo=timezone.utc).isoformat(),
+                "ends_at": datetime(2031, 4, 7, hour, 30, tzinfo=timezone.utc).isoformat(),
+                "status": "booked",
+                "location_type": "clinic",
+                "location": f"Keyset Room {hour}",
+                "allow_outside_hours": True,
+            },
+        )
+        assert res.status_code == 201, res.text
+
+    unpaged = api_client.get(
+        "/appointments", headers=auth_headers, params={"patient_id": patient_id}
+    )
+    assert unpaged.status_code == 200, unpaged.text
+    assert NEXT_CURSOR_HEADER not in unpaged.headers
+    assert len(unpaged.json()) == 3
+    walked = _walk(
+        api_client, auth_headers, "/appointments", {"patient_id": patient_id, "limit": 2}
+    )
+    assert [row["id"] for row in walked] == [row["id"] for row in unpaged.json()]
+    assert len(walked) == 3
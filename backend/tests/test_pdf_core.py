@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import date
+from functools import partial
+
+from reportlab import rl_config
+
+from app.models.patient import Patient
+from app.models.patient_recall import PatientRecall, PatientRecallKind
+from app.services import pdf_core
+from app.services.recall_letter_pdf import build_recall_letter_pdf, draw_recall_letter
+
+
+def _patient() -> Patient:
+    return Patient(id=1, first_name="Ada", last_name="Lovelace", city="London")
+
+
+def _recall() -> PatientRecall:
+    return PatientRecall(due_date=date(2035, 1, 1), kind=PatientRecallKind.exam)
+
+
+def test_letterhead_becomes_a_form_once_repeated():
+    single = build_recall_letter_pdf(_patient(), _recall())
+    assert single.startswith(b"%PDF")
+    assert b"/Subtype /Form" not in single
+
+    writer = pdf_core.PdfBatchWriter()
+    for index in range(20):
+        writer.add(
+            partial(draw_recall_letter, patient=_patient(), recall=_recall()),
+            title=f"Letter {index}",
+        )
+    batch = writer.finish()
+    assert writer.documents == 20
+    assert batch.count(b"/Subtype /Form") == 2  # letterhead and footer, stored once
+    assert batch.count(b"/Type /Page\n") == 20
+    assert len(batch) < 20 * len(single) * 0.6
+
+
+def test_binary_streams_leave_the_reportlab_default_alone():
+    default = rl_config.useA85
+    pdf = build_recall_letter_pdf(_patient(), _recall())
+    assert b"/ASCII85Decode" not in pdf
+    assert b"/FlateDecode" in pdf
+    assert rl_config.useA85 == default
+
+
+def test_profile_letterhead_is_shared_per_profile_version():
+    profile = {
+        "name": "Seaside Dental",
+        "address_line1": "1 Front",
+        "address_line2": "",
+        "city": "Hove",
+        "postcode": "BN3",
+        "phone": "01273 000000",
+        "website": "1 Front",
+        "email": "hi@example.com",
+    }
+    letterhead = pdf_core.profile_letterhead(profile)
+    assert letterhead.lines == ("1 Front", "Hove BN3", "hi@example.com", "Tel: 01273 000000")
+    assert pdf_core.profile_letterhead(dict(profile)) is letterhead
+
+    changed = pdf_core.profile_letterhead({**profile, "phone": "01273 111111"})
+    assert changed is not letterhead
+    assert changed.form_name != letterhead.form_name
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from app.db.session import engine
+from app.services import query_profile
+from app.services.query_profile import QueryProfile, fingerprint
+
+
+def _query_count(response) -> int:
+    header = response.headers.get("server-timing", "")
+    match = re.search(r'desc="(\d+) queries"', header)
+    assert match, f"no query count in Server-Timing: {header!r}"
+    return int(match.group(1))
+
+
+@pytest.fixture
+def assert_query_budget():
+    """Fail when a response ran more queries than `budget` (read from Server-Timing)."""
+
+    def _check(response, budget: int) -> int:
+        assert response.status_code == 200, response.text
+        count = _query_count(response)
+        assert count <= budget, (
+            f"{response.request.method} {response.request.url.path} ran {count} queries "
+            f"(budget {budget}); likely an N+1"
+        )
+        return count
+
+    return _check
+
+
+def test_fingerprint_ignores_values_and_in_list_length():
+    first = fingerprint(
+        "SELECT * FROM patients WHERE id IN (%(id_1_1)s, %(id_1_2)s) AND last_name = 'Smith' LIMIT 5"
+    )
+    second = fingerprint(
+        "SELECT *   FROM patients WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)\n"
+        "AND last_name = 'O''Neil' LIMIT 20"
+    )
+    assert first == second
+    assert "Smith" not in first
+
+
+def test_profile_flags_repeated_statements():
+    profile = QueryProfile(method="GET", path="/example")
+    for index in range(12):
+        profile.record(f"SELECT * FROM invoices WHERE id = {index}", 0.5)
+    profile.record("SELECT 1", 3.0)
+
+    summary = profile.summary(status_code=200)
+    assert summary["query_count"] == 13
+    assert summary["slowest_statement"] == "SELECT ?"
+    assert summary["repeated"] == [{"fingerprint": "SELECT * FROM invoices WHERE id = ?", "count": 12}]
+    assert 'desc="13 queries"' in profile.server_timing()
+
+
+def test_failed_statement_does_not_leave_a_start_time_on_the_connection():
+    query_profile.install_query_hooks()
+    profile = QueryProfile(method="GET", path="/example")
+    token = query_profile._current.set(profile)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(ProgrammingError):
+                conn.execute(text("SELECT * FROM query_profile_missing_table"))
+            conn.rollback()
+            assert not conn.info.get("query_profile_started")
+            conn.execute(text("SELECT 1"))
+            assert not conn.info.get("query_profile_started")
+    finally:
+        query_profile._current.reset(token)
+    assert profile.query_count == 1
+
+
+def test_hot_routes_stay_within_query_budget(api_client, auth_headers, assert_query_budget):
+    patient = api_client.post(
+        "/patients", json={"first_name": "Budget", "last_name": "Patient"}, headers=auth_headers
+    )
+    assert patient.status_code == 201, patient.text
+    patient_id = patient.json()["id"]
+
+    day = datetime(2027, 3, 8, 9, 0, tzinfo=timezone.utc)
+    for index in range(12):
+        starts_at = day + timedelta(minutes=20 * index)
+        res = api_client.post(
+            "/appointments",
+            json={
+                "patient_id": patient_id,
+                "starts_at": starts_at.isoformat(),
+                "ends_at": (starts_at + timedelta(minutes=15)).isoformat(),
+                "status": "booked",
+                "location_type": "clinic",
+                "allow_outside_hours": True,
+            },
+            headers=auth_headers,
+        )
+        assert res.status_code == 201, res.text
+        res = api_client.patch(
+            f"/patients/{patient_id}", json={"phone": f"0100{index:02d}"}, headers=auth_headers
+        )
+        assert res.status_code == 200, res.text
+
+    # Later invoices get earlier issue dates, so the newest payments belong to
+    # invoices outside the summary's invoice page.
+    for index in range(6):
+        invoice = api_client.post(
+            "/invoices",
+            json={"patient_id": patient_id, "issue_date": (date(2027, 3, 20) - timedelta(days=index)).isoformat()},
+            headers=auth_headers,
+        )
+        assert invoice.status_code == 201, invoice.text
+        invoice_id = invoice.json()["id"]
+        res = api_client.post(
+            f"/invoices/{invoice_id}/lines",
+            json={"description": "Exam", "quantity": 1, "unit_price_pence": 5000},
+            headers=auth_headers,
+        )
+        assert res.status_code == 201, res.text
+        assert api_client.post(f"/invoices/{invoice_id}/issue", headers=auth_headers).status_code == 200
+        res = api_client.post(
+            f"/invoices/{invoice_id}/payments",
+            json={"amount_pence": 1000, "method": "cash"},
+            headers=auth_headers,
+        )
+        assert res.status_code == 201, res.text
+
+    budgets = {
+        "/appointments/range?start=2027-03-08&end=2027-03-09": 6,
+        "/appointments/run-sheet.pdf?date=2027-03-08&location=clinic": 6,
+        f"/patients/{patient_id}/timeline": 8,
+        f"/patients/{patient_id}/audit?limit=50": 8,
+        f"/patients/{patient_id}/finance-summary?limit=3": 8,
+        "/recalls?limit=50": 6,
+    }
+    for path, budget in budgets.items():
+        assert_query_budget(api_client.get(path, headers=auth_headers), budget)
+
+
+def test_query_profile_endpoint_lists_recent_requests(api_client, auth_headers):
+    api_client.get("/patients/search?q=Budget", headers=auth_headers)
+    res = api_client.get("/admin/query-profile?path=/patients/search", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    entries = res.json()
+    assert entries and entries[0]["path"] == "/patients/search"
+    assert entries[0]["query_count"] >= 1
+    assert api_client.get("/admin/query-profile").status_code == 401
+
+
+def test_pool_waits_are_reported_per_request_and_per_pool(api_client, auth_headers):
+    before = api_client.get("/admin/query-profile/pool", headers=auth_headers)
+    assert before.status_code == 200, before.text
+    res = api_client.get("/patients/search?q=Pool", headers=auth_headers)
+    assert res.status_code == 200, res.text
+    assert re.search(r"db-pool;dur=[0-9.]+", res.headers["server-timing"])
+
+    after = api_client.get("/admin/query-profile/pool", headers=auth_headers).json()
+    assert set(after) == {"sync", "async"}
+    assert after["async"]["checkouts"] > before.json()["async"]["checkouts"]
+    assert after["sync"]["size"] >= 1
+    assert api_client.get("/admin/query-profile/pool").status_code == 401
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from uuid import uuid4
+
+from sqlalchemy import delete, func, select
+
+from app.db.session import SessionLocal
+from app.models.r4_user import R4User
+from app.models.user import User
+from app.services.reference_cache import (
+    R4_USERS,
+    ReferenceCache,
+    bump_reference_data,
+    reference_cache,
+)
+
+
+def _actor_id(session) -> int:
+    return int(session.scalar(select(func.min(User.id))))
+
+
+def _add_user(session, legacy_source: str, code: int, name: str) -> None:
+    actor_id = _actor_id(session)
+    session.add(
+        R4User(
+            legacy_source=legacy_source,
+            legacy_user_code=code,
+            display_name=name,
+            is_current=True,
+            role="Dentist",
+            created_by_user_id=actor_id,
+            updated_by_user_id=actor_id,
+        )
+    )
+
+
+def test_bump_reloads_only_the_changed_scope():
+    legacy_source = f"refcache-{uuid4().hex[:8]}"
+    cache = ReferenceCache(check_seconds=0)
+    session = SessionLocal()
+    try:
+        refs = cache.get(session)
+        assert refs.r4_user(7, legacy_source) is None
+
+        _add_user(session, legacy_source, 7, "Dr Before")
+        session.commit()
+        # Written without a version bump: the cached copy is kept.
+        assert cache.get(session).r4_user(7, legacy_source) is None
+
+        bump_reference_data(session, R4_USERS)
+        session.commit()
+        user = cache.get(session).r4_user(7, legacy_source)
+        assert user is not None
+        assert (user.display_name, user.is_current, user.role) == ("Dr Before", True, "Dentist")
+        assert cache.refresh(session) == []
+
+        row = session.scalar(select(R4User).where(R4User.legacy_source == legacy_source))
+        row.display_name = "Dr After"
+        bump_reference_data(session, R4_USERS)
+        session.commit()
+        assert cache.refresh(session) == [R4_USERS]
+        assert cache.get(session).r4_user(7, legacy_source).display_name == "Dr After"
+        assert refs.r4_user(7, legacy_source) is None  # snapshots are immutable
+    finally:
+        session.execute(delete(R4User).where(R4User.legacy_source == legacy_source))
+        bump_reference_data(session, R4_USERS)
+        session.commit()
+        session.close()
+
+
+def test_check_interval_defers_other_writers_until_expired():
+    legacy_source = f"refcache-{uuid4().hex[:8]}"
+    cache = ReferenceCache(check_seconds=3600)
+    reader = SessionLocal()
+    writer = SessionLocal()
+    try:
+        cache.get(reader)
+        _add_user(writer, legacy_source, 8, "Dr Elsewhere")
+        bump_reference_data(writer, R4_USERS)
+        writer.commit()
+
+        assert cache.get(reader).r4_user(8, legacy_source) is None
+        cache.expire()
+        assert cache.get(reader).r4_user(8, legacy_source).display_name == "Dr Elsewhere"
+    finally:
+        writer.execute(delete(R4User).where(R4User.legacy_source == legacy_source))
+        bump_reference_data(writer, R4_USERS)
+        writer.commit()
+        writer.close()
+        reader.close()
+
+
+def test_settings_writes_refresh_profile_and_schedule(api_client, auth_headers):
+    profile = api_client.get("/settings/profile", headers=auth_headers).json()
+    schedule = api_client.get("/settings/schedule", headers=auth_headers).json()
+    try:
+        res = api_client.put(
+            "/settings/profile",
+            headers=auth_headers,
+            json={**{key: value for key, value in profile.items() if key != "id"}, "city": "Cachetown"},
+        )
+        assert res.status_code == 200, res.text
+        session = SessionLocal()
+        try:
+            assert reference_cache.get(session).profile["city"] == "Cachetown"
+        finally:
+            session.close()
+
+        hours = [
+            {key: value for key, value in row.items() if key != "id"} for row in schedule["hours"]
+        ]
+        hours[0]["is_closed"] = not hours[0]["is_closed"]
+        if hours[0]["is_closed"]:
+            hours[0]["start_time"] = hours[0]["end_time"] = None
+        else:
+            hours[0]["start_time"], hours[0]["end_time"] = "09:00:00", "17:00:00"
+        res = api_client.put(
+            "/settings/schedule",
+            headers=auth_headers,
+            json={"hours": hours, "closures": [], "overrides": []},
+        )
+        assert res.status_code == 200, res.text
+        assert res.json()["hours"][0]["is_closed"] == hours[0]["is_closed"]
+        fetched = api_client.get("/settings/schedule", headers=auth_headers).json()
+        assert fetched["hours"][0]["is_closed"] == hours[0]["is_closed"]
+    finally:
+        api_client.put(
+            "/settings/profile",
+            headers=auth_headers,
+            json={key: value for key, value in profile.items() if key != "id"},
+        )
+        api_client.put(
+            "/settings/schedule",
+            headers=auth_headers,
+            json={
+                "hours": [
+                    {key: value for key, value in row.items() if key != "id"}
+                    for row in schedule["hours"]
+                ],
+                "closures": [
+                    {key: value for key, value in row.items() if key != "id"}
+                    for row in schedule["closures"]
+                ],
+                "overrides": [
+                    {key: value for key, value in row.items() if key != "id"}
+                    for row in schedule["overrides"]
+                ],
+            },
+        )
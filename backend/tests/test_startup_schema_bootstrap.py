@@ -50,6 +50,11 @@ def test_startup_does_not_call_metadata_create_all(monkeypatch):
         calls.append("ensure_default_templates")
         return 0
 
+    def fake_warm_reference_cache(db):
+        assert db is session
+        calls.append("warm_reference_cache")
+        return []
+
     def fake_create_all(self, *args, **kwargs):
         create_all_calls.append((args, kwargs))
 
@@ -58,6 +63,7 @@ def test_startup_does_not_call_metadata_create_all(monkeypatch):
     monkeypatch.setattr(app_main, "seed_initial_admin", fake_seed_initial_admin)
     monkeypatch.setattr(app_main, "ensure_capabilities", fake_ensure_capabilities)
     monkeypatch.setattr(app_main, "ensure_default_templates", fake_ensure_default_templates)
+    monkeypatch.setattr(app_main, "warm_reference_cache", fake_warm_reference_cache)
     monkeypatch.setattr(MetaData, "create_all", fake_create_all)
 
     app_main.startup()
@@ -69,6 +75,7 @@ def test_startup_does_not_call_metadata_create_all(monkeypatch):
         "seed_initial_admin",
         "ensure_capabilities",
         "ensure_default_templates",
+        "warm_reference_cache",
     ]
     assert session.scalar_calls == 1
     assert session.closed is True
@@ -22,6 +22,7 @@ import {
 } from "date-fns";
 import { enGB } from "date-fns/locale";
 import { apiFetch, clearToken } from "@/lib/auth";
+import { subscribeDiaryEvents } from "@/lib/diaryEvents";
 import { recallResponseError } from "@/lib/recallErrors";
 import StatusIcon from "@/components/ui/StatusIcon";
 
@@ -2339,6 +2340,19 @@ export default function AppointmentsPage() {
     void loadAppointments();
   }, [loadAppointments]);
 
+  useEffect(() => {
+    if (!range) return;
+    let reloadTimer: ReturnType<typeof setTimeout> | null = null;
+    const unsubscribe = subscribeDiaryEvents({ start: range.start, end: range.end }, () => {
+      if (reloadTimer) clearTimeout(reloadTimer);
+      reloadTimer = setTimeout(() => void loadAppointments(), 250);
+    });
+    return () => {
+      if (reloadTimer) clearTimeout(reloadTimer);
+      unsubscribe();
+    };
+  }, [loadAppointments, range]);
+
   useEffect(() => {
     if (!selectedPatientId) return;
     const patient = patients.find((p) => String(p.id) === selectedPatientId);
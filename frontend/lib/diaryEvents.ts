@@ -0,0 +1,76 @@
+import { apiFetch } from "@/lib/auth";
+
+export type DiaryEvent = {
+  type: string;
+  appointment_id?: number;
+  days?: string[];
+};
+
+type DiaryEventWindow = { start: string; end: string };
+
+const RECONNECT_DELAY_MS = 5000;
+
+function parseFrame(frame: string): DiaryEvent | null {
+  const dataLines = frame
+    .split("\n")
+    .filter((line) => line.startsWith("data:"))
+    .map((line) => line.slice(5).trim());
+  if (dataLines.length === 0) return null;
+  try {
+    return JSON.parse(dataLines.join("\n")) as DiaryEvent;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Streams /appointments/events for the given window and reconnects after drops.
+ * Uses fetch rather than EventSource so the bearer token can be sent.
+ */
+export function subscribeDiaryEvents(
+  eventWindow: DiaryEventWindow,
+  onEvent: (event: DiaryEvent) => void
+): () => void {
+  const controller = new AbortController();
+  let stopped = false;
+  let retryTimer: ReturnType<typeof setTimeout> | null = null;
+
+  const connect = async () => {
+    try {
+      const params = new URLSearchParams({ start: eventWindow.start, end: eventWindow.end });
+      const res = await apiFetch(`/api/appointments/events?${params.toString()}`, {
+        signal: controller.signal,
+        headers: { Accept: "text/event-stream" },
+      });
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (!stopped) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary = buffer.indexOf("\n\n");
+        while (boundary !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const event = parseFrame(frame);
+          if (event) onEvent(event);
+          boundary = buffer.indexOf("\n\n");
+        }
+      }
+    } catch {
+      // Fall through to reconnect unless the caller unsubscribed.
+    }
+    if (!stopped) {
+      retryTimer = setTimeout(() => void connect(), RECONNECT_DELAY_MS);
+    }
+  };
+
+  void connect();
+  return () => {
+    stopped = true;
+    if (retryTimer) clearTimeout(retryTimer);
+    controller.abort();
+  };
+}
@@ -45,51 +45,86 @@ prune_old() {
 
 BACKUP_ROOT="$(default_backup_root)"
 BACKUP_KEEP="${BACKUP_KEEP:-30}"
+ATTACHMENTS_BACKUP_MODE="${ATTACHMENTS_BACKUP_MODE:-full}"
 validate_keep_count "$BACKUP_KEEP"
 mkdir -p "$BACKUP_ROOT"
 
-timestamp="$(date +%Y-%m-%d_%H%M%S)"
-archive_name="attachments_${timestamp}.tgz"
-backup_file="$BACKUP_ROOT/$archive_name"
-source_desc=""
-
-if [ -n "${ATTACHMENTS_PATH:-}" ]; then
-  if [ ! -d "$ATTACHMENTS_PATH" ]; then
-    echo "ATTACHMENTS_PATH does not exist: $ATTACHMENTS_PATH" >&2
-    exit 1
+# Prints "<kind>|<volume name>|<directory>": kind is path (ATTACHMENTS_PATH),
+# or the docker mount type (volume/bind) of the backend's /data.
+resolve_attachments_dir() {
+  if [ -n "${ATTACHMENTS_PATH:-}" ]; then
+    printf 'path||%s\n' "$ATTACHMENTS_PATH"
+    return
   fi
-  tar -czf "$backup_file" -C "$ATTACHMENTS_PATH" .
-  source_desc="path:$ATTACHMENTS_PATH"
-else
+  local backend_container mount_info mount_type mount_name mount_source
   backend_container="$(docker compose ps -q backend)"
   if [ -z "$backend_container" ]; then
     echo "backend container not found; set ATTACHMENTS_PATH or start the stack" >&2
     exit 1
   fi
-
   mount_info="$(docker inspect --format '{{range .Mounts}}{{if eq .Destination "/data"}}{{.Type}}|{{.Name}}|{{.Source}}{{end}}{{end}}' "$backend_container")"
-  if [ -z "$mount_info" ]; then
+  IFS='|' read -r mount_type mount_name mount_source <<<"$mount_info"
+  if [ -z "$mount_source" ]; then
     echo "unable to resolve backend /data mount" >&2
     exit 1
   fi
+  printf '%s|%s|%s\n' "$mount_type" "$mount_name" "$mount_source"
+}
 
-  IFS='|' read -r mount_type mount_name mount_source <<<"$mount_info"
-  case "$mount_type" in
-    volume)
-      docker run --rm -v "$mount_name:/v:ro" -v "$BACKUP_ROOT:/b" alpine:3.20 sh -lc "tar -czf '/b/$archive_name' -C /v ."
-      source_desc="volume:$mount_name"
-      ;;
-    bind)
-      tar -czf "$backup_file" -C "$mount_source" .
-      source_desc="bind:$mount_source"
-      ;;
-    *)
-      echo "unsupported mount type for /data: $mount_type" >&2
-      exit 1
-      ;;
-  esac
+attachments_source="$(resolve_attachments_dir)"
+IFS='|' read -r source_kind source_name source_dir <<<"$attachments_source"
+
+if [ "$ATTACHMENTS_BACKUP_MODE" = "incremental" ]; then
+  # Content-hash manifest plus dated packs of new objects only; see
+  # ops/backup_attachments_incremental.py. Reads the mount source directly, so
+  # volume-backed stacks need this to run as a user that can read it (root).
+  if [ ! -d "$source_dir" ]; then
+    echo "attachments directory does not exist: $source_dir" >&2
+    exit 1
+  fi
+  store_dir="$BACKUP_ROOT/attachments_incremental"
+  incremental_output="$(python3 "$ROOT_DIR/ops/backup_attachments_incremental.py" --dest "$store_dir" backup --source "$source_dir" --keep "$((BACKUP_KEEP > 0 ? BACKUP_KEEP : 1))")"
+  echo "$incremental_output"
+  pack_name="$(awk -F= '$1 == "backup_pack" {print $2}' <<<"$incremental_output")"
+  pack_bytes="$(awk -F= '$1 == "backup_pack_bytes" {print $2}' <<<"$incremental_output")"
+
+  echo "backup_type=attachments_incremental"
+  echo "backup_root=$BACKUP_ROOT"
+  echo "backup_file=${pack_name:+$store_dir/packs/$pack_name}"
+  echo "backup_size_bytes=${pack_bytes:-0}"
+  echo "attachments_source=$source_kind:$source_dir"
+  echo "retention_keep=$BACKUP_KEEP"
+  exit 0
 fi
 
+timestamp="$(date +%Y-%m-%d_%H%M%S)"
+archive_name="attachments_${timestamp}.tgz"
+backup_file="$BACKUP_ROOT/$archive_name"
+source_desc=""
+
+case "$source_kind" in
+  path)
+    if [ ! -d "$source_dir" ]; then
+      echo "ATTACHMENTS_PATH does not exist: $source_dir" >&2
+      exit 1
+    fi
+    tar -czf "$backup_file" -C "$source_dir" .
+    source_desc="path:$source_dir"
+    ;;
+  volume)
+    docker run --rm -v "$source_name:/v:ro" -v "$BACKUP_ROOT:/b" alpine:3.20 sh -lc "tar -czf '/b/$archive_name' -C /v ."
+    source_desc="volume:$source_name"
+    ;;
+  bind)
+    tar -czf "$backup_file" -C "$source_dir" .
+    source_desc="bind:$source_dir"
+    ;;
+  *)
+    echo "unsupported mount type for /data: $source_kind" >&2
+    exit 1
+    ;;
+esac
+
 if [ ! -s "$backup_file" ]; then
   echo "attachments backup failed: $backup_file is empty" >&2
   exit 1
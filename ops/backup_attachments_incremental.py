@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""Incremental, content-addressed backups of the attachments store.
+
+Layout under the destination directory:
+
+    index.json                      object sha256 -> pack it lives in
+    snapshots/<stamp>.json          relative path -> sha256/size/mtime for one run
+    packs/attachments_<stamp>.tar   objects first seen in that run
+
+Each run only hashes files whose size or mtime changed since the previous
+snapshot, and only archives objects that no earlier pack already holds, so a
+nightly run costs time in proportion to new uploads. Identical files (the
+application stores shared uploads once, but older trees may not) are packed
+once. A run is committed by writing its snapshot last; an interrupted run
+leaves no snapshot and the next run simply repeats the work.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+
+FORMAT_VERSION = 1
+READ_CHUNK_BYTES = 1024 * 1024
+DEFAULT_EXCLUDES = ("pdf-cache",)
+INDEX_NAME = "index.json"
+SNAPSHOTS_DIR = "snapshots"
+PACKS_DIR = "packs"
+
+
+class BackupError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    sha256: str
+    size: int
+    mtime_ns: int
+
+    def as_json(self) -> dict[str, object]:
+        return {"sha256": self.sha256, "size": self.size, "mtime_ns": self.mtime_ns}
+
+
+def _now_stamp() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d_%H%M%S")
+
+
+def _write_json_atomic(path: Path, payload: dict[str, object]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as handle:
+        json.dump(payload, handle, sort_keys=True, separators=(",", ":"))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> dict[str, object]:
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(READ_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_stream(handle: BinaryIO) -> str:
+    digest = hashlib.sha256()
+    while chunk := handle.read(READ_CHUNK_BYTES):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def object_member(sha256: str) -> str:
+    return f"objects/{sha256[:2]}/{sha256}"
+
+
+def _is_excluded(rel_path: str, excluded: list[str]) -> bool:
+    return any(rel_path == item or rel_path.endswith(f"/{item}") for item in excluded)
+
+
+def scan_source(
+    source: Path, excludes: Iterable[str] = DEFAULT_EXCLUDES
+) -> dict[str, os.stat_result]:
+    """Stat every file under source, skipping dot-entries (staging, temp files) and excludes.
+
+    Excludes match at any depth, so "pdf-cache" also skips "attachments/pdf-cache"
+    when the source is the whole /data mount.
+    """
+    excluded = [item.strip("/") for item in excludes if item.strip("/")]
+    found: dict[str, os.stat_result] = {}
+    for dirpath, dirnames, filenames in os.walk(source):
+        rel_dir = Path(dirpath).relative_to(source)
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if not name.startswith(".")
+            and not _is_excluded((rel_dir / name).as_posix(), excluded)
+        )
+        for name in filenames:
+            if name.startswith("."):
+                continue
+            path = Path(dirpath) / name
+            stat = path.stat()
+            found[(rel_dir / name).as_posix()] = stat
+    return found
+
+
+class BackupStore:
+    def __init__(self, destination: Path):
+        self.destination = destination
+        self.index_path = destination / INDEX_NAME
+        self.snapshots_dir = destination / SNAPSHOTS_DIR
+        self.packs_dir = destination / PACKS_DIR
+
+    def load_index(self) -> dict[str, dict[str, object]]:
+        if not self.index_path.exists():
+            return {}
+        payload = _read_json(self.index_path)
+        if payload.get("version") != FORMAT_VERSION:
+            raise BackupError(f"unsupported index version: {payload.get('version')}")
+        return dict(payload["objects"])
+
+    def save_index(self, objects: dict[str, dict[str, object]]) -> None:
+        _write_json_atomic(self.index_path, {"version": FORMAT_VERSION, "objects": objects})
+
+    def snapshot_names(self) -> list[str]:
+        if not self.snapshots_dir.is_dir():
+            return []
+        return sorted(path.stem for path in self.snapshots_dir.glob("*.json"))
+
+    def load_snapshot(self, name: str | None = None) -> dict[str, object] | None:
+        names = self.snapshot_names()
+        if name is None:
+            if not names:
+                return None
+            name = names[-1]
+        path = self.snapshots_dir / f"{name}.json"
+        if not path.exists():
+            raise BackupError(f"snapshot not found: {name}")
+        return _read_json(path)
+
+    def pack_path(self, pack: str) -> Path:
+        return self.packs_dir / pack
+
+
+def _snapshot_files(snapshot: dict[str, object] | None) -> dict[str, FileEntry]:
+    if not snapshot:
+        return {}
+    return {
+        rel: FileEntry(
+            sha256=str(item["sha256"]), size=int(item["size"]), mtime_ns=int(item["mtime_ns"])
+        )
+        for rel, item in dict(snapshot["files"]).items()
+    }
+
+
+def _add_object(archive: tarfile.TarFile, path: Path, sha256: str, size: int) -> None:
+    info = tarfile.TarInfo(object_member(sha256))
+    info.size = size
+    info.mtime = int(datetime.now(timezone.utc).timestamp())
+    info.mode = 0o600
+    with path.open("rb") as handle:
+        reader = _HashingReader(handle)
+        archive.addfile(info, reader)
+    if reader.hexdigest() != sha256:
+        raise BackupError(f"file changed while being backed up: {path}")
+
+
+class _HashingReader:
+    """File wrapper that hashes exactly the bytes tarfile copies into the pack."""
+
+    def __init__(self, handle: BinaryIO):
+        self._handle = handle
+        self._digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._handle.read(size)
+        self._digest.update(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def run_backup(
+    source: Path,
+    destination: Path,
+    *,
+    jobs: int | None = None,
+    excludes: Iterable[str] = DEFAULT_EXCLUDES,
+    rehash: bool = False,
+    stamp: str | None = None,
+) -> dict[str, object]:
+    if not source.is_dir():
+        raise BackupError(f"source directory does not exist: {source}")
+    store = BackupStore(destination)
+    stamp = stamp or _now_stamp()
+    if stamp in store.snapshot_names():
+        raise BackupError(f"snapshot already exists: {stamp}")
+    objects = store.load_index()
+    previous = _snapshot_files(store.load_snapshot())
+
+    stats = scan_source(source, excludes)
+    files: dict[str, FileEntry] = {}
+    to_hash: list[str] = []
+    for rel, stat in stats.items():
+        known = previous.get(rel)
+        if (
+            not rehash
+            and known is not None
+            and known.size == stat.st_size
+            and known.mtime_ns == stat.st_mtime_ns
+            and known.sha256 in objects
+        ):
+            files[rel] = known
+        else:
+            to_hash.append(rel)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        digests = pool.map(lambda rel: hash_file(source / rel), to_hash)
+        for rel, sha256 in zip(to_hash, digests):
+            stat = stats[rel]
+            files[rel] = FileEntry(sha256=sha256, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    new_objects: dict[str, str] = {}
+    for rel in sorted(to_hash):
+        sha256 = files[rel].sha256
+        if sha256 not in objects and sha256 not in new_objects:
+            new_objects[sha256] = rel
+
+    pack_name = None
+    pack_bytes = 0
+    if new_objects:
+        pack_name = f"attachments_{stamp}.tar"
+        pack_path = store.pack_path(pack_name)
+        pack_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = pack_path.with_name(f".{pack_name}.tmp")
+        try:
+            with tarfile.open(tmp_path, "w") as archive:
+                for sha256, rel in new_objects.items():
+                    _add_object(archive, source / rel, sha256, files[rel].size)
+            with tmp_path.open("rb") as handle:
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, pack_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        pack_bytes = pack_path.stat().st_size
+        for sha256, rel in new_objects.items():
+            objects[sha256] = {"pack": pack_name, "size": files[rel].size}
+        store.save_index(objects)
+
+    _write_json_atomic(
+        store.snapshots_dir / f"{stamp}.json",
+        {
+            "version": FORMAT_VERSION,
+            "snapshot": stamp,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "source": str(source),
+            "files": {rel: files[rel].as_json() for rel in sorted(files)},
+        },
+    )
+    return {
+        "snapshot": stamp,
+        "files": len(files),
+        "hashed": len(to_hash),
+        "new_objects": len(new_objects),
+        "new_bytes": sum(files[rel].size for rel in new_objects.values()),
+        "pack": pack_name,
+        "pack_bytes": pack_bytes,
+        "total_bytes": sum(entry.size for entry in files.values()),
+    }
+
+
+def _objects_by_pack(
+    store: BackupStore, files: dict[str, FileEntry], objects: dict[str, dict[str, object]]
+) -> dict[str, set[str]]:
+    grouped: dict[str, set[str]] = {}
+    for rel, entry in files.items():
+        location = objects.get(entry.sha256)
+        if location is None:
+            raise BackupError(f"no pack holds {rel} ({entry.sha256})")
+        grouped.setdefault(str(location["pack"]), set()).add(entry.sha256)
+    return grouped
+
+
+def verify_snapshot(destination: Path, snapshot: str | None = None) -> dict[str, object]:
+    """Re-hash every object a snapshot needs straight out of its pack."""
+    store = BackupStore(destination)
+    loaded = store.load_snapshot(snapshot)
+    if loaded is None:
+        raise BackupError("no snapshots to verify")
+    files = _snapshot_files(loaded)
+    grouped = _objects_by_pack(store, files, store.load_index())
+    problems: list[str] = []
+    checked = 0
+    for pack, wanted in sorted(grouped.items()):
+        path = store.pack_path(pack)
+        if not path.exists():
+            problems.extend(f"missing pack {pack} for {sha}" for sha in sorted(wanted))
+            continue
+        seen: set[str] = set()
+        with tarfile.open(path, "r") as archive:
+            for member in archive:
+                sha256 = member.name.rsplit("/", 1)[-1]
+                if sha256 not in wanted:
+                    continue
+                handle = archive.extractfile(member)
+                if handle is None or _hash_stream(handle) != sha256:
+                    problems.append(f"corrupt object {sha256} in {pack}")
+                seen.add(sha256)
+                checked += 1
+        problems.extend(f"object {sha} missing from {pack}" for sha in sorted(wanted - seen))
+    return {
+        "snapshot": loaded["snapshot"],
+        "files": len(files),
+        "objects_checked": checked,
+        "problems": problems,
+    }
+
+
+def restore_snapshot(
+    destination: Path, target: Path, snapshot: str | None = None
+) -> dict[str, object]:
+    """Rebuild a snapshot's tree under target and check every file against the manifest."""
+    store = BackupStore(destination)
+    loaded = store.load_snapshot(snapshot)
+    if loaded is None:
+        raise BackupError("no snapshots to restore")
+    files = _snapshot_files(loaded)
+    grouped = _objects_by_pack(store, files, store.load_index())
+    paths_by_object: dict[str, list[str]] = {}
+    for rel, entry in files.items():
+        paths_by_object.setdefault(entry.sha256, []).append(rel)
+
+    target = target.resolve()
+    target.mkdir(parents=True, exist_ok=True)
+    for pack, wanted in sorted(grouped.items()):
+        with tarfile.open(store.pack_path(pack), "r") as archive:
+            for member in archive:
+                sha256 = member.name.rsplit("/", 1)[-1]
+                if sha256 not in wanted:
+                    continue
+                handle = archive.extractfile(member)
+                if handle is None:
+                    continue
+                data_paths = [target / rel for rel in paths_by_object[sha256]]
+                for path in data_paths:
+                    if target not in path.resolve().parents:
+                        raise BackupError(f"refusing to restore outside target: {path}")
+                first = data_paths[0]
+                first.parent.mkdir(parents=True, exist_ok=True)
+                with first.open("wb") as out:
+                    while chunk := handle.read(READ_CHUNK_BYTES):
+                        out.write(chunk)
+                for extra in data_paths[1:]:
+                    extra.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(first, extra)
+
+    problems: list[str] = []
+    for rel, entry in sorted(files.items()):
+        path = target / rel
+        if not path.is_file():
+            problems.append(f"missing {rel}")
+        elif path.stat().st_size != entry.size or hash_file(path) != entry.sha256:
+            problems.append(f"mismatch {rel}")
+    return {
+        "snapshot": loaded["snapshot"],
+        "target": str(target),
+        "files": len(files),
+        "problems": problems,
+    }
+
+
+def prune(destination: Path, keep: int) -> dict[str, object]:
+    """Keep the newest `keep` snapshots and drop packs none of them reference.
+
+    Packs are immutable, so a pack survives while any kept snapshot still
+    needs one of its objects.
+    """
+    if keep < 1:
+        raise BackupError("keep must be at least 1")
+    store = BackupStore(destination)
+    names = store.snapshot_names()
+    dropped = names[:-keep] if len(names) > keep else []
+    kept = names[len(dropped):]
+    objects = store.load_index()
+    live_packs: set[str] = set()
+    for name in kept:
+        for entry in _snapshot_files(store.load_snapshot(name)).values():
+            location = objects.get(entry.sha256)
+            if location is not None:
+                live_packs.add(str(location["pack"]))
+
+    for name in dropped:
+        (store.snapshots_dir / f"{name}.json").unlink(missing_ok=True)
+    dead_packs = sorted({str(item["pack"]) for item in objects.values()} - live_packs)
+    if dead_packs:
+        store.save_index(
+            {sha: item for sha, item in objects.items() if str(item["pack"]) not in dead_packs}
+        )
+        for pack in dead_packs:
+            store.pack_path(pack).unlink(missing_ok=True)
+    return {
+        "snapshots_deleted": len(dropped),
+        "snapshots_kept": len(kept),
+        "packs_deleted": len(dead_packs),
+    }
+
+
+def _print_kv(prefix: str, result: dict[str, object]) -> None:
+    for key, value in result.items():
+        if isinstance(value, list):
+            print(f"{prefix}_{key}_count={len(value)}")
+            for item in value:
+                print(f"{prefix}_{key}={item}")
+        else:
+            print(f"{prefix}_{key}={'' if value is None else value}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dest", required=True, type=Path, help="Backup store directory.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    backup = sub.add_parser("backup", help="Record a snapshot and pack new objects.")
+    backup.add_argument("--source", required=True, type=Path, help="Attachments directory.")
+    backup.add_argument("--jobs", type=int, help="Parallel hashing workers (default: CPUs).")
+    backup.add_argument(
+        "--exclude",
+        action="append",
+        help="Directory to skip at any depth (repeatable; default: pdf-cache).",
+    )
+    backup.add_argument(
+        "--rehash", action="store_true", help="Hash every file, ignoring size/mtime matches."
+    )
+    backup.add_argument("--keep", type=int, help="Prune to this many snapshots afterwards.")
+
+    verify = sub.add_parser("verify", help="Check a snapshot's objects against their packs.")
+    verify.add_argument("--snapshot", help="Snapshot stamp (default: latest).")
+
+    restore = sub.add_parser("restore", help="Restore a snapshot into a directory and verify it.")
+    restore.add_argument("--target", required=True, type=Path)
+    restore.add_argument("--snapshot", help="Snapshot stamp (default: latest).")
+
+    prune_parser = sub.add_parser("prune", help="Drop old snapshots and unreferenced packs.")
+    prune_parser.add_argument("--keep", required=True, type=int)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "backup":
+            result = run_backup(
+                args.source,
+                args.dest,
+                jobs=args.jobs,
+                excludes=args.exclude if args.exclude is not None else DEFAULT_EXCLUDES,
+                rehash=args.rehash,
+            )
+            _print_kv("backup", result)
+            if args.keep is not None:
+                _print_kv("retention", prune(args.dest, args.keep))
+            return 0
+        if args.command == "verify":
+            result = verify_snapshot(args.dest, args.snapshot)
+            _print_kv("verify", result)
+            return 1 if result["problems"] else 0
+        if args.command == "restore":
+            result = restore_snapshot(args.dest, args.target, args.snapshot)
+            _print_kv("restore", result)
+            return 1 if result["problems"] else 0
+        _print_kv("retention", prune(args.dest, args.keep))
+        return 0
+    except BackupError as exc:
+        print(f"backup_error={exc}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""Replay a concurrent reception-style request mix against a running backend.
+
+Virtual users share one admin login and each loop over a weighted mix of
+the busiest endpoints (patient search, diary snapshot, recalls, cash-up,
+appointment create/patch) until the run ends. The report gives throughput,
+latency percentiles and error rates per operation, plus the time requests
+spent waiting for a pooled database connection (the `db-pool` entry of the
+backend's Server-Timing header) and the worker's pool counters from
+GET /admin/query-profile/pool before and after the run.
+
+Appointment writes create real rows (archived again at the end unless
+--keep-appointments is given), so point it at a local or scratch instance.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+
+DEFAULT_MIX = {
+    "patient_search": 35,
+    "diary_snapshot": 30,
+    "recalls": 10,
+    "cashup": 5,
+    "appointment_create": 10,
+    "appointment_patch": 10,
+}
+WRITE_OPERATIONS = frozenset({"appointment_create", "appointment_patch"})
+SEARCH_PREFIXES = ("smi", "jon", "tay", "bro", "wil", "dav", "eva", "tho", "rob", "wal")
+LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1", "backend"})
+PERCENTILES = (50, 90, 95, 99)
+_TIMING_RE = re.compile(r"(?:^|,)\s*([\w-]+)\s*;[^,]*?dur=([0-9.]+)")
+
+
+class LoadTestError(RuntimeError):
+    pass
+
+
+def parse_mix(value: str | None) -> dict[str, int]:
+    """`name=weight,...` over the known operations; weights are relative."""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix: dict[str, int] = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in DEFAULT_MIX:
+            raise LoadTestError(f"unknown operation in --mix: {name!r}")
+        try:
+            mix[name] = int(weight)
+        except ValueError as exc:
+            raise LoadTestError(f"invalid weight for {name!r}: {weight!r}") from exc
+        if mix[name] < 0:
+            raise LoadTestError(f"negative weight for {name!r}")
+    if not any(mix.values()):
+        raise LoadTestError("--mix needs at least one positive weight")
+    return {name: weight for name, weight in mix.items() if weight}
+
+
+def server_timings(header: str | None) -> dict[str, float]:
+    """Durations by metric name from a Server-Timing header."""
+    return {name: float(duration) for name, duration in _TIMING_RE.findall(header or "")}
+
+
+def percentile(ordered: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+@dataclass
+class Sample:
+    operation: str
+    status: int | None
+    latency_ms: float
+    pool_wait_ms: float | None = None
+    db_ms: float | None = None
+    error: str | None = None
+
+    @property
+    def failed(self) -> bool:
+        return self.status is None or self.status >= 400
+
+
+def _distribution(values: list[float]) -> dict[str, float]:
+    ordered = sorted(values)
+    result = {f"p{pct}_ms": round(percentile(ordered, pct), 1) for pct in PERCENTILES}
+    result["max_ms"] = round(ordered[-1], 1) if ordered else 0.0
+    return result
+
+
+def summarize(samples: list[Sample], elapsed_seconds: float) -> dict[str, Any]:
+    """Throughput, latency percentiles, error rate and pool waits, overall and per operation."""
+
+    def _block(items: list[Sample]) -> dict[str, Any]:
+        failures = [item for item in items if item.failed]
+        statuses: dict[str, int] = {}
+        for item in items:
+            key = str(item.status) if item.status is not None else "error"
+            statuses[key] = statuses.get(key, 0) + 1
+        pool = [item.pool_wait_ms for item in items if item.pool_wait_ms is not None]
+        block: dict[str, Any] = {
+            "requests": len(items),
+            "errors": len(failures),
+            "error_rate": round(len(failures) / len(items), 4) if items else 0.0,
+            "throughput_rps": round(len(items) / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+            "statuses": statuses,
+            "latency": _distribution([item.latency_ms for item in items]),
+        }
+        if pool:
+            block["pool_wait"] = {
+                **_distribution(pool),
+                "total_ms": round(sum(pool), 1),
+                "requests_waiting_over_10ms": sum(1 for value in pool if value > 10),
+            }
+        return block
+
+    by_operation: dict[str, list[Sample]] = {}
+    for sample in samples:
+        by_operation.setdefault(sample.operation, []).append(sample)
+    return {
+        "overall": _block(samples),
+        "operations": {name: _block(items) for name, items in sorted(by_operation.items())},
+    }
+
+
+class ApiClient:
+    """One keep-alive HTTP connection; virtual users each own one, like browser tabs."""
+
+    def __init__(self, base_url: str, *, timeout: float = 30.0, token: str | None = None) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise LoadTestError(f"invalid --base-url: {base_url!r}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+        self._conn: http.client.HTTPConnection | None = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        body: dict[str, Any] | None = None,
+    ) -> tuple[int, dict[str, str], bytes]:
+        target = self.prefix + path + (f"?{urlencode(params)}" if params else "")
+        headers = {"Accept": "application/json", "X-Request-ID": "load-test"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, target, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; reconnect once.
+                self.close()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def json(self, method: str, path: str, **kwargs: Any) -> Any:
+        status, _headers, data = self.request(method, path, **kwargs)
+        if status >= 400:
+            raise LoadTestError(f"{method} {path} returned {status}: {data[:200]!r}")
+        return json.loads(data) if data else None
+
+
+@dataclass
+class RunConfig:
+    base_url: str
+    token: str
+    mix: dict[str, int]
+    users: int
+    duration: float
+    ramp_up: float = 0.0
+    think_time: float = 0.0
+    diary_date: date = field(default_factory=date.today)
+    patient_ids: list[int] = field(default_factory=list)
+    seed: int = 1
+
+
+class VirtualUser(threading.Thread):
+    def __init__(
+        self,
+        index: int,
+        config: RunConfig,
+        deadline: float,
+        created: list[int],
+        lock: threading.Lock,
+    ) -> None:
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.index = index
+        self.config = config
+        self.deadline = deadline
+        self.rng = random.Random(f"{config.seed}:{index}")
+        self.samples: list[Sample] = []
+        self._created = created
+        self._created_lock = lock
+        self._names = list(config.mix)
+        self._weights = [config.mix[name] for name in self._names]
+
+    def run(self) -> None:
+        client = ApiClient(self.config.base_url, token=self.config.token)
+        if self.config.ramp_up and self.config.users > 1:
+            time.sleep(self.config.ramp_up * self.index / self.config.users)
+        try:
+            while time.monotonic() < self.deadline:
+                operation = self.rng.choices(self._names, self._weights)[0]
+                self.samples.append(self._perform(client, operation))
+                if self.config.think_time:
+                    time.sleep(self.rng.uniform(0, 2 * self.config.think_time))
+        finally:
+            client.close()
+
+    def _request_for(self, operation: str) -> tuple[str, str, dict | None, dict | None]:
+        diary_day = self.config.diary_date
+        if operation == "patient_search":
+            return "GET", "/patients/search", {"q": self.rng.choice(SEARCH_PREFIXES), "limit": 20}, None
+        if operation == "diary_snapshot":
+            return "GET", "/appointments/snapshot", {"date": diary_day.isoformat(), "view": "day"}, None
+        if operation == "recalls":
+            return "GET", "/recalls", {"limit": 50}, None
+        if operation == "cashup":
+            return "GET", "/reports/finance/cashup", {"end": diary_day.isoformat()}, None
+        with self._created_lock:
+            existing = self.rng.choice(self._created) if self._created else None
+        if operation == "appointment_patch" and existing is not None:
+            kind = self.rng.choice(("Exam", "Hygiene", "Treatment"))
+            return "PATCH", f"/appointments/{existing}", None, {"appointment_type": kind}
+        # Creates (and patches before anything exists to patch).
+        slot = self.rng.randrange(0, 16)
+        starts = datetime.combine(diary_day, datetime.min.time(), tzinfo=timezone.utc) + timedelta(
+            hours=8, minutes=30 * slot
+        )
+        body = {
+            "patient_id": self.rng.choice(self.config.patient_ids),
+            "starts_at": starts.isoformat(),
+            "ends_at": (starts + timedelta(minutes=30)).isoformat(),
+            "appointment_type": "Load test",
+            "location_type": "clinic",
+            "allow_outside_hours": True,
+        }
+        return "POST", "/appointments", None, body
+
+    def _perform(self, client: ApiClient, operation: str) -> Sample:
+        method, path, params, body = self._request_for(operation)
+        label = "appointment_create" if method == "POST" else operation
+        started = time.perf_counter()
+        try:
+            status, headers, data = client.request(method, path, params=params, body=body)
+        except (OSError, http.client.HTTPException) as exc:
+            client.close()
+            return Sample(label, None, (time.perf_counter() - started) * 1000, error=type(exc).__name__)
+        latency_ms = (time.perf_counter() - started) * 1000
+        timings = server_timings(headers.get("server-timing"))
+        if method == "POST" and status == 201:
+            created_id = json.loads(data).get("id")
+            if created_id is not None:
+                with self._created_lock:
+                    self._created.append(int(created_id))
+        return Sample(label, status, latency_ms, timings.get("db-pool"), timings.get("db"))
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    client = ApiClient(base_url)
+    try:
+        payload = client.json("POST", "/auth/login", body={"email": email, "password": password})
+    finally:
+        client.close()
+    token = (payload or {}).get("access_token")
+    if not token:
+        raise LoadTestError("login response had no access_token")
+    return token
+
+
+def pool_counters(base_url: str, token: str) -> dict[str, Any] | None:
+    client = ApiClient(base_url, token=token)
+    try:
+        status, _headers, data = client.request("GET", "/admin/query-profile/pool")
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        client.close()
+    return json.loads(data) if status == 200 else None
+
+
+def _pool_delta(before: dict[str, Any] | None, after: dict[str, Any] | None) -> dict[str, Any] | None:
+    if not before or not after:
+        return None
+    delta = {}
+    for name, current in after.items():
+        previous = before.get(name, {})
+        delta[name] = {
+            "size": current.get("size"),
+            "max_overflow": current.get("max_overflow"),
+            "checkouts": current.get("checkouts", 0) - previous.get("checkouts", 0),
+            "timeouts": current.get("timeouts", 0) - previous.get("timeouts", 0),
+            "wait_ms_total": round(current.get("wait_ms_total", 0) - previous.get("wait_ms_total", 0), 1),
+            "wait_ms_max_since_start": current.get("wait_ms_max"),
+        }
+    return delta
+
+
+def run_load_test(config: RunConfig) -> tuple[list[Sample], float, list[int]]:
+    created: list[int] = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + config.ramp_up + config.duration
+    users = [VirtualUser(index, config, deadline, created, lock) for index in range(config.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.monotonic() - started
+    samples = [sample for user in users for sample in user.samples]
+    return samples, elapsed, created
+
+
+def discover_patient_ids(base_url: str, token: str, limit: int = 50) -> list[int]:
+    client = ApiClient(base_url, token=token)
+    try:
+        rows = client.json("GET", "/patients", params={"limit": limit}) or []
+    finally:
+        client.close()
+    return [int(row["id"]) for row in rows if "id" in row]
+
+
+def archive_appointments(base_url: str, token: str, appointment_ids: list[int]) -> int:
+    client = ApiClient(base_url, token=token)
+    archived = 0
+    try:
+        for appointment_id in appointment_ids:
+            status, _headers, _data = client.request("POST", f"/appointments/{appointment_id}/archive")
+            archived += int(status == 200)
+    finally:
+        client.close()
+    return archived
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--base-url",
+        default=os.getenv("BACKEND_BASE_URL", "http://localhost:8000"),
+        help="Backend root (default: $BACKEND_BASE_URL or http://localhost:8000).",
+    )
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users (default: 10).")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds at full load (default: 60).")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Seconds to start all users (default: 5).")
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=0.0,
+        help="Mean pause between a user's requests in seconds (default: 0, back to back).",
+    )
+    parser.add_argument(
+        "--mix",
+        help="Weighted operations, e.g. patient_search=35,diary_snapshot=30,recalls=10,cashup=5,"
+        "appointment_create=10,appointment_patch=10 (the default).",
+    )
+    parser.add_argument("--read-only", action="store_true", help="Drop appointment writes from the mix.")
+    parser.add_argument("--date", help="Diary day for snapshots and new appointments (default: today).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the per-user request choices.")
+    parser.add_argument("--keep-appointments", action="store_true", help="Do not archive created appointments.")
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        help="Permit writes against a host other than localhost/backend.",
+    )
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.01,
+        help="Exit 1 when the overall error rate exceeds this (default: 0.01).",
+    )
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.users <= 0 or args.duration <= 0 or args.ramp_up < 0 or args.think_time < 0:
+            raise LoadTestError("--users and --duration must be positive; --ramp-up and --think-time not negative")
+        mix = parse_mix(args.mix)
+        if args.read_only:
+            mix = {name: weight for name, weight in mix.items() if name not in WRITE_OPERATIONS}
+            if not mix:
+                raise LoadTestError("--read-only leaves no operations in --mix")
+        writes = bool(WRITE_OPERATIONS & set(mix))
+        host = urlsplit(args.base_url).hostname or ""
+        if writes and host not in LOCAL_HOSTS and not args.allow_remote:
+            raise LoadTestError(f"refusing appointment writes against {host!r} without --allow-remote")
+        diary_date = date.fromisoformat(args.date) if args.date else date.today()
+
+        email = os.getenv("ADMIN_EMAIL", "admin@example.com")
+        password = os.getenv("ADMIN_PASSWORD", "ChangeMe123!")
+        token = login(args.base_url, email, password)
+        patient_ids = discover_patient_ids(args.base_url, token) if writes else []
+        if writes and not patient_ids:
+            raise LoadTestError("no patients found for appointment writes; seed data or use --read-only")
+
+        config = RunConfig(
+            base_url=args.base_url,
+            token=token,
+            mix=mix,
+            users=args.users,
+            duration=args.duration,
+            ramp_up=args.ramp_up,
+            think_time=args.think_time,
+            diary_date=diary_date,
+            patient_ids=patient_ids,
+            seed=args.seed,
+        )
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        pool_before = pool_counters(args.base_url, token)
+        samples, elapsed, created = run_load_test(config)
+        pool_after = pool_counters(args.base_url, token)
+        archived = 0 if args.keep_appointments else archive_appointments(args.base_url, token, created)
+    except (LoadTestError, OSError, http.client.HTTPException) as exc:
+        print(f"load test failed: {exc}", file=sys.stderr)
+        return 2
+
+    report = {
+        "started_at": started_at,
+        "base_url": args.base_url,
+        "users": args.users,
+        "duration_seconds": args.duration,
+        "ramp_up_seconds": args.ramp_up,
+        "think_time_seconds": args.think_time,
+        "elapsed_seconds": round(elapsed, 2),
+        "mix": mix,
+        **summarize(samples, elapsed),
+        "server_pool": _pool_delta(pool_before, pool_after),
+        "appointments": {"created": len(created), "archived": archived},
+    }
+    rendered = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(rendered + "\n")
+    print(rendered)
+    return 1 if report["overall"]["error_rate"] > args.max_error_rate else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+import tarfile
+from pathlib import Path
+
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / "backup_attachments_incremental.py"
+SPEC = importlib.util.spec_from_file_location("backup_attachments_incremental", SCRIPT_PATH)
+assert SPEC and SPEC.loader
+BACKUP = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = BACKUP
+SPEC.loader.exec_module(BACKUP)
+
+
+def write(root: Path, rel: str, content: bytes) -> Path:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def pack_members(dest: Path, pack: str) -> list[str]:
+    with tarfile.open(dest / "packs" / pack) as archive:
+        return sorted(member.name for member in archive)
+
+
+def test_second_run_packs_only_new_objects(tmp_path: Path) -> None:
+    source = tmp_path / "attachments"
+    dest = tmp_path / "backups"
+    write(source, "aa/bb/first", b"first scan")
+    write(source, "legacy-a", b"shared letter")
+    write(source, "legacy-b", b"shared letter")
+    write(source, ".staging/partial", b"in flight")
+    write(source, "pdf-cache/invoice/1/x.pdf", b"cached")
+
+    first = BACKUP.run_backup(source, dest, jobs=2, stamp="2026-01-01_000000")
+    assert first["files"] == 3
+    assert first["new_objects"] == 2
+    assert len(pack_members(dest, first["pack"])) == 2
+
+    write(source, "cc/dd/second", b"second scan")
+    second = BACKUP.run_backup(source, dest, jobs=2, stamp="2026-01-02_000000")
+    assert second["files"] == 4
+    assert second["hashed"] == 1
+    assert second["new_objects"] == 1
+    assert pack_members(dest, second["pack"]) == [
+        BACKUP.object_member(BACKUP.hash_file(source / "cc/dd/second"))
+    ]
+
+    third = BACKUP.run_backup(source, dest, stamp="2026-01-03_000000")
+    assert third["hashed"] == 0
+    assert third["pack"] is None
+
+
+def test_data_mount_source_skips_nested_pdf_cache(tmp_path: Path) -> None:
+    # The compose volume is mounted at /data and files live in /data/attachments.
+    source = tmp_path / "data"
+    dest = tmp_path / "backups"
+    write(source, "attachments/aa/bb/scan", b"scan")
+    write(source, "attachments/pdf-cache/invoice/1/x.pdf", b"cached")
+    write(source, "attachments/.staging/partial", b"in flight")
+
+    assert sorted(BACKUP.scan_source(source)) == ["attachments/aa/bb/scan"]
+    result = BACKUP.run_backup(source, dest, stamp="2026-01-01_000000")
+    assert result["files"] == 1
+    scan = source / "attachments/aa/bb/scan"
+    assert pack_members(dest, result["pack"]) == [BACKUP.object_member(BACKUP.hash_file(scan))]
+
+
+def test_restore_rebuilds_snapshot_and_verifies_against_manifest(tmp_path: Path) -> None:
+    source = tmp_path / "attachments"
+    dest = tmp_path / "backups"
+    write(source, "aa/bb/first", b"first scan" * 1000)
+    write(source, "legacy-a", b"shared letter")
+    write(source, "legacy-b", b"shared letter")
+    BACKUP.run_backup(source, dest, stamp="2026-01-01_000000")
+    (source / "legacy-b").unlink()
+    write(source, "cc/dd/second", b"second scan")
+    BACKUP.run_backup(source, dest, stamp="2026-01-02_000000")
+
+    latest = BACKUP.restore_snapshot(dest, tmp_path / "latest")
+    assert latest["problems"] == []
+    assert (tmp_path / "latest/cc/dd/second").read_bytes() == b"second scan"
+    assert not (tmp_path / "latest/legacy-b").exists()
+
+    earlier = BACKUP.restore_snapshot(dest, tmp_path / "earlier", "2026-01-01_000000")
+    assert earlier["problems"] == []
+    assert (tmp_path / "earlier/legacy-b").read_bytes() == b"shared letter"
+
+    assert BACKUP.verify_snapshot(dest)["problems"] == []
+
+
+def test_verify_reports_corrupt_pack(tmp_path: Path, capsys) -> None:
+    source = tmp_path / "attachments"
+    dest = tmp_path / "backups"
+    write(source, "aa/bb/first", b"first scan")
+    result = BACKUP.run_backup(source, dest, stamp="2026-01-01_000000")
+    pack = dest / "packs" / result["pack"]
+    data = pack.read_bytes()
+    pack.write_bytes(data.replace(b"first scan", b"FIRST SCAN"))
+
+    assert BACKUP.main(["--dest", str(dest), "verify"]) == 1
+    assert "verify_problems=corrupt object" in capsys.readouterr().out
+
+
+def test_prune_keeps_packs_needed_by_remaining_snapshots(tmp_path: Path) -> None:
+    source = tmp_path / "attachments"
+    dest = tmp_path / "backups"
+    write(source, "kept", b"kept for ever")
+    write(source, "removed", b"deleted later")
+    first = BACKUP.run_backup(source, dest, stamp="2026-01-01_000000")
+    (source / "removed").unlink()
+    write(source, "new", b"new upload")
+    BACKUP.run_backup(source, dest, stamp="2026-01-02_000000")
+
+    result = BACKUP.prune(dest, keep=1)
+    assert result == {"snapshots_deleted": 1, "snapshots_kept": 1, "packs_deleted": 0}
+    assert (dest / "packs" / first["pack"]).exists()
+
+    (source / "kept").unlink()
+    BACKUP.run_backup(source, dest, stamp="2026-01-03_000000")
+    result = BACKUP.prune(dest, keep=1)
+    assert result["packs_deleted"] == 1
+    assert not (dest / "packs" / first["pack"]).exists()
+    assert BACKUP.restore_snapshot(dest, tmp_path / "restored")["problems"] == []
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / "load_test.py"
+SPEC = importlib.util.spec_from_file_location("load_test", SCRIPT_PATH)
+assert SPEC and SPEC.loader
+LOAD = importlib.util.module_from_spec(SPEC)
+sys.modules[SPEC.name] = LOAD
+SPEC.loader.exec_module(LOAD)
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    appointments: list[int] = []
+    archived: list[int] = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, payload, *, pool_ms: float = 0.0) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header(
+            "Server-Timing",
+            f'db;dur=1.5;desc="2 queries", db-slowest;dur=1.0, db-pool;dur={pool_ms:.1f}',
+        )
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def do_POST(self):
+        body = self._body()
+        if self.path == "/auth/login":
+            return self._reply(200, {"access_token": "token"})
+        if self.headers.get("Authorization") != "Bearer token":
+            return self._reply(401, {"detail": "Not authenticated"})
+        if self.path == "/appointments":
+            assert body["allow_outside_hours"] is True
+            with self.lock:
+                self.appointments.append(len(self.appointments) + 1)
+                created = self.appointments[-1]
+            return self._reply(201, {"id": created})
+        if self.path.endswith("/archive"):
+            with self.lock:
+                self.archived.append(int(self.path.split("/")[2]))
+            return self._reply(200, {})
+        return self._reply(404, {})
+
+    def do_PATCH(self):
+        self._body()
+        return self._reply(200, {})
+
+    def do_GET(self):
+        if self.path.startswith("/patients?"):
+            return self._reply(200, [{"id": 1}, {"id": 2}])
+        if self.path == "/admin/query-profile/pool":
+            return self._reply(200, {"sync": {"size": 5, "checkouts": 10, "wait_ms_total": 1.0}})
+        if self.path.startswith("/recalls"):
+            return self._reply(500, {"detail": "boom"})
+        return self._reply(200, [], pool_ms=12.5)
+
+
+@pytest.fixture
+def backend_url():
+    StubBackend.appointments = []
+    StubBackend.archived = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBackend)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parse_mix_validates_names_and_weights():
+    assert LOAD.parse_mix(None) == LOAD.DEFAULT_MIX
+    assert LOAD.parse_mix("patient_search=3,recalls=0") == {"patient_search": 3}
+    with pytest.raises(LOAD.LoadTestError):
+        LOAD.parse_mix("unknown=1")
+    with pytest.raises(LOAD.LoadTestError):
+        LOAD.parse_mix("recalls=0")
+
+
+def test_server_timings_and_percentiles():
+    timings = LOAD.server_timings('db;dur=4.2;desc="3 queries", db-slowest;dur=2.0, db-pool;dur=0.7')
+    assert timings == {"db": 4.2, "db-slowest": 2.0, "db-pool": 0.7}
+    ordered = [float(value) for value in range(1, 101)]
+    assert LOAD.percentile(ordered, 50) == 50.0
+    assert LOAD.percentile(ordered, 99) == 99.0
+    assert LOAD.percentile([], 95) == 0.0
+
+
+def test_summary_counts_errors_per_operation():
+    samples = [
+        LOAD.Sample("patient_search", 200, 10.0, pool_wait_ms=0.0),
+        LOAD.Sample("patient_search", 200, 30.0, pool_wait_ms=20.0),
+        LOAD.Sample("recalls", 503, 5.0),
+        LOAD.Sample("recalls", None, 1.0, error="ConnectionRefusedError"),
+    ]
+    summary = LOAD.summarize(samples, 2.0)
+    assert summary["overall"]["requests"] == 4
+    assert summary["overall"]["error_rate"] == 0.5
+    assert summary["overall"]["throughput_rps"] == 2.0
+    assert summary["operations"]["recalls"]["statuses"] == {"503": 1, "error": 1}
+    assert summary["operations"]["patient_search"]["pool_wait"]["requests_waiting_over_10ms"] == 1
+    assert "pool_wait" not in summary["operations"]["recalls"]
+
+
+def test_run_reports_mix_and_archives_created_appointments(backend_url, tmp_path, capsys):
+    output = tmp_path / "report.json"
+    code = LOAD.main(
+        [
+            "--base-url",
+            backend_url,
+            "--users",
+            "3",
+            "--duration",
+            "0.5",
+            "--ramp-up",
+            "0",
+            "--output",
+            str(output),
+        ]
+    )
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert json.loads(capsys.readouterr().out) == report
+    assert code == 1  # the stub fails every /recalls request
+    operations = report["operations"]
+    assert operations["recalls"]["error_rate"] == 1.0
+    assert operations["diary_snapshot"]["errors"] == 0
+    assert operations["diary_snapshot"]["pool_wait"]["max_ms"] == 12.5
+    assert report["appointments"]["created"] == len(StubBackend.appointments) > 0
+    assert sorted(StubBackend.archived) == StubBackend.appointments
+    assert report["server_pool"]["sync"]["checkouts"] == 0
+
+
+def test_writes_against_remote_hosts_need_opt_in(capsys):
+    code = LOAD.main(["--base-url", "https://pms.example.com", "--duration", "1"])
+    assert code == 2
+    assert "--allow-remote" in capsys.readouterr().err